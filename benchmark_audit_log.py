@@ -0,0 +1,121 @@
+"""
+Перевірка, що журнал аудиту (titanic_game/audit.py) не збільшує затримку передбачень.
+
+Одні й ті самі пасажири передбачаються через model.predict_survival без журналу
+та з журналом (поведінка при переповненні 'block' і 'drop'). Варіанти чергуються
+в кількох раундах (шум машини однаково впливає на всі), для кожного виводяться
+p50/p99/p99.9 затримки одного передбачення. Перевіряється, що p99 з журналом не
+більший за p99 без журналу більш ніж на --p99-tolerance, що кожне передбачення
+записано та що файли ротувались. Якщо перевірка не пройдена, скрипт завершується
+з кодом 1.
+
+Запуск:
+    python benchmark_audit_log.py
+    python benchmark_audit_log.py --predictions 50000 --max-file-kb 256 --rounds 5
+"""
+
+import os
+import sys
+import time
+import argparse
+import warnings
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'titanic_game'))
+
+# Журнал, артефакти та скетчі зсуву - у тимчасовій папці, а не в titanic_game/results
+# (змінні середовища читаються під час імпорту модулів, тому задаються до нього)
+WORKDIR = tempfile.mkdtemp(prefix='titanic-audit-')
+os.environ['TITANIC_ARTIFACTS_DIR'] = os.path.join(WORKDIR, 'artifacts')
+os.environ['TITANIC_DRIFT_DIR'] = os.path.join(WORKDIR, 'drift')
+os.environ['TITANIC_AUDIT_DIR'] = os.path.join(WORKDIR, 'audit')
+
+warnings.filterwarnings('ignore')
+
+
+def make_passengers(n, random_state=42):
+    """Випадкові пасажири (аргументи predict_survival)."""
+    rng = np.random.default_rng(random_state)
+    return [(int(rng.integers(1, 4)), 'Жінка' if rng.random() < 0.35 else 'Чоловік',
+             float(np.clip(rng.normal(30, 14), 0.5, 80)), int(rng.poisson(0.5)),
+             int(rng.poisson(0.4)), float(rng.lognormal(3, 1)))
+            for _ in range(n)]
+
+
+def measure(passengers):
+    """Затримка кожного передбачення в мікросекундах."""
+    from model import predict_survival
+
+    latencies = np.empty(len(passengers))
+    for i, passenger in enumerate(passengers):
+        started = time.perf_counter()
+        predict_survival(*passenger)
+        latencies[i] = time.perf_counter() - started
+    return latencies * 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Затримка передбачень з журналом аудиту")
+    parser.add_argument('--predictions', type=int, default=20000, help="Кількість передбачень на варіант у раунді")
+    parser.add_argument('--rounds', type=int, default=3, help="Скільки разів чергувати варіанти")
+    parser.add_argument('--max-file-kb', type=int, default=128, help="Розмір файлу журналу до ротації")
+    parser.add_argument('--p99-tolerance', type=float, default=0.15,
+                        help="Допустиме відносне збільшення p99 з журналом")
+    args = parser.parse_args()
+
+    import audit
+    from audit import AuditLog, read_audit_log
+    from model import load_model
+
+    load_model()
+    passengers = make_passengers(args.predictions)
+    audit.AUDIT_ENABLED = False
+    measure(passengers[:1000])  # прогрів
+
+    print(f"📊 {args.predictions} передбачень × {args.rounds} раунди на варіант, ядер: {os.cpu_count()}")
+    variants = [('без журналу', None), ('журнал, block', 'block'), ('журнал, drop', 'drop')]
+    latencies = {name: [] for name, _ in variants}
+    failures = []
+    for round_number in range(args.rounds):
+        # Порядок варіантів зсувається в кожному раунді
+        shift = round_number % len(variants)
+        for name, overflow in variants[shift:] + variants[:shift]:
+            audit.AUDIT_ENABLED = overflow is not None
+            if overflow:
+                directory = os.path.join(WORKDIR, f"{overflow}-{round_number}")
+                audit._audit_log = AuditLog(directory, overflow=overflow, max_file_bytes=args.max_file_kb * 1024)
+            latencies[name].append(measure(passengers))
+
+            if overflow:
+                log = audit._audit_log
+                log.close()
+                records = len(read_audit_log(directory))
+                files = len(os.listdir(directory))
+                if records != len(passengers) or log.dropped:
+                    failures.append(f"{name}, раунд {round_number + 1}: записано {records} з {len(passengers)}, "
+                                    f"відкинуто {log.dropped}, помилок {log.errors}")
+                if files < 2:
+                    failures.append(f"{name}, раунд {round_number + 1}: файли не ротувались ({files})")
+                print(f"   раунд {round_number + 1}, {name:14s} | записано {records}, відкинуто {log.dropped}, "
+                      f"файлів: {files}")
+    audit.AUDIT_ENABLED = False
+
+    percentiles = {}
+    for name, _ in variants:
+        percentiles[name] = np.percentile(np.concatenate(latencies[name]), [50, 99, 99.9])
+        p50, p99, p999 = percentiles[name]
+        print(f"   {name:14s} | p50 {p50:7.1f} мкс | p99 {p99:7.1f} мкс | p99.9 {p999:7.1f} мкс")
+
+    baseline_p99 = percentiles['без журналу'][1]
+    for name, overflow in variants:
+        if overflow and percentiles[name][1] > baseline_p99 * (1 + args.p99_tolerance):
+            failures.append(f"{name}: p99 {percentiles[name][1]:.1f} мкс > {baseline_p99:.1f} мкс × "
+                            f"{1 + args.p99_tolerance:g}")
+
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        sys.exit(1)
+    print(f"✅ p99 з журналом у межах +{args.p99_tolerance:.0%}, усі передбачення записано, файли ротувались")
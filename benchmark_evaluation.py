@@ -0,0 +1,76 @@
+"""
+Порівняння швидкості оцінки моделі на кроці 6: попередній варіант
+(model.score двічі, predict, precision_score, recall_score, f1_score)
+та evaluation.evaluate_model (один predict_proba на вибірку, матриця помилок,
+ROC AUC та бутстреп-інтервали всіх метрик).
+
+Запуск:
+    python benchmark_evaluation.py
+    python benchmark_evaluation.py --rows 100000 1000000 --bootstrap 2000
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+from sklearn.metrics import precision_score, recall_score, f1_score, roc_auc_score
+from sklearn.model_selection import train_test_split
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'titanic_game'))
+
+from algorithms import build_model, DECISION_TREE, RANDOM_FOREST
+from evaluation import evaluate_model
+from benchmark_hist_tree import make_synthetic_data
+
+
+def old_evaluation(model, X_train, y_train, X_test, y_test):
+    """Оцінка як раніше в training.train_game_model (без AUC та інтервалів)."""
+    y_pred = model.predict(X_test)
+    return {
+        'train_accuracy': model.score(X_train, y_train),
+        'test_accuracy': model.score(X_test, y_test),
+        'precision': precision_score(y_test, y_pred, zero_division=0),
+        'recall': recall_score(y_test, y_pred, zero_division=0),
+        'f1': f1_score(y_test, y_pred, zero_division=0),
+    }
+
+
+def timed(function, *args, **kwargs):
+    started = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Швидкість оцінки моделі на кроці 6")
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 1000000], help="Розміри датасетів")
+    parser.add_argument('--bootstrap', type=int, default=1000, help="Кількість бутстреп-вибірок")
+    args = parser.parse_args()
+
+    for n_rows in args.rows:
+        X, y = make_synthetic_data(n_rows)
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+        print(f"📊 {n_rows} рядків (test: {len(y_test)})")
+
+        for algorithm in [DECISION_TREE, RANDOM_FOREST]:
+            model = build_model(algorithm, max_depth=8, n_estimators=50, n_rows=len(y_train),
+                                n_jobs=-1)
+            model.fit(X_train, y_train)
+
+            old, old_time = timed(old_evaluation, model, X_train, y_train, X_test, y_test)
+            _, auc_time = timed(lambda: roc_auc_score(y_test, model.predict_proba(X_test)[:, 1]))
+            new, new_time = timed(evaluate_model, model, X_train, y_train, X_test, y_test,
+                                  n_bootstrap=args.bootstrap)
+
+            same = all(np.isclose(old[key], value) for key, value in [
+                ('train_accuracy', new['train']['accuracy']), ('test_accuracy', new['test']['accuracy']),
+                ('precision', new['test']['precision']), ('recall', new['test']['recall']),
+                ('f1', new['test']['f1'])
+            ])
+            low, high = new['test']['ci']['accuracy']
+            print(f"   {algorithm.split(' (')[0]:14s} | раніше {old_time * 1000:7.0f} мс "
+                  f"(+ AUC {auc_time * 1000:.0f} мс) | тепер {new_time * 1000:7.0f} мс з AUC та "
+                  f"{args.bootstrap} бутстреп-вибірками | метрики збігаються: {'✅' if same else '❌'} | "
+                  f"Test Accuracy {new['test']['accuracy'] * 100:.2f}% [{low * 100:.2f}%, {high * 100:.2f}%]")
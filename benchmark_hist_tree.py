@@ -0,0 +1,120 @@
+"""
+Порівняння швидкості навчання дерева рішень на гістограмах (hist_tree.py)
+з DecisionTreeClassifier зі sklearn.
+
+Сценарій такий самий, як у додатку: одні й ті самі дані навчаються багато
+разів з різною глибиною та різними наборами ознак. Дерево на гістограмах
+розкладає дані по кошиках один раз (prebin), а sklearn сортує ознаки заново
+при кожному навчанні.
+
+Запуск:
+    python benchmark_hist_tree.py                      # справжні дані + 1M рядків
+    python benchmark_hist_tree.py --rows 1000000 10000000
+"""
+
+import os
+import sys
+import time
+import argparse
+from urllib.error import URLError
+
+import numpy as np
+from sklearn.tree import DecisionTreeClassifier
+from sklearn.model_selection import train_test_split
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'titanic_game'))
+
+from hist_tree import HistogramTreeClassifier, prebin
+
+FEATURES = ['Pclass', 'Sex', 'Age', 'SibSp', 'Parch', 'Fare']
+
+# Комбінації (глибина, ознаки), які перебирає гравець (max_depth у грі - від 1 до 20)
+DEPTHS = [3, 5, 10, 20]
+FEATURE_SUBSETS = [FEATURES, ['Pclass', 'Sex', 'Age'], ['Sex', 'Age', 'Fare']]
+
+
+def load_real_data():
+    """Справжній датасет Титаніка, підготовлений як у train_model.py."""
+    from train_model import prepare_data
+
+    df, _ = prepare_data()
+    return df[FEATURES].to_numpy(dtype=np.float64), df['Survived'].to_numpy()
+
+
+def make_synthetic_data(n_rows, random_state=42):
+    """
+    Синтетичні пасажири з розподілами, схожими на справжні
+    (Fare та Age - неперервні ознаки з великою кількістю унікальних значень).
+    """
+    rng = np.random.default_rng(random_state)
+    pclass = rng.choice([1, 2, 3], size=n_rows, p=[0.24, 0.21, 0.55])
+    sex = rng.integers(0, 2, size=n_rows)
+    age = np.clip(rng.normal(30, 14, size=n_rows), 0.4, 80)
+    sibsp = rng.poisson(0.5, size=n_rows)
+    parch = rng.poisson(0.4, size=n_rows)
+    fare = rng.lognormal(np.log(60) - 0.6 * pclass, 0.8, size=n_rows)
+
+    logit = 2.5 - 2.4 * sex - 0.9 * (pclass - 2) - 0.02 * (age - 30) - 0.2 * sibsp + 0.004 * fare
+    survived = (rng.random(n_rows) < 1 / (1 + np.exp(-logit))).astype(np.int64)
+
+    X = np.column_stack([pclass, sex, age, sibsp, parch, fare]).astype(np.float64)
+    return X, survived
+
+
+def run_benchmark(name, X, y):
+    """Навчає всі комбінації глибини та ознак обома способами та друкує час і точність."""
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    n_fits = len(DEPTHS) * len(FEATURE_SUBSETS)
+
+    print(f"\n📊 {name}: {len(y_train)} рядків для навчання, {n_fits} навчань")
+
+    # sklearn: кожне навчання сортує ознаки заново
+    started = time.perf_counter()
+    sklearn_scores = []
+    for columns in FEATURE_SUBSETS:
+        idx = [FEATURES.index(c) for c in columns]
+        for depth in DEPTHS:
+            model = DecisionTreeClassifier(max_depth=depth, min_samples_split=5,
+                                           min_samples_leaf=2, random_state=42)
+            model.fit(X_train[:, idx], y_train)
+            sklearn_scores.append(model.score(X_test[:, idx], y_test))
+    sklearn_time = time.perf_counter() - started
+
+    # Гістограми: кошики рахуються один раз, далі - тільки вибір стовпців
+    started = time.perf_counter()
+    binned, bin_edges = prebin(X_train)
+    prebin_time = time.perf_counter() - started
+
+    hist_scores = []
+    for columns in FEATURE_SUBSETS:
+        idx = [FEATURES.index(c) for c in columns]
+        for depth in DEPTHS:
+            model = HistogramTreeClassifier(max_depth=depth, min_samples_split=5, min_samples_leaf=2)
+            model.fit_binned(binned[:, idx], y_train, [bin_edges[i] for i in idx])
+            hist_scores.append(model.score(X_test[:, idx], y_test))
+    hist_time = time.perf_counter() - started
+
+    print(f"   sklearn:     {sklearn_time:8.2f} с  ({sklearn_time / n_fits:.3f} с на навчання)")
+    print(f"   гістограми:  {hist_time:8.2f} с  ({hist_time / n_fits:.3f} с на навчання, "
+          f"з них prebin {prebin_time:.2f} с)")
+    print(f"   прискорення: {sklearn_time / hist_time:.1f}×")
+    print(f"   середня точність: sklearn {np.mean(sklearn_scores) * 100:.2f}%, "
+          f"гістограми {np.mean(hist_scores) * 100:.2f}% "
+          f"(макс. різниця {np.max(np.abs(np.subtract(sklearn_scores, hist_scores))) * 100:.2f}%)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк дерева рішень на гістограмах")
+    parser.add_argument('--rows', type=int, nargs='*', default=[1_000_000],
+                        help="Розміри синтетичних даних")
+    parser.add_argument('--skip-real', action='store_true', help="Не завантажувати справжні дані")
+    args = parser.parse_args()
+
+    if not args.skip_real:
+        try:
+            run_benchmark("Справжні дані Титаніка", *load_real_data())
+        except URLError as error:
+            print(f"⚠️ Не вдалося завантажити справжні дані: {error}")
+
+    for n_rows in args.rows:
+        run_benchmark(f"Синтетичні дані ({n_rows:,} рядків)", *make_synthetic_data(n_rows))
@@ -0,0 +1,303 @@
+"""
+Перевірка масштабування пропускної здатності з кількістю реплік.
+
+Кожна репліка - окремий процес з HTTP-сервером на своєму порту, як у
+run_replicas.py, а запити гравців проходять через той самий TCP-балансувальник
+(run_replicas.serve_balancer, нове з'єднання на кожен запит), тому запити
+однієї сесії потрапляють на різні репліки. Один запит повторює Python-роботу
+одного перезапуску сторінки гри:
+    1. відновити сесію зі спільного сховища (session_store.py);
+    2. відтворити дані кроків 2 та 3 з виборів гравця на спільному датасеті
+       (artifacts.py, memory map) та порахувати статистику;
+    3. зробити передбачення спільною моделлю;
+    4. зберегти оновлений знімок сесії.
+
+Після кожного заміру перевіряється, що кожна репліка отримала запити, а після
+всіх - що жоден запит не втрачено (лічильники в сесіях). Прискорення перевіряється
+лише для кількості реплік, що не перевищує кількість ядер: з N репліками на N ядрах
+пропускна здатність має бути не меншою за --min-efficiency × N від однієї репліки.
+Якщо перевірка не пройдена, скрипт завершується з кодом 1.
+
+Запуск:
+    python benchmark_replicas.py                       # 1, 2, 4 ... до кількості ядер
+    python benchmark_replicas.py --replicas 1 2 4 8 --rows 50000 --requests 400
+"""
+
+import os
+import sys
+import time
+import uuid
+import shutil
+import socket
+import asyncio
+import argparse
+import tempfile
+import threading
+import http.client
+import multiprocessing
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+import numpy as np
+import pandas as pd
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'titanic_game')
+
+# Скільки одночасних гравців на одну репліку
+CLIENTS_PER_REPLICA = 2
+
+# Вибори гравця, з якими працюють усі сесії
+CHOICES = {
+    'features': ['Pclass', 'Sex', 'Age', 'SibSp', 'Parch', 'Fare', 'Embarked', 'Cabin', 'Name'],
+    'cols_to_show': ['Survived', 'Pclass', 'Sex', 'Age', 'SibSp', 'Parch', 'Fare', 'Embarked', 'Cabin', 'Name'],
+    'age_strategy': "Заповнити медіаною (середнім значенням)",
+    'encoding_choices': {
+        'Sex': "Male=1, Female=0",
+        'Embarked': "За алфавітом: C, Q, S → 1, 2, 3",
+        'Cabin': "Є каюта = 1, Немає каюти = 0",
+        'Name': "Витягти титулів, сімейного стану (Mr, Mrs, Miss, Master)",
+    },
+}
+
+
+def make_synthetic_passengers(n_rows, random_state=42):
+    """Синтетичні пасажири зі схемою датасету Титаніка (з текстовими колонками)."""
+    rng = np.random.default_rng(random_state)
+    pclass = rng.choice([1, 2, 3], size=n_rows, p=[0.24, 0.21, 0.55])
+    sex = rng.choice(['male', 'female'], size=n_rows, p=[0.65, 0.35])
+    age = np.clip(rng.normal(30, 14, size=n_rows), 0.4, 80).round(1)
+    age[rng.random(n_rows) < 0.2] = np.nan
+    titles = np.where(sex == 'male', rng.choice(['Mr', 'Master'], size=n_rows, p=[0.9, 0.1]),
+                      rng.choice(['Mrs', 'Miss'], size=n_rows))
+    cabin = np.where(rng.random(n_rows) < 0.23,
+                     [f"{deck}{number}" for deck, number in zip(rng.choice(list('ABCDEFG'), size=n_rows),
+                                                                rng.integers(1, 130, size=n_rows))],
+                     None)
+    survived = (rng.random(n_rows) < np.where(sex == 'female', 0.74, 0.19)).astype(np.int64)
+
+    return pd.DataFrame({
+        'PassengerId': np.arange(1, n_rows + 1),
+        'Survived': survived,
+        'Pclass': pclass,
+        'Name': [f"Passenger{i}, {title}. John" for i, title in enumerate(titles)],
+        'Sex': sex,
+        'Age': age,
+        'SibSp': rng.poisson(0.5, size=n_rows),
+        'Parch': rng.poisson(0.4, size=n_rows),
+        'Ticket': rng.integers(100000, 999999, size=n_rows).astype(str),
+        'Fare': rng.lognormal(np.log(60) - 0.6 * pclass, 0.8, size=n_rows).round(2),
+        'Cabin': cabin,
+        'Embarked': rng.choice(['S', 'C', 'Q'], size=n_rows, p=[0.72, 0.19, 0.09]),
+    })
+
+
+def handle_request(session_id, store):
+    """Один запит гравця (див. опис модуля)."""
+    from artifacts import load_dataset
+    from preprocessing import prepare_step_2, apply_encodings
+    from dataset_stats import compute_stats
+    from session_store import load_session, save_session
+    from model import predict_survival
+
+    state = {}
+    load_session(session_id, state, store)
+    choices = state['game_choices']
+
+    df = load_dataset()
+    df_step_2 = prepare_step_2(df, choices['cols_to_show'], choices['age_strategy'])
+    df_processed = apply_encodings(df_step_2, choices['encoding_choices'])
+    compute_stats(df_processed)
+    predict_survival(1, "Жінка", 29, 0, 0, 100)
+
+    choices['requests'] = choices.get('requests', 0) + 1
+    save_session(session_id, state, store=store)
+
+
+def free_port():
+    """Вільний TCP-порт на localhost."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def replica_worker(port, ready, warmup_session_id):
+    """Процес-репліка: HTTP-сервер, який обробляє GET /<сесія> (GET /handled - лічильник запитів)."""
+    sys.path.insert(0, APP_DIR)
+    from session_store import get_session_store
+
+    store = get_session_store()
+    handled = 0
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            nonlocal handled
+            session_id = self.path.lstrip('/')
+            if session_id == 'handled':
+                body = str(handled).encode()
+            else:
+                handle_request(session_id, store)
+                handled += 1
+                body = b'ok'
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(('127.0.0.1', port), Handler)
+    # Прогрів: відкриваємо датасет та модель до початку вимірювання
+    handle_request(warmup_session_id, store)
+    handled = 0
+    ready.set()
+    server.serve_forever()
+
+
+def get(port, path):
+    """Один HTTP-запит (нове з'єднання, тому балансувальник обирає наступну репліку)."""
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+    try:
+        connection.request('GET', path, headers={'Connection': 'close'})
+        response = connection.getresponse()
+        body = response.read()
+        if response.status != 200:
+            raise RuntimeError(f"HTTP {response.status} для {path}")
+        return body
+    finally:
+        connection.close()
+
+
+def start_balancer(backends):
+    """Запускає балансувальник run_replicas.py у фоновому потоці. Повертає його порт."""
+    from run_replicas import serve_balancer
+
+    port = free_port()
+    threading.Thread(target=lambda: asyncio.run(serve_balancer(port, backends, host='127.0.0.1')),
+                     daemon=True).start()
+    for _ in range(100):
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return port
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError("Балансувальник не запустився")
+
+
+def run_replicas(n_replicas, session_ids, n_requests):
+    """
+    Запускає репліки та балансувальник, надсилає запити та вимірює пропускну здатність.
+
+    Кожен гравець (потік) надсилає запити лише своїх сесій і чекає відповіді, тому
+    запити однієї сесії не виконуються одночасно (як у справжньої вкладки).
+
+    Returns:
+        tuple: (запитів за секунду, список - скільки запитів обробила кожна репліка)
+    """
+    context = multiprocessing.get_context('spawn')
+    ports = [free_port() for _ in range(n_replicas)]
+    readies = [context.Event() for _ in ports]
+    workers = [context.Process(target=replica_worker, args=(port, ready, session_ids[i % len(session_ids)]),
+                               daemon=True)
+               for i, (port, ready) in enumerate(zip(ports, readies))]
+    for worker in workers:
+        worker.start()
+    try:
+        for ready in readies:
+            if not ready.wait(300):
+                raise RuntimeError("Репліка не запустилась")
+        balancer_port = start_balancer([('127.0.0.1', port) for port in ports])
+
+        n_clients = min(CLIENTS_PER_REPLICA * n_replicas, len(session_ids))
+        plans = [[session_ids[i % len(session_ids)] for i in range(n_requests) if i % len(session_ids) % n_clients == client]
+                 for client in range(n_clients)]
+        errors = []
+
+        def client(plan):
+            try:
+                for session_id in plan:
+                    get(balancer_port, '/' + session_id)
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=client, args=(plan,)) for plan in plans]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        if errors:
+            raise errors[0]
+
+        handled = [int(get(port, '/handled')) for port in ports]
+    finally:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.join()
+    return sum(handled) / elapsed, handled
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк масштабування реплік")
+    default_replicas = sorted({1, 2, 4, os.cpu_count() or 1} & set(range(1, (os.cpu_count() or 1) + 1)))
+    parser.add_argument('--replicas', type=int, nargs='*', default=default_replicas, help="Кількість реплік")
+    parser.add_argument('--rows', type=int, default=20000, help="Розмір синтетичного датасету")
+    parser.add_argument('--requests', type=int, default=200, help="Кількість запитів на один замір")
+    parser.add_argument('--sessions', type=int, default=50, help="Кількість сесій гравців")
+    parser.add_argument('--min-efficiency', type=float, default=0.6,
+                        help="Мінімальне прискорення на одну репліку (для реплік не більше, ніж ядер)")
+    args = parser.parse_args()
+
+    # Спільні артефакти, сховище сесій, журнал аудиту та скетчі зсуву - у тимчасовій папці
+    # (налаштування успадковують репліки)
+    workdir = tempfile.mkdtemp(prefix='titanic-replicas-')
+    try:
+        os.environ['TITANIC_ARTIFACTS_DIR'] = os.path.join(workdir, 'artifacts')
+        os.environ['TITANIC_SESSION_STORE'] = 'sqlite:///' + os.path.join(workdir, 'sessions.db')
+        os.environ['TITANIC_AUDIT_DIR'] = os.path.join(workdir, 'audit')
+        os.environ['TITANIC_DRIFT_DIR'] = os.path.join(workdir, 'drift')
+        sys.path.insert(0, APP_DIR)
+
+        from artifacts import publish_dataset, DATASET_PATH
+        from session_store import get_session_store, save_session
+
+        publish_dataset(make_synthetic_passengers(args.rows), DATASET_PATH)
+        store = get_session_store()
+        session_ids = [uuid.uuid4().hex for _ in range(args.sessions)]
+        for session_id in session_ids:
+            save_session(session_id, {'game_step': 6, 'game_choices': dict(CHOICES)}, store=store)
+
+        cores = os.cpu_count() or 1
+        print(f"📊 {args.rows:,} пасажирів, {args.sessions} сесій, {args.requests} запитів, ядер: {cores}")
+        failures = []
+        baseline = None
+        for n_replicas in args.replicas:
+            throughput, handled = run_replicas(n_replicas, session_ids, args.requests)
+            baseline = baseline or throughput / args.replicas[0]
+            speedup = throughput / baseline
+            print(f"   реплік: {n_replicas:2d} | {throughput:7.1f} запитів/с | "
+                  f"прискорення {speedup:.2f}× | запитів на репліку: {handled}")
+
+            if min(handled) == 0:
+                failures.append(f"{n_replicas} реплік: балансувальник не передав запитів частині реплік ({handled})")
+            if n_replicas > cores:
+                print("      (прискорення не перевіряється: реплік більше, ніж ядер)")
+            elif speedup < args.min_efficiency * n_replicas:
+                failures.append(f"{n_replicas} реплік: прискорення {speedup:.2f}× < "
+                                f"{args.min_efficiency:g} × {n_replicas}")
+
+        total = sum(store.load(session_id)['game_choices'].get('requests', 0) for session_id in session_ids)
+        # Прогрів кожної репліки теж записує один запит у сесію
+        expected = sum(args.requests + n_replicas for n_replicas in args.replicas)
+        print(f"   оброблено запитів за лічильниками сесій: {total}")
+        if total != expected:
+            failures.append(f"втрачено оновлення сесій: {total} з {expected}")
+
+        if failures:
+            for failure in failures:
+                print(f"❌ {failure}")
+            sys.exit(1)
+        print("✅ Усі репліки отримували запити, жоден запит не втрачено, прискорення в межах норми")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
@@ -0,0 +1,130 @@
+"""
+Запуск кількох реплік додатку за локальним балансувальником навантаження.
+
+Кожна репліка - окремий процес Streamlit на своєму порту (--port + 1 ... --port + N),
+тому Python-робота різних гравців виконується на різних ядрах. Балансувальник
+приймає з'єднання на --port і по черзі (round robin) передає їх реплікам на рівні
+TCP, тому працюють і HTTP, і WebSocket. Стан сесій зберігається у спільному сховищі
+(titanic_game/session_store.py), датасет та моделі - у спільних файлах, відображених
+у пам'ять (titanic_game/artifacts.py), тому гравець може потрапити на будь-яку репліку,
+а перезапуск реплік не втрачає прогрес.
+
+Запуск:
+    python run_replicas.py --replicas 4 --port 8501
+    TITANIC_SESSION_STORE=redis://localhost:6379/0 python run_replicas.py --replicas 8
+"""
+
+import os
+import sys
+import time
+import signal
+import asyncio
+import secrets
+import argparse
+import itertools
+import subprocess
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'titanic_game')
+APP_PATH = os.path.join(APP_DIR, 'app.py')
+
+sys.path.insert(0, APP_DIR)
+
+from artifacts import load_dataset
+
+# Розмір буфера при пересиланні даних між гравцем та реплікою
+CHUNK_SIZE = 64 * 1024
+
+
+def start_replicas(n_replicas, first_port, host='127.0.0.1'):
+    """
+    Запускає процеси Streamlit.
+
+    Усі репліки отримують однаковий секрет cookie, інакше XSRF-токен, виданий
+    однією реплікою, не пройде перевірку на іншій.
+
+    Returns:
+        list: Список (порт, subprocess.Popen)
+    """
+    env = dict(os.environ)
+    env.setdefault('STREAMLIT_SERVER_COOKIE_SECRET', secrets.token_hex(32))
+
+    replicas = []
+    for port in range(first_port, first_port + n_replicas):
+        command = [sys.executable, '-m', 'streamlit', 'run', APP_PATH,
+                   '--server.port', str(port), '--server.address', host,
+                   '--server.headless', 'true']
+        replicas.append((port, subprocess.Popen(command, env=env)))
+    return replicas
+
+
+async def _pipe(reader, writer):
+    try:
+        while True:
+            data = await reader.read(CHUNK_SIZE)
+            if not data:
+                break
+            writer.write(data)
+            await writer.drain()
+    except (ConnectionError, asyncio.CancelledError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve_balancer(port, backends, host='0.0.0.0'):
+    """
+    TCP-балансувальник round robin. Якщо репліка не відповідає,
+    з'єднання передається наступній.
+
+    Args:
+        port: Порт балансувальника
+        backends: Список (host, port) реплік
+        host: Адреса, на якій слухає балансувальник
+    """
+    order = itertools.cycle(backends)
+
+    async def handle(client_reader, client_writer):
+        for _ in range(len(backends)):
+            backend_host, backend_port = next(order)
+            try:
+                backend_reader, backend_writer = await asyncio.open_connection(backend_host, backend_port)
+                break
+            except OSError:
+                continue
+        else:
+            client_writer.close()
+            return
+
+        await asyncio.gather(_pipe(client_reader, backend_writer), _pipe(backend_reader, client_writer))
+
+    server = await asyncio.start_server(handle, host, port)
+    print(f"⚖️ Балансувальник: http://localhost:{port} → {len(backends)} реплік")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Кілька реплік додатку за балансувальником")
+    parser.add_argument('--replicas', type=int, default=os.cpu_count() or 1, help="Кількість реплік")
+    parser.add_argument('--port', type=int, default=8501, help="Порт балансувальника")
+    args = parser.parse_args()
+
+    # Датасет публікується один раз до запуску реплік, щоб вони не завантажували його одночасно
+    try:
+        load_dataset()
+    except Exception as error:
+        print(f"⚠️ Не вдалося підготувати датасет: {error}")
+
+    replicas = start_replicas(args.replicas, args.port + 1)
+    # SIGTERM (наприклад, від systemd) зупиняє репліки так само, як Ctrl+C
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        time.sleep(2)
+        asyncio.run(serve_balancer(args.port, [('127.0.0.1', port) for port, _ in replicas]))
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        for _, process in replicas:
+            process.send_signal(signal.SIGINT)
+        for _, process in replicas:
+            process.wait(timeout=10)
@@ -0,0 +1,160 @@
+"""
+Модуль з алгоритмами машинного навчання для ігрового режиму.
+Містить функції для створення моделей та поступового навчання Random Forest.
+"""
+
+import warnings
+
+import numpy as np
+from sklearn.tree import DecisionTreeClassifier
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+from hist_tree import HistogramTreeClassifier
+
+DECISION_TREE = "Decision Tree (дерево рішень)"
+RANDOM_FOREST = "Random Forest (ліс дерев)"
+LOGISTIC_REGRESSION = "Logistic Regression (логістична регресія)"
+
+ALGORITHMS = [DECISION_TREE, RANDOM_FOREST, LOGISTIC_REGRESSION]
+
+# Алгоритми, для яких має сенс параметр max_depth
+TREE_ALGORITHMS = {DECISION_TREE, RANDOM_FOREST}
+
+# Параметри поступового навчання лісу
+FOREST_STEP = 10
+FOREST_MAX_TREES = 200
+
+# Починаючи з такої кількості рядків Decision Tree навчається на гістограмах
+# (без сортування Age та Fare при кожному навчанні)
+HISTOGRAM_MIN_ROWS = 100_000
+
+
+def build_model(algorithm, max_depth=5, n_estimators=FOREST_STEP, n_rows=None, n_jobs=1):
+    """
+    Створює ненавчену модель обраного алгоритму.
+
+    Args:
+        algorithm: Один з ALGORITHMS
+        max_depth: Максимальна глибина дерев (для Decision Tree та Random Forest)
+        n_estimators: Початкова кількість дерев для Random Forest
+        n_rows: Кількість рядків для навчання (для великих даних Decision Tree
+            замінюється на hist_tree.HistogramTreeClassifier)
+        n_jobs: Кількість ядер для Random Forest. За замовчуванням 1: фонові
+            задачі навчання вже виконуються паралельно у пулі, і ліс на всіх
+            ядрах у кожній з них перевантажив би процесор
+
+    Returns:
+        Модель sklearn, готова до навчання
+    """
+    if algorithm == RANDOM_FOREST:
+        # warm_start дозволяє додавати дерева до вже навченого лісу
+        return RandomForestClassifier(
+            n_estimators=n_estimators,
+            max_depth=max_depth,
+            min_samples_split=5,
+            min_samples_leaf=2,
+            oob_score=True,
+            warm_start=True,
+            n_jobs=n_jobs,
+            random_state=42
+        )
+
+    if algorithm == LOGISTIC_REGRESSION:
+        # Логістична регресія чутлива до масштабу ознак
+        return make_pipeline(
+            StandardScaler(),
+            LogisticRegression(max_iter=1000, random_state=42)
+        )
+
+    if n_rows is not None and n_rows >= HISTOGRAM_MIN_ROWS:
+        return HistogramTreeClassifier(
+            max_depth=max_depth,
+            min_samples_split=5,
+            min_samples_leaf=2
+        )
+
+    return DecisionTreeClassifier(
+        max_depth=max_depth,
+        random_state=42,
+        min_samples_split=5,
+        min_samples_leaf=2
+    )
+
+
+def grow_forest(model, X_train, y_train, X_test=None, y_test=None,
+                step=FOREST_STEP, max_trees=FOREST_MAX_TREES,
+                stop_on_plateau=True, patience=3, tolerance=0.002,
+                on_progress=None):
+    """
+    Поступово навчає Random Forest, додаючи по `step` дерев за раз.
+
+    Після кожного кроку обчислюється точність на out-of-bag прикладах
+    (або на тестових даних, якщо OOB ще недоступна) і викликається
+    on_progress(n_trees, max_trees, accuracy). Якщо stop_on_plateau=True,
+    навчання зупиняється, коли точність не покращується більше ніж на
+    tolerance протягом patience кроків.
+
+    Args:
+        model: RandomForestClassifier з warm_start=True
+        X_train, y_train: Тренувальні дані
+        X_test, y_test: Тестові дані (запасний варіант для оцінки)
+        step: Скільки дерев додавати за один крок
+        max_trees: Максимальна кількість дерев
+        stop_on_plateau: Чи зупинятись, коли точність вийшла на плато
+        patience: Скільки кроків без покращення чекати
+        tolerance: Мінімальне покращення, яке вважається прогресом
+        on_progress: Функція зворотного виклику для відображення прогресу
+
+    Returns:
+        dict: Словник з історією навчання:
+            - history: list - (кількість дерев, точність) після кожного кроку
+            - stopped_early: bool - чи зупинено через плато
+            - score_name: str - 'OOB' або 'Test'
+    """
+    history = []
+    best_accuracy = -np.inf
+    steps_without_improvement = 0
+    stopped_early = False
+    score_name = 'OOB'
+
+    n_trees = 0
+    while n_trees < max_trees:
+        n_trees = min(n_trees + step, max_trees)
+        model.set_params(n_estimators=n_trees)
+
+        with warnings.catch_warnings():
+            # На перших кроках частина прикладів ще не має OOB-передбачень
+            warnings.simplefilter('ignore')
+            model.fit(X_train, y_train)
+
+        oob_accuracy = getattr(model, 'oob_score_', np.nan)
+        if np.isnan(oob_accuracy) and X_test is not None:
+            accuracy = model.score(X_test, y_test)
+            score_name = 'Test'
+        else:
+            accuracy = oob_accuracy
+            score_name = 'OOB'
+
+        history.append((n_trees, float(accuracy)))
+
+        if on_progress is not None:
+            on_progress(n_trees, max_trees, float(accuracy))
+
+        if accuracy > best_accuracy + tolerance:
+            best_accuracy = accuracy
+            steps_without_improvement = 0
+        else:
+            steps_without_improvement += 1
+
+        if stop_on_plateau and steps_without_improvement >= patience:
+            stopped_early = True
+            break
+
+    return {
+        'history': history,
+        'stopped_early': stopped_early,
+        'score_name': score_name
+    }
@@ -3,13 +3,310 @@ Streamlit додаток для передбачення виживання на
 Має два режими: навчальний (про overfitting/underfitting) та ігровий.
 """
 
+import time
+import uuid
+
 import streamlit as st
+from streamlit import runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-from model import predict_survival, get_feature_importance, load_model
-from utils import load_comparison_results
+from model import predict_survival, get_feature_importance, load_model, what_if_curves
+from utils import load_comparison_results, load_comparison_figures, get_learning_curve
+from learning_curve import learning_curve_figure
+from algorithms import (ALGORITHMS, TREE_ALGORITHMS, DECISION_TREE, RANDOM_FOREST,
+                        FOREST_STEP, FOREST_MAX_TREES)
+from training import train_game_model, canonical_choices, choices_fingerprint, training_job_key
+from importance import permutation_importance, model_fingerprint
+from error_analysis import analyze_errors, error_page
+from evaluation import positive_scores
+from slicing import sliced_metrics, worst_slices, SEGMENTS, AGE_BAND, MIN_SLICE_ROWS
+from schema import game_model_schema, get_vectorizer, bundle_bytes
+from exploration import get_exploration, heatmap_figure, histogram_figure, missing_figures, MIN_CELL_ROWS
+import preview
+from artifacts import load_dataset
+from preprocessing import (prepare_step_2, apply_encodings, step_2_fingerprints, AGE_STRATEGIES, AGE_KEEP, CATEGORICAL_COLUMNS,
+                           SEX_ENCODINGS, EMBARKED_ENCODINGS, NAME_ENCODINGS, TICKET_ENCODINGS, CABIN_ENCODINGS)
+from session_store import (load_session, save_session, claim_session, sign_session_id, verify_session_token,
+                           get_session_store, SessionConflictError, REPLICA_ID)
+import memory_debug
+from state_manager import get_state_manager
+from dataset_stats import (get_dataset_stats, compute_stats, non_numeric_columns, total_missing,
+                           format_rates)
+from leaderboard import get_leaderboard, CHOICE_DIMENSIONS as LEADERBOARD_DIMENSIONS
+from jobs import (get_executor, QueueFullError, QUEUED as JOB_QUEUED, DONE as JOB_DONE,
+                  FAILED as JOB_FAILED, CANCELLED as JOB_CANCELLED)
+
+# Як часто (в секундах) оновлювати сторінку, поки модель навчається у фоні
+TRAINING_POLL_INTERVAL = 1.0
+
+
+
+def show_data_preview(data, key, version, columns=None):
+    """
+    Показує датасет посторінково з сортуванням та фільтрацією на сервері.
+    
+    Args:
+        data: DataFrame для показу
+        key: Унікальний префікс ключів віджетів
+        version: Версія датасету (змінюється, коли змінюються дані)
+        columns: Колонки для показу (за замовчуванням - всі)
+    """
+    columns = list(data.columns if columns is None else columns)
+    version = (version, tuple(columns), len(data))
+    
+    sort_col, order_col, filter_col, value_col, size_col = st.columns([2, 1, 2, 3, 1])
+    with sort_col:
+        sort_by = st.selectbox("Сортувати за:", [None] + columns, key=f"{key}_sort",
+                               format_func=lambda c: "—" if c is None else c)
+    with order_col:
+        descending = st.checkbox("За спаданням", key=f"{key}_desc", disabled=sort_by is None)
+    with filter_col:
+        filter_column = st.selectbox("Фільтр за:", [None] + columns, key=f"{key}_filter",
+                                     format_func=lambda c: "—" if c is None else c)
+    filter_value = None
+    with value_col:
+        if filter_column is not None:
+            kind, options = preview.filter_options(data, version, filter_column)
+            if kind == 'range':
+                low, high = float(options[0]), float(options[1])
+                filter_value = st.slider("Діапазон:", min_value=low, max_value=high, value=(low, high),
+                                         key=f"{key}_range_{filter_column}")
+            elif kind == 'values':
+                selected = st.multiselect(
+                    "Значення:", list(range(len(options))), key=f"{key}_values_{filter_column}",
+                    format_func=lambda code: "(порожньо)" if pd.isna(options[code]) else str(options[code])
+                )
+                filter_value = tuple(selected) if selected else None
+            else:
+                filter_value = st.text_input("Містить:", key=f"{key}_text_{filter_column}") or None
+    with size_col:
+        page_size = st.selectbox("Рядків:", preview.PAGE_SIZES, key=f"{key}_size")
+    
+    query_args = dict(sort_by=sort_by, descending=descending,
+                      filter_column=filter_column, filter_value=filter_value)
+    n_pages = max(1, -(-preview.count_rows(data, version, **query_args) // page_size))
+    page = st.number_input("Сторінка:", min_value=1, max_value=n_pages, value=1, step=1, key=f"{key}_page")
+    
+    table, total, n_pages = preview.get_page(data, version, columns, page, page_size, **query_args)
+    st.dataframe(table, use_container_width=True, hide_index=True)
+    
+    first_row = (page - 1) * page_size + 1 if total else 0
+    st.caption(f"Рядки {first_row}–{min(page * page_size, total)} з {total} • Сторінка {page} з {n_pages}")
+
+
+def show_exploration(data, key, version):
+    """
+    Показує графіки для дослідження датасету. Графіки будуються з агрегатів
+    (exploration.py), порахованих на сервері один раз для версії датасету,
+    тому браузер отримує однаковий обсяг даних для будь-якої кількості пасажирів.
+    
+    Args:
+        data: DataFrame
+        key: Унікальний префікс ключів віджетів
+        version: Версія датасету (змінюється, коли змінюються дані)
+    """
+    exploration = get_exploration(data, (version, len(data)))
+    heatmap_tab, histogram_tab, missing_tab = st.tabs(["🌡️ Вік × вартість", "📊 Гістограми", "🕳️ Пропуски"])
+    
+    with heatmap_tab:
+        if exploration['heatmap'] is None:
+            st.info("Для теплової карти потрібні колонки Age, Fare та Survived.")
+        else:
+            st.plotly_chart(heatmap_figure(exploration['heatmap']), use_container_width=True)
+            st.caption(f"Кожна клітинка - частка тих, хто вижив, серед пасажирів з таким віком і вартістю "
+                       f"квитка (порожні клітинки - менше {MIN_CELL_ROWS} пасажирів).")
+    
+    with histogram_tab:
+        histograms = {(column, group): histogram for column, by_group in exploration['histograms'].items()
+                      for group, histogram in by_group.items()}
+        if not histograms:
+            st.info("Для гістограм потрібні колонки Age або Fare та Pclass або Sex.")
+        else:
+            column_col, group_col, survived_col = st.columns([1, 1, 1])
+            with column_col:
+                column = st.selectbox("Колонка:", sorted({column for column, _ in histograms}), key=f"{key}_hist_column")
+            with group_col:
+                group = st.selectbox("Розбити за:", [g for c, g in histograms if c == column], key=f"{key}_hist_group")
+            with survived_col:
+                survived_only = st.checkbox("Лише ті, хто вижив", key=f"{key}_hist_survived",
+                                            disabled=histograms[(column, group)]['survived'] is None)
+            st.plotly_chart(histogram_figure(histograms[(column, group)], column, group, survived_only),
+                            use_container_width=True)
+    
+    with missing_tab:
+        blocks_figure, pairs_figure = missing_figures(exploration['missing'])
+        blocks_col, pairs_col = st.columns(2)
+        with blocks_col:
+            st.plotly_chart(blocks_figure, use_container_width=True)
+        with pairs_col:
+            st.plotly_chart(pairs_figure, use_container_width=True)
+        st.caption(f"Рядки датасету поділено на {len(exploration['missing']['block_starts'])} блоків: "
+                   "світла смуга в колонці - там пропусків немає, темна - багато пропусків.")
+
+
+def step_2_stats(df_step_2, original_data, cols_to_show, age_strategy):
+    """
+    Статистика даних кроку 2 (з кешу dataset_stats; перераховується тільки змінена колонка Age).
+
+    Версія однозначно визначається обраними колонками та стратегією для Age, тому
+    сесії з однаковими виборами ділять один запис кешу, а з різними - ні.
+
+    Args:
+        df_step_2: Дані кроку 2
+        original_data: Оригінальний датасет
+        cols_to_show: Обрані колонки
+        age_strategy: Стратегія заповнення Age
+
+    Returns:
+        dict: Статистика у форматі dataset_stats.compute_stats
+    """
+    return get_dataset_stats(
+        df_step_2, ("step_2", tuple(cols_to_show), age_strategy),
+        base=get_dataset_stats(original_data, "original"),
+        changed=('Age',) if age_strategy != AGE_KEEP else ()
+    )
+
+
+def rebuild_game_data(choices, original_data):
+    """
+    Відтворює дані кроків 2 та 3 з виборів гравця, якщо їх немає в сесії
+    (наприклад, сесію відновлено зі сховища після перезапуску або на іншій репліці).
+
+    Args:
+        choices: st.session_state.game_choices
+        original_data: Оригінальний датасет
+    """
+    if 'df_step_2' not in choices and 'cols_to_show' in choices and 'age_strategy' in choices:
+        choices['df_step_2'] = prepare_step_2(original_data, choices['cols_to_show'], choices['age_strategy'])
+    if 'stats_step_2' not in choices and 'df_step_2' in choices and 'cols_to_show' in choices \
+            and 'age_strategy' in choices:
+        choices['stats_step_2'] = step_2_stats(choices['df_step_2'], original_data,
+                                               choices['cols_to_show'], choices['age_strategy'])
+    if 'df_processed' not in choices and 'df_step_2' in choices and 'encoding_choices' in choices:
+        df_step_2 = choices['df_step_2']
+        choices['df_processed'] = apply_encodings(
+            df_step_2, choices['encoding_choices'],
+            step_2_fingerprints(df_step_2.columns, choices.get('age_strategy'))
+        )
+
+
+def owner_is_stale(owner):
+    """Чи закрито вкладку-власника оренди сесії (перевірити можна лише вкладки цієї репліки)."""
+    replica_id, _, streamlit_session_id = owner.partition(':')
+    return (replica_id == REPLICA_ID and runtime.exists()
+            and not runtime.get_instance().is_active_session(streamlit_session_id))
+
+
+def open_session(session_id):
+    """
+    Прив'язує сесію до цієї вкладки та записує її підписаний токен в адресу сторінки.
+
+    Args:
+        session_id: Ідентифікатор сесії
+    """
+    st.session_state.session_id = session_id
+    st.query_params['session'] = sign_session_id(session_id)
+    # Важкі об'єкти, збережені на диск до перезапуску сервера (або іншою реплікою)
+    get_state_manager().adopt_spilled(session_id)
+
+
+def persist_session():
+    """Зберігає компактний знімок сесії у спільне сховище (див. session_store.py)."""
+    choices = st.session_state.get('game_choices', {})
+    fingerprint = choices_fingerprint(choices) if 'training_result' in st.session_state else None
+    try:
+        save_session(st.session_state.session_id, st.session_state, fingerprint,
+                     owner=st.session_state.session_owner)
+    except SessionConflictError:
+        # Поки вкладка була неактивна, сесію відкрили в іншій вкладці - продовжуємо з копії
+        open_session(uuid.uuid4().hex)
+        st.session_state.pop('_saved_snapshot', None)
+        save_session(st.session_state.session_id, st.session_state, fingerprint,
+                     owner=st.session_state.session_owner)
+
+
+@st.fragment(run_every=TRAINING_POLL_INTERVAL)
+def training_status(executor, job_id):
+    """
+    Показує стан фонового навчання і оновлюється кожні TRAINING_POLL_INTERVAL секунд.
+
+    Перезапускається лише цей фрагмент; всю сторінку перезапускаємо тоді,
+    коли задача завершилась (або гравець її скасував).
+
+    Args:
+        executor: Виконавець фонових задач (jobs.get_executor())
+        job_id: Ідентифікатор задачі навчання
+    """
+    job = executor.status(job_id)
+    if job is None or job['status'] in (JOB_DONE, JOB_FAILED, JOB_CANCELLED):
+        st.rerun()
+
+    if job['coalesced']:
+        st.caption("👥 Таку саму модель зараз навчає інший гравець - результат буде спільним.")
+    if job['status'] == JOB_QUEUED:
+        st.info(f"⏳ Твоя модель у черзі на навчання (позиція: {job['position']}). "
+                "Можна не чекати на цій сторінці - результат збережеться.")
+    else:
+        st.progress(
+            min(job['progress'], 1.0),
+            text=job['progress_text'] or f"🔧 Навчаємо модель... ({job['elapsed']:.0f} с)"
+        )
+
+    if st.button("⏹️ Скасувати навчання", use_container_width=True):
+        executor.cancel(job_id)
+        st.session_state.pop('training_job_id', None)
+        st.rerun()
+
+
+def memory_debug_panel():
+    """
+    Панель діагностики пам'яті (TITANIC_MEMORY_DEBUG=1): розмір ключів цієї сесії,
+    усі сесії процесу, місця виділення пам'яті (tracemalloc) та експорт звіту.
+    """
+    with st.sidebar.expander("🧠 Пам'ять сесій (debug)"):
+        tracing = st.checkbox("tracemalloc", value=memory_debug.tracemalloc.is_tracing(), key="_memory_tracing")
+        memory_debug.set_tracing(tracing)
+
+        report = memory_debug.record_session(st.session_state.session_id, st.session_state)
+        st.markdown(f"**Ця сесія:** {memory_debug.format_bytes(report['total'])}")
+        st.dataframe(pd.DataFrame({
+            'Ключ': list(report['keys']),
+            'Розмір': [memory_debug.format_bytes(size) for size in report['keys'].values()],
+        }), hide_index=True, use_container_width=True)
+
+        process = memory_debug.process_report()
+        st.markdown(f"**Процес {process['pid']}:** RSS {memory_debug.format_bytes(process['process']['rss'])}, "
+                    f"сесій: {len(process['sessions'])}, разом у сесіях "
+                    f"{memory_debug.format_bytes(process['total'])}")
+        now = time.time()
+        st.dataframe(pd.DataFrame([
+            {'Сесія': session_id[:8], 'Розмір': memory_debug.format_bytes(item['total']),
+             'Найбільший ключ': next(iter(item['keys']), '—'),
+             'Неактивна, с': int(now - item['updated_at'])}
+            for session_id, item in sorted(process['sessions'].items(), key=lambda entry: -entry[1]['total'])
+        ]), hide_index=True, use_container_width=True)
+
+        allocators = report['allocators']
+        if allocators:
+            st.markdown("**Найбільші місця виділення пам'яті:**")
+            st.dataframe(pd.DataFrame([
+                {'Місце': item['location'], 'Розмір': memory_debug.format_bytes(item['size']),
+                 'Приріст': memory_debug.format_bytes(item['size_diff'])}
+                for item in allocators['top']
+            ]), hide_index=True, use_container_width=True)
+
+        manager = get_state_manager().metrics()
+        st.markdown(f"**Менеджер стану:** {memory_debug.format_bytes(manager['memory'])} з "
+                    f"{memory_debug.format_bytes(manager['budget'])}, об'єктів у пам'яті: {manager['in_memory']}, "
+                    f"на диску: {manager['on_disk']} | витіснено: {manager['evicted']}, "
+                    f"завантажено з диска: {manager['loaded']}, відкинуто: {manager['dropped']}")
+
+        if st.button("💾 Експортувати звіт", key="_memory_export"):
+            st.caption(f"Збережено: {memory_debug.export_report()}")
+
 
 # Налаштування сторінки
 st.set_page_config(
@@ -27,13 +324,38 @@ st.markdown("---")
 import pandas as pd
 
 url = "https://raw.githubusercontent.com/datasciencedojo/datasets/master/titanic.csv"
-df = pd.read_csv(url)
+# Датасет завантажується один раз і спільний для всіх сесій та реплік (див. artifacts.py)
+df = load_dataset(url)
+
+# --- Сесія гравця ---
+# Підписаний ідентифікатор сесії зберігається в адресі сторінки (?session=...), а стан - у спільному
+# сховищі, тому після перезапуску сервера або на іншій репліці гравець продовжує з того ж місця.
+# Записувати сесію може лише вкладка, яка її орендувала (власник - сесія Streamlit цієї вкладки)
+if 'session_owner' not in st.session_state:
+    script_context = get_script_run_ctx()
+    st.session_state.session_owner = f"{REPLICA_ID}:{script_context.session_id if script_context else uuid.uuid4().hex}"
+if 'session_id' not in st.session_state:
+    session_id = verify_session_token(st.query_params.get('session'))
+    restored = session_id is not None and load_session(session_id, st.session_state)
+    if session_id is None or not claim_session(session_id, st.session_state.session_owner,
+                                               is_stale=owner_is_stale):
+        # Адреса без правильного підпису - нова сесія; сесія вже відкрита в іншій вкладці -
+        # копія її стану під новим ідентифікатором (інша вкладка продовжує свою)
+        if restored:
+            st.toast("Ця гра вже відкрита в іншій вкладці - продовжуємо з її копії.")
+        session_id = uuid.uuid4().hex
+    open_session(session_id)
+
+# Важкі об'єкти (DataFrame, моделі) між перезапусками сторінки тримає менеджер зі спільним
+# бюджетом пам'яті (див. state_manager.py); повертаємо їх у стан сесії
+get_state_manager().restore(st.session_state.session_id, st.session_state)
 
 # Перемикач режимів
 mode = st.sidebar.radio(
     "🎯 Виберіть режим:",
     ["📚 Навчальний режим", "🎮 Ігровий режим"],
-    index=0
+    index=0,
+    key="mode"
 )
 
 st.sidebar.markdown("---")
@@ -84,6 +406,10 @@ if mode == "📚 Навчальний режим":
     </div>
     """, unsafe_allow_html=True)
     
+    # Дослідження датасету (агреговані графіки)
+    with st.expander("🔍 Дослідження даних"):
+        show_exploration(df, key="explore_learning", version="original")
+    
     # Кнопка для завантаження/навчання моделей
     if st.button("🚀 Почати навчання моделей", type="primary", use_container_width=True):
         with st.spinner("🔧 Навчаємо моделі... Це може зайняти кілька секунд."):
@@ -98,6 +424,9 @@ if mode == "📚 Навчальний режим":
     # Показуємо результати якщо вони є
     if 'comparison_results' in st.session_state:
         results = st.session_state['comparison_results']
+
+        # Готові графіки та таблиці (будуються один раз після навчання моделей)
+        figures = load_comparison_figures(results)
         
         # Вступний текст
         st.markdown("---")
@@ -141,23 +470,8 @@ if mode == "📚 Навчальний режим":
                 st.metric("Test Accuracy", f"{overfit_data['test_accuracy']*100:.1f}%", 
                          delta=f"-{overfit_data['difference']*100:.1f}%", delta_color="inverse")
             
-            # Візуалізація
-            fig_overfit = go.Figure()
-            fig_overfit.add_trace(go.Bar(
-                x=['Train', 'Test'],
-                y=[overfit_data['train_accuracy']*100, overfit_data['test_accuracy']*100],
-                marker_color=['#e74c3c', '#c0392b'],
-                text=[f"{overfit_data['train_accuracy']*100:.1f}%", f"{overfit_data['test_accuracy']*100:.1f}%"],
-                textposition='outside',
-                name='Overfitting'
-            ))
-            fig_overfit.update_layout(
-                title='Overfitting: Велика різниця між Train та Test',
-                yaxis_title='Точність (%)',
-                height=400,
-                showlegend=False
-            )
-            st.plotly_chart(fig_overfit, use_container_width=True)
+            # Візуалізація (готовий графік, побудований під час навчання моделей)
+            st.plotly_chart(figures['overfit'], use_container_width=True)
             
             st.info("""
             💡 **Параметри цієї моделі:**
@@ -193,23 +507,8 @@ if mode == "📚 Навчальний режим":
                 st.metric("Train Accuracy", f"{underfit_data['train_accuracy']*100:.1f}%")
                 st.metric("Test Accuracy", f"{underfit_data['test_accuracy']*100:.1f}%")
             
-            # Візуалізація
-            fig_underfit = go.Figure()
-            fig_underfit.add_trace(go.Bar(
-                x=['Train', 'Test'],
-                y=[underfit_data['train_accuracy']*100, underfit_data['test_accuracy']*100],
-                marker_color=['#3498db', '#2980b9'],
-                text=[f"{underfit_data['train_accuracy']*100:.1f}%", f"{underfit_data['test_accuracy']*100:.1f}%"],
-                textposition='outside',
-                name='Underfitting'
-            ))
-            fig_underfit.update_layout(
-                title='Underfitting: Низька точність на обох наборах',
-                yaxis_title='Точність (%)',
-                height=400,
-                showlegend=False
-            )
-            st.plotly_chart(fig_underfit, use_container_width=True)
+            # Візуалізація (готовий графік, побудований під час навчання моделей)
+            st.plotly_chart(figures['underfit'], use_container_width=True)
             
             st.info("""
             💡 **Параметри цієї моделі:**
@@ -247,23 +546,8 @@ if mode == "📚 Навчальний режим":
                 st.metric("Test Accuracy", f"{goodfit_data['test_accuracy']*100:.1f}%")
                 st.metric("Різниця", f"{goodfit_data['difference']*100:.1f}%", delta="Мінімальна!")
             
-            # Візуалізація
-            fig_goodfit = go.Figure()
-            fig_goodfit.add_trace(go.Bar(
-                x=['Train', 'Test'],
-                y=[goodfit_data['train_accuracy']*100, goodfit_data['test_accuracy']*100],
-                marker_color=['#2ecc71', '#27ae60'],
-                text=[f"{goodfit_data['train_accuracy']*100:.1f}%", f"{goodfit_data['test_accuracy']*100:.1f}%"],
-                textposition='outside',
-                name='Good Fit'
-            ))
-            fig_goodfit.update_layout(
-                title='Good Fit: Висока точність на обох наборах',
-                yaxis_title='Точність (%)',
-                height=400,
-                showlegend=False
-            )
-            st.plotly_chart(fig_goodfit, use_container_width=True)
+            # Візуалізація (готовий графік, побудований під час навчання моделей)
+            st.plotly_chart(figures['goodfit'], use_container_width=True)
             
             st.success("""
             💡 **Параметри цієї моделі:**
@@ -277,58 +561,8 @@ if mode == "📚 Навчальний режим":
         st.markdown("---")
         st.subheader("📊 Порівняння всіх трьох моделей")
         
-        # Формуємо дані для таблиці з округленням
-        comparison_data = {
-            'Модель': ['Overfitting', 'Underfitting', 'Good Fit'],
-            'Train Accuracy (%)': [
-                round(results['overfitting']['train_accuracy']*100, 1),
-                round(results['underfitting']['train_accuracy']*100, 1),
-                round(results['goodfit']['train_accuracy']*100, 1)
-            ],
-            'Test Accuracy (%)': [
-                round(results['overfitting']['test_accuracy']*100, 1),
-                round(results['underfitting']['test_accuracy']*100, 1),
-                round(results['goodfit']['test_accuracy']*100, 1)
-            ],
-            'Різниця (%)': [
-                round(results['overfitting']['difference']*100, 1),
-                round(results['underfitting']['difference']*100, 1),
-                round(results['goodfit']['difference']*100, 1)
-            ]
-        }
-        
-        comparison_df = pd.DataFrame(comparison_data)
-        
         # Візуалізація порівняння
-        fig_comparison = go.Figure()
-        
-        fig_comparison.add_trace(go.Bar(
-            name='Train Accuracy',
-            x=comparison_df['Модель'],
-            y=comparison_df['Train Accuracy (%)'],
-            marker_color='#3498db',
-            text=comparison_df['Train Accuracy (%)'].apply(lambda x: f'{x:.1f}%'),
-            textposition='outside'
-        ))
-        
-        fig_comparison.add_trace(go.Bar(
-            name='Test Accuracy',
-            x=comparison_df['Модель'],
-            y=comparison_df['Test Accuracy (%)'],
-            marker_color='#e74c3c',
-            text=comparison_df['Test Accuracy (%)'].apply(lambda x: f'{x:.1f}%'),
-            textposition='outside'
-        ))
-        
-        fig_comparison.update_layout(
-            title='Порівняння: Overfitting vs Underfitting vs Good Fit',
-            xaxis_title='Модель',
-            yaxis_title='Точність (%)',
-            barmode='group',
-            height=500
-        )
-        
-        st.plotly_chart(fig_comparison, use_container_width=True)
+        st.plotly_chart(figures['comparison'], use_container_width=True)
         
         # Таблиця порівняння з форматуванням
         st.markdown("### 📋 Детальна таблиця порівняння")
@@ -346,13 +580,29 @@ if mode == "📚 Навчальний режим":
         </div>
         """, unsafe_allow_html=True)
         
-        # Форматуємо таблицю для кращого відображення
-        display_df = comparison_df.copy()
-        display_df['Train Accuracy (%)'] = display_df['Train Accuracy (%)'].apply(lambda x: f"{x:.1f}%")
-        display_df['Test Accuracy (%)'] = display_df['Test Accuracy (%)'].apply(lambda x: f"{x:.1f}%")
-        display_df['Різниця (%)'] = display_df['Різниця (%)'].apply(lambda x: f"{x:.1f}%")
+        # Таблиця вже відформатована під час навчання моделей
+        st.dataframe(figures['display_df'], use_container_width=True, hide_index=True)
+        
+        # Крива навчання: як точність Good Fit залежить від кількості даних
+        st.markdown("---")
+        st.subheader("📈 Крива навчання")
+        st.markdown("Модель Good Fit навчена на вибірках різного розміру (кожна - з кількома різними "
+                    "поділами даних). Смуга навколо лінії - розкид точності між поділами.")
         
-        st.dataframe(display_df, use_container_width=True, hide_index=True)
+        # Крива зберігається під час навчання моделей (train_model.py) - сторінка її лише завантажує
+        curve = get_learning_curve()
+        if curve is None:
+            st.warning("⚠️ Криву навчання ще не обчислено. Запустіть `python train_model.py`, "
+                       "щоб зберегти її разом з моделлю.")
+        else:
+            st.plotly_chart(learning_curve_figure(curve), use_container_width=True)
+            
+            gap = (curve['train_mean'][-1] - curve['test_mean'][-1]) * 100
+            st.info(f"""
+            💡 **Як читати графік:** на малих вибірках модель запам'ятовує дані (Train Accuracy висока,
+            Test Accuracy низька - overfitting). З ростом кількості даних лінії зближуються: на всіх
+            {curve['sizes'][-1]} записах різниця - {gap:.1f}%.
+            """)
         
         # Висновки
         st.markdown("---")
@@ -373,6 +623,69 @@ if mode == "📚 Навчальний режим":
         </div>
         """, unsafe_allow_html=True)
         
+        # Що, якби: як змінюється прогноз, якщо змінити одну ознаку пасажира
+        st.markdown("---")
+        st.subheader("🔮 А що, якби?")
+        st.markdown("Опишіть пасажира і подивіться, як змінилась би його ймовірність вижити "
+                    "з іншим віком, квитком, класом чи родиною (модель Good Fit).")
+
+        what_if_col1, what_if_col2, what_if_col3 = st.columns(3)
+        with what_if_col1:
+            what_if_pclass = st.selectbox("Клас каюти (Pclass):", [1, 2, 3], index=2, key="what_if_pclass")
+            what_if_sex = st.radio("Стать:", ["Чоловік", "Жінка"], horizontal=True, key="what_if_sex")
+        with what_if_col2:
+            what_if_age = st.slider("Вік:", min_value=0, max_value=80, value=28, key="what_if_age")
+            what_if_fare = st.slider("Вартість квитка (Fare):", min_value=0, max_value=520, value=15,
+                                     key="what_if_fare")
+        with what_if_col3:
+            what_if_sibsp = st.number_input("Брати/сестри/чоловік/дружина (SibSp):", min_value=0, max_value=8,
+                                            value=0, key="what_if_sibsp")
+            what_if_parch = st.number_input("Батьки/діти (Parch):", min_value=0, max_value=6,
+                                            value=0, key="what_if_parch")
+
+        what_if = what_if_curves(what_if_pclass, what_if_sex, what_if_age,
+                                 what_if_sibsp, what_if_parch, what_if_fare)
+        what_if_probability = what_if['probability']
+        st.metric("Ймовірність вижити", f"{what_if_probability * 100:.1f}%",
+                  help="Прогноз моделі для пасажира з обраними параметрами")
+
+        current_values = {
+            'Pclass': what_if_pclass, 'Age': what_if_age, 'Fare': what_if_fare,
+            'SibSp': what_if_sibsp, 'Parch': what_if_parch
+        }
+        curve_titles = {
+            'Age': "Якби пасажир був іншого віку",
+            'Fare': "Якби квиток коштував інакше",
+            'Pclass': "Якби пасажир їхав іншим класом",
+            'Sex': "Якби стать була іншою",
+            'SibSp': "Якби братів/сестер/подружжя було інакше",
+            'Parch': "Якби батьків/дітей було інакше",
+        }
+
+        curve_columns = st.columns(2)
+        for position, feature in enumerate(['Age', 'Fare', 'Pclass', 'Sex', 'SibSp', 'Parch']):
+            values, probabilities = what_if['curves'][feature]
+            fig_what_if = go.Figure()
+            if feature in ('Age', 'Fare'):
+                fig_what_if.add_trace(go.Scatter(x=values, y=probabilities * 100, mode='lines',
+                                                 line=dict(color='#1f77b4', shape='hv')))
+                fig_what_if.add_vline(x=current_values[feature], line_dash='dash', line_color='#d62728')
+            else:
+                labels = ["Жінка", "Чоловік"] if feature == 'Sex' else [str(int(v)) for v in values]
+                current = what_if_sex if feature == 'Sex' else str(current_values[feature])
+                fig_what_if.add_trace(go.Bar(
+                    x=labels, y=probabilities * 100,
+                    marker_color=['#d62728' if label == current else '#1f77b4' for label in labels]
+                ))
+            fig_what_if.update_layout(
+                title=curve_titles[feature], xaxis_title=feature, yaxis_title="Ймовірність вижити (%)",
+                yaxis_range=[0, 100], height=300, margin=dict(l=10, r=10, t=40, b=10), showlegend=False
+            )
+            with curve_columns[position % 2]:
+                st.plotly_chart(fig_what_if, use_container_width=True)
+        st.caption("Червоним позначено поточне значення. Усі криві рахуються одним запитом до моделі "
+                   "і кешуються, тому змінюються миттєво.")
+
         st.markdown("---")
         st.info("💡 Тепер ви можете перейти до ігрового режиму та спробувати натренувати свою власну модель!")
 
@@ -403,6 +716,7 @@ else:
         st.session_state.game_step = 0
     if 'game_choices' not in st.session_state:
         st.session_state.game_choices = {}
+    rebuild_game_data(st.session_state.game_choices, df)
 
     # --- Прогрес-бар ---
     progress = st.session_state.game_step / 6
@@ -487,13 +801,17 @@ else:
         if features:
             st.markdown("### ✅ Твій датасет:")
             cols_to_show = ['Survived'] + features if 'Survived' not in features else features
-            st.dataframe(df[cols_to_show].head(1000), use_container_width=True)
+            show_data_preview(df, key="preview_step_1", version="original", columns=cols_to_show)
+
+        # --- Exploration charts ---
+        with st.expander("🔍 Дослідити дані на графіках"):
+            show_exploration(df, key="explore_step_1", version="original")
 
-        # --- Optional full view button ---
-        if st.button("📋 Побачити повну базу даних", use_container_width=True):
+        # --- Optional full view ---
+        if st.toggle("📋 Побачити повну базу даних", key="show_full_data"):
             st.markdown("### 📊 Повна база даних:")
-            st.dataframe(df.head(1000), use_container_width=True)
-            st.info(f"Показано {len(df)} записів")
+            show_data_preview(df, key="preview_full", version="original")
+            st.info(f"Всього {len(df)} записів")
 
         # --- Navigation buttons ---
         col_btn1, col_btn2 = st.columns(2)
@@ -519,15 +837,16 @@ else:
         features = st.session_state.game_choices.get('features', [])
         cols_to_show = st.session_state.game_choices.get('cols_to_show', [])
 
-        # Завантажуємо оригінальні дані з CSV (або з session_state якщо вже завантажені)
-        if 'original_data' not in st.session_state:
-            st.session_state.original_data = pd.read_csv(url)
+        # Оригінальні дані спільні для всіх сесій (файл у пам'яті, див. artifacts.py),
+        # тому кожна сесія не тримає власну копію
+        original_data = df
 
         # Створюємо НОВУ копію оригінальних даних для цього кроку
-        df_step_2 = st.session_state.original_data[cols_to_show].copy()
+        df_step_2 = original_data[cols_to_show].copy()
+        original_stats = get_dataset_stats(original_data, "original")
 
         st.markdown(f"""Ви обрали ознаки: {features}""")
-        age_strategy = "Залишити як є (NaN)"
+        age_strategy = AGE_KEEP
 
         if 'Age' in features:
             st.markdown("""
@@ -541,12 +860,7 @@ else:
             with col1:
                 age_strategy = st.radio(
                     "Виберіть стратегію:",
-                    options=[
-                        "Видалити всі рядки з пропущеним віком",
-                        "Заповнити медіаною (середнім значенням)",
-                        "Заповнити середнім арифметичним",
-                        "Залишити як є (NaN)"
-                    ],
+                    options=AGE_STRATEGIES,
                     index=1
                 )
 
@@ -554,8 +868,11 @@ else:
                 show_hint = st.checkbox("❓ Підказка", key="hint_age")
 
             if show_hint:
-                st.info("""
+                age_stats = original_stats['columns']['Age']
+                st.info(f"""
                 💡 **Підказка:**
+                - Пропущено: {age_stats['missing']} з {original_stats['n_rows']} \
+({age_stats['missing'] / max(original_stats['n_rows'], 1) * 100:.1f}%)
                 - **Видалити рядки** - втратимо багато даних (погано!)
                 - **Медіана** - найкращий варіант, стійка до викидів ✅
                 - **Середнє** - може бути спотворене екстремальними значеннями
@@ -565,18 +882,12 @@ else:
                 """)
 
             # ✅ Застосовуємо ОБРАНУ трансформацію до КОПІЇ
-            if age_strategy == "Залишити як є (NaN)":
-                pass  # нічого не робимо
-            elif age_strategy == "Видалити всі рядки з пропущеним віком":
-                df_step_2 = df_step_2.dropna(subset=['Age'])
-            elif age_strategy == "Заповнити середнім арифметичним":
-                df_step_2['Age'] = df_step_2['Age'].fillna(df_step_2['Age'].mean())
-            elif age_strategy == "Заповнити медіаною (середнім значенням)":
-                df_step_2['Age'] = df_step_2['Age'].fillna(df_step_2['Age'].median())
+            df_step_2 = prepare_step_2(original_data, cols_to_show, age_strategy,
+                                       age_stats=original_stats['columns']['Age'])
 
             st.markdown("### ✅ Твій датасет (після обраної трансформації):")
             st.markdown(f"**Кількість рядків:** {len(df_step_2)}")
-            st.dataframe(df_step_2.head(1000), use_container_width=True)
+            show_data_preview(df_step_2, key="preview_step_2", version=("step_2", age_strategy))
 
         elif "Age" not in features:
             st.warning("""
@@ -588,7 +899,10 @@ else:
             """)
 
         # ✅ Зберігаємо оброблені дані для наступного кроку
+        # (статистика нової версії: перераховується тільки змінена колонка Age)
         st.session_state.game_choices['df_step_2'] = df_step_2
+        st.session_state.game_choices['stats_step_2'] = step_2_stats(df_step_2, original_data,
+                                                                     cols_to_show, age_strategy)
 
         col_btn1, col_btn2 = st.columns(2)
         with col_btn1:
@@ -614,13 +928,18 @@ else:
                 st.session_state.game_step = 2
                 st.rerun()
         else:
-            # ✅ ЗАВЖДИ створюємо НОВУ копію
-            df_step_3 = df_from_step2.copy()
+            # Дані кроку 2 не змінюються на місці, тому копія не потрібна
+            df_step_3 = df_from_step2
+            stats_step_2 = st.session_state.game_choices.get('stats_step_2')
+            if stats_step_2 is None:
+                stats_step_2 = step_2_stats(df_from_step2, df,
+                                            st.session_state.game_choices.get('cols_to_show', list(df_from_step2.columns)),
+                                            st.session_state.game_choices.get('age_strategy'))
             original_features = st.session_state.game_choices.get('features', []).copy()
             features = original_features.copy()
 
             # Визначаємо категоріальні колонки
-            categorical_cols = ['Sex', 'Embarked', 'Name', 'Ticket', 'Cabin']
+            categorical_cols = CATEGORICAL_COLUMNS
             selected_categorical = [col for col in original_features if
                                     col in categorical_cols and col in df_step_3.columns]
 
@@ -634,6 +953,8 @@ else:
                 with col_btn2:
                     if st.button("Далі ➡️", type="primary", use_container_width=True, key="next_3"):
                         st.session_state.game_choices['df_processed'] = df_step_3
+                        st.session_state.game_choices['stats_processed'] = stats_step_2
+                        st.session_state.game_choices['encoding_choices'] = {}
                         st.session_state.game_step = 4
                         st.rerun()
             else:
@@ -651,7 +972,7 @@ else:
                     st.markdown(f"### 📊 Колонка: **{col}**")
 
                     # Показуємо приклади значень З ОРИГІНАЛЬНИХ даних (до трансформації)
-                    original_vals = df_from_step2[col].dropna().unique()[:5]
+                    original_vals = stats_step_2['columns'][col]['examples']
                     st.markdown(f"**Приклади значень:** {', '.join(map(str, original_vals))}")
 
                     # SEX
@@ -661,13 +982,7 @@ else:
                         with col1:
                             sex_encoding = st.radio(
                                 "Виберіть метод кодування:",
-                                options=[
-                                    "Male=1, Female=0",
-                                    "Female=1, Male=0",
-                                    "За статистикою виживання: Male=1, Female=3",
-                                    "Протилежні значення: Male=-1, Female=1",
-                                    #"Не використовувати цю колонку"
-                                ],
+                                options=SEX_ENCODINGS,
                                 index=0,
                                 key=f"encoding_sex"
                             )
@@ -676,10 +991,11 @@ else:
                             show_hint = st.checkbox("❓ Підказка", key=f"hint_sex")
 
                         if show_hint:
-                            st.info("""
+                            sex_rates = stats_step_2['columns']['Sex'].get('survival_rates', {})
+                            st.info(f"""
                             💡 **Підказка:**
                             - Будь-яке числове кодування 0/1 підійде
-                            - Стать важлива для прогнозування виживання!
+                            - Стать важлива для прогнозування виживання! Вижили: {format_rates(sex_rates)}
                             **Оптимальний вибір:** Male=1, Female=0 ✅
                             """)
 
@@ -694,12 +1010,7 @@ else:
                         with col1:
                             embarked_encoding = st.radio(
                                 "Виберіть метод кодування:",
-                                options=[
-                                    "За алфавітом: C, Q, S → 1, 2, 3",
-                                    "За популярністю порту S=3 (найбільше), C=2, Q=1 (найменше) (за кількістю пасажирів)",
-
-                                    #"Не використовувати цю колонку"
-                                ],
+                                options=EMBARKED_ENCODINGS,
                                 index=0,
                                 key=f"encoding_embarked"
                             )
@@ -708,11 +1019,12 @@ else:
                             show_hint = st.checkbox("❓ Підказка", key=f"hint_embarked")
 
                         if show_hint:
-                            value_counts = df_from_step2['Embarked'].value_counts()
+                            embarked_stats = stats_step_2['columns']['Embarked']
                             st.info(f"""
                             💡 **Підказка:**
                             - Порт посадки може впливати на клас пасажирів
-                            - Розподіл: {value_counts.to_dict()}
+                            - Розподіл: {embarked_stats.get('value_counts', {})}
+                            - Вижили: {format_rates(embarked_stats.get('survival_rates', {}))}
                             **Оптимальний вибір:** C=0, Q=1, S=2 ✅
                             """)
 
@@ -727,11 +1039,7 @@ else:
                         with col1:
                             name_encoding = st.radio(
                                 "Виберіть метод обробки:",
-                                options=[
-                                    "Витягти титулів, сімейного стану (Mr, Mrs, Miss, Master)",
-                                    "Підрахувати довжину імені (кількість символів)",
-                                    #"Не використовувати цю колонку"
-                                ],
+                                options=NAME_ENCODINGS,
                                 index=0,
                                 key=f"encoding_name"
                             )
@@ -757,11 +1065,7 @@ else:
                         with col1:
                             ticket_encoding = st.radio(
                                 "Виберіть метод обробки:",
-                                options=[
-                                    "Підрахувати довжину квитка",
-                                    'Вартість квитка: PC/STON=1 (преміум), A/=2 (середній), Інші=3',
-                                    #"Не використовувати цю колонку"
-                                ],
+                                options=TICKET_ENCODINGS,
                                 index=0,
                                 key=f"encoding_ticket"
                             )
@@ -780,8 +1084,8 @@ else:
 
                     # CABIN
                     elif col == 'Cabin':
-                        cabin_count = df_from_step2['Cabin'].notna().sum()
-                        cabin_percent = (cabin_count / len(df_from_step2) * 100)
+                        cabin_count = stats_step_2['n_rows'] - stats_step_2['columns']['Cabin']['missing']
+                        cabin_percent = (cabin_count / max(stats_step_2['n_rows'], 1) * 100)
                         st.markdown(f"Приклад: **'C85'**, **'E46'** | Заповнено: {cabin_count} ({cabin_percent:.1f}%)")
 
                         col1, col2 = st.columns([3, 1])
@@ -789,12 +1093,7 @@ else:
                         with col1:
                             cabin_encoding = st.radio(
                                 "Виберіть метод обробки:",
-                                options=[
-                                    "Є каюта = 1, Немає каюти = 0",
-                                    "Вища палуба = вище число (A/B/C=3, D/E=2, F/G=1, Немає=0)",
-                                    "Літера каюти: A=1, B=2, C=3, D=4, E=5, F=6, G=7, Немає=0"
-                                    #"Не використовувати цю колонку"
-                                ],
+                                options=CABIN_ENCODINGS,
                                 index=0,
                                 key=f"encoding_cabin"
                             )
@@ -815,120 +1114,11 @@ else:
                 st.markdown("---")
                 st.markdown("### 🔄 Застосовуємо трансформації...")
 
-                # Sex - перезаписуємо значення
-                if 'Sex' in current_encodings:
-                    if current_encodings['Sex'] == "Male=1, Female=0":
-                        df_step_3['Sex'] = df_step_3['Sex'].map({'male': 1, 'female': 0})
-                    elif current_encodings['Sex'] == "Female=1, Male=0":
-                        df_step_3['Sex'] = df_step_3['Sex'].map({'female': 1, 'male': 0})
-                    elif current_encodings['Sex'] == "За статистикою виживання: Male=1, Female=3":
-                        df_step_3['Sex'] = df_step_3['Sex'].map({'male': 1, 'female': 3})
-                    elif current_encodings['Sex'] == "Протилежні значення: Male=-1, Female=1":
-                        df_step_3['Sex'] = df_step_3['Sex'].map({'male': -1, 'female': 1})
-
-                # Embarked - перезаписуємо значення
-                if 'Embarked' in current_encodings:
-                    if current_encodings['Embarked'] == "За алфавітом: C, Q, S → 1, 2, 3":
-                        df_step_3['Embarked'] = df_step_3['Embarked'].map({'C': 1, 'Q': 2, 'S': 3})
-                    elif current_encodings[
-                        'Embarked'] == "За популярністю порту S=3 (найбільше), C=2, Q=1 (найменше) (за кількістю пасажирів)":
-                        df_step_3['Embarked'] = df_step_3['Embarked'].map({'S': 3, 'C': 2, 'Q': 1})
-
-                # Name - перезаписуємо значення (витягуємо титул або довжину)
-                if 'Name' in current_encodings:
-                    if current_encodings['Name'] == "Витягти титулів, сімейного стану (Mr, Mrs, Miss, Master)":
-                        # Витягуємо титул
-                        title_series = df_step_3['Name'].str.extract(' ([A-Za-z]+)\.', expand=False)
-                        title_mapping = {
-                            'Mr': 1,  # Дорослий чоловік
-                            'Mrs': 2,  # Одружена жінка
-                            'Miss': 3,  # Неодружена жінка/дівчина
-                            'Master': 4,  # Хлопчик
-                            'Ms': 3,  # Сучасна форма Miss
-                            'Mlle': 3,  # Мадемуазель (Miss)
-                            'Mme': 2,  # Мадам (Mrs)
-                            'Dr': 5,  # Доктор
-                            'Rev': 5,  # Преподобний
-                            'Col': 5,  # Полковник
-                            'Major': 5,  # Майор
-                            'Capt': 5,  # Капітан
-                            'Sir': 5,  # Сер
-                            'Lady': 5,  # Леді
-                            'Don': 5,  # Дон
-                            'Dona': 5,  # Донья
-                            'Countess': 5,  # Графиня
-                            'Jonkheer': 5  # Йонкхер (голландський титул)
-                        }
-                        # ✅ ПЕРЕЗАПИСУЄМО колонку Name числами
-                        df_step_3['Name'] = title_series.map(title_mapping).fillna(5)
-
-                    elif current_encodings['Name'] == "Підрахувати довжину імені (кількість символів)":
-                        # ✅ ПЕРЕЗАПИСУЄМО колонку Name на довжину
-                        df_step_3['Name'] = df_step_3['Name'].str.len()
-
-                # Ticket - перезаписуємо значення
-                if 'Ticket' in current_encodings:
-                    if current_encodings['Ticket'] == "Підрахувати довжину квитка":
-                        # ✅ ПЕРЕЗАПИСУЄМО колонку Ticket на довжину
-                        df_step_3['Ticket'] = df_step_3['Ticket'].str.len()
-
-                    elif current_encodings['Ticket'] == 'Вартість квитка: PC/STON=1 (преміум), A/=2 (середній), Інші=3':
-                        # Визначаємо тип квитка за префіксом
-                        def classify_ticket(ticket):
-                            if pd.isna(ticket):
-                                return 3  # Немає інформації
-                            ticket_str = str(ticket).upper()
-                            if 'PC' in ticket_str or 'STON' in ticket_str:
-                                return 1  # Преміум
-                            elif ticket_str.startswith('A/') or ticket_str.startswith('A.'):
-                                return 2  # Середній
-                            else:
-                                return 3  # Інші
-
-
-                        # ✅ ПЕРЕЗАПИСУЄМО колонку Ticket категоріями
-                        df_step_3['Ticket'] = df_step_3['Ticket'].apply(classify_ticket)
-
-                # Cabin - перезаписуємо значення
-                if 'Cabin' in current_encodings:
-                    if current_encodings['Cabin'] == "Є каюта = 1, Немає каюти = 0":
-                        # ✅ ПЕРЕЗАПИСУЄМО колонку Cabin на 0/1
-                        df_step_3['Cabin'] = df_step_3['Cabin'].notna().astype(int)
-
-                    elif current_encodings['Cabin'] == "Вища палуба = вище число (A/B/C=3, D/E=2, F/G=1, Немає=0)":
-                        # Визначаємо рівень палуби
-                        def classify_deck_level(cabin):
-                            if pd.isna(cabin):
-                                return 0  # Немає каюти
-                            deck = str(cabin)[0].upper()  # Перша літера
-                            if deck in ['A', 'B', 'C']:
-                                return 3  # Верхні палуби (кращі)
-                            elif deck in ['D', 'E']:
-                                return 2  # Середні палуби
-                            elif deck in ['F', 'G']:
-                                return 1  # Нижні палуби
-                            else:
-                                return 0  # Невідомий формат
-
-
-                        # ✅ ПЕРЕЗАПИСУЄМО колонку Cabin рівнем палуби
-                        df_step_3['Cabin'] = df_step_3['Cabin'].apply(classify_deck_level)
-
-                    elif current_encodings['Cabin'] == "Літера каюти: A=1, B=2, C=3, D=4, E=5, F=6, G=7, Немає=0":
-                        # Витягуємо літеру каюти
-                        def extract_deck_letter(cabin):
-                            if pd.isna(cabin):
-                                return 0  # Немає каюти
-                            deck = str(cabin)[0].upper()
-                            deck_mapping = {
-                                'A': 1, 'B': 2, 'C': 3, 'D': 4,
-                                'E': 5, 'F': 6, 'G': 7, 'T': 8
-                            }
-                            return deck_mapping.get(deck, 0)
-
-
-                        # ✅ ПЕРЕЗАПИСУЄМО колонку Cabin номером літери
-                        df_step_3['Cabin'] = df_step_3['Cabin'].apply(extract_deck_letter)
+                # Перераховуються тільки колонки, у яких змінились дані кроку 2 або обране кодування
+                df_step_3 = apply_encodings(
+                    df_from_step2, current_encodings,
+                    step_2_fingerprints(df_from_step2.columns, st.session_state.game_choices.get('age_strategy'))
+                )
 
                 # Показуємо результат
                 st.markdown("---")
@@ -948,18 +1138,24 @@ else:
                 for col, encoding in current_encodings.items():
                     st.success(f"**{col}**: {encoding}")
 
+                # Статистика після перетворень: перераховуються тільки закодовані колонки
+                stats_step_3 = get_dataset_stats(
+                    df_step_3, (stats_step_2['version'], tuple(sorted(current_encodings.items()))),
+                    base=stats_step_2, changed=tuple(current_encodings)
+                )
+
                 # Перевірка: чи всі колонки числові?
-                non_numeric = df_step_3.select_dtypes(exclude=[np.number]).columns.tolist()
-                if 'Survived' in non_numeric:
-                    non_numeric.remove('Survived')
+                non_numeric = non_numeric_columns(stats_step_3)
 
                 if non_numeric:
                     st.warning(f"⚠️ **Увага!** Ще є текстові колонки: {', '.join(non_numeric)}")
                 else:
                     st.success("✅ Всі ознаки перетворено на числа! Готово до навчання моделі.")
 
-                # Зберігаємо оброблений DataFrame
+                # Зберігаємо оброблений DataFrame та обрані кодування
                 st.session_state.game_choices['df_processed'] = df_step_3
+                st.session_state.game_choices['stats_processed'] = stats_step_3
+                st.session_state.game_choices['encoding_choices'] = current_encodings
 
                 # Кнопки навігації
                 st.markdown("---")
@@ -1026,52 +1222,96 @@ else:
         st.subheader("⚙️ Крок 5: Налаштування моделі")
 
         st.markdown("""
-        ### Що таке `max_depth`?
-
-        `max_depth` — це **наскільки глибоким може бути дерево рішень**, тобто **скільки запитань поспіль може задати модель**, щоб зробити свій прогноз.
-
-        Пояснення:
-
-        - **Мала глибина (1–2)** — модель задає мало запитань → рішення занадто прості → може часто помилятись.
-        - **Дуже велика глибина (15+)** — модель задає занадто багато запитань → починає "зазубрювати" дані → погано працює на нових прикладах.
-        - **Середня глибина (3–7)** — модель задає достатньо запитань, але не перебільшує → зазвичай найкращий варіант.
+        ### Який алгоритм обрати?
 
-        Обери глибину, яка допоможе моделі робити точні, але не "перенавчені" рішення.
+        - **Decision Tree** — одне дерево запитань. Просте та зрозуміле, але легко "зазубрює" дані.
+        - **Random Forest** — багато дерев, кожне навчене на випадковій частині даних, які голосують разом.
+          Зазвичай точніше та стабільніше за одне дерево. Навчається на всіх ядрах процесора.
+        - **Logistic Regression** — зважена сума ознак, перетворена на ймовірність.
+          Швидка та стійка до перенавчання, але не вловлює складні взаємодії ознак.
         """)
 
         col1, col2 = st.columns([3, 1])
-        
+
         with col1:
-            max_depth = st.slider(
-                "Виберіть max_depth:",
-                min_value=1,
-                max_value=20,
-                value=5,
-                help="Максимальна глибина дерева рішень"
+            algorithm = st.radio(
+                "Виберіть алгоритм:",
+                options=ALGORITHMS,
+                index=0,
+                key="algorithm"
             )
-            
-            # Показуємо попередження залежно від вибору
-            if max_depth <= 2:
-                st.warning("⚠️ Занадто мала глибина може призвести до underfitting")
-            elif max_depth >= 15:
-                st.warning("⚠️ Занадто велика глибина може призвести до overfitting")
-            else:
-                st.success("✅ Хороший вибір для балансу!")
-        
+
         with col2:
-            show_hint = st.checkbox("❓ Підказка", key="hint_depth")
-        
+            show_hint = st.checkbox("❓ Підказка", key="hint_algorithm")
+
         if show_hint:
             st.info("""
             💡 **Підказка:**
-            Пам'ятаєш навчальний режим?
-            - **1-2**: Underfitting (занадто просто)
-            - **3-7**: Good Fit (оптимально) ✅
-            - **15+**: Overfitting (занадто складно)
-            
-            **Оптимальний вибір:** 5-7
+            - **Decision Tree** - добрий старт, щоб побачити вплив max_depth
+            - **Random Forest** - найчастіше дає найвищу точність на тесті ✅
+            - **Logistic Regression** - добрий простий базовий варіант
             """)
-        
+
+        max_depth = None
+        forest_stop_on_plateau = True
+
+        if algorithm in TREE_ALGORITHMS:
+            st.markdown("---")
+            st.markdown("""
+            ### Що таке `max_depth`?
+
+            `max_depth` — це **наскільки глибоким може бути дерево рішень**, тобто **скільки запитань поспіль може задати модель**, щоб зробити свій прогноз.
+
+            Пояснення:
+
+            - **Мала глибина (1–2)** — модель задає мало запитань → рішення занадто прості → може часто помилятись.
+            - **Дуже велика глибина (15+)** — модель задає занадто багато запитань → починає "зазубрювати" дані → погано працює на нових прикладах.
+            - **Середня глибина (3–7)** — модель задає достатньо запитань, але не перебільшує → зазвичай найкращий варіант.
+
+            Обери глибину, яка допоможе моделі робити точні, але не "перенавчені" рішення.
+            """)
+
+            col1, col2 = st.columns([3, 1])
+
+            with col1:
+                max_depth = st.slider(
+                    "Виберіть max_depth:",
+                    min_value=1,
+                    max_value=20,
+                    value=5,
+                    help="Максимальна глибина дерева рішень"
+                )
+
+                # Показуємо попередження залежно від вибору
+                if max_depth <= 2:
+                    st.warning("⚠️ Занадто мала глибина може призвести до underfitting")
+                elif max_depth >= 15:
+                    st.warning("⚠️ Занадто велика глибина може призвести до overfitting")
+                else:
+                    st.success("✅ Хороший вибір для балансу!")
+
+            with col2:
+                show_hint = st.checkbox("❓ Підказка", key="hint_depth")
+
+            if show_hint:
+                st.info("""
+                💡 **Підказка:**
+                Пам'ятаєш навчальний режим?
+                - **1-2**: Underfitting (занадто просто)
+                - **3-7**: Good Fit (оптимально) ✅
+                - **15+**: Overfitting (занадто складно)
+
+                **Оптимальний вибір:** 5-7
+                """)
+
+        if algorithm == RANDOM_FOREST:
+            forest_stop_on_plateau = st.checkbox(
+                "⏹️ Зупинити навчання, коли точність перестане рости",
+                value=True,
+                help=f"Ліс росте по {FOREST_STEP} дерев (максимум {FOREST_MAX_TREES}). "
+                     "Якщо точність не покращується кілька кроків поспіль, навчання зупиняється."
+            )
+
         col_btn1, col_btn2 = st.columns(2)
         with col_btn1:
             if st.button("⬅️ Назад", use_container_width=True, key="back_5"):
@@ -1079,7 +1319,9 @@ else:
                 st.rerun()
         with col_btn2:
             if st.button("Далі ➡️", type="primary", use_container_width=True, key="next_5"):
+                st.session_state.game_choices['algorithm'] = algorithm
                 st.session_state.game_choices['max_depth'] = max_depth
+                st.session_state.game_choices['forest_stop_on_plateau'] = forest_stop_on_plateau
                 st.session_state.game_step = 6
                 st.rerun()
 
@@ -1129,347 +1371,770 @@ else:
             'Твій вибір': dropna_strategy
         })
 
-        # 5. Max Depth
-        max_depth = choices.get('max_depth', 'Не обрано')
+        # 5. Алгоритм та Max Depth
+        algorithm = choices.get('algorithm', DECISION_TREE)
         choices_data.append({
-            'Крок': '5️⃣ Max Depth',
-            'Твій вибір': str(max_depth)
+            'Крок': '5️⃣ Алгоритм',
+            'Твій вибір': algorithm
         })
 
+        max_depth = choices.get('max_depth', 'Не обрано')
+        if algorithm in TREE_ALGORITHMS:
+            choices_data.append({
+                'Крок': '5️⃣ Max Depth',
+                'Твій вибір': str(max_depth)
+            })
+
         choices_df = pd.DataFrame(choices_data)
         st.dataframe(choices_df, use_container_width=True, hide_index=True)
 
         st.markdown("---")
 
-        # Кнопка навчання
-        if st.button("🚀 Навчити модель!", type="primary", use_container_width=True):
-            with st.spinner("🔧 Навчаємо модель на основі твоїх виборів..."):
-
-                # ✅ 1. ОТРИМУЄМО ПІДГОТОВЛЕНІ ДАНІ
-                df_processed = st.session_state.game_choices.get('df_processed')
-
-                if df_processed is None:
-                    st.error("❌ Дані не підготовлені! Поверніться до попередніх кроків.")
-                else:
-                    try:
-                        # ✅ 2. ВАЛІДАЦІЯ ДАНИХ
-                        st.info("🔍 Перевірка даних перед навчанням...")
-
-                        # Перевіряємо наявність Survived
-                        if 'Survived' not in df_processed.columns:
-                            st.error("❌ Помилка: колонка 'Survived' не знайдена!")
-                            st.stop()
-
-                        # Перевіряємо на текстові колонки
-                        non_numeric = df_processed.select_dtypes(exclude=[np.number]).columns.tolist()
-                        if 'Survived' in non_numeric:
-                            non_numeric.remove('Survived')
-
-                        if non_numeric:
-                            st.error(f"❌ Помилка: є текстові колонки: {', '.join(non_numeric)}")
-                            st.warning("Поверніться до Кроку 3 і перетворіть всі колонки на числа!")
-                            st.stop()
-
-                        # Перевіряємо на пропущені значення
-                        missing_count = df_processed.isnull().sum().sum()
-                        if missing_count > 0:
-                            st.warning(f"⚠️ Знайдено {missing_count} пропущених значень. Видаляємо їх...")
-                            df_processed = df_processed.dropna()
-
-                        # Перевіряємо чи достатньо даних
-                        if len(df_processed) < 50:
-                            st.error(f"❌ Занадто мало даних: {len(df_processed)} записів. Потрібно мінімум 50.")
-                            st.stop()
-
-                        st.success(f"✅ Дані валідовані! Готово {len(df_processed)} записів для навчання.")
-
-                        # ✅ 3. РОЗДІЛЯЄМО НА X та y
-                        X = df_processed.drop('Survived', axis=1)
-                        y = df_processed['Survived']
-
-                        st.info(f"📊 Ознаки для навчання: {list(X.columns)}")
-
-                        # ✅ 4. РОЗДІЛЯЄМО НА TRAIN/TEST
-                        from sklearn.model_selection import train_test_split
-
-                        X_train, X_test, y_train, y_test = train_test_split(
-                            X, y, test_size=0.2, random_state=42, stratify=y
-                        )
-
-                        st.info(f"🔀 Розділено на Train: {len(X_train)} записів, Test: {len(X_test)} записів")
-
-                        # ✅ 5. НАВЧАЄМО МОДЕЛЬ
-                        from sklearn.tree import DecisionTreeClassifier
-
-                        max_depth_val = choices.get('max_depth', 5)
-
-                        model = DecisionTreeClassifier(
-                            max_depth=max_depth_val,
-                            random_state=42,
-                            min_samples_split=5,
-                            min_samples_leaf=2
-                        )
-
-                        st.info(f"🌳 Навчаємо Decision Tree з max_depth={max_depth_val}...")
-                        model.fit(X_train, y_train)
-
-                        # ✅ 6. ОБЧИСЛЮЄМО РЕАЛЬНУ ТОЧНІСТЬ
-                        train_accuracy = model.score(X_train, y_train)
-                        test_accuracy = model.score(X_test, y_test)
-
-                        # Додаткові метрики
-                        from sklearn.metrics import precision_score, recall_score, f1_score
-
-                        y_pred = model.predict(X_test)
-                        precision = precision_score(y_test, y_pred, zero_division=0)
-                        recall = recall_score(y_test, y_pred, zero_division=0)
-                        f1 = f1_score(y_test, y_pred, zero_division=0)
-
-                        # ✅ 7. ЗБЕРІГАЄМО МОДЕЛЬ
-                        st.session_state['trained_model'] = model
-                        st.session_state['X_train'] = X_train
-                        st.session_state['X_test'] = X_test
-                        st.session_state['y_train'] = y_train
-                        st.session_state['y_test'] = y_test
-
-                        st.success("✅ Модель успішно навчена!")
-
-                        # ✅ 8. АНАЛІЗУЄМО ВИБОРИ (тільки для feedback, НЕ впливає на оцінку!)
-                        feedback = []
-
-                        # Перевірка ознак
-                        selected_features = set(choices.get('features', []))
-                        optimal_features = {'Pclass', 'Sex', 'Age', 'SibSp', 'Parch', 'Fare'}
-
-                        if 'PassengerId' not in selected_features:
-                            feedback.append("✅ Не використовував PassengerId (добре!)")
-                        else:
-                            feedback.append("⚠️ PassengerId не корисний для прогнозу")
-
-                        useful_selected = len(selected_features.intersection(optimal_features))
-                        if useful_selected >= 5:
-                            feedback.append(f"✅ Обрав {useful_selected} з 6 найкорисніших ознак")
-                        elif useful_selected >= 3:
-                            feedback.append(f"⚠️ Обрав {useful_selected} корисних ознак (можна більше)")
-                        else:
-                            feedback.append(f"❌ Обрав мало корисних ознак: {useful_selected}")
-
-                        # Перевірка обробки віку
-                        if 'Age' in selected_features:
-                            if 'медіаною' in age_strategy:
-                                feedback.append("✅ Використав медіану для віку (оптимально)")
-                            elif 'середнім' in age_strategy:
-                                feedback.append("⚠️ Середнє працює, але медіана краще")
-                            elif 'Видалити' in age_strategy:
-                                feedback.append("⚠️ Видалення рядків втрачає багато даних")
-
-                        # Перевірка кодування Sex
-                        sex_encoding = encoding_choices.get('Sex', '')
-                        if sex_encoding:
-                            if 'статистикою' in sex_encoding or 'Female=3' in sex_encoding:
-                                feedback.append("✅ Цікавий вибір кодування Sex (враховує статистику)")
-                            elif 'Протилежні' in sex_encoding:
-                                feedback.append("✅ Креативний вибір кодування Sex")
-
-                        # Перевірка max_depth
-                        difference = train_accuracy - test_accuracy
-
-                        if 3 <= max_depth_val <= 7:
-                            feedback.append(f"✅ Оптимальний max_depth: {max_depth_val}")
-                        elif max_depth_val <= 2:
-                            feedback.append(f"⚠️ max_depth={max_depth_val} може бути занадто малим")
-                        else:
-                            feedback.append(f"⚠️ max_depth={max_depth_val} може призвести до overfitting")
-
-                        # Аналіз РЕАЛЬНИХ результатів моделі
-                        if difference > 0.15:
-                            feedback.append(
-                                f"⚠️ Велика різниця Train-Test ({difference * 100:.1f}%) - ознака overfitting")
-                        elif difference < 0.05:
-                            feedback.append(f"✅ Мала різниця Train-Test ({difference * 100:.1f}%) - добрий баланс!")
-
-                        if test_accuracy >= 0.80:
-                            feedback.append(f"🎉 Відмінна точність на тесті: {test_accuracy * 100:.1f}%!")
-                        elif test_accuracy >= 0.75:
-                            feedback.append(f"✅ Хороша точність на тесті: {test_accuracy * 100:.1f}%")
-                        elif test_accuracy < 0.65:
-                            feedback.append(f"⚠️ Низька точність на тесті: {test_accuracy * 100:.1f}%")
+        # Режим оцінки моделі
+        col1, col2 = st.columns([3, 1])
 
-                        # ✅ 9. ПОКАЗУЄМО РЕЗУЛЬТАТИ (без змін)
-                        st.markdown("---")
-                        st.markdown("### 📊 Результати навчання")
+        with col1:
+            eval_mode = st.radio(
+                "Як оцінювати модель?",
+                options=[
+                    "Один поділ Train/Test (80% / 20%)",
+                    "K-fold крос-валідація"
+                ],
+                index=0,
+                key="eval_mode"
+            )
 
-                        col1, col2, col3, col4 = st.columns(4)
+            cv_splits, cv_repeats = 5, 1
+            if eval_mode == "K-fold крос-валідація":
+                cv_splits = st.slider("Кількість фолдів (k):", min_value=3, max_value=10, value=5)
+                cv_repeats = st.slider("Кількість повторень:", min_value=1, max_value=5, value=1,
+                                       help="Більше повторень - стабільніша оцінка, але довше навчання")
 
-                        with col1:
-                            st.metric("Train Accuracy", f"{train_accuracy * 100:.1f}%")
-                            st.caption("Це точність моделі на тих даних, на яких вона навчалась.")
-                        with col2:
-                            st.metric("Test Accuracy", f"{test_accuracy * 100:.1f}%")
-                            st.caption("Це точність моделі на нових даних, яких вона ніколи не бачила.")
-                        with col3:
-                            difference = train_accuracy - test_accuracy
-                            delta_color = "inverse" if difference > 0.1 else "normal"
-                            st.metric("Різниця", f"{difference * 100:.1f}%",
-                                      delta=f"{difference * 100:.1f}%", delta_color=delta_color)
-                            st.caption("""
-                            ### 🔍 Що означає різниця між Train і Test?
-                            - **0–5%** → 🟢 *Чудово!* Модель добре узагальнює і не перенавчена.  
-                            - **5–10%** → 🟡 *Нормально.* Є легке перенавчання, але модель працює стабільно.  
-                            - **10%+** → 🔴 *Проблема.* Модель перенавчена.
-                            """)
-                        with col4:
-                            st.metric("F1-Score", f"{f1 * 100:.1f}%")
-                            st.caption("""
-                            ### 🎯 Що таке F1-Score?
-                            F1 — це збалансована оцінка точності моделі, яка враховує **і Precision, і Recall**.
-                            """)
-
-                        # Детальні метрики
-                        with st.expander("📈 Детальні метрики"):
-                            metric_col1, metric_col2, metric_col3 = st.columns(3)
-                            with metric_col1:
-                                st.metric("Precision", f"{precision * 100:.1f}%")
-                                st.caption("Наскільки точно модель передбачає *позитивні* приклади.")
-                            with metric_col2:
-                                st.metric("Recall", f"{recall * 100:.1f}%")
-                                st.caption("Яку частку *справжніх позитивів* модель знаходить.")
-                            with metric_col3:
-                                st.metric("Записів у Train", len(X_train))
-
-                        # ✅ 10. ОЦІНКА НА ОСНОВІ РЕАЛЬНИХ МЕТРИК (ЗМІНЕНО!)
-                        st.markdown("---")
-                        st.markdown("### 🎯 Оцінка твоєї моделі")
-
-                        # Визначаємо тип fit на основі РЕАЛЬНИХ метрик
-                        if difference > 0.15:
-                            fit_type = "Overfitting 🔴"
-                            fit_explanation = f"Модель занадто добре запам'ятала тренувальні дані (різниця {difference * 100:.1f}%)"
-                        elif test_accuracy < 0.70:
-                            fit_type = "Underfitting 🔵"
-                            fit_explanation = f"Модель занадто проста і не вловлює закономірності (точність {test_accuracy * 100:.1f}%)"
-                        else:
-                            fit_type = "Good Fit 🟢"
-                            fit_explanation = f"Модель добре узагальнює дані! (різниця {difference * 100:.1f}%)"
+        with col2:
+            show_hint = st.checkbox("❓ Підказка", key="hint_eval_mode")
 
-                        # ОЦІНКА БАЗУЄТЬСЯ ТІЛЬКИ НА РЕАЛЬНИХ МЕТРИКАХ
-                        if test_accuracy >= 0.80 and difference < 0.10:
-                            st.success(f"""
-                            ## 🏆 Відмінно!
+        if show_hint:
+            st.info("""
+            💡 **Підказка:**
+            - **Один поділ** - швидко, але результат залежить від того, які пасажири потрапили в тест
+            - **K-fold** - модель навчається k разів на різних частинах даних,
+              і ми бачимо середню точність та її розкид ✅
+            """)
 
-                            **Твоя модель: {fit_type}**
-                            {fit_explanation}
+        executor = get_executor()
 
-                            **Результати:**
-                            - 🎯 Train Accuracy: {train_accuracy * 100:.1f}%
-                            - ✅ Test Accuracy: {test_accuracy * 100:.1f}%
-                            - 📊 Різниця: {difference * 100:.1f}%
-                            - 🎪 F1-Score: {f1 * 100:.1f}%
+        # Кнопка навчання
+        if st.button("🚀 Навчити модель!", type="primary", use_container_width=True):
+            # ✅ 1. ОТРИМУЄМО ПІДГОТОВЛЕНІ ДАНІ
+            df_processed = st.session_state.game_choices.get('df_processed')
 
-                            **Ти справжній Data Scientist!** 🎉
-                            """)
-                            st.balloons()
+            if df_processed is None:
+                st.error("❌ Дані не підготовлені! Поверніться до попередніх кроків.")
+            else:
+                # ✅ 2. ВАЛІДАЦІЯ ДАНИХ
+                st.info("🔍 Перевірка даних перед навчанням...")
 
-                        elif test_accuracy >= 0.75 and difference < 0.15:
-                            st.info(f"""
-                            ## 👍 Добре!
+                stats_processed = st.session_state.game_choices.get('stats_processed')
+                if stats_processed is None:
+                    stats_processed = compute_stats(df_processed)
 
-                            **Твоя модель: {fit_type}**
-                            {fit_explanation}
+                # Перевіряємо наявність Survived
+                if 'Survived' not in stats_processed['columns']:
+                    st.error("❌ Помилка: колонка 'Survived' не знайдена!")
+                    st.stop()
 
-                            **Результати:**
-                            - 🎯 Train Accuracy: {train_accuracy * 100:.1f}%
-                            - ✅ Test Accuracy: {test_accuracy * 100:.1f}%
-                            - 📊 Різниця: {difference * 100:.1f}%
-                            - 🎪 F1-Score: {f1 * 100:.1f}%
+                # Перевіряємо на текстові колонки
+                non_numeric = non_numeric_columns(stats_processed)
 
-                            Непогана модель! Є простір для покращення.
-                            """)
+                if non_numeric:
+                    st.error(f"❌ Помилка: є текстові колонки: {', '.join(non_numeric)}")
+                    st.warning("Поверніться до Кроку 3 і перетворіть всі колонки на числа!")
+                    st.stop()
+
+                # Перевіряємо на пропущені значення
+                missing_count = total_missing(stats_processed)
+                if missing_count > 0:
+                    df_processed = df_processed.dropna()
+
+                # Перевіряємо чи достатньо даних
+                if len(df_processed) < 50:
+                    st.error(f"❌ Занадто мало даних: {len(df_processed)} записів. Потрібно мінімум 50.")
+                    st.stop()
+
+                # ✅ 3. СТАВИМО НАВЧАННЯ В ЧЕРГУ (модель навчається у фоновому процесі)
+                previous_job_id = st.session_state.pop('training_job_id', None)
+                if previous_job_id:
+                    executor.cancel(previous_job_id)
+
+                # Режим оцінки теж входить у вибори гравця (для таблиці лідерів)
+                choices['eval_mode'] = eval_mode
+                choices['cv_splits'] = cv_splits if eval_mode == "K-fold крос-валідація" else None
+                choices['cv_repeats'] = cv_repeats
+
+                try:
+                    st.session_state.training_job_id = executor.submit(
+                        st.session_state.session_id,
+                        train_game_model,
+                        df_processed,
+                        algorithm,
+                        max_depth=choices.get('max_depth') or 5,
+                        stop_on_plateau=choices.get('forest_stop_on_plateau', True),
+                        cv_splits=cv_splits if eval_mode == "K-fold крос-валідація" else None,
+                        cv_repeats=cv_repeats,
+                        schema=game_model_schema(df_processed, choices,
+                                                 get_dataset_stats(df, "original")['columns'].get('Age')),
+                        # Однакові вибори кількох гравців (наприклад, у класі) навчаються один раз
+                        coalesce_key=training_job_key(choices, df_processed.columns)
+                    )
+                    st.session_state.training_data = df_processed
+                    st.session_state.training_missing_count = missing_count
+                    st.session_state.pop('training_result', None)
+                except QueueFullError as e:
+                    st.error(f"❌ {e}")
+
+        # ✅ 4. ПЕРЕВІРЯЄМО СТАН ФОНОВОГО НАВЧАННЯ
+        training_in_progress = False
+        job_id = st.session_state.get('training_job_id')
+
+        if job_id:
+            job = executor.status(job_id)
+
+            if job is None or job['status'] == JOB_CANCELLED:
+                st.session_state.pop('training_job_id', None)
+            elif job['status'] == JOB_FAILED:
+                st.session_state.pop('training_job_id', None)
+                st.error(f"❌ Помилка: {job['error']}")
+            elif job['status'] == JOB_DONE:
+                st.session_state.pop('training_job_id', None)
+                st.session_state.training_result = executor.result(job_id)
+                st.session_state.training_result_is_new = True
+            else:
+                training_in_progress = True
+                training_status(executor, job_id)
+
+        with st.sidebar.expander("📈 Черга навчання"):
+            job_metrics = executor.metrics()
+            st.markdown(f"""
+            - У черзі: **{job_metrics['queue_depth']}**
+            - Навчається: **{job_metrics['running']} / {job_metrics['max_workers']}**
+            - Завершено: {job_metrics['completed']} | Помилок: {job_metrics['failed']} | Скасовано: {job_metrics['cancelled']}
+            - Однакові задачі: {job_metrics['coalesced']} (зекономлено навчань: {job_metrics['fits_saved']}, чекають зараз: {job_metrics['coalescing']})
+            - Очікування: {job_metrics['wait_time_mean']:.1f} с (p95 {job_metrics['wait_time_p95']:.1f} с)
+            - Навчання: {job_metrics['run_time_mean']:.1f} с (p95 {job_metrics['run_time_p95']:.1f} с)
+            """)
 
-                        elif test_accuracy >= 0.70:
-                            st.warning(f"""
-                            ## 🤔 Можна краще!
+        # ✅ 5. ПОКАЗУЄМО РЕЗУЛЬТАТИ
+        training_result = st.session_state.get('training_result')
 
-                            **Твоя модель: {fit_type}**
-                            {fit_explanation}
+        # Сесію відновлено зі сховища: моделі в пам'яті немає, але є її метрики
+        training_summary = st.session_state.get('training_summary')
+        if (training_result is None and not training_in_progress and training_summary is not None
+                and training_summary.get('fingerprint') == choices_fingerprint(choices)):
+            st.info(f"♻️ Сесію відновлено. Твоя остання модель: Test Accuracy "
+                    f"{training_summary['test_accuracy'] * 100:.1f}%, F1-Score {training_summary['f1'] * 100:.1f}%. "
+                    "Натисни «🚀 Навчити модель!», щоб знову побачити всі результати.")
 
-                            **Результати:**
-                            - 🎯 Train Accuracy: {train_accuracy * 100:.1f}%
-                            - ⚠️ Test Accuracy: {test_accuracy * 100:.1f}%
-                            - 📊 Різниця: {difference * 100:.1f}%
-                            - 🎪 F1-Score: {f1 * 100:.1f}%
+        if training_result is not None and not training_in_progress:
+            try:
+                df_processed = st.session_state.training_data
+                is_new_result = st.session_state.pop('training_result_is_new', False)
+
+                missing_count = st.session_state.get('training_missing_count', 0)
+                if missing_count > 0:
+                    st.warning(f"⚠️ Знайдено {missing_count} пропущених значень. Їх видалено перед навчанням.")
+
+                st.success(f"✅ Дані валідовані! Готово {len(df_processed)} записів для навчання.")
+
+                X = df_processed.drop('Survived', axis=1)
+                y = df_processed['Survived']
+
+                st.info(f"📊 Ознаки для навчання: {list(X.columns)}")
+
+                X_train = X.iloc[training_result['train_positions']]
+                X_test = X.iloc[training_result['test_positions']]
+                y_train = y.iloc[training_result['train_positions']]
+                y_test = y.iloc[training_result['test_positions']]
+
+                st.info(f"🔀 Розділено на Train: {len(X_train)} записів, Test: {len(X_test)} записів")
+
+                model = training_result['model']
+                max_depth_val = choices.get('max_depth') or 5
+
+                forest_info = training_result['forest_info']
+                if forest_info is not None:
+                    n_trees_grown = forest_info['history'][-1][0]
+                    if forest_info['stopped_early']:
+                        st.success(f"⏹️ Точність ({forest_info['score_name']}) перестала рости - "
+                                   f"навчання зупинено на {n_trees_grown} деревах.")
+                    else:
+                        st.info(f"🌲 Навчено {n_trees_grown} дерев (на всіх ядрах).")
+
+                train_accuracy = training_result['train_accuracy']
+                test_accuracy = training_result['test_accuracy']
+                precision = training_result['precision']
+                recall = training_result['recall']
+                f1 = training_result['f1']
+
+                # K-fold: оцінка базується на середніх значеннях по всіх фолдах
+                cv_results = training_result['cv_results']
+                if cv_results is not None:
+                    cv_summary = cv_results['summary']
+                    train_accuracy = cv_summary['train_accuracy']['mean']
+                    test_accuracy = cv_summary['accuracy']['mean']
+                    precision = cv_summary['precision']['mean']
+                    recall = cv_summary['recall']['mean']
+                    f1 = cv_summary['f1']['mean']
+
+                # ✅ 7. ЗБЕРІГАЄМО МОДЕЛЬ
+                st.session_state['trained_model'] = model
+                st.session_state['X_train'] = X_train
+                st.session_state['X_test'] = X_test
+                st.session_state['y_train'] = y_train
+                st.session_state['y_test'] = y_test
+
+                st.success("✅ Модель успішно навчена!")
+
+                # ✅ 8. АНАЛІЗУЄМО ВИБОРИ (тільки для feedback, НЕ впливає на оцінку!)
+                feedback = []
+
+                # Перевірка ознак
+                selected_features = set(choices.get('features', []))
+                optimal_features = {'Pclass', 'Sex', 'Age', 'SibSp', 'Parch', 'Fare'}
+
+                if 'PassengerId' not in selected_features:
+                    feedback.append("✅ Не використовував PassengerId (добре!)")
+                else:
+                    feedback.append("⚠️ PassengerId не корисний для прогнозу")
 
-                            Модель працює, але є потенціал для покращення!
-                            """)
+                useful_selected = len(selected_features.intersection(optimal_features))
+                if useful_selected >= 5:
+                    feedback.append(f"✅ Обрав {useful_selected} з 6 найкорисніших ознак")
+                elif useful_selected >= 3:
+                    feedback.append(f"⚠️ Обрав {useful_selected} корисних ознак (можна більше)")
+                else:
+                    feedback.append(f"❌ Обрав мало корисних ознак: {useful_selected}")
+
+                # Перевірка обробки віку
+                if 'Age' in selected_features:
+                    if 'медіаною' in age_strategy:
+                        feedback.append("✅ Використав медіану для віку (оптимально)")
+                    elif 'середнім' in age_strategy:
+                        feedback.append("⚠️ Середнє працює, але медіана краще")
+                    elif 'Видалити' in age_strategy:
+                        feedback.append("⚠️ Видалення рядків втрачає багато даних")
+
+                # Перевірка кодування Sex
+                sex_encoding = encoding_choices.get('Sex', '')
+                if sex_encoding:
+                    if 'статистикою' in sex_encoding or 'Female=3' in sex_encoding:
+                        feedback.append("✅ Цікавий вибір кодування Sex (враховує статистику)")
+                    elif 'Протилежні' in sex_encoding:
+                        feedback.append("✅ Креативний вибір кодування Sex")
+
+                # Перевірка max_depth
+                difference = train_accuracy - test_accuracy
+
+                if algorithm not in TREE_ALGORITHMS:
+                    pass  # max_depth не використовується
+                elif 3 <= max_depth_val <= 7:
+                    feedback.append(f"✅ Оптимальний max_depth: {max_depth_val}")
+                elif max_depth_val <= 2:
+                    feedback.append(f"⚠️ max_depth={max_depth_val} може бути занадто малим")
+                else:
+                    feedback.append(f"⚠️ max_depth={max_depth_val} може призвести до overfitting")
+
+                # Аналіз РЕАЛЬНИХ результатів моделі
+                if difference > 0.15:
+                    feedback.append(
+                        f"⚠️ Велика різниця Train-Test ({difference * 100:.1f}%) - ознака overfitting")
+                elif difference < 0.05:
+                    feedback.append(f"✅ Мала різниця Train-Test ({difference * 100:.1f}%) - добрий баланс!")
+
+                if test_accuracy >= 0.80:
+                    feedback.append(f"🎉 Відмінна точність на тесті: {test_accuracy * 100:.1f}%!")
+                elif test_accuracy >= 0.75:
+                    feedback.append(f"✅ Хороша точність на тесті: {test_accuracy * 100:.1f}%")
+                elif test_accuracy < 0.65:
+                    feedback.append(f"⚠️ Низька точність на тесті: {test_accuracy * 100:.1f}%")
+
+                # ✅ 9. ПОКАЗУЄМО РЕЗУЛЬТАТИ (без змін)
+                st.markdown("---")
+                st.markdown("### 📊 Результати навчання")
+
+                col1, col2, col3, col4 = st.columns(4)
+
+                with col1:
+                    st.metric("Train Accuracy", f"{train_accuracy * 100:.1f}%")
+                    st.caption("Це точність моделі на тих даних, на яких вона навчалась.")
+                with col2:
+                    st.metric("Test Accuracy", f"{test_accuracy * 100:.1f}%")
+                    st.caption("Це точність моделі на нових даних, яких вона ніколи не бачила.")
+                with col3:
+                    difference = train_accuracy - test_accuracy
+                    delta_color = "inverse" if difference > 0.1 else "normal"
+                    st.metric("Різниця", f"{difference * 100:.1f}%",
+                              delta=f"{difference * 100:.1f}%", delta_color=delta_color)
+                    st.caption("""
+                    ### 🔍 Що означає різниця між Train і Test?
+                    - **0–5%** → 🟢 *Чудово!* Модель добре узагальнює і не перенавчена.  
+                    - **5–10%** → 🟡 *Нормально.* Є легке перенавчання, але модель працює стабільно.  
+                    - **10%+** → 🔴 *Проблема.* Модель перенавчена.
+                    """)
+                with col4:
+                    st.metric("F1-Score", f"{f1 * 100:.1f}%")
+                    st.caption("""
+                    ### 🎯 Що таке F1-Score?
+                    F1 — це збалансована оцінка точності моделі, яка враховує **і Precision, і Recall**.
+                    """)
+
+                # Детальні метрики
+                with st.expander("📈 Детальні метрики"):
+                    metric_col1, metric_col2, metric_col3 = st.columns(3)
+                    with metric_col1:
+                        st.metric("Precision", f"{precision * 100:.1f}%")
+                        st.caption("Наскільки точно модель передбачає *позитивні* приклади.")
+                    with metric_col2:
+                        st.metric("Recall", f"{recall * 100:.1f}%")
+                        st.caption("Яку частку *справжніх позитивів* модель знаходить.")
+                    with metric_col3:
+                        st.metric("Записів у Train", len(X_train))
+
+                    # Повна оцінка на тесті: AUC, матриця помилок, ROC-крива та довірчі інтервали
+                    test_evaluation = (training_result.get('evaluation') or {}).get('test')
+                    if test_evaluation is not None:
+                        confidence = int(test_evaluation['confidence'] * 100)
+                        metric_labels = {'accuracy': 'Test Accuracy', 'precision': 'Precision',
+                                         'recall': 'Recall', 'f1': 'F1-Score', 'auc': 'ROC AUC'}
+                        st.dataframe(pd.DataFrame([
+                            {
+                                'Метрика': label,
+                                'Значення (%)': f"{test_evaluation[metric] * 100:.1f}%",
+                                f'{confidence}% інтервал': (
+                                    f"{test_evaluation['ci'][metric][0] * 100:.1f}% - "
+                                    f"{test_evaluation['ci'][metric][1] * 100:.1f}%"
+                                    if metric in test_evaluation['ci'] else '—'
+                                )
+                            }
+                            for metric, label in metric_labels.items()
+                        ]), use_container_width=True, hide_index=True)
+                        st.caption(f"Інтервал показує, в яких межах, найімовірніше, була б метрика на інших "
+                                   f"{test_evaluation['n']} пасажирах (бутстреп).")
+
+                        roc_col, confusion_col = st.columns(2)
+                        with roc_col:
+                            fig_roc = go.Figure()
+                            fig_roc.add_trace(go.Scatter(x=test_evaluation['roc']['fpr'], y=test_evaluation['roc']['tpr'],
+                                                         mode='lines', name=f"AUC = {test_evaluation['auc']:.3f}"))
+                            fig_roc.add_trace(go.Scatter(x=[0, 1], y=[0, 1], mode='lines', name='Випадкове вгадування',
+                                                         line=dict(dash='dash', color='gray')))
+                            fig_roc.update_layout(title='ROC-крива', xaxis_title='Хибно «Вижив» (FPR)',
+                                                  yaxis_title='Знайдені «Вижив» (TPR)', height=350,
+                                                  margin=dict(l=10, r=10, t=40, b=10))
+                            st.plotly_chart(fig_roc, use_container_width=True)
+                        with confusion_col:
+                            confusion = test_evaluation['confusion']
+                            st.markdown("**Матриця помилок (тест):**")
+                            st.dataframe(pd.DataFrame(
+                                [[confusion['tn'], confusion['fp']], [confusion['fn'], confusion['tp']]],
+                                index=['Насправді загинув', 'Насправді вижив'],
+                                columns=['Передбачено «Загинув»', 'Передбачено «Вижив»']
+                            ), use_container_width=True)
+
+                # Результати крос-валідації: середнє та розкид
+                if cv_results is not None:
+                    st.markdown(f"#### 🔁 Крос-валідація ({cv_results['n_splits']} фолдів × "
+                                f"{cv_results['n_repeats']} повторень)")
+                    metric_labels = {
+                        'train_accuracy': 'Train Accuracy',
+                        'accuracy': 'Test Accuracy',
+                        'precision': 'Precision',
+                        'recall': 'Recall',
+                        'f1': 'F1-Score'
+                    }
+                    cv_df = pd.DataFrame([
+                        {
+                            'Метрика': label,
+                            'Середнє (%)': f"{cv_summary[metric]['mean'] * 100:.1f}%",
+                            'Розкид ± (%)': f"{cv_summary[metric]['std'] * 100:.1f}%",
+                            'Мін - Макс (%)': f"{cv_summary[metric]['min'] * 100:.1f}% - "
+                                              f"{cv_summary[metric]['max'] * 100:.1f}%"
+                        }
+                        for metric, label in metric_labels.items()
+                    ])
+                    st.dataframe(cv_df, use_container_width=True, hide_index=True)
+                    st.caption("Оцінка нижче базується на середніх значеннях по всіх фолдах.")
+
+                # Експорт моделі разом зі схемою ознак (файл збирається один раз для результату навчання)
+                schema = training_result.get('schema')
+                if schema is not None:
+                    with st.expander("📦 Експорт моделі"):
+                        st.markdown("Модель зберігається разом зі **схемою ознак**: порядок колонок, кодування "
+                                    "з кроку 3 та значення для пропусків. Тому її можна застосувати до нових "
+                                    "пасажирів у вихідному вигляді (як у CSV), без повторення кроків гри.")
+                        encoding_labels = {'number': 'Число', 'map': 'Словник значень', 'title': 'Титул з імені',
+                                           'length': 'Довжина тексту', 'ticket_class': 'Тип квитка',
+                                           'not_missing': 'Є значення', 'first_letter': 'Палуба (перша літера)'}
+                        st.dataframe(pd.DataFrame([
+                            {'Ознака': feature['name'], 'Тип': feature['dtype'],
+                             'Кодування': encoding_labels.get(feature['encoding']['kind'], feature['encoding']['kind']),
+                             'Замість пропуску': feature['fill']}
+                            for feature in schema['features']
+                        ]), use_container_width=True, hide_index=True)
+
+                        # Перевірка: схема з вихідних даних відтворює тестові ознаки
+                        vectorizer = get_vectorizer(schema)
+                        started = time.perf_counter()
+                        X_schema = vectorizer.transform(df.loc[X_test.index])
+                        elapsed = time.perf_counter() - started
+                        mismatches = int((X_schema != X_test.to_numpy(dtype=np.float64)).any(axis=1).sum())
+                        if mismatches == 0:
+                            st.success(f"✅ Схема відтворює всі {len(X_test)} тестових рядків з вихідних даних "
+                                       f"({elapsed * 1000:.1f} мс).")
                         else:
-                            st.error(f"""
-                            ## 😔 Потрібно покращити
-
-                            **Твоя модель: {fit_type}**
-                            {fit_explanation}
-
-                            **Результати:**
-                            - 🎯 Train Accuracy: {train_accuracy * 100:.1f}%
-                            - ❌ Test Accuracy: {test_accuracy * 100:.1f}%
-                            - 📊 Різниця: {difference * 100:.1f}%
-                            - 🎪 F1-Score: {f1 * 100:.1f}%
-
-                            Спробуй інші параметри! 💪
-                            """)
-
-                        # ✅ 11. ВІЗУАЛІЗАЦІЯ РЕЗУЛЬТАТІВ (без змін)
-                        # ... весь код візуалізації залишається
-
-                        # ✅ 12. ДЕТАЛЬНИЙ АНАЛІЗ (без змін)
-                        st.markdown("---")
-                        st.markdown("### 🔍 Детальний аналіз твоїх виборів")
-
-                        for item in feedback:
-                            if '✅' in item:
-                                st.success(item)
-                            elif '⚠️' in item:
-                                st.warning(item)
-                            elif '❌' in item:
-                                st.error(item)
-                            elif '🎉' in item:
-                                st.info(item)
-
-                        # Рекомендації БАЗУЮТЬСЯ НА РЕАЛЬНИХ МЕТРИКАХ
-                        if test_accuracy < 0.80 or difference > 0.10:
-                            st.markdown("---")
-                            st.markdown("### 💡 Рекомендації для покращення:")
-
-                            if difference > 0.15:
-                                st.info("📌 Overfitting: Зменши max_depth або додай більше даних")
-                            if test_accuracy < 0.65:
-                                st.info("📌 Underfitting: Збільш max_depth або додай корисні ознаки")
-                            if 'PassengerId' in selected_features:
-                                st.info("📌 Видали PassengerId - він не допомагає прогнозу")
-                            if useful_selected < 4:
-                                st.info("📌 Додай більше корисних ознак: Pclass, Sex, Age, SibSp, Parch, Fare")
-                    except Exception as e:
-                        st.error(f"❌ Помилка: {e}")
-
-
-
-            # Кнопки дій
-            st.markdown("---")
-            col_btn1, col_btn2 = st.columns(2)
-            with col_btn1:
-                if st.button("🔄 Спробувати ще раз", use_container_width=True):
-                    st.session_state.game_step = 0
-                    st.session_state.game_choices = {}
-                    st.rerun()
-            with col_btn2:
-                if st.button("📚 Повернутись до навчання", type="secondary", use_container_width=True):
-                    st.session_state.clear()
-                    st.rerun()
+                            st.warning(f"⚠️ Схема не відтворює {mismatches} з {len(X_test)} тестових рядків.")
+
+                        if 'export' not in training_result:
+                            training_result['export'] = bundle_bytes(model, schema)
+                        st.download_button("💾 Завантажити модель", data=training_result['export'],
+                                           file_name="titanic_game_model.pkl", mime="application/octet-stream",
+                                           key="export_model")
+                        st.code("from schema import load_bundle, predict_bundle\n\n"
+                                "bundle = load_bundle('titanic_game_model.pkl')\n"
+                                "probabilities = predict_bundle(bundle, passengers)  # DataFrame, dict або Arrow",
+                                language='python')
+
+                # Permutation importance на тестових даних (кешується за відбитком моделі)
+                with st.expander("🔀 Які ознаки найважливіші для твоєї моделі?"):
+                    if 'model_fingerprint' not in training_result:
+                        training_result['model_fingerprint'] = model_fingerprint(model)
+                    importances = permutation_importance(
+                        model, X_test, y_test, fingerprint=training_result['model_fingerprint']
+                    )
+                    importance_df = pd.DataFrame([
+                        {
+                            'Ознака': name,
+                            'Падіння точності (%)': values['mean'] * 100,
+                            'Розкид (%)': values['std'] * 100
+                        }
+                        for name, values in importances.items()
+                    ])
+                    fig_importance = px.bar(
+                        importance_df, x='Падіння точності (%)', y='Ознака',
+                        orientation='h', error_x='Розкид (%)'
+                    )
+                    fig_importance.update_layout(
+                        yaxis={'categoryorder': 'total ascending'},
+                        height=120 + 40 * len(importance_df),
+                        margin=dict(l=10, r=10, t=10, b=10)
+                    )
+                    st.plotly_chart(fig_importance, use_container_width=True)
+                    st.caption("Наскільки падає точність на тестових даних, якщо перемішати значення "
+                               "однієї ознаки. Чим більше падіння - тим важливіша ознака. "
+                               "Близько до нуля (або менше) - модель майже не використовує цю ознаку.")
+
+                # ✅ 10. ОЦІНКА НА ОСНОВІ РЕАЛЬНИХ МЕТРИК (ЗМІНЕНО!)
+                st.markdown("---")
+                st.markdown("### 🎯 Оцінка твоєї моделі")
+
+                # Визначаємо тип fit на основі РЕАЛЬНИХ метрик
+                if difference > 0.15:
+                    fit_type = "Overfitting 🔴"
+                    fit_explanation = f"Модель занадто добре запам'ятала тренувальні дані (різниця {difference * 100:.1f}%)"
+                elif test_accuracy < 0.70:
+                    fit_type = "Underfitting 🔵"
+                    fit_explanation = f"Модель занадто проста і не вловлює закономірності (точність {test_accuracy * 100:.1f}%)"
+                else:
+                    fit_type = "Good Fit 🟢"
+                    fit_explanation = f"Модель добре узагальнює дані! (різниця {difference * 100:.1f}%)"
+
+                # ОЦІНКА БАЗУЄТЬСЯ ТІЛЬКИ НА РЕАЛЬНИХ МЕТРИКАХ
+                if test_accuracy >= 0.80 and difference < 0.10:
+                    st.success(f"""
+                    ## 🏆 Відмінно!
+
+                    **Твоя модель: {fit_type}**
+                    {fit_explanation}
+
+                    **Результати:**
+                    - 🎯 Train Accuracy: {train_accuracy * 100:.1f}%
+                    - ✅ Test Accuracy: {test_accuracy * 100:.1f}%
+                    - 📊 Різниця: {difference * 100:.1f}%
+                    - 🎪 F1-Score: {f1 * 100:.1f}%
+
+                    **Ти справжній Data Scientist!** 🎉
+                    """)
+                    if is_new_result:
+                        st.balloons()
+
+                elif test_accuracy >= 0.75 and difference < 0.15:
+                    st.info(f"""
+                    ## 👍 Добре!
+
+                    **Твоя модель: {fit_type}**
+                    {fit_explanation}
+
+                    **Результати:**
+                    - 🎯 Train Accuracy: {train_accuracy * 100:.1f}%
+                    - ✅ Test Accuracy: {test_accuracy * 100:.1f}%
+                    - 📊 Різниця: {difference * 100:.1f}%
+                    - 🎪 F1-Score: {f1 * 100:.1f}%
+
+                    Непогана модель! Є простір для покращення.
+                    """)
+
+                elif test_accuracy >= 0.70:
+                    st.warning(f"""
+                    ## 🤔 Можна краще!
+
+                    **Твоя модель: {fit_type}**
+                    {fit_explanation}
+
+                    **Результати:**
+                    - 🎯 Train Accuracy: {train_accuracy * 100:.1f}%
+                    - ⚠️ Test Accuracy: {test_accuracy * 100:.1f}%
+                    - 📊 Різниця: {difference * 100:.1f}%
+                    - 🎪 F1-Score: {f1 * 100:.1f}%
+
+                    Модель працює, але є потенціал для покращення!
+                    """)
+                else:
+                    st.error(f"""
+                    ## 😔 Потрібно покращити
+
+                    **Твоя модель: {fit_type}**
+                    {fit_explanation}
+
+                    **Результати:**
+                    - 🎯 Train Accuracy: {train_accuracy * 100:.1f}%
+                    - ❌ Test Accuracy: {test_accuracy * 100:.1f}%
+                    - 📊 Різниця: {difference * 100:.1f}%
+                    - 🎪 F1-Score: {f1 * 100:.1f}%
+
+                    Спробуй інші параметри! 💪
+                    """)
+
+                # ✅ 11. ВІЗУАЛІЗАЦІЯ РЕЗУЛЬТАТІВ (без змін)
+                # ... весь код візуалізації залишається
+
+                # ✅ 11.1. ТАБЛИЦЯ ЛІДЕРІВ
+                leaderboard = get_leaderboard()
+                fingerprint = choices_fingerprint(choices)
+
+                if is_new_result:
+                    leaderboard.record(
+                        fingerprint,
+                        canonical_choices(choices),
+                        train_accuracy,
+                        test_accuracy,
+                        f1,
+                        fit_time=training_result['fit_time'],
+                        total_time=training_result['total_time'],
+                        session_id=st.session_state.session_id
+                    )
 
+                st.markdown("---")
+                st.markdown("### 🏆 Таблиця лідерів")
+
+                overall = leaderboard.percentile(test_accuracy)
+                same_choices = leaderboard.percentile(test_accuracy, fingerprint=fingerprint)
+
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.metric("Краще ніж", f"{overall['percentile']:.0f}% спроб",
+                              help=f"Порівняно з усіма {overall['total']} збереженими спробами")
+                with col2:
+                    st.metric("Спроб з такими ж виборами", same_choices['total'])
+
+                top_runs = leaderboard.top(10)
+                if top_runs:
+                    st.markdown("**🥇 Топ-10 моделей:**")
+                    top_df = pd.DataFrame([
+                        {
+                            'Місце': place,
+                            'Алгоритм': run['algorithm'],
+                            'Ознаки': run['features'],
+                            'Max Depth': run['max_depth'] or '-',
+                            'Test Accuracy (%)': f"{run['test_accuracy'] * 100:.1f}%",
+                            'F1-Score (%)': f"{run['f1'] * 100:.1f}%"
+                        }
+                        for place, run in enumerate(top_runs, start=1)
+                    ])
+                    st.dataframe(top_df, use_container_width=True, hide_index=True)
+
+                with st.expander("📊 Як впливають вибори (середнє по всіх спробах)"):
+                    for dimension, label in LEADERBOARD_DIMENSIONS.items():
+                        aggregates = leaderboard.choice_aggregates(dimension)
+                        if not aggregates:
+                            continue
+                        st.markdown(f"**{label}**")
+                        st.dataframe(pd.DataFrame([
+                            {
+                                label: row['value'],
+                                'Спроб': row['runs'],
+                                'Середня Test Accuracy (%)': f"{row['mean_test_accuracy'] * 100:.1f}%",
+                                'Найкраща (%)': f"{row['best_test_accuracy'] * 100:.1f}%"
+                            }
+                            for row in aggregates
+                        ]), use_container_width=True, hide_index=True)
 
+                # ✅ 12. ДЕТАЛЬНИЙ АНАЛІЗ (без змін)
+                st.markdown("---")
+                st.markdown("### 🔍 Детальний аналіз твоїх виборів")
+
+                for item in feedback:
+                    if '✅' in item:
+                        st.success(item)
+                    elif '⚠️' in item:
+                        st.warning(item)
+                    elif '❌' in item:
+                        st.error(item)
+                    elif '🎉' in item:
+                        st.info(item)
+
+                # Рекомендації БАЗУЮТЬСЯ НА РЕАЛЬНИХ МЕТРИКАХ
+                if test_accuracy < 0.80 or difference > 0.10:
+                    st.markdown("---")
+                    st.markdown("### 💡 Рекомендації для покращення:")
+
+                    if difference > 0.15:
+                        st.info("📌 Overfitting: Зменши max_depth або додай більше даних")
+                    if test_accuracy < 0.65:
+                        st.info("📌 Underfitting: Збільш max_depth або додай корисні ознаки")
+                    if 'PassengerId' in selected_features:
+                        st.info("📌 Видали PassengerId - він не допомагає прогнозу")
+                    if useful_selected < 4:
+                        st.info("📌 Додай більше корисних ознак: Pclass, Sex, Age, SibSp, Parch, Fare")
+
+                # ✅ 13. ТОЧНІСТЬ ЗА ГРУПАМИ ПАСАЖИРІВ (зрізи рахуються один раз для результату навчання)
+                slice_segments = [segment for segment in SEGMENTS
+                                  if (segment if segment != AGE_BAND else 'Age') in df.columns]
+                if slice_segments:
+                    st.markdown("---")
+                    st.markdown("### 🧩 Точність за групами пасажирів")
+                    if 'slices' not in training_result:
+                        training_result['slices'] = sliced_metrics(
+                            df.loc[X_test.index], y_test, positive_scores(model, X_test), segments=slice_segments
+                        )
+                    slices = training_result['slices']
+                    st.caption("Метрики на тесті окремо для кожної групи та пари груп. Якщо модель добре працює "
+                               "«в середньому», вона все одно може помилятися для окремих пасажирів - наприклад, "
+                               "для чоловіків 1 класу. Калібрування - різниця між середньою ймовірністю моделі "
+                               "та справжньою часткою тих, хто вижив.")
+
+                    slice_labels = {'slice': 'Зріз', 'segment': 'Група', 'n': 'Пасажирів', 'accuracy': 'Точність (%)',
+                                    'accuracy_gap': 'Різниця з усіма (%)', 'survival_rate': 'Вижили (%)',
+                                    'mean_score': 'Середня ймовірність (%)',
+                                    'calibration_gap': 'Калібрування (%)', 'f1': 'F1 (%)'}
+
+                    def format_slices(table, with_slice=False):
+                        columns = [column for column in slice_labels if with_slice or column != 'slice']
+                        table = table[columns].copy()
+                        percent_columns = [column for column in columns if column not in ('slice', 'segment', 'n')]
+                        table[percent_columns] = (table[percent_columns] * 100).round(1)
+                        return table.rename(columns=slice_labels)
+
+                    worst = worst_slices(slices, limit=5)
+                    if len(worst):
+                        st.markdown(f"**Де модель працює найгірше (групи від {MIN_SLICE_ROWS} пасажирів):**")
+                        st.dataframe(format_slices(worst, with_slice=True), use_container_width=True, hide_index=True)
+
+                    slice_names = [name for name in slices['slice'].unique() if name != 'Усі']
+                    selected_slice = st.selectbox("Показати зріз:", slice_names, key="slice_view")
+                    st.dataframe(format_slices(slices[slices['slice'] == selected_slice]),
+                                 use_container_width=True, hide_index=True)
+
+                # ✅ 14. АНАЛІЗ ПОМИЛОК
+                st.markdown("---")
+                st.markdown("### 🧐 Аналіз помилок")
+
+                # Аналіз рахується один раз для результату навчання
+                if 'error_analysis' not in training_result:
+                    training_result['error_analysis'] = analyze_errors(model, X_test, y_test)
+                analysis = training_result['error_analysis']
+
+                err_col1, err_col2, err_col3 = st.columns(3)
+                with err_col1:
+                    st.metric("Помилок на тесті", f"{analysis['n_errors']} з {analysis['n_rows']}")
+                with err_col2:
+                    st.metric("Хибно «Вижив»", analysis['false_positives'])
+                    st.caption("Модель сказала «вижив», а пасажир загинув.")
+                with err_col3:
+                    st.metric("Хибно «Загинув»", analysis['false_negatives'])
+                    st.caption("Модель сказала «загинув», а пасажир вижив.")
+
+                if analysis['n_errors'] > 0:
+                    groups_df = analysis['groups']
+                    group_column = 'Правило' if analysis['has_rules'] else 'Група'
+
+                    st.markdown("#### 🌿 Де модель помиляється найчастіше")
+                    if analysis['has_rules']:
+                        st.caption("Кожен рядок - це лист дерева: правило, за яким модель відбирає пасажирів, "
+                                   "і скільки з них вона передбачила неправильно.")
+                    else:
+                        st.caption("Ця модель не має простих правил, тому помилки згруповано "
+                                   "за передбаченням та впевненістю моделі.")
+                    st.dataframe(groups_df.drop(columns='group').head(10),
+                                 use_container_width=True, hide_index=True)
+
+                    st.markdown("#### 📋 Неправильно передбачені пасажири")
+                    filter_col, size_col, page_col = st.columns([3, 1, 1])
+                    with filter_col:
+                        group_labels = dict(zip(groups_df['group'], groups_df[group_column]))
+                        selected_group = st.selectbox(
+                            f"{group_column}:",
+                            [None] + list(group_labels),
+                            format_func=lambda g: "Усі помилки" if g is None else group_labels[g],
+                            key="error_group"
+                        )
+                    with size_col:
+                        page_size = st.selectbox("Рядків на сторінці:", [10, 25, 50, 100], key="error_page_size")
+                    with page_col:
+                        page = st.number_input("Сторінка:", min_value=1, value=1, step=1, key="error_page")
+
+                    page_df, n_filtered, n_pages = error_page(
+                        analysis, X_test, y_test, page, page_size, group=selected_group
+                    )
+                    st.dataframe(page_df, use_container_width=True, hide_index=True)
+                    st.caption(f"Сторінка {min(page, n_pages)} з {n_pages} • Всього помилок: {n_filtered}")
+            except Exception as e:
+                st.error(f"❌ Помилка: {e}")
 
 
 
+        # Кнопки дій
+        st.markdown("---")
+        col_btn1, col_btn2, col_btn3 = st.columns(3)
+        with col_btn1:
+            if st.button("⬅️ Назад", use_container_width=True, key="back_6"):
+                # Скасовуємо навчання - вибори на кроці 5 можуть змінитись
+                if st.session_state.get('training_job_id'):
+                    executor.cancel(st.session_state.pop('training_job_id'))
+                st.session_state.pop('training_result', None)
+                st.session_state.game_step = 5
+                st.rerun()
+        with col_btn2:
+            if st.button("🔄 Спробувати ще раз", use_container_width=True):
+                if st.session_state.get('training_job_id'):
+                    executor.cancel(st.session_state.pop('training_job_id'))
+                st.session_state.pop('training_result', None)
+                st.session_state.game_step = 0
+                st.session_state.game_choices = {}
+                st.rerun()
+        with col_btn3:
+            if st.button("📚 Повернутись до навчання", type="secondary", use_container_width=True):
+                if st.session_state.get('training_job_id'):
+                    executor.cancel(st.session_state.pop('training_job_id'))
+                # Інакше збережений знімок (?session=...) відновив би гру після перезапуску
+                session_id = st.session_state.session_id
+                get_session_store().delete(session_id)
+                get_state_manager().forget(session_id)
+                del st.query_params['session']
+                st.session_state.clear()
+                st.rerun()
 
+        # Стан навчання оновлює фрагмент training_status; знімок сесії зберігаємо один раз
+        if training_in_progress:
+            persist_session()
 
     # Підвал
     st.markdown("---")
@@ -1493,4 +2158,14 @@ else:
         </div>
         """,
         unsafe_allow_html=True
-    )
\ No newline at end of file
+    )
+
+# Зберігаємо стан сесії (тільки якщо він змінився)
+persist_session()
+
+# Діагностика пам'яті (тільки якщо увімкнено)
+if memory_debug.MEMORY_DEBUG:
+    memory_debug_panel()
+
+# Віддаємо важкі об'єкти менеджеру (він витісняє їх, якщо бюджет пам'яті перевищено)
+get_state_manager().release(st.session_state.session_id, st.session_state)
@@ -0,0 +1,95 @@
+"""
+Модуль зі спільними артефактами (датасет та моделі) для кількох реплік додатку.
+Датасет один раз зберігається у файл Arrow, а кожен процес відкриває його
+через memory map: числові колонки читаються прямо зі сторінок файлу, тому
+N реплік на одному сервері тримають у пам'яті одну копію даних (кеш ОС).
+Моделі зберігаються через joblib і завантажуються з mmap_mode='r'.
+"""
+
+import os
+import uuid
+import pickle
+
+import joblib
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+DATASET_URL = "https://raw.githubusercontent.com/datasciencedojo/datasets/master/titanic.csv"
+
+# Папка зі спільними артефактами (однакова для всіх реплік)
+ARTIFACTS_DIR = os.environ.get('TITANIC_ARTIFACTS_DIR',
+                               os.path.join(os.path.dirname(__file__), 'results', 'artifacts'))
+DATASET_PATH = os.path.join(ARTIFACTS_DIR, 'titanic.arrow')
+
+# Глобальні кеші (один на процес)
+_dataset = None
+_models = {}
+
+
+def _atomic_path(path):
+    """Тимчасовий файл поруч з path: після запису його перейменовують одним os.replace."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    return f"{path}.{uuid.uuid4().hex}.tmp"
+
+
+def publish_dataset(df, path=DATASET_PATH):
+    """
+    Зберігає датасет у файл Arrow без стиснення (щоб його можна було відобразити в пам'ять).
+    Запис атомарний: репліки, що читають файл одночасно, бачать або старий, або новий файл.
+
+    Args:
+        df: DataFrame
+        path: Шлях до файлу
+    """
+    tmp_path = _atomic_path(path)
+    feather.write_feather(df, tmp_path, compression='uncompressed')
+    os.replace(tmp_path, path)
+
+
+def load_dataset(url=DATASET_URL, path=DATASET_PATH):
+    """
+    Повертає спільний датасет (з кешу процесу або з файлу Arrow через memory map).
+    Якщо файлу ще немає, перша репліка завантажує CSV та публікує його.
+
+    Returns:
+        DataFrame: Датасет (числові колонки - лише для читання, спільні між процесами)
+    """
+    global _dataset
+
+    if _dataset is None:
+        if not os.path.exists(path):
+            publish_dataset(pd.read_csv(url), path)
+        table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+        # split_blocks: кожна колонка - окремий блок, числові колонки без пропусків не копіюються
+        _dataset = table.to_pandas(split_blocks=True)
+    return _dataset
+
+
+def load_model_artifact(pickle_path):
+    """
+    Завантажує модель, збережену через pickle, як спільний артефакт.
+    У папці артефактів створюється копія у форматі joblib, масиви numpy якої
+    відображаються в пам'ять (mmap_mode='r'), тому всі репліки читають їх з одних
+    і тих самих сторінок (дерева sklearn копіюють свої вузли під час завантаження).
+
+    Args:
+        pickle_path: Шлях до файлу .pkl з моделлю
+
+    Returns:
+        object: Модель
+    """
+    if pickle_path in _models:
+        return _models[pickle_path]
+
+    joblib_path = os.path.join(ARTIFACTS_DIR, os.path.basename(pickle_path) + '.joblib')
+    if (not os.path.exists(joblib_path)
+            or os.path.getmtime(joblib_path) < os.path.getmtime(pickle_path)):
+        with open(pickle_path, 'rb') as f:
+            model = pickle.load(f)
+        tmp_path = _atomic_path(joblib_path)
+        joblib.dump(model, tmp_path)
+        os.replace(tmp_path, joblib_path)
+
+    _models[pickle_path] = joblib.load(joblib_path, mmap_mode='r')
+    return _models[pickle_path]
@@ -0,0 +1,455 @@
+"""
+Модуль з журналом аудиту передбачень.
+Кожне передбачення (вхідні дані, результат та версія моделі) записується
+у колонкові файли Arrow (потоковий формат IPC зі стисненням zstd). Запис
+виконується асинхронно у фоновому потоці: передбачення лише записує значення
+в наступний рядок заздалегідь виділеного блоку колонок (однакова невелика
+ціна для кожного передбачення), а повний блок фоновий потік перетворює на
+пакет Arrow без проходу по рядках і дописує у файл. Тому фонова робота
+трапляється рідко (раз на BLOCK_ROWS записів або FLUSH_INTERVAL секунд) і
+не збільшує хвіст затримки передбачень.
+
+Файли ротуються за розміром та часом:
+    results/audit/predictions-<час створення>-<pid>-<номер>.arrows
+Кожен процес (репліка) пише у свої файли. Записані пакети можна читати
+(read_audit_log), поки файл ще пишеться або якщо останній пакет обірвано.
+
+Помилки запису (диск, права) записуються в лог (logging) і не втрачають
+записи: пакет повторюється у новому файлі до MAX_WRITE_ATTEMPTS разів.
+"""
+
+import os
+import glob
+import time
+import atexit
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+AUDIT_DIR = os.environ.get('TITANIC_AUDIT_DIR',
+                           os.path.join(os.path.dirname(__file__), 'results', 'audit'))
+
+# Чи записувати передбачення (TITANIC_AUDIT_LOG=0 вимикає журнал)
+AUDIT_ENABLED = os.environ.get('TITANIC_AUDIT_LOG', '1') != '0'
+
+# Що робити, якщо всі блоки заповнені: 'block' - чекати місця, 'drop' - відкинути запис
+OVERFLOW = os.environ.get('TITANIC_AUDIT_OVERFLOW', 'block')
+OVERFLOW_POLICIES = ('block', 'drop')
+
+# Записи накопичуються в блоках по BLOCK_ROWS рядків; фоновий потік пише повний блок
+# одразу, а неповний - раз на FLUSH_INTERVAL секунд. Одночасно існує не більше
+# MAX_PENDING // BLOCK_ROWS блоків (обмеження пам'яті черги)
+BLOCK_ROWS = 1024
+FLUSH_INTERVAL = 1.0
+MAX_PENDING = 100000
+
+# Скільки разів (раз на FLUSH_INTERVAL, кожного разу в новому файлі) пробувати записати пакет,
+# перш ніж відкинути його з помилкою в лозі
+MAX_WRITE_ATTEMPTS = 5
+
+# Ротація: новий файл, якщо поточний більший за MAX_FILE_BYTES або старший за ROTATE_INTERVAL
+MAX_FILE_BYTES = 64 * 1024 * 1024
+ROTATE_INTERVAL = 3600
+
+# Аргументи model.predict_survival (в порядку виклику) та ознаки моделі
+INPUT_KEYS = ['pclass', 'sex', 'age', 'sibsp', 'parch', 'fare']
+FEATURE_NAMES = ['Pclass', 'Sex', 'Age', 'SibSp', 'Parch', 'Fare']
+
+SCHEMA = pa.schema(
+    [('ts', pa.float64()), ('model_version', pa.string())]
+    + [(f'input_{key}', pa.string() if key == 'sex' else pa.float64()) for key in INPUT_KEYS]
+    + [(name, pa.float64()) for name in FEATURE_NAMES]
+    + [('survived', pa.bool_()), ('probability', pa.float64())]
+)
+
+# Глобальний журнал (один на процес)
+_audit_log = None
+
+
+class RecordBlock:
+    """
+    Заздалегідь виділені колонки для BLOCK_ROWS записів.
+
+    Args:
+        capacity: Кількість рядків
+    """
+
+    def __init__(self, capacity=BLOCK_ROWS):
+        self.capacity = capacity
+        self.created_at = np.empty(capacity, dtype=np.float64)
+        self.model_versions = np.empty(capacity, dtype=object)
+        self.inputs = np.empty((capacity, len(INPUT_KEYS)), dtype=object)
+        self.features = np.empty((capacity, len(FEATURE_NAMES)), dtype=np.float64)
+        self.survived = np.empty(capacity, dtype=bool)
+        self.probabilities = np.empty(capacity, dtype=np.float64)
+        self.size = 0
+
+    def append(self, created_at, inputs, features, survived, probability, model_version):
+        i = self.size
+        self.created_at[i] = created_at
+        self.model_versions[i] = model_version
+        self.inputs[i] = inputs
+        self.features[i] = features
+        self.survived[i] = survived
+        self.probabilities[i] = probability
+        self.size = i + 1
+
+    @property
+    def full(self):
+        return self.size == self.capacity
+
+
+def block_to_arrow(block):
+    """
+    Перетворює заповнену частину блоку на колонковий RecordBatch.
+    Значення копіюються, тому блок можна одразу використати повторно.
+
+    Args:
+        block: RecordBlock
+
+    Returns:
+        pyarrow.RecordBatch: Пакет зі схемою SCHEMA
+    """
+    n = block.size
+    arrays = [pa.array(block.created_at[:n].copy()), pa.array(block.model_versions[:n], pa.string())]
+    for i, key in enumerate(INPUT_KEYS):
+        values = block.inputs[:n, i]
+        if key == 'sex':
+            arrays.append(pa.array([None if value is None else str(value) for value in values], pa.string()))
+            continue
+        try:
+            # None -> NaN; повільніший шлях - тільки якщо серед аргументів є текст
+            values = values.astype(np.float64)
+        except (TypeError, ValueError):
+            values = pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').to_numpy(np.float64)
+        arrays.append(pa.array(values))
+    arrays += [pa.array(block.features[:n, i].copy()) for i in range(len(FEATURE_NAMES))]
+    arrays.append(pa.array(block.survived[:n].copy()))
+    arrays.append(pa.array(block.probabilities[:n].copy()))
+    return pa.RecordBatch.from_arrays(arrays, schema=SCHEMA)
+
+
+class AuditLog:
+    """
+    Журнал аудиту з асинхронним записом блоками та ротацією файлів.
+
+    record() записує значення в поточний блок (під коротким замком). Повний
+    блок передається фоновому потоку, а передбачення продовжують писати в
+    наступний вільний блок. Фоновий потік прокидається, коли є повний блок
+    (або раз на FLUSH_INTERVAL секунд - тоді забирає й неповний), та дописує
+    блоки у поточний файл пакетами Arrow. close() дописує всі записи та
+    закриває файл.
+
+    Args:
+        directory: Папка для файлів журналу
+        overflow: 'block' або 'drop' (див. OVERFLOW)
+        max_pending: Скільки записів можуть одночасно чекати на запис
+        max_file_bytes: Розмір файлу (стиснутого), після якого починається новий
+        rotate_interval: Вік файлу (в секундах), після якого починається новий
+        block_rows: Кількість рядків в одному блоці
+    """
+
+    def __init__(self, directory=AUDIT_DIR, overflow=OVERFLOW, max_pending=MAX_PENDING,
+                 max_file_bytes=MAX_FILE_BYTES, rotate_interval=ROTATE_INTERVAL, block_rows=BLOCK_ROWS):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Невідома поведінка при переповненні: {overflow}")
+
+        self.directory = directory
+        self.overflow = overflow
+        self.max_file_bytes = max_file_bytes
+        self.rotate_interval = rotate_interval
+        self.block_rows = block_rows
+        self.max_blocks = max(2, max_pending // block_rows)
+        self._lock = threading.Lock()
+        self._space = threading.Condition(self._lock)  # блок повернувся у вільні
+        self._settled = threading.Condition(self._lock)  # записи записано або відкинуто
+        self._current = RecordBlock(block_rows)
+        self._ready = []  # блоки, які чекають на запис
+        self._free = []
+        self._n_blocks = 1
+        self._writer = None
+        self._wake = threading.Event()
+        self._file = None
+        self._stream = None
+        self._opened_at = 0.0
+        self._file_number = 0
+        self._closed = False
+        self._failed = []  # (RecordBatch, кількість спроб) - пакети, які потрібно записати повторно
+        self._settled_count = 0  # прийняті записи, які вже записано або відкинуто
+        self._flush_target = 0
+        self.path = None
+        self.accepted = 0
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+        self.last_error = None
+
+    def _ensure_writer(self):
+        if self._writer is None or not self._writer.is_alive():
+            self._writer = threading.Thread(target=self._write_loop, name='audit-writer', daemon=True)
+            self._writer.start()
+
+    def _next_block(self):
+        """Новий поточний блок (з вільних або виділений), None - якщо досягнуто max_blocks."""
+        if self._free:
+            return self._free.pop()
+        if self._n_blocks < self.max_blocks:
+            self._n_blocks += 1
+            return RecordBlock(self.block_rows)
+        return None
+
+    def record(self, inputs, features, survived, probability, model_version):
+        """
+        Додає передбачення в чергу на запис.
+
+        Args:
+            inputs: Аргументи predict_survival (в порядку INPUT_KEYS)
+            features: Підготовлений вектор ознак моделі (в порядку FEATURE_NAMES)
+            survived: Передбачений клас
+            probability: Ймовірність виживання
+            model_version: Версія моделі (model.get_model_version)
+
+        Returns:
+            bool: True, якщо запис прийнято
+        """
+        created_at = time.time()
+        with self._lock:
+            if self._closed:
+                self.dropped += 1
+                return False
+            self._ensure_writer()
+
+            while self._current.full:
+                if self._closed:
+                    self.dropped += 1
+                    return False
+                block = self._next_block()
+                if block is not None:
+                    self._ready.append(self._current)
+                    self._current = block
+                    self._wake.set()
+                elif self.overflow == 'block':
+                    self._wake.set()
+                    self._space.wait()
+                else:
+                    self.dropped += 1
+                    return False
+
+            self._current.append(created_at, inputs, features, survived, probability, model_version)
+            self.accepted += 1
+            if self._current.full:
+                self._wake.set()
+        return True
+
+    def _take_blocks(self, partial):
+        """Забирає блоки, які чекають на запис (partial - разом з неповним поточним)."""
+        with self._lock:
+            if (partial or self._current.full) and self._current.size:
+                # Під час закриття нових записів не буде - зайвий блок не знадобиться
+                block = self._next_block() or (RecordBlock(self.block_rows) if self._closed else None)
+                if block is not None:
+                    self._ready.append(self._current)
+                    self._current = block
+            blocks, self._ready = self._ready, []
+        return blocks
+
+    def _release_block(self, block):
+        with self._lock:
+            block.size = 0
+            self._free.append(block)
+            self._space.notify_all()
+
+    def _write_loop(self):
+        # Потік прокидається, коли є повний блок, або раз на FLUSH_INTERVAL (тоді пише
+        # й неповний блок), тому передбачення не перемикають потоки при кожному записі
+        while True:
+            woken = self._wake.wait(FLUSH_INTERVAL)
+            self._wake.clear()
+            closing = self._closed
+            self._retry_failed(final=closing)
+
+            for block in self._take_blocks(partial=closing or not woken or self._flush_requested()):
+                self._write_block(block)
+
+            if closing:
+                # Остання спроба для пакетів, які не вдалося записати щойно
+                self._retry_failed(final=True)
+                self._abandon_file()
+                return
+
+    def _flush_requested(self):
+        with self._lock:
+            return self._settled_count < self._flush_target
+
+    def _write_block(self, block):
+        n_records = block.size
+        try:
+            record_batch = block_to_arrow(block)
+        except (TypeError, ValueError, pa.ArrowException) as error:
+            # Некоректні дані повтор не виправить
+            self._report_error(error)
+            logger.error("Журнал аудиту: %d записів не перетворено на Arrow і відкинуто: %s", n_records, error)
+            self._release_block(block)
+            self._finish(n_records, written=False)
+            return
+        self._release_block(block)
+        self._write_record_batch(record_batch, attempts=0)
+
+    def _write_record_batch(self, record_batch, attempts):
+        try:
+            self._rotate_if_needed()
+            self._stream.write_batch(record_batch)
+        except (OSError, pa.ArrowException) as error:
+            # Файл міг залишитись з обірваним пакетом - наступна спроба піде в новий файл
+            self._report_error(error)
+            self._abandon_file()
+            attempts += 1
+            if attempts < MAX_WRITE_ATTEMPTS:
+                logger.warning("Журнал аудиту: не вдалося записати %d записів (спроба %d з %d), повторимо: %s",
+                               record_batch.num_rows, attempts, MAX_WRITE_ATTEMPTS, error)
+                self._failed.append((record_batch, attempts))
+                return
+            logger.error("Журнал аудиту: %d записів відкинуто після %d спроб запису: %s",
+                         record_batch.num_rows, attempts, error)
+            self._finish(record_batch.num_rows, written=False)
+            return
+        self._finish(record_batch.num_rows, written=True)
+
+    def _retry_failed(self, final=False):
+        """Повторює запис пакетів, які не вдалося записати (final - остання спроба перед закриттям)."""
+        failed, self._failed = self._failed, []
+        for record_batch, attempts in failed:
+            self._write_record_batch(record_batch, MAX_WRITE_ATTEMPTS - 1 if final else attempts)
+
+    def _finish(self, n_records, written):
+        with self._lock:
+            if written:
+                self.written += n_records
+            else:
+                self.dropped += n_records
+            self._settled_count += n_records
+            self._settled.notify_all()
+
+    def _report_error(self, error):
+        self.errors += 1
+        self.last_error = f"{type(error).__name__}: {error}"
+
+    def _abandon_file(self):
+        try:
+            self._close_file()
+        except (OSError, pa.ArrowException):
+            pass
+        self._stream = self._file = None
+
+    def _rotate_if_needed(self):
+        if (self._stream is not None
+                and self._file.tell() < self.max_file_bytes
+                and time.time() - self._opened_at < self.rotate_interval):
+            return
+
+        self._close_file()
+        os.makedirs(self.directory, exist_ok=True)
+        self._opened_at = time.time()
+        self._file_number += 1
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(self._opened_at))
+        self.path = os.path.join(self.directory,
+                                 f"predictions-{stamp}-{os.getpid()}-{self._file_number}.arrows")
+        self._file = pa.OSFile(self.path, 'wb')
+        self._stream = pa.ipc.new_stream(self._file, SCHEMA,
+                                         options=pa.ipc.IpcWriteOptions(compression='zstd'))
+
+    def _close_file(self):
+        if self._stream is not None:
+            self._stream.close()
+            self._file.close()
+            self._stream = self._file = None
+
+    def flush(self, timeout=None):
+        """
+        Чекає, доки всі прийняті записи будуть записані (або відкинуті після
+        MAX_WRITE_ATTEMPTS спроб) - для тестів та завершення роботи.
+
+        Returns:
+            bool: True, якщо всі записи оброблено до timeout
+        """
+        with self._lock:
+            if self._writer is None:
+                return True
+            self._flush_target = max(self._flush_target, self.accepted)
+            self._wake.set()
+            return self._settled.wait_for(lambda: self._settled_count >= self._flush_target
+                                          or not self._writer.is_alive(), timeout)
+
+    def close(self, timeout=10):
+        """Дописує всі записи, закриває файл та зупиняє фоновий потік."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._space.notify_all()
+            writer = self._writer
+        if writer is not None and writer.is_alive():
+            self._wake.set()
+            writer.join(timeout)
+
+
+def get_audit_log():
+    """Створює (або повертає закешований) журнал аудиту процесу."""
+    global _audit_log
+
+    if _audit_log is None:
+        _audit_log = AuditLog()
+        # Записи з черги дописуються при завершенні процесу
+        atexit.register(_audit_log.close)
+    return _audit_log
+
+
+def audit_prediction(inputs, features, survived, probability, model_version):
+    """Записує передбачення в журнал аудиту процесу (якщо журнал увімкнено)."""
+    if AUDIT_ENABLED:
+        get_audit_log().record(inputs, features, survived, probability, model_version)
+
+
+def read_complete_batches(path):
+    """
+    Читає пакети файлу журналу по одному й зупиняється на обірваному кінці
+    (файл ще пишеться або процес завершився посеред запису).
+
+    Returns:
+        list: Повністю записані RecordBatch
+    """
+    batches = []
+    with pa.OSFile(path, 'rb') as f:
+        try:
+            reader = pa.ipc.open_stream(f)
+        except (OSError, pa.ArrowInvalid):
+            # Файл щойно створено, і схему ще не записано (або її обірвано)
+            return batches
+        while True:
+            try:
+                batches.append(reader.read_next_batch())
+            except (StopIteration, OSError, pa.ArrowInvalid):
+                # Кінець потоку або обірваний останній пакет
+                break
+    return batches
+
+
+def read_audit_log(directory=AUDIT_DIR):
+    """
+    Читає всі записи журналу (зокрема з файлів, які ще пишуться або обірвані).
+
+    Returns:
+        DataFrame: Записи, відсортовані за часом (колонки SCHEMA)
+    """
+    batches = []
+    for path in glob.glob(os.path.join(directory, '*.arrows')):
+        batches += read_complete_batches(path)
+
+    if not batches:
+        return SCHEMA.empty_table().to_pandas()
+    return pa.Table.from_batches(batches, SCHEMA).to_pandas().sort_values('ts', ignore_index=True)
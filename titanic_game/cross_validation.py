@@ -0,0 +1,249 @@
+"""
+Модуль для крос-валідації моделей (k-fold та repeated stratified k-fold).
+Фолди навчаються паралельно в окремих процесах, а матриця ознак передається
+робочим процесам через спільну пам'ять (без копіювання через pickle).
+"""
+
+import os
+import atexit
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from multiprocessing import shared_memory
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.model_selection import StratifiedKFold
+
+# Метрики, для яких рахуємо середнє та розкид
+METRIC_NAMES = ['train_accuracy', 'accuracy', 'precision', 'recall', 'f1']
+
+# На маленьких датасетах запуск процесів коштує більше, ніж саме навчання
+MIN_ROWS_FOR_PARALLEL = 20000
+
+# Глобальний пул процесів: створюється один раз на всі ядра і спільний для всіх сесій
+# (кожен виклик run_shared обмежує лише кількість своїх одночасних задач)
+_executor = None
+_executor_lock = threading.Lock()
+
+# Кеш підключених блоків спільної пам'яті у робочому процесі
+_attached = None
+
+
+def _binary_metrics(y_true, y_pred):
+    """
+    Обчислює accuracy, precision, recall та F1 за один прохід через
+    матрицю помилок (bincount замість чотирьох окремих функцій sklearn).
+    """
+    y_true = np.asarray(y_true, dtype=np.int64)
+    y_pred = np.asarray(y_pred, dtype=np.int64)
+    tn, fp, fn, tp = np.bincount(2 * y_true + y_pred, minlength=4)[:4]
+
+    total = tn + fp + fn + tp
+    precision = tp / (tp + fp) if (tp + fp) else 0.0
+    recall = tp / (tp + fn) if (tp + fn) else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if (precision + recall) else 0.0
+
+    return {
+        'accuracy': float((tp + tn) / total) if total else 0.0,
+        'precision': float(precision),
+        'recall': float(recall),
+        'f1': float(f1),
+    }
+
+
+def _evaluate_fold(X, y, folds, estimator, repeat, fold):
+    """Навчає копію моделі на одному фолді та повертає метрики."""
+    test_mask = folds[repeat] == fold
+    train_idx = np.flatnonzero(~test_mask)
+    test_idx = np.flatnonzero(test_mask)
+
+    model = clone(estimator)
+    model.fit(X[train_idx], y[train_idx])
+
+    metrics = _binary_metrics(y[test_idx], model.predict(X[test_idx]))
+    metrics['train_accuracy'] = float(np.mean(model.predict(X[train_idx]) == y[train_idx]))
+    metrics['repeat'] = repeat
+    metrics['fold'] = fold
+    return metrics
+
+
+def _open_shared(name):
+    """Підключається до існуючого блоку спільної пам'яті без реєстрації в resource tracker."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 не має параметра track
+        return shared_memory.SharedMemory(name=name)
+
+
+def _attach(specs):
+    """
+    Повертає масиви зі спільної пам'яті у робочому процесі.
+    Підключення кешується, доки батьківський процес не передасть нові блоки.
+    """
+    global _attached
+
+    key = tuple(spec[0] for spec in specs)
+    if _attached is None or _attached[0] != key:
+        if _attached is not None:
+            for segment in _attached[1]:
+                segment.close()
+        segments = [_open_shared(name) for name, _, _ in specs]
+        arrays = [
+            np.ndarray(shape, dtype=dtype, buffer=segment.buf)
+            for segment, (_, shape, dtype) in zip(segments, specs)
+        ]
+        _attached = (key, segments, arrays)
+
+    return _attached[2]
+
+
+def _run_shared_task(specs, function, args):
+    """Точка входу робочого процесу: масиви беруться зі спільної пам'яті."""
+    return function(*_attach(specs), *args)
+
+
+def _get_executor():
+    """Створює (або повертає закешований) пул процесів на всі ядра."""
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+        return _executor
+
+
+@atexit.register
+def _shutdown_executor():
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+
+
+def run_shared(function, arrays, tasks, n_jobs=None):
+    """
+    Виконує function(*arrays, *args) для кожного набору args з tasks паралельно.
+
+    Масиви один раз копіюються у спільну пам'ять, і робочі процеси читають
+    їх напряму, не отримуючи копій через pickle (підключення кешується між задачами).
+
+    Args:
+        function: Функція рівня модуля (передається в робочі процеси через pickle)
+        arrays: Список масивів numpy
+        tasks: Список кортежів додаткових аргументів
+        n_jobs: Кількість процесів (None - всі ядра, 1 - в поточному процесі)
+
+    Returns:
+        list: Результати в порядку tasks
+    """
+    n_workers = min(n_jobs or os.cpu_count() or 1, len(tasks))
+    if n_workers <= 1:
+        return [function(*arrays, *args) for args in tasks]
+
+    segments = []
+    try:
+        specs = []
+        for array in arrays:
+            segment = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            segments.append(segment)
+            np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf)[...] = array
+            specs.append((segment.name, array.shape, array.dtype.str))
+
+        # Не більше n_workers задач цього виклику одночасно: наступна подається, коли завершується попередня
+        executor = _get_executor()
+        results = [None] * len(tasks)
+        pending = {}
+        next_task = 0
+        while next_task < len(tasks) or pending:
+            while next_task < len(tasks) and len(pending) < n_workers:
+                future = executor.submit(_run_shared_task, specs, function, tasks[next_task])
+                pending[future] = next_task
+                next_task += 1
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[pending.pop(future)] = future.result()
+        return results
+    finally:
+        for segment in segments:
+            segment.close()
+            segment.unlink()
+
+
+def make_fold_assignments(y, n_splits=5, n_repeats=1, random_state=42):
+    """
+    Розбиває рядки на стратифіковані фолди.
+
+    Returns:
+        numpy.ndarray: Масив (n_repeats, n_rows) з номером тестового фолду для кожного рядка
+    """
+    y = np.asarray(y)
+    dtype = np.int8 if n_splits < 128 else np.int16
+    folds = np.empty((n_repeats, len(y)), dtype=dtype)
+    placeholder = np.zeros(len(y), dtype=np.int8)
+
+    for repeat in range(n_repeats):
+        splitter = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=random_state + repeat)
+        for fold, (_, test_idx) in enumerate(splitter.split(placeholder, y)):
+            folds[repeat, test_idx] = fold
+
+    return folds
+
+
+def summarize_folds(fold_results):
+    """
+    Обчислює середнє та стандартне відхилення кожної метрики по всіх фолдах.
+
+    Returns:
+        dict: {метрика: {'mean': float, 'std': float, 'min': float, 'max': float}}
+    """
+    summary = {}
+    for metric in METRIC_NAMES:
+        values = np.array([result[metric] for result in fold_results], dtype=np.float64)
+        summary[metric] = {
+            'mean': float(values.mean()),
+            'std': float(values.std(ddof=1)) if len(values) > 1 else 0.0,
+            'min': float(values.min()),
+            'max': float(values.max()),
+        }
+    return summary
+
+
+def cross_validate_model(estimator, X, y, n_splits=5, n_repeats=1, random_state=42, n_jobs=None):
+    """
+    Оцінює модель k-fold (або repeated stratified k-fold) крос-валідацією.
+
+    Фолди навчаються паралельно. Матриця ознак, цільова змінна та розбиття
+    на фолди один раз копіюються у спільну пам'ять, і робочі процеси читають
+    їх напряму, не отримуючи копій через pickle.
+
+    Args:
+        estimator: Ненавчена модель sklearn (буде клонована для кожного фолду)
+        X: Матриця ознак (DataFrame або numpy.ndarray, тільки числа)
+        y: Цільова змінна (0/1)
+        n_splits: Кількість фолдів (k)
+        n_repeats: Скільки разів повторити розбиття з різним перемішуванням
+        random_state: Початкове значення генератора для розбиття
+        n_jobs: Кількість процесів (None - всі ядра, 1 - без паралелізму)
+
+    Returns:
+        dict: Словник з результатами:
+            - folds: list - метрики кожного фолду
+            - summary: dict - середнє та розкид кожної метрики
+            - n_splits, n_repeats: параметри розбиття
+    """
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    y = np.ascontiguousarray(y, dtype=np.int64)
+    folds = make_fold_assignments(y, n_splits, n_repeats, random_state)
+    tasks = [(repeat, fold) for repeat in range(n_repeats) for fold in range(n_splits)]
+
+    if len(X) < MIN_ROWS_FOR_PARALLEL:
+        n_jobs = 1
+    fold_results = run_shared(_evaluate_fold, (X, y, folds),
+                              [(estimator, r, f) for r, f in tasks], n_jobs)
+
+    return {
+        'folds': fold_results,
+        'summary': summarize_folds(fold_results),
+        'n_splits': n_splits,
+        'n_repeats': n_repeats,
+    }
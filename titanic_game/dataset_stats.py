@@ -0,0 +1,209 @@
+"""
+Модуль зі статистикою датасету для підказок та перевірок гри.
+Статистика (пропуски, кількість унікальних значень, розподіли, квантилі,
+частка тих, хто вижив) рахується один раз для кожної версії датасету.
+Коли крок гри змінює тільки кілька колонок, решта статистики береться
+з попередньої версії без повторного проходу по даних.
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Цільова колонка (для частки тих, хто вижив)
+TARGET = 'Survived'
+
+# Для колонок з такою або меншою кількістю унікальних значень зберігається весь розподіл
+MAX_VALUE_COUNTS = 30
+
+# Квантилі числових колонок
+QUANTILES = (0.0, 0.25, 0.5, 0.75, 1.0)
+
+# Кількість інтервалів для частки тих, хто вижив, у числових колонках з багатьма значеннями
+SURVIVAL_BINS = 5
+
+# Кількість прикладів значень (для підказок)
+N_EXAMPLES = 5
+
+# Скільки версій датасетів тримати в кеші
+MAX_CACHED_STATS = 64
+
+# Глобальний кеш: версія датасету -> статистика
+_stats = OrderedDict()
+
+
+def _is_numeric(dtype):
+    # Так само, як select_dtypes(include=[np.number]): bool не вважається числом
+    return pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+
+
+def column_stats(values, target=None):
+    """
+    Рахує статистику однієї колонки.
+
+    Args:
+        values: pandas.Series з даними колонки
+        target: numpy.ndarray з цільовою змінною (0/1) або None
+
+    Returns:
+        dict: Статистика колонки:
+            - numeric: чи колонка числова
+            - missing: кількість пропущених значень
+            - nunique: кількість унікальних значень (без пропусків)
+            - examples: перші кілька унікальних значень
+            - value_counts, survival_rates: розподіл та частка тих, хто вижив,
+              для кожного значення (тільки для колонок з небагатьма значеннями)
+            - mean, median, quantiles: для числових колонок
+            - survival_bins: частка тих, хто вижив, по інтервалах (числові колонки з багатьма значеннями)
+            - missing_survival_rate: частка тих, хто вижив, серед рядків з пропуском
+    """
+    codes, uniques = pd.factorize(values)
+    valid = codes >= 0
+    n_missing = int(len(codes) - valid.sum())
+    numeric = _is_numeric(values.dtype)
+    labels = uniques.tolist()
+
+    stats = {
+        'numeric': numeric,
+        'missing': n_missing,
+        'nunique': len(uniques),
+        'examples': labels[:N_EXAMPLES],
+    }
+
+    if len(uniques) <= MAX_VALUE_COUNTS:
+        counts = np.bincount(codes[valid], minlength=len(uniques))
+        order = np.argsort(-counts, kind='stable')
+        stats['value_counts'] = {labels[i]: int(counts[i]) for i in order}
+        if target is not None:
+            survived = np.bincount(codes[valid], weights=target[valid], minlength=len(uniques))
+            stats['survival_rates'] = {labels[i]: float(survived[i] / counts[i]) for i in order}
+
+    if numeric and valid.any():
+        array = values.to_numpy(dtype=np.float64)[valid]
+        quantiles = np.quantile(array, QUANTILES)
+        stats['mean'] = float(array.mean())
+        stats['median'] = float(np.median(array))
+        stats['quantiles'] = dict(zip(QUANTILES, quantiles.tolist()))
+
+        if target is not None and len(uniques) > MAX_VALUE_COUNTS:
+            edges = np.unique(np.quantile(array, np.linspace(0, 1, SURVIVAL_BINS + 1)))
+            bins = np.clip(np.searchsorted(edges, array, side='right') - 1, 0, len(edges) - 2)
+            counts = np.bincount(bins, minlength=len(edges) - 1)
+            survived = np.bincount(bins, weights=target[valid], minlength=len(edges) - 1)
+            stats['survival_bins'] = {
+                (float(edges[i]), float(edges[i + 1])): float(survived[i] / counts[i])
+                for i in range(len(edges) - 1) if counts[i]
+            }
+
+    if target is not None and n_missing:
+        stats['missing_survival_rate'] = float(target[~valid].mean())
+
+    return stats
+
+
+def _target_values(df):
+    if TARGET not in df.columns or df[TARGET].isna().any():
+        return None
+    return df[TARGET].to_numpy(dtype=np.float64)
+
+
+def compute_stats(df, version=None):
+    """
+    Рахує статистику всіх колонок датасету.
+
+    Args:
+        df: DataFrame
+        version: Версія датасету (зберігається в результаті)
+
+    Returns:
+        dict: {'version', 'n_rows', 'survival_rate', 'columns': {колонка: column_stats}}
+    """
+    target = _target_values(df)
+    return {
+        'version': version,
+        'n_rows': len(df),
+        'survival_rate': float(target.mean()) if target is not None and len(target) else None,
+        'columns': {name: column_stats(df[name], target) for name in df.columns},
+    }
+
+
+def derive_stats(base, df, changed=(), version=None):
+    """
+    Статистика нової версії датасету на основі статистики попередньої.
+    Перераховуються тільки змінені та нові колонки; якщо змінилась кількість
+    рядків або цільова колонка, статистика рахується заново.
+
+    Args:
+        base: Статистика попередньої версії (compute_stats) або None
+        df: DataFrame нової версії
+        changed: Колонки, значення яких змінились
+        version: Версія нового датасету
+
+    Returns:
+        dict: Статистика у форматі compute_stats
+    """
+    if base is None or base['n_rows'] != len(df) or TARGET in changed:
+        return compute_stats(df, version)
+
+    target = None
+    columns = {}
+    for name in df.columns:
+        if name in base['columns'] and name not in changed:
+            columns[name] = base['columns'][name]
+        else:
+            if target is None:
+                target = _target_values(df)
+            columns[name] = column_stats(df[name], target)
+
+    return {
+        'version': version,
+        'n_rows': base['n_rows'],
+        'survival_rate': base['survival_rate'] if TARGET in df.columns else None,
+        'columns': columns,
+    }
+
+
+def get_dataset_stats(df, version, base=None, changed=()):
+    """
+    Повертає статистику версії датасету (з кешу або рахує її).
+
+    Args:
+        df: DataFrame
+        version: Версія датасету (будь-який хешований ключ, що змінюється разом з даними)
+        base: Статистика попередньої версії, з якої отримано df (див. derive_stats)
+        changed: Колонки, змінені відносно base
+
+    Returns:
+        dict: Статистика у форматі compute_stats
+    """
+    if version is None or (isinstance(version, tuple) and version and version[0] is None):
+        # Без версії (або похідна від датасету без версії) кеш не може відрізнити
+        # різні датасети - рахуємо без кешування
+        return derive_stats(base, df, changed, version)
+
+    if version in _stats:
+        _stats.move_to_end(version)
+        return _stats[version]
+
+    stats = derive_stats(base, df, changed, version)
+    _stats[version] = stats
+    if len(_stats) > MAX_CACHED_STATS:
+        _stats.popitem(last=False)
+    return stats
+
+
+def non_numeric_columns(stats, exclude=(TARGET,)):
+    """Колонки, які ще не перетворено на числа."""
+    return [name for name, column in stats['columns'].items()
+            if not column['numeric'] and name not in exclude]
+
+
+def total_missing(stats):
+    """Загальна кількість пропущених значень у всіх колонках."""
+    return sum(column['missing'] for column in stats['columns'].values())
+
+
+def format_rates(rates):
+    """Частки тих, хто вижив, у вигляді тексту для підказок: 'female: 74%, male: 19%'."""
+    return ", ".join(f"{value}: {rate * 100:.0f}%" for value, rate in rates.items())
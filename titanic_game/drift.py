@@ -0,0 +1,318 @@
+"""
+Модуль для моніторингу зсуву (drift) вхідних даних передбачень.
+
+Під час навчання для кожної ознаки та для передбаченої ймовірності будується
+базовий скетч фіксованого розміру (квантилі для числових ознак, частоти для
+категоріальних). Кожне передбачення лише записує рядок у попередньо виділений
+буфер; буфер пакетами додається до поточних скетчів, а кожні CHECK_EVERY
+передбачень поточні скетчі порівнюються з базовими (PSI та KS).
+
+Пам'ять не залежить від кількості передбачень, а скетчі різних процесів
+(наприклад, реплік або воркерів) об'єднуються через merge: кожен процес зберігає
+свій стан у DRIFT_DIR, а drift_report() об'єднує їх у загальний звіт.
+"""
+
+import os
+import glob
+import uuid
+import atexit
+import pickle
+import threading
+
+import numpy as np
+
+from sketches import QuantileSketch, CategoryCounter
+
+MODELS_DIR = os.path.join(os.path.dirname(__file__), 'models')
+BASELINE_PATH = os.path.join(MODELS_DIR, 'drift_baseline.pkl')
+
+# Папка зі станом моніторів процесів (спільна для всіх реплік)
+DRIFT_DIR = os.environ.get('TITANIC_DRIFT_DIR',
+                           os.path.join(os.path.dirname(__file__), 'results', 'drift'))
+
+# Ознаки моделі в порядку model.prepare_input та передбачена ймовірність
+FEATURE_NAMES = ['Pclass', 'Sex', 'Age', 'SibSp', 'Parch', 'Fare']
+PROBABILITY = 'probability'
+MONITORED_COLUMNS = FEATURE_NAMES + [PROBABILITY]
+CATEGORICAL_FEATURES = {'Pclass', 'Sex'}
+
+# Скільки передбачень накопичувати в буфері перед оновленням скетчів
+BUFFER_SIZE = 256
+
+# Як часто (в передбаченнях) порівнювати поточні дані з базовими
+CHECK_EVERY = 1000
+
+# Мінімум передбачень для порівняння ознаки (менше - оцінки надто шумні)
+MIN_RECORDS = 100
+
+# Кількість кошиків PSI (децилі базового розподілу) та пороги
+PSI_BINS = 10
+PSI_WARNING = 0.1
+PSI_ALERT = 0.25
+
+# Коефіцієнт критичного значення KS для рівня значущості 0.05
+KS_COEFFICIENT = 1.36
+
+# Глобальні змінні для кешування
+_baseline = None
+_drift_monitor = None
+
+
+def create_sketches():
+    """Порожні скетчі для всіх ознак та ймовірності."""
+    return {column: CategoryCounter() if column in CATEGORICAL_FEATURES else QuantileSketch()
+            for column in MONITORED_COLUMNS}
+
+
+def update_sketches(sketches, X, probabilities):
+    """
+    Додає пакет передбачень до скетчів.
+
+    Args:
+        sketches: Словник скетчів (create_sketches)
+        X: Масив ознак (n, 6) у порядку FEATURE_NAMES
+        probabilities: Масив ймовірностей виживання (n,)
+    """
+    X = np.asarray(X, dtype=np.float64)
+    for i, column in enumerate(FEATURE_NAMES):
+        sketches[column].update(X[:, i])
+    sketches[PROBABILITY].update(np.asarray(probabilities, dtype=np.float64))
+    return sketches
+
+
+def merge_sketches(target, source):
+    """Об'єднує скетчі source з target (результат - у target)."""
+    for column in MONITORED_COLUMNS:
+        target[column].merge(source[column])
+    return target
+
+
+def build_baseline(X, probabilities):
+    """
+    Базові скетчі з тренувальних даних (зберігаються разом з моделлю).
+
+    Args:
+        X: Тренувальні ознаки у порядку FEATURE_NAMES
+        probabilities: Ймовірності виживання моделі на тренувальних даних
+
+    Returns:
+        dict: Словник скетчів
+    """
+    return update_sketches(create_sketches(), X, probabilities)
+
+
+def population_stability_index(expected, actual, eps=1e-4):
+    """PSI між двома розподілами за кошиками (частки; нулі замінюються на eps)."""
+    expected = np.clip(np.asarray(expected, dtype=np.float64), eps, None)
+    actual = np.clip(np.asarray(actual, dtype=np.float64), eps, None)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def compare_feature(baseline, current, categorical):
+    """
+    Порівнює поточний скетч ознаки з базовим.
+
+    Returns:
+        dict: psi, ks (None для категоріальних), ks_critical, count, status ('ok', 'warning', 'alert')
+    """
+    if categorical:
+        categories = sorted(set(baseline.counts) | set(current.counts))
+        expected = list(baseline.frequencies(categories).values())
+        actual = list(current.frequencies(categories).values())
+        ks = ks_critical = None
+    else:
+        edges = np.unique(baseline.quantile(np.linspace(0, 1, PSI_BINS + 1)[1:-1]))
+        expected = np.diff(np.concatenate([[0.0], baseline.cdf(edges), [1.0]]))
+        actual = np.diff(np.concatenate([[0.0], current.cdf(edges), [1.0]]))
+
+        # KS: найбільша різниця функцій розподілу в точках обох скетчів
+        grid = np.concatenate([baseline.means, current.means])
+        ks = float(np.max(np.abs(baseline.cdf(grid) - current.cdf(grid))))
+        n, m = baseline.count, current.count
+        ks_critical = KS_COEFFICIENT * np.sqrt((n + m) / (n * m))
+
+    psi = population_stability_index(expected, actual)
+    if psi >= PSI_ALERT:
+        status = 'alert'
+    elif psi >= PSI_WARNING or (ks is not None and ks > ks_critical):
+        status = 'warning'
+    else:
+        status = 'ok'
+
+    return {'psi': psi, 'ks': ks, 'ks_critical': ks_critical, 'count': current.count, 'status': status}
+
+
+def compare_sketches(baseline, current, min_records=MIN_RECORDS):
+    """
+    Звіт про зсув для всіх ознак та ймовірності.
+
+    Returns:
+        dict: {колонка: compare_feature(...)}; колонки з меншою за min_records
+              кількістю значень пропускаються
+    """
+    report = {}
+    for column in MONITORED_COLUMNS:
+        base, current_sketch = baseline[column], current[column]
+        if base.count == 0 or current_sketch.count < min_records:
+            continue
+        report[column] = compare_feature(base, current_sketch, column in CATEGORICAL_FEATURES)
+    return report
+
+
+def format_report(report):
+    """Рядки звіту для виводу (найбільший зсув - першим)."""
+    icons = {'ok': '✅', 'warning': '⚠️', 'alert': '🚨'}
+    lines = []
+    for column, result in sorted(report.items(), key=lambda item: -item[1]['psi']):
+        line = f"{icons[result['status']]} {column}: PSI={result['psi']:.3f}"
+        if result['ks'] is not None:
+            line += f", KS={result['ks']:.3f} (поріг {result['ks_critical']:.3f})"
+        lines.append(line + f", передбачень: {result['count']}")
+    return lines
+
+
+def load_baseline(path=BASELINE_PATH):
+    """
+    Завантажує базові скетчі, збережені train_model.py (з кешем).
+
+    Returns:
+        dict або None: Словник скетчів (None, якщо модель навчена без них)
+    """
+    global _baseline
+
+    if _baseline is None and os.path.exists(path):
+        with open(path, 'rb') as f:
+            _baseline = pickle.load(f)
+    return _baseline
+
+
+class DriftMonitor:
+    """
+    Монітор зсуву передбачень одного процесу.
+
+    record() лише копіює рядок у буфер під блокуванням; скетчі оновлюються
+    пакетами по buffer_size рядків, а порівняння з базовими скетчами
+    та збереження стану - кожні check_every передбачень.
+
+    Args:
+        baseline: Базові скетчі (None - дані лише збираються)
+        buffer_size: Розмір буфера передбачень
+        check_every: Як часто порівнювати з базовими скетчами
+        state_dir: Папка для стану процесу (None - не зберігати)
+    """
+
+    def __init__(self, baseline=None, buffer_size=BUFFER_SIZE, check_every=CHECK_EVERY, state_dir=DRIFT_DIR):
+        self.baseline = baseline
+        self.check_every = check_every
+        self.state_dir = state_dir
+        self.sketches = create_sketches()
+        self.count = 0
+        self.last_report = None
+        self._drifted = []
+        self._buffer = np.empty((buffer_size, len(MONITORED_COLUMNS)), dtype=np.float64)
+        self._filled = 0
+        self._lock = threading.Lock()
+
+    def record(self, features, probability):
+        """
+        Записує одне передбачення.
+
+        Args:
+            features: Ознаки пасажира у порядку FEATURE_NAMES
+            probability: Передбачена ймовірність виживання
+        """
+        with self._lock:
+            row = self._buffer[self._filled]
+            row[:-1] = features
+            row[-1] = probability
+            self._filled += 1
+            self.count += 1
+            if self._filled == len(self._buffer):
+                self._flush()
+            if self.count % self.check_every == 0:
+                self._check()
+
+    def _flush(self):
+        if self._filled:
+            rows = self._buffer[:self._filled]
+            update_sketches(self.sketches, rows[:, :-1], rows[:, -1])
+            self._filled = 0
+
+    def _check(self):
+        if self.baseline is not None:
+            self.last_report = compare_sketches(self.baseline, self.sketches)
+            drifted = [column for column, result in self.last_report.items() if result['status'] != 'ok']
+            # Повідомляємо лише про зміну набору ознак зі зсувом, а не на кожній перевірці
+            if drifted and drifted != self._drifted:
+                print(f"⚠️ Зсув вхідних даних після {self.count} передбачень: {', '.join(drifted)}")
+            self._drifted = drifted
+        if self.state_dir:
+            self._save_state()
+
+    def _save_state(self):
+        path = os.path.join(self.state_dir, f"{os.getpid()}.pkl")
+        os.makedirs(self.state_dir, exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({'count': self.count, 'sketches': self.sketches}, f)
+        os.replace(tmp_path, path)
+
+    def state(self):
+        """Поточний стан монітора (для merge в іншому процесі)."""
+        with self._lock:
+            self._flush()
+            return {'count': self.count, 'sketches': self.sketches}
+
+    def save_state(self):
+        """Додає буфер до скетчів та зберігає стан процесу в state_dir."""
+        with self._lock:
+            self._flush()
+            if self.state_dir and self.count:
+                self._save_state()
+
+    def merge(self, state):
+        """Об'єднує стан іншого монітора (state()) з цим."""
+        with self._lock:
+            self._flush()
+            merge_sketches(self.sketches, state['sketches'])
+            self.count += state['count']
+        return self
+
+    def report(self):
+        """Порівнює поточні дані процесу з базовими (None, якщо базових скетчів немає)."""
+        with self._lock:
+            self._flush()
+            if self.baseline is None:
+                return None
+            self.last_report = compare_sketches(self.baseline, self.sketches)
+            return self.last_report
+
+
+def get_drift_monitor():
+    """Створює (або повертає закешований) монітор зсуву процесу."""
+    global _drift_monitor
+
+    if _drift_monitor is None:
+        _drift_monitor = DriftMonitor(load_baseline())
+        # Залишок буфера зберігається при завершенні процесу
+        atexit.register(_drift_monitor.save_state)
+    return _drift_monitor
+
+
+def drift_report(state_dir=DRIFT_DIR, baseline=None):
+    """
+    Загальний звіт про зсув: об'єднує збережені стани всіх процесів.
+
+    Args:
+        state_dir: Папка зі станами моніторів
+        baseline: Базові скетчі (за замовчуванням - load_baseline())
+
+    Returns:
+        tuple: (кількість передбачень, звіт compare_sketches або None без базових скетчів)
+    """
+    baseline = baseline if baseline is not None else load_baseline()
+    merged = DriftMonitor(baseline, state_dir=None)
+    for path in sorted(glob.glob(os.path.join(state_dir, '*.pkl'))):
+        with open(path, 'rb') as f:
+            merged.merge(pickle.load(f))
+    return merged.count, merged.report()
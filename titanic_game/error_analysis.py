@@ -0,0 +1,188 @@
+"""
+Модуль для аналізу помилок моделі на тестових даних.
+Показує, яких пасажирів модель передбачила неправильно і за якими правилами
+(для дерева рішень - шлях від кореня до листа).
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+# Межі впевненості для моделей без простих правил (ліс, логістична регресія)
+CONFIDENCE_BINS = [0.5, 0.6, 0.7, 0.8, 0.9, 1.0]
+
+OUTCOME_LABELS = {0: 'Загинув', 1: 'Вижив'}
+
+
+def _tree_structure(model):
+    """
+    Повертає масиви (ознака, поріг, лівий нащадок) одного дерева
+    або None, якщо модель не є одним деревом.
+    """
+    if hasattr(model, 'tree_'):
+        return model.tree_.feature, model.tree_.threshold, model.tree_.children_left
+    if hasattr(model, 'tree_feature_'):
+        return model.tree_feature_, model.tree_threshold_, model.tree_left_
+    return None
+
+
+def _format_number(value):
+    return f"{value:.2f}".rstrip('0').rstrip('.')
+
+
+def path_rule(path_nodes, structure, feature_names):
+    """
+    Перетворює шлях від кореня до листа на читабельне правило.
+    Кілька умов на одну ознаку об'єднуються в інтервал (наприклад, 6.5 < Age ≤ 30).
+
+    Args:
+        path_nodes: Номери вузлів шляху (від кореня до листа)
+        structure: Масиви дерева (див. _tree_structure)
+        feature_names: Назви ознак
+
+    Returns:
+        str: Правило, наприклад "Sex > 0.5 і Age ≤ 6.5"
+    """
+    feature, threshold, left = structure
+    bounds = {}
+    for node, next_node in zip(path_nodes[:-1], path_nodes[1:]):
+        low, high = bounds.get(feature[node], (-math.inf, math.inf))
+        if next_node == left[node]:
+            high = min(high, threshold[node])
+        else:
+            low = max(low, threshold[node])
+        bounds[feature[node]] = (low, high)
+
+    parts = []
+    for f, (low, high) in bounds.items():
+        name = feature_names[f]
+        if low == -math.inf:
+            parts.append(f"{name} ≤ {_format_number(high)}")
+        elif high == math.inf:
+            parts.append(f"{name} > {_format_number(low)}")
+        else:
+            parts.append(f"{_format_number(low)} < {name} ≤ {_format_number(high)}")
+
+    return " і ".join(parts) if parts else "Усі пасажири"
+
+
+def analyze_errors(model, X, y):
+    """
+    Знаходить неправильно передбачених пасажирів та групує помилки.
+
+    Для дерева рішень шляхи всіх рядків беруться одним розрідженим викликом
+    decision_path, помилки групуються за листами, а правило будується один раз
+    для кожного листа (не для кожного рядка). Для інших моделей помилки
+    групуються за передбаченим класом та впевненістю моделі.
+
+    Args:
+        model: Навчена модель
+        X: Тестові дані (DataFrame)
+        y: Правильні відповіді (0/1)
+
+    Returns:
+        dict: Словник з результатами аналізу:
+            - n_rows, n_errors, false_positives, false_negatives: кількості
+            - groups: DataFrame з групами (правило, пасажирів, помилок, частка помилок)
+            - group: номер групи для кожного рядка
+            - rules: назва (правило) кожної групи
+            - error_positions: позиції неправильно передбачених рядків
+            - y_pred, confidence: передбачення та впевненість моделі
+            - has_rules: чи є групи правилами дерева
+    """
+    y = np.asarray(y, dtype=np.int64)
+    proba = model.predict_proba(X)[:, 1]
+    y_pred = np.asarray(model.predict(X), dtype=np.int64)
+    confidence = np.where(y_pred == 1, proba, 1 - proba)
+    errors = y_pred != y
+
+    structure = _tree_structure(model)
+    if structure is not None:
+        # Один виклик: шляхи всіх рядків у розрідженій матриці (рядки × вузли)
+        path = model.decision_path(X).tocsr()
+        path.sort_indices()
+        leaf = path.indices[path.indptr[1:] - 1]
+
+        _, first_rows, group = np.unique(leaf, return_index=True, return_inverse=True)
+        feature_names = list(X.columns)
+        rules = np.array([
+            path_rule(path.indices[path.indptr[row]:path.indptr[row + 1]], structure, feature_names)
+            for row in first_rows
+        ], dtype=object)
+    else:
+        band = np.clip(np.searchsorted(CONFIDENCE_BINS, confidence, side='right') - 1,
+                       0, len(CONFIDENCE_BINS) - 2)
+        keys, group = np.unique(y_pred * len(CONFIDENCE_BINS) + band, return_inverse=True)
+        rules = np.array([
+            f"Передбачено «{OUTCOME_LABELS[key // len(CONFIDENCE_BINS)]}», впевненість "
+            f"{CONFIDENCE_BINS[key % len(CONFIDENCE_BINS)] * 100:.0f}-"
+            f"{CONFIDENCE_BINS[key % len(CONFIDENCE_BINS) + 1] * 100:.0f}%"
+            for key in keys
+        ], dtype=object)
+
+    group = group.astype(np.int32).ravel()
+    n_groups = len(rules)
+    rows_per_group = np.bincount(group, minlength=n_groups)
+    errors_per_group = np.bincount(group, weights=errors, minlength=n_groups).astype(np.int64)
+    false_positive = errors & (y_pred == 1)
+    fp_per_group = np.bincount(group, weights=false_positive, minlength=n_groups).astype(np.int64)
+
+    groups = pd.DataFrame({
+        'group': np.arange(n_groups),
+        'Правило' if structure is not None else 'Група': rules,
+        'Пасажирів': rows_per_group,
+        'Помилок': errors_per_group,
+        'Частка помилок (%)': np.round(100 * errors_per_group / np.maximum(rows_per_group, 1), 1),
+        'Хибно «Вижив»': fp_per_group,
+        'Хибно «Загинув»': errors_per_group - fp_per_group,
+    })
+    groups = groups[groups['Помилок'] > 0].sort_values(['Помилок', 'Частка помилок (%)'], ascending=False)
+
+    return {
+        'n_rows': len(y),
+        'n_errors': int(errors.sum()),
+        'false_positives': int(false_positive.sum()),
+        'false_negatives': int((errors & (y_pred == 0)).sum()),
+        'groups': groups.reset_index(drop=True),
+        'group': group,
+        'rules': rules,
+        'error_positions': np.flatnonzero(errors),
+        'y_pred': y_pred,
+        'confidence': confidence,
+        'has_rules': structure is not None,
+    }
+
+
+def error_page(analysis, X, y, page, page_size, group=None):
+    """
+    Повертає одну сторінку неправильно передбачених пасажирів.
+    Таблиця будується тільки для рядків сторінки, тому працює і з мільйонами рядків.
+
+    Args:
+        analysis: Результат analyze_errors
+        X: Тестові дані (DataFrame)
+        y: Правильні відповіді
+        page: Номер сторінки (з 1)
+        page_size: Кількість рядків на сторінці
+        group: Номер групи для фільтрації (None - всі помилки)
+
+    Returns:
+        tuple: (DataFrame сторінки, загальна кількість помилок, кількість сторінок)
+    """
+    positions = analysis['error_positions']
+    if group is not None:
+        positions = positions[analysis['group'][positions] == group]
+
+    n_pages = max(1, math.ceil(len(positions) / page_size))
+    page = min(max(page, 1), n_pages)
+    rows = positions[(page - 1) * page_size:page * page_size]
+
+    y = np.asarray(y)
+    page_df = X.iloc[rows].copy()
+    page_df.insert(0, 'Насправді', np.where(y[rows] == 1, OUTCOME_LABELS[1], OUTCOME_LABELS[0]))
+    page_df.insert(1, 'Передбачено', np.where(analysis['y_pred'][rows] == 1, OUTCOME_LABELS[1], OUTCOME_LABELS[0]))
+    page_df.insert(2, 'Впевненість (%)', np.round(analysis['confidence'][rows] * 100, 1))
+    page_df['Правило' if analysis['has_rules'] else 'Група'] = analysis['rules'][analysis['group'][rows]]
+
+    return page_df, len(positions), n_pages
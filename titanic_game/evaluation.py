@@ -0,0 +1,227 @@
+"""
+Модуль з оцінкою навченої моделі (крок 6).
+
+predict_proba викликається один раз для кожної вибірки (train / test). З
+ймовірностей за один прохід (np.unique + bincount) будуються кількості
+позитивних та негативних прикладів для кожного значення ймовірності, а з
+них - accuracy, precision, recall, F1, матриця помилок, ROC-крива та AUC.
+
+Довірчі інтервали рахуються бутстрепом. Усі метрики залежать лише від
+кількостей у комірках (значення ймовірності × клас), тому кожна бутстреп-вибірка
+зводиться до рядка матриці кількостей (n_bootstrap × комірки), а метрики
+рахуються для всіх вибірок одразу. Для невеликого тесту матриця будується з
+матриці індексів вибірок (n_bootstrap × n), для великого - одним викликом
+rng.multinomial (той самий розподіл, але час не залежить від кількості рядків).
+"""
+
+import numpy as np
+
+# Поріг класу "Вижив" (як у predict для бінарної класифікації)
+THRESHOLD = 0.5
+
+# Бутстреп: кількість вибірок, рівень довіри та максимум комірок
+N_BOOTSTRAP = 1000
+CONFIDENCE = 0.95
+MAX_BOOTSTRAP_BINS = 128
+
+# До якого розміру (n_bootstrap × n рядків) використовується матриця індексів вибірок
+MAX_INDEX_MATRIX = 4_000_000
+
+# Скільки точок ROC-кривої зберігати для графіка
+ROC_POINTS = 200
+
+METRIC_NAMES = ['accuracy', 'precision', 'recall', 'f1', 'auc']
+
+
+def positive_scores(model, X):
+    """
+    Ймовірність класу 1 (один виклик predict_proba).
+
+    Returns:
+        ndarray: Ймовірності (нулі, якщо модель бачила лише клас 0)
+    """
+    proba = model.predict_proba(X)
+    classes = list(getattr(model, 'classes_', [0, 1]))
+    if 1 not in classes:
+        return np.zeros(len(proba))
+    return np.asarray(proba[:, classes.index(1)], dtype=np.float64)
+
+
+def score_counts(y_true, scores, return_inverse=False):
+    """
+    Кількості негативних та позитивних прикладів для кожного значення ймовірності.
+
+    Returns:
+        tuple: (значення ймовірностей за зростанням, кількості негативних, кількості позитивних)
+               та, якщо return_inverse, номер значення для кожного рядка
+    """
+    y_true = np.asarray(y_true, dtype=np.int64)
+    values, inverse = np.unique(np.asarray(scores, dtype=np.float64), return_inverse=True)
+    inverse = inverse.ravel()
+    counts = np.bincount(2 * inverse + y_true, minlength=2 * len(values)).reshape(-1, 2)
+    if return_inverse:
+        return values, counts[:, 0], counts[:, 1], inverse
+    return values, counts[:, 0], counts[:, 1]
+
+
+def metrics_from_counts(negatives, positives, predicted_positive):
+    """
+    Метрики з кількостей по значеннях ймовірності (за зростанням).
+    Працює і для пакета вибірок: negatives та positives - масиви (..., K).
+
+    Args:
+        negatives, positives: Кількості негативних та позитивних прикладів
+        predicted_positive: Маска значень, які модель відносить до класу 1 (K,)
+
+    Returns:
+        dict: accuracy, precision, recall, f1, auc, tn, fp, fn, tp (масиви форми ...)
+    """
+    negatives = np.asarray(negatives, dtype=np.float64)
+    positives = np.asarray(positives, dtype=np.float64)
+    n_negative = negatives.sum(axis=-1)
+    n_positive = positives.sum(axis=-1)
+
+    tp = positives[..., predicted_positive].sum(axis=-1)
+    fp = negatives[..., predicted_positive].sum(axis=-1)
+    fn = n_positive - tp
+    tn = n_negative - fp
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        accuracy = np.where(n_positive + n_negative > 0, (tp + tn) / (n_positive + n_negative), 0.0)
+        precision = np.where(tp + fp > 0, tp / (tp + fp), 0.0)
+        recall = np.where(n_positive > 0, tp / n_positive, 0.0)
+        f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+
+        # AUC (Манна-Уітні): для кожного негативного - частка позитивних з більшою
+        # ймовірністю, однакові ймовірності - половина
+        positives_above = np.cumsum(positives[..., ::-1], axis=-1)[..., ::-1] - positives
+        pairs = (negatives * (positives_above + positives / 2)).sum(axis=-1)
+        auc = np.where(n_positive * n_negative > 0, pairs / (n_positive * n_negative), np.nan)
+
+    return {'accuracy': accuracy, 'precision': precision, 'recall': recall, 'f1': f1, 'auc': auc,
+            'tn': tn, 'fp': fp, 'fn': fn, 'tp': tp}
+
+
+def roc_curve_points(negatives, positives, max_points=ROC_POINTS):
+    """
+    ROC-крива з кількостей по значеннях ймовірності (за зростанням).
+
+    Returns:
+        tuple: (fpr, tpr) - списки не довші за max_points + 1
+    """
+    fp = np.concatenate([[0], np.cumsum(negatives[::-1])])
+    tp = np.concatenate([[0], np.cumsum(positives[::-1])])
+    fpr = fp / fp[-1] if fp[-1] else fp.astype(np.float64)
+    tpr = tp / tp[-1] if tp[-1] else tp.astype(np.float64)
+    if len(fpr) > max_points + 1:
+        keep = np.unique(np.linspace(0, len(fpr) - 1, max_points + 1).astype(np.int64))
+        fpr, tpr = fpr[keep], tpr[keep]
+    return fpr.tolist(), tpr.tolist()
+
+
+def merge_bins(values, threshold=THRESHOLD, max_bins=MAX_BOOTSTRAP_BINS):
+    """
+    Об'єднує сусідні значення ймовірності до max_bins груп (значення нижче та вище
+    порогу в одну групу не потрапляють).
+
+    Returns:
+        tuple: (номер групи для кожного значення, маска груп класу 1)
+    """
+    side = values > threshold
+    if len(values) <= max_bins:
+        return np.arange(len(values)), side
+
+    groups = np.minimum(np.arange(len(values)) * max_bins // len(values), max_bins - 1)
+    _, groups = np.unique(2 * groups + side, return_inverse=True)
+    predicted_positive = np.zeros(groups.max() + 1, dtype=bool)
+    predicted_positive[groups[side]] = True
+    return groups, predicted_positive
+
+
+def bootstrap_intervals(row_cells, predicted_positive, n_bootstrap=N_BOOTSTRAP,
+                        confidence=CONFIDENCE, random_state=42):
+    """
+    Бутстреп-інтервали метрик.
+
+    Args:
+        row_cells: Комірка кожного рядка: 2 * група ймовірності + клас
+        predicted_positive: Маска груп, які модель відносить до класу 1
+
+    Returns:
+        dict: {метрика: (нижня межа, верхня межа)}
+    """
+    n = len(row_cells)
+    if n == 0 or n_bootstrap <= 0:
+        return {}
+
+    rng = np.random.default_rng(random_state)
+    n_cells = 2 * len(predicted_positive)
+    if n_bootstrap * n <= MAX_INDEX_MATRIX:
+        # Матриця індексів вибірок -> комірки -> кількості (один bincount для всіх вибірок)
+        cells = row_cells[rng.integers(0, n, size=(n_bootstrap, n))]
+        cells += (np.arange(n_bootstrap) * n_cells)[:, None]
+        samples = np.bincount(cells.ravel(), minlength=n_bootstrap * n_cells)
+    else:
+        counts = np.bincount(row_cells, minlength=n_cells)
+        samples = rng.multinomial(n, counts / n, size=n_bootstrap)
+    samples = samples.reshape(n_bootstrap, -1, 2)
+    metrics = metrics_from_counts(samples[..., 0], samples[..., 1], predicted_positive)
+
+    alpha = (1 - confidence) / 2
+    intervals = {}
+    for name in METRIC_NAMES:
+        values = metrics[name][~np.isnan(metrics[name])]
+        if len(values):
+            low, high = np.quantile(values, [alpha, 1 - alpha])
+            intervals[name] = (float(low), float(high))
+    return intervals
+
+
+def evaluate_split(y_true, scores, threshold=THRESHOLD, n_bootstrap=N_BOOTSTRAP,
+                   confidence=CONFIDENCE, random_state=42):
+    """
+    Оцінка моделі на одній вибірці за ймовірностями класу 1.
+
+    Args:
+        y_true: Справжні класи (0/1)
+        scores: Ймовірності класу 1 (positive_scores)
+        threshold: Поріг класу 1
+        n_bootstrap: Кількість бутстреп-вибірок (0 - без інтервалів)
+        confidence: Рівень довіри інтервалів
+
+    Returns:
+        dict: Словник з результатами:
+            - n: int - кількість рядків
+            - accuracy, precision, recall, f1, auc: float - метрики
+            - confusion: dict - tn, fp, fn, tp
+            - roc: dict - fpr, tpr (списки)
+            - ci: dict - {метрика: (нижня, верхня межа)}
+    """
+    values, negatives, positives, inverse = score_counts(y_true, scores, return_inverse=True)
+    metrics = metrics_from_counts(negatives, positives, values > threshold)
+    fpr, tpr = roc_curve_points(negatives, positives)
+
+    groups, predicted_positive = merge_bins(values, threshold)
+    row_cells = 2 * groups[inverse] + np.asarray(y_true, dtype=np.int64)
+    return {
+        'n': int(negatives.sum() + positives.sum()),
+        **{name: float(metrics[name]) for name in METRIC_NAMES},
+        'confusion': {name: int(metrics[name]) for name in ['tn', 'fp', 'fn', 'tp']},
+        'roc': {'fpr': fpr, 'tpr': tpr},
+        'ci': bootstrap_intervals(row_cells, predicted_positive, n_bootstrap=n_bootstrap,
+                                  confidence=confidence, random_state=random_state),
+        'confidence': confidence,
+    }
+
+
+def evaluate_model(model, X_train, y_train, X_test, y_test, n_bootstrap=N_BOOTSTRAP):
+    """
+    Оцінює модель на train та test (по одному predict_proba на вибірку).
+
+    Returns:
+        dict: {'train': evaluate_split(...), 'test': evaluate_split(...)}
+    """
+    return {
+        'train': evaluate_split(y_train, positive_scores(model, X_train), n_bootstrap=n_bootstrap),
+        'test': evaluate_split(y_test, positive_scores(model, X_test), n_bootstrap=n_bootstrap),
+    }
@@ -0,0 +1,248 @@
+"""
+Модуль з агрегованими графіками для дослідження датасету.
+
+Графіки будуються не з рядків, а з невеликих агрегатів, порахованих на
+сервері за один прохід (bincount) з фіксованими межами кошиків: частка тих,
+хто вижив, у кожній клітинці вік × вартість квитка, гістограми віку та
+вартості за класом і статтю, частка пропусків у блоках рядків та спільні
+пропуски пар колонок. Розмір агрегатів (а отже, і графіків, які отримує
+браузер) не залежить від кількості пасажирів.
+
+Агрегати рахуються один раз для кожної версії датасету (як dataset_stats).
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# Цільова колонка (для частки тих, хто вижив)
+TARGET = 'Survived'
+
+# Фіксовані межі кошиків (значення за останньою межею потрапляють в останній кошик)
+AGE_EDGES = np.arange(0, 85, 5, dtype=np.float64)
+FARE_EDGES = np.array([0, 5, 8, 10, 15, 20, 30, 40, 60, 80, 120, 200, 300, 520], dtype=np.float64)
+HISTOGRAM_COLUMNS = {'Age': AGE_EDGES, 'Fare': FARE_EDGES}
+
+# Колонки, за якими розбиваються гістограми, та максимум груп
+GROUP_COLUMNS = ['Pclass', 'Sex']
+MAX_GROUPS = 10
+
+# Клітинки теплової карти з меншою кількістю пасажирів не зафарбовуються
+MIN_CELL_ROWS = 5
+
+# На скільки блоків ділити рядки для матриці пропусків
+MISSING_ROW_BLOCKS = 100
+
+# Скільки версій датасетів тримати в кеші
+MAX_CACHED_EXPLORATIONS = 16
+
+# Глобальний кеш: версія датасету -> агрегати
+_explorations = OrderedDict()
+
+
+def _bin_codes(values, edges):
+    """Номер кошика кожного значення (-1 - пропуск або нечислове значення)."""
+    values = pd.to_numeric(values, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    codes = np.clip(np.searchsorted(edges, values, side='right') - 1, 0, len(edges) - 2)
+    codes[np.isnan(values)] = -1
+    return codes
+
+
+def _edge_labels(edges):
+    labels = [f"{low:g}-{high:g}" for low, high in zip(edges[:-2], edges[1:-1])]
+    return labels + [f"{edges[-2]:g}+"]
+
+
+def _target_values(df):
+    if TARGET not in df.columns:
+        return None
+    target = pd.to_numeric(df[TARGET], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    return None if np.isnan(target).any() else target
+
+
+def survival_heatmap(df, target):
+    """
+    Частка тих, хто вижив, у клітинках вік × вартість квитка.
+
+    Returns:
+        dict або None: age_labels, fare_labels, counts та rates (рядки - вік, колонки - вартість;
+                       rate = None, якщо в клітинці менше MIN_CELL_ROWS пасажирів)
+    """
+    if target is None or 'Age' not in df.columns or 'Fare' not in df.columns:
+        return None
+
+    age = _bin_codes(df['Age'], AGE_EDGES)
+    fare = _bin_codes(df['Fare'], FARE_EDGES)
+    valid = (age >= 0) & (fare >= 0)
+    shape = (len(AGE_EDGES) - 1, len(FARE_EDGES) - 1)
+    cells = age[valid] * shape[1] + fare[valid]
+    counts = np.bincount(cells, minlength=shape[0] * shape[1]).reshape(shape)
+    survived = np.bincount(cells, weights=target[valid], minlength=shape[0] * shape[1]).reshape(shape)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rates = np.where(counts >= MIN_CELL_ROWS, survived / counts, np.nan)
+    return {
+        'age_labels': _edge_labels(AGE_EDGES),
+        'fare_labels': _edge_labels(FARE_EDGES),
+        'counts': counts.tolist(),
+        'rates': [[None if np.isnan(rate) else float(rate) for rate in row] for row in rates],
+        'n_rows': int(valid.sum()),
+    }
+
+
+def grouped_histograms(df, target):
+    """
+    Гістограми віку та вартості квитка для кожного класу та статі.
+
+    Returns:
+        dict: {колонка: {група: {'labels', 'groups', 'counts', 'survived'}}}
+              (counts та survived - списки (групи × кошики))
+    """
+    histograms = {}
+    for column, edges in HISTOGRAM_COLUMNS.items():
+        if column not in df.columns:
+            continue
+        bins = _bin_codes(df[column], edges)
+        n_bins = len(edges) - 1
+        histograms[column] = {}
+        for group_column in GROUP_COLUMNS:
+            if group_column not in df.columns:
+                continue
+            groups, group_values = pd.factorize(df[group_column], sort=True)
+            if len(group_values) > MAX_GROUPS:
+                continue
+            valid = (bins >= 0) & (groups >= 0)
+            cells = groups[valid] * n_bins + bins[valid]
+            size = len(group_values) * n_bins
+            counts = np.bincount(cells, minlength=size).reshape(-1, n_bins)
+            entry = {'labels': _edge_labels(edges), 'groups': [str(value) for value in group_values],
+                     'counts': counts.tolist(), 'survived': None}
+            if target is not None:
+                survived = np.bincount(cells, weights=target[valid], minlength=size).reshape(-1, n_bins)
+                entry['survived'] = survived.astype(np.int64).tolist()
+            histograms[column][group_column] = entry
+    return histograms
+
+
+def missing_matrix(df, n_blocks=MISSING_ROW_BLOCKS):
+    """
+    Пропуски: частка пропусків кожної колонки в n_blocks послідовних блоках рядків
+    та частка рядків, де пропущені обидві колонки пари.
+
+    Returns:
+        dict: columns, fractions (по колонках), blocks (блоки × колонки),
+              block_starts (перший рядок блоку), co_missing (колонки × колонки)
+    """
+    columns = [str(column) for column in df.columns]
+    missing = df.isna().to_numpy()
+    n_rows = len(df)
+    if n_rows == 0:
+        return {'columns': columns, 'fractions': [0.0] * len(columns), 'blocks': [],
+                'block_starts': [], 'co_missing': [[0.0] * len(columns) for _ in columns]}
+
+    starts = np.unique(np.arange(min(n_blocks, n_rows)) * n_rows // min(n_blocks, n_rows))
+    sizes = np.diff(np.append(starts, n_rows))
+    block_missing = np.add.reduceat(missing.view(np.uint8), starts, axis=0, dtype=np.int64)
+    as_float = missing.astype(np.float32)
+    co_missing = (as_float.T @ as_float) / n_rows
+
+    return {
+        'columns': columns,
+        'fractions': (missing.sum(axis=0) / n_rows).tolist(),
+        'blocks': (block_missing / sizes[:, None]).tolist(),
+        'block_starts': starts.tolist(),
+        'co_missing': co_missing.tolist(),
+    }
+
+
+def compute_exploration(df, version=None):
+    """
+    Рахує всі агрегати для графіків дослідження датасету.
+
+    Returns:
+        dict: {'version', 'n_rows', 'heatmap', 'histograms', 'missing'}
+    """
+    target = _target_values(df)
+    return {
+        'version': version,
+        'n_rows': len(df),
+        'heatmap': survival_heatmap(df, target),
+        'histograms': grouped_histograms(df, target),
+        'missing': missing_matrix(df),
+    }
+
+
+def get_exploration(df, version):
+    """
+    Повертає агрегати версії датасету (з кешу або рахує їх).
+
+    Args:
+        df: DataFrame
+        version: Версія датасету (будь-який хешований ключ, що змінюється разом з даними)
+
+    Returns:
+        dict: Див. compute_exploration
+    """
+    if version in _explorations:
+        _explorations.move_to_end(version)
+        return _explorations[version]
+
+    exploration = compute_exploration(df, version)
+    _explorations[version] = exploration
+    if len(_explorations) > MAX_CACHED_EXPLORATIONS:
+        _explorations.popitem(last=False)
+    return exploration
+
+
+def heatmap_figure(heatmap):
+    """Теплова карта частки тих, хто вижив (вік × вартість квитка)."""
+    rates = [[None if rate is None else rate * 100 for rate in row] for row in heatmap['rates']]
+    fig = go.Figure(go.Heatmap(
+        z=rates, x=heatmap['fare_labels'], y=heatmap['age_labels'], customdata=heatmap['counts'],
+        colorscale='RdYlGn', zmin=0, zmax=100, colorbar=dict(title='Вижили, %'),
+        hovertemplate='Вік: %{y}<br>Вартість: %{x}<br>Вижили: %{z:.0f}%<br>Пасажирів: %{customdata}<extra></extra>'
+    ))
+    fig.update_layout(title='Частка тих, хто вижив: вік × вартість квитка', xaxis_title='Вартість квитка',
+                      yaxis_title='Вік', height=450, margin=dict(l=10, r=10, t=40, b=10))
+    return fig
+
+
+def histogram_figure(histogram, column, group_column, survived_only=False):
+    """Гістограма колонки для кожної групи (класу або статі)."""
+    values = histogram['survived'] if survived_only and histogram['survived'] is not None else histogram['counts']
+    fig = go.Figure([
+        go.Bar(x=histogram['labels'], y=counts, name=f"{group_column} = {group}")
+        for group, counts in zip(histogram['groups'], values)
+    ])
+    fig.update_layout(title=f"{column} за {group_column}" + (" (лише ті, хто вижив)" if survived_only else ""),
+                      xaxis_title=column, yaxis_title='Пасажирів', barmode='group', height=400,
+                      margin=dict(l=10, r=10, t=40, b=10))
+    return fig
+
+
+def missing_figures(missing):
+    """
+    Матриця пропусків (блоки рядків × колонки) та спільні пропуски пар колонок.
+
+    Returns:
+        tuple: (фігура блоків, фігура пар колонок)
+    """
+    blocks = go.Figure(go.Heatmap(
+        z=[[fraction * 100 for fraction in row] for row in missing['blocks']],
+        x=missing['columns'], y=missing['block_starts'], colorscale='Blues', zmin=0, zmax=100,
+        colorbar=dict(title='Пропущено, %'),
+        hovertemplate='Колонка: %{x}<br>Рядки від %{y}<br>Пропущено: %{z:.1f}%<extra></extra>'
+    ))
+    blocks.update_layout(title='Пропуски по блоках рядків', yaxis_title='Перший рядок блоку',
+                         yaxis_autorange='reversed', height=400, margin=dict(l=10, r=10, t=40, b=10))
+
+    pairs = go.Figure(go.Heatmap(
+        z=[[fraction * 100 for fraction in row] for row in missing['co_missing']],
+        x=missing['columns'], y=missing['columns'], colorscale='Blues', zmin=0,
+        colorbar=dict(title='Рядків, %'),
+        hovertemplate='%{y} і %{x} пропущені разом: %{z:.1f}% рядків<extra></extra>'
+    ))
+    pairs.update_layout(title='Спільні пропуски пар колонок', height=400, margin=dict(l=10, r=10, t=40, b=10))
+    return blocks, pairs
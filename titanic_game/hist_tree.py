@@ -0,0 +1,472 @@
+"""
+Модуль з деревом рішень, що навчається на гістограмах.
+Кожна ознака розбивається на кошики (bins), і для пошуку розділень
+достатньо кількості пасажирів кожного класу в кожному кошику. Тому дерево
+можна навчати частинами (chunks) на даних, які не вміщуються в пам'ять.
+"""
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.base import BaseEstimator, ClassifierMixin
+
+# Максимальна кількість кошиків на ознаку (номер кошика вміщується в uint8)
+MAX_BINS = 256
+
+# Кількість рядків, які обробляються одним bincount (обмежує тимчасову пам'ять)
+BINCOUNT_BLOCK = 1 << 18
+
+# Кількість вузлів, для яких розділення шукаються одночасно
+SPLIT_BATCH = 256
+
+
+def compute_bin_edges(quantiles_per_feature, max_bins=MAX_BINS):
+    """
+    Перетворює кандидати-квантилі кожної ознаки на межі кошиків.
+
+    Args:
+        quantiles_per_feature: Список масивів з квантилями (або унікальними значеннями) кожної ознаки
+        max_bins: Максимальна кількість кошиків
+
+    Returns:
+        list: Список відсортованих масивів меж (не більше max_bins - 1 межі на ознаку)
+    """
+    edges = []
+    for values in quantiles_per_feature:
+        values = np.unique(np.asarray(values, dtype=np.float64))
+        values = values[~np.isnan(values)]
+        if len(values) > max_bins - 1:
+            positions = np.linspace(0, len(values) - 1, max_bins - 1).round().astype(np.int64)
+            values = np.unique(values[positions])
+        edges.append(values)
+    return edges
+
+
+def quantile_bin_edges(X, max_bins=MAX_BINS):
+    """
+    Межі кошиків з квантилів кожної ознаки даних у пам'яті.
+
+    Returns:
+        list: Межі кошиків для кожної ознаки (див. compute_bin_edges)
+    """
+    X = np.asarray(X, dtype=np.float64)
+    levels = np.linspace(0, 1, max_bins + 1)[1:-1]
+    return compute_bin_edges(
+        [np.nanquantile(X[:, f], levels) if not np.all(np.isnan(X[:, f])) else []
+         for f in range(X.shape[1])],
+        max_bins
+    )
+
+
+def prebin(X, max_bins=MAX_BINS):
+    """
+    Розкладає дані по кошиках один раз, щоб потім навчати багато дерев
+    (з різною глибиною чи підмножиною ознак) без повторного сортування.
+
+    Args:
+        X: Матриця ознак (numpy масив або DataFrame)
+        max_bins: Максимальна кількість кошиків на ознаку
+
+    Returns:
+        tuple: (binned - масив uint8, bin_edges - межі кошиків для кожної ознаки)
+    """
+    bin_edges = quantile_bin_edges(X, max_bins)
+    return bin_data(X, bin_edges), bin_edges
+
+
+def bin_data(X, bin_edges):
+    """
+    Розкладає значення ознак по кошиках.
+    Кошик b містить значення з (edges[b-1], edges[b]], пропущені значення - останній кошик.
+
+    Returns:
+        numpy.ndarray: Масив номерів кошиків (uint8) розміром як X
+    """
+    X = np.asarray(X, dtype=np.float64)
+    binned = np.empty(X.shape, dtype=np.uint8)
+    for feature, edges in enumerate(bin_edges):
+        binned[:, feature] = np.searchsorted(edges, X[:, feature], side='left')
+    return binned
+
+
+class HistogramTreeClassifier(ClassifierMixin, BaseEstimator):
+    """
+    Дерево рішень (критерій Gini) для класів 0/1, що росте рівень за рівнем
+    з гістограм кількостей класів по кошиках.
+
+    Навчене дерево має такий самий інтерфейс, як DecisionTreeClassifier:
+    predict, predict_proba, score, apply та feature_importances_.
+
+    Args:
+        max_depth: Максимальна глибина дерева (None - без обмеження)
+        min_samples_split: Мінімальна кількість прикладів у вузлі для розділення
+        min_samples_leaf: Мінімальна кількість прикладів у листі
+        max_bins: Максимальна кількість кошиків на ознаку
+    """
+
+    def __init__(self, max_depth=5, min_samples_split=2, min_samples_leaf=1, max_bins=MAX_BINS):
+        self.max_depth = max_depth
+        self.min_samples_split = min_samples_split
+        self.min_samples_leaf = min_samples_leaf
+        self.max_bins = max_bins
+
+    def fit(self, X, y):
+        """
+        Навчає дерево на даних у пам'яті.
+        Межі кошиків - квантилі кожної ознаки.
+        """
+        binned, bin_edges = prebin(X, self.max_bins)
+        return self.fit_binned(binned, y, bin_edges)
+
+    def fit_binned(self, binned, y, bin_edges):
+        """
+        Навчає дерево на вже розкладених по кошиках даних (див. prebin).
+
+        Для кожної пари дочірніх вузлів гістограма рахується тільки для
+        меншого з них, а гістограма більшого - різниця з батьківською.
+        Тому кожен рівень дерева переглядає не більше половини рядків.
+        Для вузлів, які вже не можна розділити, гістограми не рахуються.
+
+        Args:
+            binned: Масив номерів кошиків uint8 (рядки × ознаки)
+            y: Цільова змінна (0/1)
+            bin_edges: Межі кошиків для кожної ознаки (стовпця binned)
+
+        Returns:
+            self
+        """
+        binned = np.asarray(binned, dtype=np.uint8)
+        y = np.asarray(y, dtype=np.int64)
+        self._setup(bin_edges)
+        importances = np.zeros(self.n_features_in_)
+
+        # Рядки вузлів поточного рівня лежать в order підряд (sizes - кількість рядків вузла)
+        nodes = [0]
+        order = np.arange(len(y))
+        sizes = np.array([len(y)])
+        counts = np.bincount(y, minlength=2)[None, :]
+        depth = 0
+        can_split = self._can_split(counts, depth)
+        hist = self._histograms(binned, y, None, None, 1) if can_split[0] else None
+
+        while can_split.any():
+            self._set_values(nodes, counts)
+            candidates = np.flatnonzero(can_split)
+            split_slots = self._split_nodes([nodes[i] for i in candidates], hist, importances)
+            if not split_slots:
+                break
+
+            # Розподіляємо рядки розділених вузлів між дітьми (лівий, правий) одразу для всього рівня
+            split_positions = candidates[split_slots]
+            rank = np.full(len(nodes), -1)
+            rank[split_positions] = np.arange(len(split_positions))
+            row_rank = np.repeat(rank, sizes)
+            keep = row_rank >= 0
+            order, row_rank = order[keep], row_rank[keep]
+
+            split_nodes = [nodes[i] for i in split_positions]
+            features = np.array([self._feature[node] for node in split_nodes])
+            split_bins = np.array([self._split_bin[node] for node in split_nodes])
+            go_right = binned[order, features[row_rank]] > split_bins[row_rank]
+
+            child = 2 * row_rank + go_right
+            n_children = 2 * len(split_nodes)
+            counts = np.bincount(2 * child + y[order], minlength=2 * n_children).reshape(n_children, 2)
+            order = order[np.argsort(child, kind='stable')]
+            sizes = counts.sum(axis=1)
+            nodes = [c for node in split_nodes for c in (self._left[node], self._right[node])]
+
+            depth += 1
+            can_split = self._can_split(counts, depth)
+            if not can_split.any():
+                break
+
+            # Гістограма меншого з пари рахується, більшого - різниця з батьківською
+            pairs = np.flatnonzero(can_split[0::2] | can_split[1::2])
+            smaller_is_left = sizes[2 * pairs] <= sizes[2 * pairs + 1]
+            slot_of_child = np.full(n_children, -1)
+            slot_of_child[2 * pairs + ~smaller_is_left] = np.arange(len(pairs))
+            row_slot = np.repeat(slot_of_child, sizes)
+            wanted = row_slot >= 0
+            smaller = self._histograms(binned, y, order[wanted], row_slot[wanted], len(pairs))
+            larger = hist[np.asarray(split_slots)[pairs]] - smaller
+
+            smaller_is_left = smaller_is_left[:, None, None]
+            hist = np.empty((2 * len(pairs),) + smaller.shape[1:], dtype=np.int64)
+            hist[0::2] = np.where(smaller_is_left, smaller, larger)
+            hist[1::2] = np.where(smaller_is_left, larger, smaller)
+
+            # Залишаємо гістограми тільки вузлів, які можна розділити
+            hist = hist[can_split[(2 * pairs[:, None] + np.arange(2)).ravel()]]
+            del smaller, larger
+
+        self._set_values(nodes, counts)
+        self._finalize_tree(importances)
+        return self
+
+    def fit_chunks(self, make_chunks, bin_edges):
+        """
+        Навчає дерево частинами, не тримаючи всі дані в пам'яті.
+
+        Дерево росте рівень за рівнем: за кожен прохід по даних для всіх вузлів
+        поточного рівня накопичуються гістограми (вузол × кошик × клас),
+        з яких обираються найкращі розділення. Пам'ять обмежена розміром частини
+        та розміром гістограм, а не розміром даних.
+
+        Args:
+            make_chunks: Функція без аргументів, що повертає новий ітератор пар (X_chunk, y_chunk)
+            bin_edges: Межі кошиків для кожної ознаки (див. compute_bin_edges)
+
+        Returns:
+            self
+        """
+        self._setup(bin_edges)
+        importances = np.zeros(self.n_features_in_)
+        frontier = [0]
+        depth = 0
+
+        while frontier:
+            hist = self._accumulate(make_chunks, frontier)
+            counts = self._node_counts(hist)
+            self._set_values(frontier, counts)
+
+            candidates = np.flatnonzero(self._can_split(counts, depth))
+            split_nodes = [frontier[candidates[slot]]
+                           for slot in self._split_nodes([frontier[i] for i in candidates],
+                                                         hist[candidates], importances)]
+            frontier = [child for node in split_nodes for child in (self._left[node], self._right[node])]
+            depth += 1
+
+        self._finalize_tree(importances)
+        return self
+
+    def _setup(self, bin_edges):
+        self.bin_edges_ = [np.asarray(edges, dtype=np.float64) for edges in bin_edges]
+        self.n_features_in_ = len(self.bin_edges_)
+        self.classes_ = np.array([0, 1])
+
+        # Кошики всіх ознак лежать підряд: ознака f займає [offsets[f], offsets[f + 1])
+        n_bins = [len(edges) + 1 for edges in self.bin_edges_]
+        self._bin_offsets = np.concatenate([[0], np.cumsum(n_bins)])
+
+        self._feature = [-1]
+        self._split_bin = [-1]
+        self._left = [-1]
+        self._right = [-1]
+        self._value = [np.zeros(2)]
+
+    def _accumulate(self, make_chunks, frontier):
+        """Один прохід по даних: гістограми для вузлів frontier."""
+        slots = np.full(len(self._feature), -1, dtype=np.int64)
+        slots[frontier] = np.arange(len(frontier))
+
+        # Поточна (ще не завершена) структура дерева для маршрутизації рядків
+        feature = np.array(self._feature)
+        split_bin = np.array(self._split_bin)
+        left = np.array(self._left)
+        right = np.array(self._right)
+
+        hist = np.zeros((len(frontier), self._bin_offsets[-1], 2), dtype=np.int64)
+        for X_chunk, y_chunk in make_chunks():
+            binned = bin_data(X_chunk, self.bin_edges_)
+            y_chunk = np.asarray(y_chunk, dtype=np.int64)
+
+            nodes = self._route(binned, feature, split_bin, left, right)
+            chunk_slots = slots[nodes]
+            keep = chunk_slots >= 0
+            if not keep.all():
+                binned, y_chunk, chunk_slots = binned[keep], y_chunk[keep], chunk_slots[keep]
+
+            hist += self._bincount(binned, y_chunk, chunk_slots, len(frontier))
+
+        return hist
+
+    def _bincount(self, binned, y, slots, n_slots):
+        """
+        Гістограми (слот × кошик × клас) одним bincount для всіх ознак.
+        Великі масиви обробляються блоками, щоб обмежити тимчасову пам'ять.
+        """
+        n_bins = self._bin_offsets[-1]
+        size = n_slots * n_bins * 2
+
+        hist = np.zeros(size, dtype=np.int64)
+        for start in range(0, len(y), BINCOUNT_BLOCK):
+            block = slice(start, start + BINCOUNT_BLOCK)
+            # Індекс = ((слот, кошик ознаки), клас)
+            index = ((slots[block, None] * n_bins + self._bin_offsets[:-1] + binned[block]) * 2
+                     + y[block, None])
+            hist += np.bincount(index.ravel(), minlength=size)
+
+        return hist.reshape(n_slots, n_bins, 2)
+
+    def _histograms(self, binned, y, rows, slots, n_slots):
+        """Гістограми для n_slots вузлів: rows - номери рядків (None - усі), slots - вузол кожного рядка."""
+        if rows is None:
+            return self._bincount(binned, y, np.zeros(len(y), dtype=np.int64), n_slots)
+        return self._bincount(binned[rows], y[rows], slots, n_slots)
+
+    def _node_counts(self, hist):
+        """Кількості класів у вузлах (однакові для всіх ознак - беремо першу)."""
+        return hist[:, self._bin_offsets[0]:self._bin_offsets[1]].sum(axis=1)
+
+    def _can_split(self, counts, depth):
+        """Маска вузлів, які ще можна розділити (достатньо прикладів, обидва класи, глибина)."""
+        if self.max_depth is not None and depth >= self.max_depth:
+            return np.zeros(len(counts), dtype=bool)
+        total = counts.sum(axis=1)
+        return ((total >= self.min_samples_split) & (total >= 2 * self.min_samples_leaf)
+                & (counts.min(axis=1) > 0))
+
+    def _set_values(self, nodes, counts):
+        for node, node_counts in zip(nodes, counts):
+            self._value[node] = node_counts.astype(np.float64)
+
+    def _split_nodes(self, nodes, hist, importances):
+        """
+        Обирає найкращі розділення для вузлів та створює дочірні вузли.
+
+        Returns:
+            list: Номери (позиції в nodes) вузлів, які було розділено
+        """
+        split_slots = []
+        for start in range(0, len(nodes), SPLIT_BATCH):
+            features, bins, gains = self._best_splits(hist[start:start + SPLIT_BATCH])
+            for offset in np.flatnonzero(gains > 0):
+                slot = start + offset
+                node = nodes[slot]
+                self._feature[node] = int(features[offset])
+                self._split_bin[node] = int(bins[offset])
+                importances[features[offset]] += gains[offset]
+                self._left[node] = self._init_node()
+                self._right[node] = self._init_node()
+                split_slots.append(slot)
+        return split_slots
+
+    def _init_node(self):
+        self._feature.append(-1)
+        self._split_bin.append(-1)
+        self._left.append(-1)
+        self._right.append(-1)
+        self._value.append(np.zeros(2))
+        return len(self._feature) - 1
+
+    def _best_splits(self, hist):
+        """
+        Векторизований пошук найкращого розділення для кожного вузла.
+
+        Returns:
+            tuple: (ознака, кошик, виграш у зваженому Gini) для кожного вузла
+        """
+        node_counts = self._node_counts(hist).astype(np.float64)
+
+        # Кумулятивні суми по кошиках окремо для кожної ознаки
+        left = np.cumsum(hist, axis=1, dtype=np.float64)
+        starts = self._bin_offsets[:-1]
+        before = np.concatenate([np.zeros((len(hist), 1, 2)), left[:, starts[1:] - 1]], axis=1)
+        left -= np.repeat(before, np.diff(self._bin_offsets), axis=1)
+
+        left_0, left_1 = left[:, :, 0], left[:, :, 1]
+        right_0 = node_counts[:, None, 0] - left_0
+        right_1 = node_counts[:, None, 1] - left_1
+        n_left = left_0 + left_1
+        n_right = right_0 + right_1
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Зважений Gini для двох класів: n * (1 - p0² - p1²) = 2 * c0 * c1 / n
+            impurity = 2 * (left_0 * left_1 / n_left + right_0 * right_1 / n_right)
+
+        valid = (n_left >= self.min_samples_leaf) & (n_right >= self.min_samples_leaf)
+        impurity[~valid] = np.inf
+
+        best = impurity.argmin(axis=1)
+        best_impurity = impurity[np.arange(len(hist)), best]
+
+        parent_impurity = 2 * node_counts[:, 0] * node_counts[:, 1] / node_counts.sum(axis=1)
+        gains = np.where(np.isfinite(best_impurity), parent_impurity - best_impurity, 0.0)
+
+        features = np.searchsorted(self._bin_offsets, best, side='right') - 1
+        bins = best - self._bin_offsets[features]
+        return features, bins, np.where(gains > 1e-9, gains, 0.0)
+
+    def _finalize_tree(self, importances):
+        """Перетворює списки вузлів на масиви та обчислює пороги в одиницях ознак."""
+        self.tree_feature_ = np.array(self._feature, dtype=np.int64)
+        self.tree_split_bin_ = np.array(self._split_bin, dtype=np.int64)
+        self.tree_left_ = np.array(self._left, dtype=np.int64)
+        self.tree_right_ = np.array(self._right, dtype=np.int64)
+        self.tree_value_ = np.array(self._value, dtype=np.float64)
+
+        # Поріг: x <= edges[bin] - ліва гілка
+        self.tree_threshold_ = np.full(len(self.tree_feature_), np.nan)
+        for node in np.flatnonzero(self.tree_feature_ >= 0):
+            edges = self.bin_edges_[self.tree_feature_[node]]
+            split_bin = self.tree_split_bin_[node]
+            self.tree_threshold_[node] = edges[split_bin] if split_bin < len(edges) else np.inf
+
+        total = importances.sum()
+        self.feature_importances_ = importances / total if total > 0 else importances
+        self.n_nodes_ = len(self.tree_feature_)
+
+        del self._feature, self._split_bin, self._left, self._right, self._value
+
+    @staticmethod
+    def _route(binned, feature, split_bin, left, right):
+        """Проводить рядки (у кошиках) від кореня до листів."""
+        nodes = np.zeros(len(binned), dtype=np.int64)
+        rows = np.arange(len(binned))
+        while True:
+            node_feature = feature[nodes]
+            is_split = node_feature >= 0
+            if not is_split.any():
+                return nodes
+            go_left = binned[rows, np.maximum(node_feature, 0)] <= split_bin[nodes]
+            nodes = np.where(is_split, np.where(go_left, left[nodes], right[nodes]), nodes)
+
+    def apply(self, X):
+        """Повертає номер листа для кожного рядка."""
+        X = np.asarray(X, dtype=np.float64)
+        nodes = np.zeros(len(X), dtype=np.int64)
+        rows = np.arange(len(X))
+        while True:
+            node_feature = self.tree_feature_[nodes]
+            is_split = node_feature >= 0
+            if not is_split.any():
+                return nodes
+            go_left = X[rows, np.maximum(node_feature, 0)] <= self.tree_threshold_[nodes]
+            nodes = np.where(is_split, np.where(go_left, self.tree_left_[nodes], self.tree_right_[nodes]), nodes)
+
+    def decision_path(self, X):
+        """
+        Повертає шлях кожного рядка від кореня до листа, як DecisionTreeClassifier.
+
+        Returns:
+            scipy.sparse.csr_matrix: Матриця (рядки × вузли) з 1 для вузлів на шляху
+        """
+        X = np.asarray(X, dtype=np.float64)
+        rows = np.arange(len(X))
+        nodes = np.zeros(len(X), dtype=np.int64)
+        path_rows, path_nodes = [], []
+        while len(rows):
+            path_rows.append(rows)
+            path_nodes.append(nodes)
+            is_split = self.tree_feature_[nodes] >= 0
+            rows, nodes = rows[is_split], nodes[is_split]
+            go_left = X[rows, self.tree_feature_[nodes]] <= self.tree_threshold_[nodes]
+            nodes = np.where(go_left, self.tree_left_[nodes], self.tree_right_[nodes])
+
+        # Дочірні вузли мають більші номери, ніж батьківські - сортування дає порядок шляху
+        path_rows = np.concatenate(path_rows)
+        path_nodes = np.concatenate(path_nodes)
+        order = np.lexsort((path_nodes, path_rows))
+        indptr = np.concatenate([[0], np.cumsum(np.bincount(path_rows, minlength=len(X)))])
+        return csr_matrix((np.ones(len(order), dtype=np.int64), path_nodes[order], indptr),
+                          shape=(len(X), self.n_nodes_))
+
+    def predict_proba(self, X):
+        """Ймовірності класів 0 та 1 (частки класів у листі)."""
+        counts = self.tree_value_[self.apply(X)]
+        totals = counts.sum(axis=1, keepdims=True)
+        return np.divide(counts, totals, out=np.full_like(counts, 0.5), where=totals > 0)
+
+    def predict(self, X):
+        """Передбачає клас (0 - загинув, 1 - вижив)."""
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
@@ -0,0 +1,139 @@
+"""
+Модуль для обчислення permutation importance (важливості ознак перестановкою).
+На відміну від feature_importances_ дерева, ця оцінка рахується на відкладених
+даних і не завищує важливість ознак з багатьма значеннями (Age, Fare).
+"""
+
+import os
+import pickle
+import hashlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Кількість перестановок кожної ознаки за замовчуванням
+DEFAULT_REPEATS = 5
+
+# Якщо всі перестановки всіх ознак вміщуються в цей обсяг, вони оцінюються
+# одним викликом predict; інакше - окремий пакет на кожну ознаку (паралельно)
+MAX_BATCH_BYTES = 256 * 1024 * 1024
+
+# Скільки результатів тримати в кеші (один на модель та набір даних)
+MAX_CACHED_RESULTS = 32
+
+# Глобальний кеш результатів: відбиток -> результат
+_cache = OrderedDict()
+
+
+def model_fingerprint(model):
+    """Повертає короткий відбиток (sha1) навченої моделі."""
+    return hashlib.sha1(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)).hexdigest()[:16]
+
+
+def _data_fingerprint(X, y):
+    digest = hashlib.sha1(np.ascontiguousarray(X).tobytes())
+    digest.update(np.ascontiguousarray(y).tobytes())
+    digest.update(str(X.shape).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def _permuted_batch(X, features, n_repeats, random_state):
+    """
+    Будує один стековий пакет: для кожної ознаки n_repeats копій X,
+    у кожній з яких стовпець ознаки перемішано.
+
+    Returns:
+        numpy.ndarray: Масив (len(features) * n_repeats * n_rows, n_features)
+    """
+    n_rows = len(X)
+    batch = np.tile(X, (len(features) * n_repeats, 1))
+    for position, feature in enumerate(features):
+        # Свій генератор на ознаку - результат не залежить від поділу на пакети
+        rng = np.random.default_rng([random_state, feature])
+        permutations = rng.random((n_repeats, n_rows)).argsort(axis=1)
+        rows = slice(position * n_repeats * n_rows, (position + 1) * n_repeats * n_rows)
+        batch[rows, feature] = X[permutations, feature].ravel()
+    return batch
+
+
+def _predict(model, X):
+    if hasattr(model, 'feature_names_in_'):
+        # Модель навчена на DataFrame - передаємо назви колонок, як при навчанні
+        X = pd.DataFrame(X, columns=model.feature_names_in_, copy=False)
+    return np.asarray(model.predict(X))
+
+
+def _score_features(model, X, y, features, n_repeats, random_state):
+    """
+    Оцінює перестановки ознак одним викликом predict.
+
+    Returns:
+        numpy.ndarray: Точність для кожної (ознака, перестановка), розмір (len(features), n_repeats)
+    """
+    batch = _permuted_batch(X, features, n_repeats, random_state)
+    predictions = _predict(model, batch).reshape(len(features), n_repeats, len(X))
+    return (predictions == y).mean(axis=2)
+
+
+def permutation_importance(model, X, y, feature_names=None, n_repeats=DEFAULT_REPEATS,
+                           random_state=42, n_jobs=None, fingerprint=None):
+    """
+    Обчислює permutation importance: наскільки падає точність моделі на
+    відкладених даних, якщо перемішати значення однієї ознаки.
+
+    Усі перестановки генеруються як один стековий пакет і оцінюються одним
+    викликом predict. Якщо пакет завеликий, кожна ознака оцінюється своїм
+    пакетом у паралельних потоках. Результат кешується за відбитком моделі
+    та даних, тому повторні запити (наприклад, при оновленні сторінки) безкоштовні.
+
+    Args:
+        model: Навчена модель з методом predict
+        X: Відкладені дані (DataFrame або numpy.ndarray)
+        y: Правильні відповіді (0/1)
+        feature_names: Назви ознак (за замовчуванням - колонки DataFrame)
+        n_repeats: Скільки разів перемішувати кожну ознаку
+        random_state: Початкове значення генератора
+        n_jobs: Кількість потоків для великих даних (None - всі ядра)
+        fingerprint: Готовий відбиток моделі (model_fingerprint), щоб не рахувати його заново
+
+    Returns:
+        dict: Словник {ознака: {'mean': float, 'std': float}}, відсортований за спаданням mean
+    """
+    if feature_names is None:
+        feature_names = list(getattr(X, 'columns', range(np.shape(X)[1])))
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.int64)
+
+    key = (fingerprint or model_fingerprint(model), _data_fingerprint(X, y),
+           tuple(feature_names), n_repeats, random_state)
+    if key in _cache:
+        _cache.move_to_end(key)
+        return _cache[key]
+
+    features = list(range(X.shape[1]))
+    baseline = float((_predict(model, X) == y).mean())
+
+    if X.nbytes * len(features) * n_repeats <= MAX_BATCH_BYTES:
+        scores = _score_features(model, X, y, features, n_repeats, random_state)
+    else:
+        n_workers = min(n_jobs or os.cpu_count() or 1, len(features))
+        with ThreadPoolExecutor(max_workers=n_workers) as pool:
+            scores = np.vstack(list(pool.map(
+                lambda feature: _score_features(model, X, y, [feature], n_repeats, random_state),
+                features
+            )))
+
+    drops = baseline - scores
+    result = dict(sorted(
+        ((name, {'mean': float(drops[i].mean()), 'std': float(drops[i].std())})
+         for i, name in enumerate(feature_names)),
+        key=lambda item: item[1]['mean'],
+        reverse=True
+    ))
+
+    _cache[key] = result
+    if len(_cache) > MAX_CACHED_RESULTS:
+        _cache.popitem(last=False)
+    return result
@@ -0,0 +1,456 @@
+"""
+Модуль з фоновим виконавцем задач навчання.
+Навчання запускається в обмеженому пулі процесів, а сторінка Streamlit
+лише перевіряє статус задачі на наступних перезапусках скрипта.
+
+Однакові задачі кількох сесій (з однаковим ключем, наприклад відбитком
+канонічних виборів гравця) об'єднуються: навчається тільки перша, а решта
+чекають на неї й отримують той самий результат.
+"""
+
+import os
+import time
+import uuid
+import atexit
+import threading
+import multiprocessing
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+# Статуси задачі
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+FINISHED_STATUSES = {DONE, FAILED, CANCELLED}
+
+# Скільки завершених задач пам'ятати (разом з їх результатами)
+MAX_FINISHED_JOBS = 200
+
+# Скільки останніх тривалостей враховувати в метриках
+METRICS_WINDOW = 500
+
+
+class QueueFullError(RuntimeError):
+    """Черга задач переповнена - нову задачу не прийнято."""
+
+
+class _Job:
+    """Внутрішній запис про задачу."""
+
+    __slots__ = ('id', 'session_id', 'fn', 'args', 'kwargs', 'status', 'future',
+                 'submitted_at', 'started_at', 'finished_at', 'result', 'error',
+                 'key', 'leader', 'followers')
+
+    def __init__(self, session_id, fn, args, kwargs, key=None, leader=None):
+        self.id = uuid.uuid4().hex
+        self.session_id = session_id
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.status = QUEUED
+        self.future = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        # Об'єднання однакових задач: ключ, задача, що навчається (для тих, хто чекає),
+        # та задачі, які чекають на цю
+        self.key = key
+        self.leader = leader
+        self.followers = []
+
+
+def _run_job(progress_store, job_id, fn, args, kwargs):
+    """Точка входу робочого процесу: передає у fn функцію для звітування прогресу."""
+    def progress(value, text=''):
+        progress_store[job_id] = (float(value), text)
+
+    return fn(*args, progress=progress, **kwargs)
+
+
+class TrainingJobExecutor:
+    """
+    Виконавець задач навчання на обмеженому пулі процесів.
+
+    Задачі чекають у власних чергах сесій і відправляються в пул по колу
+    (round-robin), тому одна сесія не може зайняти всі процеси. У пул
+    потрапляє не більше max_workers задач одночасно - решта лишається
+    в черзі й може бути скасована без втрат.
+
+    Задача з ключем coalesce_key, для якого вже є незавершена задача,
+    не навчається: вона чекає на першу задачу та отримує копію її результату.
+    Якщо першу задачу скасовано, вона все одно навчається для тих, хто чекає.
+
+    Args:
+        max_workers: Кількість процесів для навчання
+        max_queued: Максимальна кількість задач у черзі (для всіх сесій)
+        max_per_session: Максимальна кількість незавершених задач однієї сесії
+    """
+
+    def __init__(self, max_workers=None, max_queued=64, max_per_session=1):
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+        self.max_queued = max_queued
+        self.max_per_session = max_per_session
+
+        self._lock = threading.RLock()
+        self._pool = None
+        self._manager = None
+        self._progress = None
+        self._jobs = {}
+        self._queues = OrderedDict()  # session_id -> deque з задачами в черзі
+        self._running = 0
+        self._finished = deque()
+        self._inflight = {}  # ключ -> задача, що навчається (або чекає в черзі)
+
+        self._counters = {'submitted': 0, 'completed': 0, 'failed': 0, 'cancelled': 0, 'rejected': 0,
+                          'coalesced': 0, 'fits_saved': 0}
+        self._wait_times = deque(maxlen=METRICS_WINDOW)
+        self._run_times = deque(maxlen=METRICS_WINDOW)
+
+    def _ensure_pool(self):
+        if self._manager is None:
+            self._manager = multiprocessing.Manager()
+            self._progress = self._manager.dict()
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+
+    def submit(self, session_id, fn, *args, coalesce_key=None, **kwargs):
+        """
+        Ставить задачу в чергу.
+
+        Функція fn має бути на рівні модуля (щоб її можна було передати в інший
+        процес) та приймати аргумент progress(value, text).
+
+        Args:
+            coalesce_key: Ключ однакових задач (None - не об'єднувати). Якщо задача
+                з таким ключем вже навчається або чекає в черзі, нова задача чекає на неї
+
+        Returns:
+            str: Ідентифікатор задачі
+
+        Raises:
+            QueueFullError: Якщо черга або ліміт сесії переповнені
+        """
+        with self._lock:
+            active = sum(
+                1 for job in self._jobs.values()
+                if job.session_id == session_id and job.status not in FINISHED_STATUSES
+            )
+            if active >= self.max_per_session:
+                self._counters['rejected'] += 1
+                raise QueueFullError("У цієї сесії вже є задача навчання. Дочекайтесь її завершення.")
+
+            leader = self._inflight.get(coalesce_key) if coalesce_key is not None else None
+            if leader is not None:
+                # Така сама задача вже є - чекаємо на її результат (місця в черзі не займає)
+                job = _Job(session_id, None, (), {}, key=coalesce_key, leader=leader)
+                leader.followers.append(job)
+                self._jobs[job.id] = job
+                self._counters['submitted'] += 1
+                self._counters['coalesced'] += 1
+                return job.id
+
+            if self.queue_depth() >= self.max_queued:
+                self._counters['rejected'] += 1
+                raise QueueFullError("Сервер зараз зайнятий навчанням інших моделей. Спробуйте пізніше.")
+
+            job = _Job(session_id, fn, args, kwargs, key=coalesce_key)
+            if coalesce_key is not None:
+                self._inflight[coalesce_key] = job
+            self._jobs[job.id] = job
+            self._queues.setdefault(session_id, deque()).append(job)
+            self._counters['submitted'] += 1
+
+            self._dispatch()
+            return job.id
+
+    def _dispatch(self):
+        """Відправляє задачі з черг у пул по колу між сесіями, поки є вільні процеси."""
+        while self._running < self.max_workers and self._queues:
+            session_id, queue = next(iter(self._queues.items()))
+            job = queue.popleft()
+
+            # Сесія переходить у кінець черги - наступною буде інша сесія
+            if queue:
+                self._queues.move_to_end(session_id)
+            else:
+                del self._queues[session_id]
+
+            self._ensure_pool()
+            job.status = RUNNING
+            job.started_at = time.time()
+            self._wait_times.append(job.started_at - job.submitted_at)
+            self._running += 1
+
+            job.future = self._pool.submit(_run_job, self._progress, job.id, job.fn, job.args, job.kwargs)
+            job.fn = job.args = job.kwargs = None
+            job.future.add_done_callback(lambda future, job=job: self._on_done(job, future))
+
+    def _on_done(self, job, future):
+        with self._lock:
+            self._running -= 1
+            job.finished_at = time.time()
+            self._run_times.append(job.finished_at - job.started_at)
+
+            if job.status == CANCELLED:
+                # Процес не можна перервати - результат скасованої задачі відкидаємо
+                pass
+            elif future.exception() is not None:
+                job.status = FAILED
+                job.error = future.exception()
+                self._counters['failed'] += 1
+
+                # Якщо процес пулу аварійно завершився, пул більше не приймає задач
+                if isinstance(job.error, BrokenProcessPool) and self._pool is not None:
+                    self._pool.shutdown(wait=False, cancel_futures=True)
+                    self._pool = None
+            else:
+                job.status = DONE
+                job.result = future.result()
+                self._counters['completed'] += 1
+
+            self._finish_followers(job, future)
+            self._progress.pop(job.id, None)
+            self._remember_finished(job)
+            self._dispatch()
+
+    def _finish_followers(self, job, future):
+        """Передає результат задачі всім задачам, які на неї чекають."""
+        if self._inflight.get(job.key) is job:
+            del self._inflight[job.key]
+
+        error = future.exception()
+        for follower in job.followers:
+            follower.leader = None
+            if follower.status == CANCELLED:
+                continue
+            follower.finished_at = job.finished_at
+            if error is not None:
+                follower.status = FAILED
+                follower.error = error
+                self._counters['failed'] += 1
+            else:
+                follower.status = DONE
+                # Кожна сесія отримує власний словник (модель у ньому спільна і лише читається)
+                result = future.result()
+                follower.result = dict(result) if isinstance(result, dict) else result
+                self._counters['completed'] += 1
+                self._counters['fits_saved'] += 1
+            self._remember_finished(follower)
+        job.followers = []
+
+    def _remember_finished(self, job):
+        self._finished.append(job.id)
+        while len(self._finished) > MAX_FINISHED_JOBS:
+            self._jobs.pop(self._finished.popleft(), None)
+
+    def cancel(self, job_id):
+        """
+        Скасовує задачу. Задача з черги видаляється одразу, а результат
+        задачі, що вже виконується, буде відкинуто після її завершення.
+
+        Returns:
+            bool: True, якщо задачу скасовано
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED_STATUSES:
+                return False
+
+            if job.leader is not None:
+                # Задача лише чекала на іншу - та продовжує навчатись для решти
+                job.leader.followers.remove(job)
+                job.leader = None
+                job.status = CANCELLED
+                job.finished_at = time.time()
+                self._remember_finished(job)
+                self._counters['cancelled'] += 1
+                return True
+
+            if job.followers and job.status == QUEUED:
+                # На задачу чекають інші сесії: місце в черзі переходить до тієї,
+                # яка чекала найдовше
+                self._detach_leader(job, job.followers[0])
+                self._counters['cancelled'] += 1
+                return True
+
+            if self._inflight.get(job.key) is job and job.status == QUEUED:
+                del self._inflight[job.key]
+
+            if job.status == QUEUED:
+                queue = self._queues.get(job.session_id)
+                if queue is not None:
+                    queue.remove(job)
+                    if not queue:
+                        del self._queues[job.session_id]
+                job.finished_at = time.time()
+                self._remember_finished(job)
+
+            job.status = CANCELLED
+            job.fn = job.args = job.kwargs = None
+            self._counters['cancelled'] += 1
+            return True
+
+    def _detach_leader(self, job, successor):
+        """
+        Скасовує задачу з черги, на яку чекають інші: її місце в черзі
+        переходить до successor, а решта чекають уже на нього.
+        """
+        successor.fn, successor.args, successor.kwargs = job.fn, job.args, job.kwargs
+        successor.leader = None
+        successor.followers = [follower for follower in job.followers if follower is not successor]
+        for follower in successor.followers:
+            follower.leader = successor
+        self._inflight[job.key] = successor
+
+        queue = self._queues[job.session_id]
+        queue.remove(job)
+        if not queue:
+            del self._queues[job.session_id]
+        self._queues.setdefault(successor.session_id, deque()).append(successor)
+
+        job.status = CANCELLED
+        job.finished_at = time.time()
+        job.fn = job.args = job.kwargs = None
+        job.followers = []
+        self._remember_finished(job)
+
+    def status(self, job_id):
+        """
+        Повертає поточний стан задачі.
+
+        Returns:
+            dict: Словник зі станом (або None, якщо задачу не знайдено):
+                - status: str - queued/running/done/failed/cancelled
+                - position: int - позиція в черзі (тільки для queued)
+                - progress: float, progress_text: str - прогрес виконання
+                - elapsed: float - скільки секунд задача виконується
+                - error: str - текст помилки (тільки для failed)
+                - coalesced: bool - задача чекає на таку саму задачу іншої сесії
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+
+            # Задача, що чекає на іншу, показує її стан (та навчається і після
+            # скасування, поки на неї чекають)
+            source, status = job, job.status
+            if job.leader is not None and job.status not in FINISHED_STATUSES:
+                source = job.leader
+                status = RUNNING if source.status == CANCELLED else source.status
+
+            info = {'status': status, 'position': None, 'progress': 0.0,
+                    'progress_text': '', 'elapsed': 0.0, 'error': None,
+                    'coalesced': source is not job}
+
+            if status == QUEUED:
+                info['position'] = self._queue_position(source)
+            elif status == RUNNING:
+                info['elapsed'] = time.time() - source.started_at
+                info['progress'], info['progress_text'] = self._progress.get(source.id, (0.0, ''))
+            elif status == FAILED:
+                info['error'] = str(job.error)
+
+            return info
+
+    def _queue_position(self, job):
+        """Позиція задачі в черзі з урахуванням розподілу по колу між сесіями."""
+        own_queue = self._queues.get(job.session_id, ())
+        depth_in_session = list(own_queue).index(job) if job in own_queue else 0
+        # Сесії перед нашою встигнуть відправити depth + 1 задач, після неї - depth
+        position = depth_in_session + 1
+        before_own_session = True
+        for session_id, queue in self._queues.items():
+            if session_id == job.session_id:
+                before_own_session = False
+            elif before_own_session:
+                position += min(len(queue), depth_in_session + 1)
+            else:
+                position += min(len(queue), depth_in_session)
+        return position
+
+    def result(self, job_id):
+        """Повертає результат завершеної задачі (або None)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.result if job is not None and job.status == DONE else None
+
+    def queue_depth(self):
+        """Кількість задач, що чекають у черзі."""
+        with self._lock:
+            return sum(len(queue) for queue in self._queues.values())
+
+    def metrics(self):
+        """
+        Повертає метрики виконавця.
+
+        Returns:
+            dict: Глибина черги, кількість задач, що виконуються, лічильники
+                задач (coalesced - задачі, що чекали на таку саму задачу іншої сесії,
+                fits_saved - скільки навчань завдяки цьому не виконувалось, coalescing -
+                скільки задач чекає зараз) та середній / p95 час очікування і навчання (в секундах)
+        """
+        with self._lock:
+            def percentiles(values):
+                if not values:
+                    return 0.0, 0.0
+                array = np.fromiter(values, dtype=np.float64)
+                return float(array.mean()), float(np.percentile(array, 95))
+
+            wait_mean, wait_p95 = percentiles(self._wait_times)
+            run_mean, run_p95 = percentiles(self._run_times)
+
+            return {
+                'queue_depth': self.queue_depth(),
+                'coalescing': sum(len(job.followers) for job in self._inflight.values()),
+                'running': self._running,
+                'max_workers': self.max_workers,
+                'sessions_waiting': len(self._queues),
+                **self._counters,
+                'wait_time_mean': wait_mean,
+                'wait_time_p95': wait_p95,
+                'run_time_mean': run_mean,
+                'run_time_p95': run_p95,
+            }
+
+    def shutdown(self):
+        """Зупиняє пул процесів (незавершені задачі з черги скасовуються)."""
+        with self._lock:
+            for job_id in [job.id for queue in self._queues.values() for job in queue]:
+                self.cancel(job_id)
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+            if self._manager is not None:
+                self._manager.shutdown()
+                self._manager = None
+
+
+# Глобальний виконавець, спільний для всіх сесій процесу
+_executor = None
+
+
+def get_executor():
+    """Створює (або повертає закешований) спільний виконавець задач навчання."""
+    global _executor
+
+    if _executor is None:
+        _executor = TrainingJobExecutor(
+            max_workers=int(os.environ.get('TITANIC_TRAINING_WORKERS', 0)) or None,
+            max_queued=int(os.environ.get('TITANIC_TRAINING_QUEUE', 64))
+        )
+    return _executor
+
+
+@atexit.register
+def _shutdown_executor():
+    if _executor is not None:
+        _executor.shutdown()
@@ -0,0 +1,287 @@
+"""
+Модуль з таблицею лідерів ігрового режиму.
+Кожна завершена спроба зберігається у локальній базі SQLite. Запис виконується
+асинхронно пакетами у фоновому потоці, щоб не сповільнювати сторінку.
+"""
+
+import os
+import json
+import time
+import queue
+import atexit
+import sqlite3
+import threading
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+LEADERBOARD_PATH = os.environ.get('TITANIC_LEADERBOARD_PATH',
+                                  os.path.join(RESULTS_DIR, 'leaderboard.db'))
+
+# Параметри пакетного запису
+BATCH_SIZE = 1000
+FLUSH_INTERVAL = 1.0
+MAX_PENDING = 10000
+
+# Вибори, за якими рахуємо агрегати (колонка таблиці runs -> назва для людини)
+CHOICE_DIMENSIONS = {
+    'algorithm': 'Алгоритм',
+    'features': 'Ознаки',
+    'age_strategy': 'Обробка віку',
+    'dropna_strategy': 'Пропущені значення',
+    'max_depth': 'Max Depth',
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    session_id TEXT,
+    fingerprint TEXT NOT NULL,
+    choices TEXT NOT NULL,
+    algorithm TEXT,
+    features TEXT,
+    age_strategy TEXT,
+    dropna_strategy TEXT,
+    max_depth TEXT,
+    train_accuracy REAL NOT NULL,
+    test_accuracy REAL NOT NULL,
+    f1 REAL NOT NULL,
+    fit_time REAL,
+    total_time REAL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_test_accuracy ON runs (test_accuracy DESC, f1 DESC);
+CREATE INDEX IF NOT EXISTS idx_runs_fingerprint ON runs (fingerprint, test_accuracy);
+
+-- Агрегати по кожному вибору оновлюються разом із записом спроб,
+-- тому їх читання не потребує перегляду всієї таблиці runs
+CREATE TABLE IF NOT EXISTS choice_stats (
+    dimension TEXT NOT NULL,
+    value TEXT NOT NULL,
+    runs INTEGER NOT NULL,
+    sum_test_accuracy REAL NOT NULL,
+    sum_f1 REAL NOT NULL,
+    best_test_accuracy REAL NOT NULL,
+    PRIMARY KEY (dimension, value)
+) WITHOUT ROWID;
+"""
+
+_INSERT_RUN = """
+INSERT INTO runs (created_at, session_id, fingerprint, choices, algorithm, features,
+                  age_strategy, dropna_strategy, max_depth,
+                  train_accuracy, test_accuracy, f1, fit_time, total_time)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_UPSERT_STATS = """
+INSERT INTO choice_stats (dimension, value, runs, sum_test_accuracy, sum_f1, best_test_accuracy)
+VALUES (?, ?, 1, ?, ?, ?)
+ON CONFLICT (dimension, value) DO UPDATE SET
+    runs = runs + 1,
+    sum_test_accuracy = sum_test_accuracy + excluded.sum_test_accuracy,
+    sum_f1 = sum_f1 + excluded.sum_f1,
+    best_test_accuracy = MAX(best_test_accuracy, excluded.best_test_accuracy)
+"""
+
+
+def _connect(path):
+    """Відкриває з'єднання з базою (WAL дозволяє читати під час запису з інших процесів)."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=NORMAL')
+    connection.executescript(_SCHEMA)
+    return connection
+
+
+class Leaderboard:
+    """
+    Таблиця лідерів з асинхронним пакетним записом.
+
+    record() лише кладе запис у чергу. Фоновий потік збирає записи в пакети
+    (до BATCH_SIZE або раз на FLUSH_INTERVAL секунд) і записує кожен пакет
+    однією транзакцією. Якщо черга переповнена, запис відкидається.
+
+    Args:
+        path: Шлях до файлу бази SQLite
+    """
+
+    def __init__(self, path=LEADERBOARD_PATH):
+        self.path = path
+        self._queue = queue.Queue(maxsize=MAX_PENDING)
+        self._local = threading.local()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self.dropped = 0
+
+    def _reader(self):
+        """З'єднання для читання (окреме для кожного потоку)."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = _connect(self.path)
+            self._local.connection = connection
+        return connection
+
+    def _ensure_writer(self):
+        with self._writer_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._write_loop, name='leaderboard-writer', daemon=True)
+                self._writer.start()
+
+    def record(self, fingerprint, choices, train_accuracy, test_accuracy, f1,
+               fit_time=None, total_time=None, session_id=None):
+        """
+        Додає завершену спробу в чергу на запис (не блокує).
+
+        Args:
+            fingerprint: Відбиток канонічних виборів (training.choices_fingerprint)
+            choices: Канонічні вибори гравця (training.canonical_choices)
+            train_accuracy, test_accuracy, f1: Метрики моделі
+            fit_time, total_time: Тривалість навчання та всієї оцінки (в секундах)
+            session_id: Ідентифікатор сесії гравця
+
+        Returns:
+            bool: True, якщо запис прийнято в чергу
+        """
+        # Серіалізація виконується у фоновому потоці
+        record = (time.time(), session_id, fingerprint, choices,
+                  float(train_accuracy), float(test_accuracy), float(f1), fit_time, total_time)
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _write_loop(self):
+        connection = _connect(self.path)
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            while len(batch) < BATCH_SIZE:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            self._write_batch(connection, batch)
+
+    def _write_batch(self, connection, batch):
+        rows = []
+        stats = []
+        for created_at, session_id, fingerprint, choices, train_accuracy, test_accuracy, f1, \
+                fit_time, total_time in batch:
+            values = {
+                'algorithm': choices.get('algorithm'),
+                'features': ', '.join(choices.get('features') or []),
+                'age_strategy': choices.get('age_strategy'),
+                'dropna_strategy': choices.get('dropna_strategy'),
+                'max_depth': None if choices.get('max_depth') is None else str(choices['max_depth']),
+            }
+            rows.append((created_at, session_id, fingerprint, json.dumps(choices, ensure_ascii=False),
+                         *values.values(), train_accuracy, test_accuracy, f1, fit_time, total_time))
+            for dimension, value in values.items():
+                if value is not None:
+                    stats.append((dimension, value, test_accuracy, f1, test_accuracy))
+
+        try:
+            with connection:
+                connection.executemany(_INSERT_RUN, rows)
+                connection.executemany(_UPSERT_STATS, stats)
+        except sqlite3.Error:
+            self.dropped += len(batch)
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    def flush(self, timeout=None):
+        """Чекає, доки всі записи з черги будуть збережені (для тестів та завершення роботи)."""
+        if self._writer is None:
+            return
+        if timeout is None:
+            self._queue.join()
+            return
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def top(self, limit=10):
+        """
+        Повертає найкращі спроби за точністю на тесті.
+
+        Returns:
+            list: Список словників з метриками та виборами
+        """
+        rows = self._reader().execute(
+            "SELECT created_at, algorithm, features, max_depth, test_accuracy, train_accuracy, f1, fit_time "
+            "FROM runs ORDER BY test_accuracy DESC, f1 DESC LIMIT ?", (limit,)
+        ).fetchall()
+        keys = ['created_at', 'algorithm', 'features', 'max_depth', 'test_accuracy',
+                'train_accuracy', 'f1', 'fit_time']
+        return [dict(zip(keys, row)) for row in rows]
+
+    def percentile(self, test_accuracy, fingerprint=None):
+        """
+        Обчислює, яку частку спроб обігнала модель з такою точністю.
+
+        Args:
+            test_accuracy: Точність моделі на тесті
+            fingerprint: Якщо вказано - порівнювати тільки зі спробами з такими ж виборами
+
+        Returns:
+            dict: percentile (0-100) та total - кількість спроб для порівняння
+        """
+        connection = self._reader()
+        if fingerprint is None:
+            total, worse = connection.execute(
+                "SELECT (SELECT COUNT(*) FROM runs), "
+                "(SELECT COUNT(*) FROM runs WHERE test_accuracy < ?)", (test_accuracy,)
+            ).fetchone()
+        else:
+            total, worse = connection.execute(
+                "SELECT (SELECT COUNT(*) FROM runs WHERE fingerprint = ?), "
+                "(SELECT COUNT(*) FROM runs WHERE fingerprint = ? AND test_accuracy < ?)",
+                (fingerprint, fingerprint, test_accuracy)
+            ).fetchone()
+        return {
+            'percentile': 100.0 * worse / total if total else 0.0,
+            'total': total
+        }
+
+    def choice_aggregates(self, dimension):
+        """
+        Повертає агрегати по одному вибору (наприклад, по алгоритму).
+
+        Returns:
+            list: Список словників value, runs, mean_test_accuracy, mean_f1, best_test_accuracy
+        """
+        if dimension not in CHOICE_DIMENSIONS:
+            raise ValueError(f"Невідомий вибір: {dimension}")
+
+        rows = self._reader().execute(
+            "SELECT value, runs, sum_test_accuracy / runs, sum_f1 / runs, best_test_accuracy "
+            "FROM choice_stats WHERE dimension = ? ORDER BY sum_test_accuracy / runs DESC",
+            (dimension,)
+        ).fetchall()
+        keys = ['value', 'runs', 'mean_test_accuracy', 'mean_f1', 'best_test_accuracy']
+        return [dict(zip(keys, row)) for row in rows]
+
+
+# Глобальна таблиця лідерів (одна на процес)
+_leaderboard = None
+
+
+def get_leaderboard():
+    """Створює (або повертає закешовану) таблицю лідерів."""
+    global _leaderboard
+
+    if _leaderboard is None:
+        _leaderboard = Leaderboard()
+    return _leaderboard
+
+
+@atexit.register
+def _flush_leaderboard():
+    if _leaderboard is not None:
+        _leaderboard.flush(timeout=5)
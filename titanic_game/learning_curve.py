@@ -0,0 +1,187 @@
+"""
+Модуль з кривою навчання для навчального режиму.
+Модель Good Fit навчається на тренувальних вибірках зростаючого розміру,
+кожен розмір - з кількома різними поділами (seed). Усі навчання виконуються
+паралельно, а матриця ознак передається процесам через спільну пам'ять
+(cross_validation.run_shared), тому той самий код працює і для мільйонів рядків.
+
+Крива зберігається поруч з comparison_results.pkl, тому сторінка показує
+її одразу, без навчання.
+"""
+
+import os
+import json
+import pickle
+import hashlib
+
+import numpy as np
+import plotly.graph_objects as go
+from sklearn.tree import DecisionTreeClassifier
+
+from cross_validation import run_shared, MIN_ROWS_FOR_PARALLEL
+
+MODELS_DIR = os.path.join(os.path.dirname(__file__), 'models')
+LEARNING_CURVE_PATH = os.path.join(MODELS_DIR, 'learning_curve.pkl')
+
+# Параметри кривої за замовчуванням
+N_SIZES = 12
+N_SEEDS = 5
+MIN_TRAIN_ROWS = 10
+TEST_SIZE = 0.3
+
+# Скільки тестових рядків оцінювати (на мільйонах рядків достатньо вибірки)
+MAX_TEST_ROWS = 200000
+
+# Кеш завантаженої кривої (шлях, час зміни файлу, крива) та готових графіків
+_curve_cache = None
+_figures_cache = {}
+
+
+def training_sizes(n_train, n_sizes=N_SIZES, min_rows=MIN_TRAIN_ROWS):
+    """Розміри тренувальних вибірок: рівномірно в логарифмічній шкалі до n_train."""
+    min_rows = min(min_rows, n_train)
+    return np.unique(np.geomspace(min_rows, n_train, n_sizes).astype(np.int64)).tolist()
+
+
+def _split(n_rows, seed, test_size=TEST_SIZE, max_test_rows=MAX_TEST_ROWS):
+    """Поділ рядків для одного seed: (порядок тренувальних рядків, тестові рядки)."""
+    order = np.random.default_rng(seed).permutation(n_rows)
+    n_test = int(round(n_rows * test_size))
+    return order[n_test:], order[:min(n_test, max_test_rows)]
+
+
+def _fit_size(X, y, params, size, seed):
+    """
+    Навчає модель на перших size рядках тренувального порядку seed.
+    Менші вибірки - префікси більших, тому крива показує ефект саме кількості даних.
+    """
+    train_order, test_idx = _split(len(y), seed)
+    train_idx = train_order[:size]
+
+    model = DecisionTreeClassifier(random_state=seed, **params)
+    model.fit(X[train_idx], y[train_idx])
+    return {
+        'size': size,
+        'seed': seed,
+        'train_accuracy': float(np.mean(model.predict(X[train_idx]) == y[train_idx])),
+        'test_accuracy': float(np.mean(model.predict(X[test_idx]) == y[test_idx])),
+    }
+
+
+def compute_learning_curve(X, y, params, n_sizes=N_SIZES, n_seeds=N_SEEDS, n_jobs=None):
+    """
+    Обчислює криву навчання.
+
+    Args:
+        X: Матриця ознак (тільки числа)
+        y: Цільова змінна (0/1)
+        params: Параметри DecisionTreeClassifier (модель Good Fit)
+        n_sizes: Кількість розмірів тренувальної вибірки
+        n_seeds: Скільки різних поділів для кожного розміру
+        n_jobs: Кількість процесів (None - всі ядра, 1 - без паралелізму)
+
+    Returns:
+        dict: Словник з результатами:
+            - sizes: list - розміри тренувальних вибірок
+            - train_mean, train_std, test_mean, test_std: list - точність по розмірах
+            - params, n_rows, n_seeds: параметри обчислення
+    """
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    y = np.ascontiguousarray(y, dtype=np.int64)
+    n_train = len(y) - int(round(len(y) * TEST_SIZE))
+    sizes = training_sizes(n_train, n_sizes)
+
+    # На маленьких датасетах запуск процесів коштує більше, ніж навчання
+    if len(y) < MIN_ROWS_FOR_PARALLEL:
+        n_jobs = 1
+    tasks = [(params, size, seed) for size in sizes for seed in range(n_seeds)]
+    fits = run_shared(_fit_size, (X, y), tasks, n_jobs)
+
+    train = np.array([fit['train_accuracy'] for fit in fits]).reshape(len(sizes), n_seeds)
+    test = np.array([fit['test_accuracy'] for fit in fits]).reshape(len(sizes), n_seeds)
+    return {
+        'sizes': sizes,
+        'train_mean': train.mean(axis=1).tolist(),
+        'train_std': train.std(axis=1).tolist(),
+        'test_mean': test.mean(axis=1).tolist(),
+        'test_std': test.std(axis=1).tolist(),
+        'params': dict(params),
+        'n_rows': int(len(y)),
+        'n_seeds': n_seeds,
+    }
+
+
+def curve_fingerprint(curve):
+    """Відбиток кривої (змінюється тільки після перерахунку)."""
+    payload = json.dumps(curve, sort_keys=True, default=float)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def save_learning_curve(curve, path=LEARNING_CURVE_PATH):
+    """Зберігає криву поруч з результатами порівняння моделей."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'wb') as f:
+        pickle.dump(curve, f)
+
+
+def load_learning_curve(params=None, path=LEARNING_CURVE_PATH):
+    """
+    Завантажує збережену криву (з кешем, доки файл не змінився).
+
+    Args:
+        params: Якщо вказано - крива має бути обчислена з такими параметрами моделі
+
+    Returns:
+        dict або None: Крива (None, якщо її немає або її обчислено для інших параметрів)
+    """
+    global _curve_cache
+
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    if _curve_cache is not None and _curve_cache[:2] == (path, mtime):
+        curve = _curve_cache[2]
+    else:
+        try:
+            with open(path, 'rb') as f:
+                curve = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        _curve_cache = (path, mtime, curve)
+    if params is not None and curve.get('params') != params:
+        return None
+    return curve
+
+
+def learning_curve_figure(curve):
+    """
+    Будує графік кривої навчання (середнє ± стандартне відхилення по seed).
+    Готовий графік кешується, тому перезапуск сторінки його не перебудовує.
+    """
+    fingerprint = curve_fingerprint(curve)
+    if fingerprint in _figures_cache:
+        return _figures_cache[fingerprint]
+
+    sizes = curve['sizes']
+    fig = go.Figure()
+    for name, key, color, fill in [('Train Accuracy', 'train', '#3498db', 'rgba(52, 152, 219, 0.2)'),
+                                   ('Test Accuracy', 'test', '#e74c3c', 'rgba(231, 76, 60, 0.2)')]:
+        mean = np.array(curve[f'{key}_mean']) * 100
+        std = np.array(curve[f'{key}_std']) * 100
+        fig.add_trace(go.Scatter(
+            x=list(sizes) + list(sizes)[::-1], y=list(mean + std) + list(mean - std)[::-1],
+            fill='toself', fillcolor=fill, line=dict(width=0), hoverinfo='skip', showlegend=False
+        ))
+        fig.add_trace(go.Scatter(x=sizes, y=mean, mode='lines+markers', name=name, line=dict(color=color)))
+    fig.update_layout(
+        title='Крива навчання: точність залежно від кількості тренувальних даних',
+        xaxis_title='Кількість тренувальних записів',
+        yaxis_title='Точність (%)',
+        xaxis_type='log',
+        height=450
+    )
+
+    _figures_cache.clear()
+    _figures_cache[fingerprint] = fig
+    return fig
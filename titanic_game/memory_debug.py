@@ -0,0 +1,297 @@
+"""
+Модуль для діагностики пам'яті сесій гравців.
+
+Після кожного перезапуску сторінки рахується глибокий розмір кожного ключа
+st.session_state (DataFrame - через memory_usage(deep=True), масиви numpy -
+nbytes, моделі sklearn - рекурсивно по атрибутах), а звіт сесії записується
+у спільний для процесу реєстр. Так видно і розмір окремих ключів, і всі
+сесії процесу разом.
+
+Якщо увімкнено tracemalloc, на кожному перезапуску також зберігаються
+найбільші місця виділення пам'яті та їх приріст з попереднього знімка.
+Звіт можна експортувати в JSON для аналізу поза додатком.
+
+Діагностика вмикається змінною середовища TITANIC_MEMORY_DEBUG=1
+(TITANIC_TRACEMALLOC=1 одразу вмикає і tracemalloc).
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+MEMORY_DEBUG = os.environ.get('TITANIC_MEMORY_DEBUG', '0') == '1'
+
+# Папка для експортованих звітів
+MEMORY_DIR = os.environ.get('TITANIC_MEMORY_DIR',
+                            os.path.join(os.path.dirname(__file__), 'results', 'memory'))
+
+# Скільки кадрів стеку зберігає tracemalloc та скільки місць виділення показувати
+TRACE_FRAMES = 10
+TOP_ALLOCATORS = 15
+
+# Звіти сесій, які не оновлювались довше (в секундах), видаляються з реєстру
+REPORT_TTL = 3600
+
+# Ключі, вміст яких показується окремо (наприклад, game_choices.df_processed)
+EXPANDED_KEYS = {'game_choices', 'training_result'}
+
+# Реєстр звітів сесій процесу та останній знімок tracemalloc
+_session_reports = {}
+_reports_lock = threading.Lock()
+_last_snapshot = None
+
+if os.environ.get('TITANIC_TRACEMALLOC', '0') == '1' and not tracemalloc.is_tracing():
+    tracemalloc.start(TRACE_FRAMES)
+
+
+def deep_sizeof(obj, seen=None):
+    """
+    Глибокий розмір об'єкта в байтах.
+    Об'єкти, які вже пораховано (seen), не рахуються вдруге.
+
+    Args:
+        obj: Будь-який об'єкт
+        seen: Словник {id: об'єкт} вже порахованих об'єктів (об'єкт тримається, щоб
+              id тимчасових об'єктів, як-от стану дерев sklearn, не використовувались повторно)
+
+    Returns:
+        int: Розмір у байтах
+    """
+    if seen is None:
+        seen = {}
+    if id(obj) in seen:
+        return 0
+    seen[id(obj)] = obj
+
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        usage = obj.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(obj, pd.DataFrame) else usage)
+    if isinstance(obj, pd.Index):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        # Масив, що володіє даними, рахується разом з ними; представлення іншого масиву - лише
+        # заголовок. Дані, якими володіє не numpy (наприклад, вузли дерева sklearn), - повністю
+        size = sys.getsizeof(obj)
+        if obj.base is not None and not isinstance(obj.base, np.ndarray):
+            size += obj.nbytes
+        if obj.dtype == object:
+            size += sum(deep_sizeof(item, seen) for item in obj.ravel())
+        return size
+    if isinstance(obj, (str, bytes, bytearray, int, float, bool, complex)) or obj is None:
+        return sys.getsizeof(obj)
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        return size + sum(deep_sizeof(key, seen) + deep_sizeof(value, seen) for key, value in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return size + sum(deep_sizeof(item, seen) for item in obj)
+
+    # Об'єкти (моделі sklearn тощо): атрибути або стан для pickle (дерева sklearn - Cython)
+    if hasattr(obj, '__dict__'):
+        size += deep_sizeof(vars(obj), seen)
+    elif type(obj).__getstate__ is not object.__getstate__:
+        try:
+            size += deep_sizeof(obj.__getstate__(), seen)
+        except (TypeError, ValueError):
+            pass
+    for slot in getattr(type(obj), '__slots__', ()):
+        if hasattr(obj, slot):
+            size += deep_sizeof(getattr(obj, slot), seen)
+    return size
+
+
+def session_memory(state):
+    """
+    Розмір кожного ключа стану сесії.
+    Вміст ключів з EXPANDED_KEYS показується окремими рядками (ключ.підключ).
+
+    Args:
+        state: st.session_state (або будь-який словник)
+
+    Returns:
+        dict: {ключ: байти}, від найбільшого до найменшого
+    """
+    seen = {}
+    sizes = {}
+    for key in list(state.keys()):
+        value = state[key]
+        if key in EXPANDED_KEYS and isinstance(value, dict):
+            seen[id(value)] = value
+            for sub_key, sub_value in value.items():
+                sizes[f"{key}.{sub_key}"] = deep_sizeof(sub_value, seen)
+        else:
+            sizes[str(key)] = deep_sizeof(value, seen)
+    return dict(sorted(sizes.items(), key=lambda item: -item[1]))
+
+
+def process_memory():
+    """
+    Пам'ять процесу.
+
+    Returns:
+        dict: rss (поточна, якщо доступна), max_rss, traced_current та traced_peak (tracemalloc)
+    """
+    rss = None
+    try:
+        with open('/proc/self/statm') as f:
+            rss = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+
+    max_rss = None
+    try:
+        import resource
+        # ru_maxrss - в кілобайтах на Linux і в байтах на macOS
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        max_rss *= 1 if sys.platform == 'darwin' else 1024
+    except ImportError:
+        pass
+
+    traced_current, traced_peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (None, None)
+    return {'rss': rss, 'max_rss': max_rss, 'traced_current': traced_current, 'traced_peak': traced_peak}
+
+
+def set_tracing(enabled):
+    """Вмикає або вимикає tracemalloc (для всього процесу)."""
+    global _last_snapshot
+
+    if enabled and not tracemalloc.is_tracing():
+        tracemalloc.start(TRACE_FRAMES)
+    elif not enabled and tracemalloc.is_tracing():
+        tracemalloc.stop()
+        _last_snapshot = None
+
+
+def _format_statistic(stat):
+    frame = stat.traceback[0]
+    return {
+        'location': f"{frame.filename}:{frame.lineno}",
+        'size': stat.size,
+        'size_diff': getattr(stat, 'size_diff', None),
+        'count': stat.count,
+    }
+
+
+def top_allocators(limit=TOP_ALLOCATORS):
+    """
+    Знімок tracemalloc: найбільші місця виділення пам'яті та найбільший приріст
+    з попереднього знімка.
+
+    Returns:
+        dict або None: top та growth (списки location, size, size_diff, count); None без tracemalloc
+    """
+    global _last_snapshot
+
+    if not tracemalloc.is_tracing():
+        return None
+
+    snapshot = tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+        tracemalloc.Filter(False, '<unknown>'),
+    ])
+    top = [_format_statistic(stat) for stat in snapshot.statistics('lineno')[:limit]]
+    growth = []
+    if _last_snapshot is not None:
+        growth = [_format_statistic(stat) for stat in snapshot.compare_to(_last_snapshot, 'lineno')[:limit]
+                  if stat.size_diff > 0]
+    _last_snapshot = snapshot
+    return {'top': top, 'growth': growth}
+
+
+def record_session(session_id, state, trace=True):
+    """
+    Рахує пам'ять сесії та записує звіт у реєстр процесу (викликається на кожному перезапуску).
+
+    Args:
+        session_id: Ідентифікатор сесії
+        state: st.session_state
+        trace: Зберегти знімок tracemalloc (якщо його увімкнено)
+
+    Returns:
+        dict: Звіт сесії (keys, total, updated_at, allocators)
+    """
+    keys = session_memory(state)
+    report = {
+        'keys': keys,
+        'total': sum(keys.values()),
+        'updated_at': time.time(),
+        'allocators': top_allocators() if trace else None,
+    }
+
+    with _reports_lock:
+        _session_reports[session_id] = report
+        expired = [sid for sid, item in _session_reports.items()
+                   if item['updated_at'] < report['updated_at'] - REPORT_TTL]
+        for sid in expired:
+            del _session_reports[sid]
+    return report
+
+
+def forget_session(session_id):
+    """Видаляє звіт сесії з реєстру."""
+    with _reports_lock:
+        _session_reports.pop(session_id, None)
+
+
+def process_report():
+    """
+    Звіт по всіх сесіях процесу.
+
+    Returns:
+        dict: process (process_memory), sessions ({id: звіт}), total (сума по сесіях)
+              та by_key (сума по ключах у всіх сесіях)
+    """
+    with _reports_lock:
+        sessions = {sid: dict(report) for sid, report in _session_reports.items()}
+
+    by_key = {}
+    for report in sessions.values():
+        for key, size in report['keys'].items():
+            # game_choices.df_processed та подібні - разом по всіх сесіях
+            by_key[key] = by_key.get(key, 0) + size
+    return {
+        'pid': os.getpid(),
+        'created_at': time.time(),
+        'process': process_memory(),
+        'sessions': sessions,
+        'total': sum(report['total'] for report in sessions.values()),
+        'by_key': dict(sorted(by_key.items(), key=lambda item: -item[1])),
+    }
+
+
+def export_report(path=None):
+    """
+    Зберігає звіт по всіх сесіях процесу (process_report) у JSON.
+
+    Args:
+        path: Файл звіту (за замовчуванням - MEMORY_DIR/memory-<час>-<pid>.json)
+
+    Returns:
+        str: Шлях до файлу
+    """
+    if path is None:
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        path = os.path.join(MEMORY_DIR, f"memory-{stamp}-{os.getpid()}.json")
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(process_report(), f, ensure_ascii=False, indent=2)
+    return path
+
+
+def format_bytes(size):
+    """Розмір у зручних одиницях (для панелі)."""
+    if size is None:
+        return '—'
+    for unit in ['Б', 'КБ', 'МБ']:
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == 'Б' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.2f} ГБ"
@@ -4,27 +4,53 @@
 """
 
 import pickle
+import hashlib
 import os
 import pandas as pd
 import numpy as np
 
+from artifacts import load_model_artifact
+from drift import get_drift_monitor
+from audit import audit_prediction
+from schema import main_model_schema, load_schema, get_vectorizer
+
 # Шлях до папки з моделями
 MODELS_DIR = os.path.join(os.path.dirname(__file__), 'models')
 MODEL_PATH = os.path.join(MODELS_DIR, 'titanic_model.pkl')
 ENCODER_PATH = os.path.join(MODELS_DIR, 'label_encoder.pkl')
 STATS_PATH = os.path.join(MODELS_DIR, 'feature_stats.pkl')
+SCHEMA_PATH = os.path.join(MODELS_DIR, 'feature_schema.json')
 
 # Глобальні змінні для кешування моделі
 _model = None
+_model_version = None
 _label_encoder = None
 _feature_stats = None
+_vectorizer = None
+_feature_importance = None
+_what_if_cache = {}
+
+# Ознаки основної моделі (порядок схеми schema.main_model_schema)
+FEATURE_NAMES = ['Pclass', 'Sex', 'Age', 'SibSp', 'Parch', 'Fare']
+
+# Значення кожної ознаки для аналізу "що, якби" (Sex задається окремо через LabelEncoder)
+WHAT_IF_VALUES = {
+    'Pclass': np.array([1, 2, 3], dtype=np.float64),
+    'Age': np.arange(0, 81, 1, dtype=np.float64),
+    'SibSp': np.arange(0, 9, dtype=np.float64),
+    'Parch': np.arange(0, 7, dtype=np.float64),
+    'Fare': np.arange(0, 521, 4, dtype=np.float64),
+}
+
+# Скільки різних пасажирів тримати в кеші "що, якби"
+WHAT_IF_CACHE_SIZE = 256
 
 def load_model():
     """
     Завантажує навчену модель з файлу.
     Використовує кешування для уникнення повторного завантаження.
     """
-    global _model, _label_encoder, _feature_stats
+    global _model, _model_version, _label_encoder, _feature_stats, _vectorizer
     
     if _model is None:
         if not os.path.exists(MODEL_PATH):
@@ -33,9 +59,12 @@ def load_model():
                 "Спочатку запустіть train_model.py для навчання моделі."
             )
         
-        # Завантажуємо модель
+        # Завантажуємо модель (спільний артефакт для всіх реплік, див. artifacts.py)
+        _model = load_model_artifact(MODEL_PATH)
+        
+        # Версія моделі для журналу аудиту - відбиток файлу моделі
         with open(MODEL_PATH, 'rb') as f:
-            _model = pickle.load(f)
+            _model_version = hashlib.sha1(f.read()).hexdigest()[:12]
         
         # Завантажуємо LabelEncoder
         with open(ENCODER_PATH, 'rb') as f:
@@ -51,9 +80,26 @@ def load_model():
                 'age_median': 28.0,
                 'fare_median': 14.45
             }
+        
+        # Схема ознак моделі (для моделей без збереженої схеми - з LabelEncoder та статистики)
+        if os.path.exists(SCHEMA_PATH):
+            schema = load_schema(SCHEMA_PATH)
+        else:
+            schema = main_model_schema(_label_encoder, _feature_stats)
+        _vectorizer = get_vectorizer(schema)
     
     return _model, _label_encoder, _feature_stats
 
+def get_feature_vectorizer():
+    """Повертає скомпільований векторизатор схеми ознак завантаженої моделі (schema.Vectorizer)."""
+    load_model()
+    return _vectorizer
+
+def get_model_version():
+    """Повертає версію (відбиток файлу) завантаженої моделі."""
+    load_model()
+    return _model_version
+
 def encode_sex(sex: str, label_encoder):
     """
     Перетворює стать з тексту на число.
@@ -83,9 +129,10 @@ def encode_sex(sex: str, label_encoder):
     # Перетворюємо через LabelEncoder
     return label_encoder.transform([sex_english])[0]
 
-def prepare_input(pclass, sex, age, sibsp, parch, fare, label_encoder, feature_stats):
+def prepare_input(pclass, sex, age, sibsp, parch, fare, label_encoder=None, feature_stats=None, *,
+                  vectorizer=None):
     """
-    Підготовлює вхідні дані для передбачення.
+    Підготовлює вхідні дані для передбачення за схемою ознак моделі.
     
     Args:
         pclass: Клас каюти (1, 2, або 3)
@@ -94,26 +141,20 @@ def prepare_input(pclass, sex, age, sibsp, parch, fare, label_encoder, feature_s
         sibsp: Кількість братів/сестер/дружини на борту
         parch: Кількість батьків/дітей на борту
         fare: Вартість квитка
-        label_encoder: LabelEncoder для статі
-        feature_stats: Статистика ознак для заповнення пропусків
+        label_encoder: LabelEncoder для статі (старий інтерфейс: разом з feature_stats
+            задає схему schema.main_model_schema замість схеми завантаженої моделі)
+        feature_stats: Статистика ознак для заповнення пропусків (старий інтерфейс)
+        vectorizer: Векторизатор схеми (за замовчуванням - схема завантаженої моделі)
     
     Returns:
-        numpy.ndarray: Підготовлений масив для передбачення
+        numpy.ndarray: Підготовлений масив (1 × ознаки) для передбачення
     """
-    # Перетворюємо стать
-    sex_encoded = encode_sex(sex, label_encoder)
-    
-    # Заповнюємо пропущені значення
-    if age is None or np.isnan(age):
-        age = feature_stats.get('age_median', 28.0)
-    
-    if fare is None or np.isnan(fare):
-        fare = feature_stats.get('fare_median', 14.45)
-    
-    # Створюємо масив у правильному порядку: Pclass, Sex, Age, SibSp, Parch, Fare
-    input_data = np.array([[pclass, sex_encoded, age, sibsp, parch, fare]])
-    
-    return input_data
+    if vectorizer is None and label_encoder is not None:
+        vectorizer = get_vectorizer(main_model_schema(label_encoder, feature_stats or {}))
+    vectorizer = vectorizer or get_feature_vectorizer()
+    # Стать кодується, а пропуски заповнюються за схемою (див. schema.main_model_schema)
+    return vectorizer.transform({'Pclass': pclass, 'Sex': sex, 'Age': age,
+                                 'SibSp': sibsp, 'Parch': parch, 'Fare': fare})
 
 def predict_survival(pclass, sex, age, sibsp, parch, fare):
     """
@@ -134,10 +175,10 @@ def predict_survival(pclass, sex, age, sibsp, parch, fare):
             - prediction_text: str - текстовий опис результату
     """
     # Завантажуємо модель
-    model, label_encoder, feature_stats = load_model()
+    model, _, _ = load_model()
     
     # Підготовлюємо вхідні дані
-    input_data = prepare_input(pclass, sex, age, sibsp, parch, fare, label_encoder, feature_stats)
+    input_data = prepare_input(pclass, sex, age, sibsp, parch, fare)
     
     # Робимо передбачення
     prediction = model.predict(input_data)[0]
@@ -146,6 +187,13 @@ def predict_survival(pclass, sex, age, sibsp, parch, fare):
     probabilities = model.predict_proba(input_data)[0]
     survival_probability = probabilities[1]  # Ймовірність виживання
     
+    # Записуємо передбачення для моніторингу зсуву (див. drift.py)
+    get_drift_monitor().record(input_data[0], survival_probability)
+    
+    # Журнал аудиту: запис лише кладеться в чергу, файл пише фоновий потік (див. audit.py)
+    audit_prediction((pclass, sex, age, sibsp, parch, fare), input_data[0], prediction,
+                     survival_probability, _model_version)
+    
     # Формуємо результат
     result = {
         'survived': bool(prediction),
@@ -157,24 +205,82 @@ def predict_survival(pclass, sex, age, sibsp, parch, fare):
 
 def get_feature_importance():
     """
-    Повертає важливість ознак моделі.
+    Повертає важливість ознак моделі (impurity-based, з дерева).
+    Для оцінки на відкладених даних див. importance.permutation_importance.
     
     Returns:
         dict: Словник з важливістю кожної ознаки
     """
-    model, _, _ = load_model()
+    global _feature_importance
+    
+    if _feature_importance is None:
+        model, _, _ = load_model()
+        
+        feature_names = getattr(model, 'feature_names_in_', None)
+        if feature_names is None:
+            feature_names = get_feature_vectorizer().feature_names
+        importances = model.feature_importances_
+        
+        feature_importance = dict(zip(feature_names, importances))
+        
+        # Сортуємо за важливістю (один раз - модель не змінюється)
+        _feature_importance = dict(sorted(
+            feature_importance.items(), 
+            key=lambda x: x[1], 
+            reverse=True
+        ))
+    
+    return _feature_importance
+
+def what_if_curves(pclass, sex, age, sibsp, parch, fare):
+    """
+    Рахує ймовірність виживання пасажира, якщо змінювати одну ознаку, а решту залишити.
     
-    feature_names = ['Pclass', 'Sex', 'Age', 'SibSp', 'Parch', 'Fare']
-    importances = model.feature_importances_
+    Сітка (вік 0-80, вартість 0-520, кожен клас, стать, SibSp та Parch)
+    будується один раз і оцінюється одним викликом predict_proba.
+    Результат кешується для кожного пасажира, тому повторний запит безкоштовний.
     
-    feature_importance = dict(zip(feature_names, importances))
+    Args:
+        pclass, sex, age, sibsp, parch, fare: Дані пасажира (як у predict_survival)
     
-    # Сортуємо за важливістю
-    feature_importance = dict(sorted(
-        feature_importance.items(), 
-        key=lambda x: x[1], 
-        reverse=True
-    ))
+    Returns:
+        dict: Словник з результатами:
+            - probability: float - ймовірність виживання самого пасажира
+            - curves: dict - {ознака: (значення ознаки, ймовірності виживання)}
+    """
+    model, label_encoder, feature_stats = load_model()
     
-    return feature_importance
-
+    base = prepare_input(pclass, sex, age, sibsp, parch, fare)[0]
+    key = tuple(float(value) for value in base)
+    if key in _what_if_cache:
+        return _what_if_cache[key]
+    
+    values = dict(WHAT_IF_VALUES)
+    values['Sex'] = label_encoder.transform(['female', 'male']).astype(np.float64)
+    
+    # Перший рядок - сам пасажир, далі блок для кожної ознаки
+    blocks = [base[None, :]]
+    for feature in FEATURE_NAMES:
+        block = np.repeat(base[None, :], len(values[feature]), axis=0)
+        block[:, FEATURE_NAMES.index(feature)] = values[feature]
+        blocks.append(block)
+    
+    probabilities = model.predict_proba(np.vstack(blocks))[:, 1]
+    
+    curves = {}
+    start = 1
+    for feature in FEATURE_NAMES:
+        end = start + len(values[feature])
+        curves[feature] = (values[feature], probabilities[start:end])
+        start = end
+    
+    result = {
+        'probability': float(probabilities[0]),
+        'curves': curves
+    }
+    
+    if len(_what_if_cache) >= WHAT_IF_CACHE_SIZE:
+        _what_if_cache.pop(next(iter(_what_if_cache)))
+    _what_if_cache[key] = result
+    
+    return result
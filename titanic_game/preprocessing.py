@@ -0,0 +1,286 @@
+"""
+Модуль з перетвореннями даних ігрового режиму (кроки 2 та 3).
+Функції не залежать від Streamlit, тому оброблені дані можна відтворити
+з виборів гравця (наприклад, після перезапуску сервера або на іншій репліці).
+
+Закодовані колонки кроку 3 кешуються за відбитком вихідної колонки та обраним
+кодуванням: коли гравець змінює один перемикач, перераховується тільки одна колонка.
+"""
+
+import hashlib
+from collections import OrderedDict
+
+import pandas as pd
+
+# Стратегії обробки пропущеного віку (крок 2)
+AGE_DROP = "Видалити всі рядки з пропущеним віком"
+AGE_MEDIAN = "Заповнити медіаною (середнім значенням)"
+AGE_MEAN = "Заповнити середнім арифметичним"
+AGE_KEEP = "Залишити як є (NaN)"
+AGE_STRATEGIES = [AGE_DROP, AGE_MEDIAN, AGE_MEAN, AGE_KEEP]
+
+# Кодування категоріальних колонок (крок 3): колонка -> варіанти
+SEX_ENCODINGS = [
+    "Male=1, Female=0",
+    "Female=1, Male=0",
+    "За статистикою виживання: Male=1, Female=3",
+    "Протилежні значення: Male=-1, Female=1",
+]
+EMBARKED_ENCODINGS = [
+    "За алфавітом: C, Q, S → 1, 2, 3",
+    "За популярністю порту S=3 (найбільше), C=2, Q=1 (найменше) (за кількістю пасажирів)",
+]
+NAME_ENCODINGS = [
+    "Витягти титулів, сімейного стану (Mr, Mrs, Miss, Master)",
+    "Підрахувати довжину імені (кількість символів)",
+]
+TICKET_ENCODINGS = [
+    "Підрахувати довжину квитка",
+    'Вартість квитка: PC/STON=1 (преміум), A/=2 (середній), Інші=3',
+]
+CABIN_ENCODINGS = [
+    "Є каюта = 1, Немає каюти = 0",
+    "Вища палуба = вище число (A/B/C=3, D/E=2, F/G=1, Немає=0)",
+    "Літера каюти: A=1, B=2, C=3, D=4, E=5, F=6, G=7, Немає=0",
+]
+ENCODINGS = {
+    'Sex': SEX_ENCODINGS,
+    'Embarked': EMBARKED_ENCODINGS,
+    'Name': NAME_ENCODINGS,
+    'Ticket': TICKET_ENCODINGS,
+    'Cabin': CABIN_ENCODINGS,
+}
+CATEGORICAL_COLUMNS = list(ENCODINGS)
+
+SEX_MAPPINGS = {
+    SEX_ENCODINGS[0]: {'male': 1, 'female': 0},
+    SEX_ENCODINGS[1]: {'female': 1, 'male': 0},
+    SEX_ENCODINGS[2]: {'male': 1, 'female': 3},
+    SEX_ENCODINGS[3]: {'male': -1, 'female': 1},
+}
+EMBARKED_MAPPINGS = {
+    EMBARKED_ENCODINGS[0]: {'C': 1, 'Q': 2, 'S': 3},
+    EMBARKED_ENCODINGS[1]: {'S': 3, 'C': 2, 'Q': 1},
+}
+
+TITLE_MAPPING = {
+    'Mr': 1,  # Дорослий чоловік
+    'Mrs': 2,  # Одружена жінка
+    'Miss': 3,  # Неодружена жінка/дівчина
+    'Master': 4,  # Хлопчик
+    'Ms': 3,  # Сучасна форма Miss
+    'Mlle': 3,  # Мадемуазель (Miss)
+    'Mme': 2,  # Мадам (Mrs)
+    'Dr': 5,  # Доктор
+    'Rev': 5,  # Преподобний
+    'Col': 5,  # Полковник
+    'Major': 5,  # Майор
+    'Capt': 5,  # Капітан
+    'Sir': 5,  # Сер
+    'Lady': 5,  # Леді
+    'Don': 5,  # Дон
+    'Dona': 5,  # Донья
+    'Countess': 5,  # Графиня
+    'Jonkheer': 5  # Йонкхер (голландський титул)
+}
+
+DECK_MAPPING = {
+    'A': 1, 'B': 2, 'C': 3, 'D': 4,
+    'E': 5, 'F': 6, 'G': 7, 'T': 8
+}
+
+# Скільки закодованих колонок тримати в кеші (спільний для всіх сесій процесу)
+MAX_CACHED_COLUMNS = 64
+
+# Глобальний кеш: (відбиток вихідної колонки, колонка, кодування) -> закодована колонка
+_encoded_columns = OrderedDict()
+
+
+def prepare_step_2(original_data, cols_to_show, age_strategy, age_stats=None):
+    """
+    Крок 2: вибирає колонки гравця та обробляє пропущений вік.
+
+    Args:
+        original_data: Оригінальний датасет
+        cols_to_show: Колонки, обрані на кроці 1 (разом із Survived)
+        age_strategy: Одна з AGE_STRATEGIES
+        age_stats: Статистика колонки Age (dataset_stats) з mean та median;
+                   якщо не вказано - рахується з даних
+
+    Returns:
+        DataFrame: Нова копія даних
+    """
+    df_step_2 = original_data[cols_to_show].copy()
+    if 'Age' not in df_step_2.columns:
+        return df_step_2
+
+    if age_strategy == AGE_DROP:
+        df_step_2 = df_step_2.dropna(subset=['Age'])
+    elif age_strategy == AGE_MEAN:
+        mean = age_stats['mean'] if age_stats else df_step_2['Age'].mean()
+        df_step_2['Age'] = df_step_2['Age'].fillna(mean)
+    elif age_strategy == AGE_MEDIAN:
+        median = age_stats['median'] if age_stats else df_step_2['Age'].median()
+        df_step_2['Age'] = df_step_2['Age'].fillna(median)
+
+    return df_step_2
+
+
+def classify_ticket(ticket):
+    """Тип квитка за префіксом: 1 - преміум, 2 - середній, 3 - інші."""
+    if pd.isna(ticket):
+        return 3  # Немає інформації
+    ticket_str = str(ticket).upper()
+    if 'PC' in ticket_str or 'STON' in ticket_str:
+        return 1  # Преміум
+    elif ticket_str.startswith('A/') or ticket_str.startswith('A.'):
+        return 2  # Середній
+    else:
+        return 3  # Інші
+
+
+def classify_deck_level(cabin):
+    """Рівень палуби: 3 - верхні (A/B/C), 2 - середні (D/E), 1 - нижні (F/G), 0 - немає каюти."""
+    if pd.isna(cabin):
+        return 0  # Немає каюти
+    deck = str(cabin)[0].upper()  # Перша літера
+    if deck in ['A', 'B', 'C']:
+        return 3  # Верхні палуби (кращі)
+    elif deck in ['D', 'E']:
+        return 2  # Середні палуби
+    elif deck in ['F', 'G']:
+        return 1  # Нижні палуби
+    else:
+        return 0  # Невідомий формат
+
+
+def extract_deck_letter(cabin):
+    """Номер літери каюти (A=1 ... G=7, T=8), 0 - немає каюти."""
+    if pd.isna(cabin):
+        return 0  # Немає каюти
+    deck = str(cabin)[0].upper()
+    return DECK_MAPPING.get(deck, 0)
+
+
+def encode_column(values, column, encoding):
+    """
+    Крок 3: перетворює одну категоріальну колонку на числа.
+
+    Args:
+        values: pandas.Series з оригінальними значеннями колонки
+        column: Назва колонки (одна з CATEGORICAL_COLUMNS)
+        encoding: Обране кодування (див. ENCODINGS)
+
+    Returns:
+        pandas.Series: Закодовані значення (або values без змін, якщо кодування невідоме)
+    """
+    if column == 'Sex' and encoding in SEX_MAPPINGS:
+        return values.map(SEX_MAPPINGS[encoding])
+
+    if column == 'Embarked' and encoding in EMBARKED_MAPPINGS:
+        return values.map(EMBARKED_MAPPINGS[encoding])
+
+    if column == 'Name':
+        if encoding == NAME_ENCODINGS[0]:
+            # Витягуємо титул
+            title_series = values.str.extract(r' ([A-Za-z]+)\.', expand=False)
+            return title_series.map(TITLE_MAPPING).fillna(5)
+        if encoding == NAME_ENCODINGS[1]:
+            return values.str.len()
+
+    if column == 'Ticket':
+        if encoding == TICKET_ENCODINGS[0]:
+            return values.str.len()
+        if encoding == TICKET_ENCODINGS[1]:
+            return values.apply(classify_ticket)
+
+    if column == 'Cabin':
+        if encoding == CABIN_ENCODINGS[0]:
+            return values.notna().astype(int)
+        if encoding == CABIN_ENCODINGS[1]:
+            return values.apply(classify_deck_level)
+        if encoding == CABIN_ENCODINGS[2]:
+            return values.apply(extract_deck_letter)
+
+    return values
+
+
+def column_fingerprint(values):
+    """Відбиток колонки за її значеннями та індексом (один векторизований прохід)."""
+    digest = hashlib.sha1(pd.util.hash_pandas_object(values, index=True).to_numpy().tobytes())
+    return digest.hexdigest()[:16]
+
+
+def step_2_fingerprints(columns, age_strategy):
+    """
+    Відбитки колонок даних кроку 2 за їхнім походженням (без проходу по даних).
+    Колонка кроку 2 залежить тільки від оригінальної колонки та того, чи видалено
+    рядки з пропущеним віком; Age - ще й від обраної стратегії.
+
+    Args:
+        columns: Колонки даних кроку 2
+        age_strategy: Стратегія обробки віку (крок 2)
+
+    Returns:
+        dict: {колонка: відбиток}
+    """
+    rows = 'age_known' if age_strategy == AGE_DROP else 'all'
+    return {column: ('original', column, rows, age_strategy if column == 'Age' else None)
+            for column in columns}
+
+
+def cached_encode_column(values, column, encoding, source_fingerprint=None):
+    """
+    Закодована колонка з кешу або encode_column, якщо вихідна колонка
+    чи кодування змінились.
+
+    Args:
+        values: pandas.Series з вихідними значеннями колонки
+        column: Назва колонки
+        encoding: Обране кодування
+        source_fingerprint: Відбиток вихідної колонки (None - порахувати за значеннями)
+
+    Returns:
+        pandas.Series: Закодовані значення (не змінюйте їх на місці - вони спільні)
+    """
+    if source_fingerprint is None:
+        source_fingerprint = column_fingerprint(values)
+
+    key = (source_fingerprint, column, encoding)
+    if key in _encoded_columns:
+        _encoded_columns.move_to_end(key)
+        return _encoded_columns[key]
+
+    encoded = encode_column(values, column, encoding)
+    _encoded_columns[key] = encoded
+    if len(_encoded_columns) > MAX_CACHED_COLUMNS:
+        _encoded_columns.popitem(last=False)
+    return encoded
+
+
+def apply_encodings(df_step_2, encodings, source_fingerprints=None):
+    """
+    Крок 3: застосовує всі обрані кодування до даних кроку 2.
+
+    Кожна закодована колонка береться з кешу за (відбиток вихідної колонки, кодування),
+    тому перераховуються тільки колонки, у яких змінилось джерело або вибір.
+    Результат збирається з колонок без копіювання незакодованих.
+
+    Args:
+        df_step_2: Дані після кроку 2 (не змінюються)
+        encodings: Словник {колонка: кодування}
+        source_fingerprints: Відбитки колонок df_step_2 (див. step_2_fingerprints);
+                             None - рахуються за значеннями
+
+    Returns:
+        DataFrame: Новий DataFrame із закодованими колонками
+    """
+    source_fingerprints = source_fingerprints or {}
+    columns = {}
+    for column in df_step_2.columns:
+        if column in encodings:
+            columns[column] = cached_encode_column(df_step_2[column], column, encodings[column],
+                                                   source_fingerprints.get(column))
+        else:
+            columns[column] = df_step_2[column]
+    return pd.DataFrame(columns, index=df_step_2.index, copy=False)
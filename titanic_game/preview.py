@@ -0,0 +1,192 @@
+"""
+Модуль для посторінкового перегляду датасетів (кроки 1 та 2 гри).
+Сортування, фільтрація та нарізка сторінок виконуються на сервері за
+заздалегідь побудованими індексами, а готові сторінки (таблиці Arrow)
+кешуються для кожної версії датасету та набору колонок.
+"""
+
+import math
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# Доступні розміри сторінки
+PAGE_SIZES = [25, 50, 100, 250]
+
+# Колонки з такою або меншою кількістю унікальних значень фільтруються вибором значень
+MAX_FILTER_VALUES = 30
+
+# Розміри кешів (найстаріші записи видаляються першими)
+MAX_CACHED_INDEXES = 128
+MAX_CACHED_QUERIES = 256
+MAX_CACHED_PAGES = 512
+
+# Глобальні кеші (спільні для всіх сесій процесу)
+_sort_indexes = OrderedDict()
+_value_indexes = OrderedDict()
+_queries = OrderedDict()
+_pages = OrderedDict()
+
+
+def _remember(cache, key, value, limit):
+    cache[key] = value
+    if len(cache) > limit:
+        cache.popitem(last=False)
+    return value
+
+
+def _cached(cache, key):
+    if key in cache:
+        cache.move_to_end(key)
+        return cache[key]
+    return None
+
+
+def sort_index(df, version, column):
+    """
+    Порядок рядків, відсортованих за колонкою (пропущені значення - в кінці).
+
+    Returns:
+        tuple: (order - позиції рядків у порядку сортування, n_valid - кількість непропущених значень)
+    """
+    key = (version, column)
+    index = _cached(_sort_indexes, key)
+    if index is None:
+        values = df[column].reset_index(drop=True)
+        order = values.sort_values(kind='stable', na_position='last').index.to_numpy()
+        index = _remember(_sort_indexes, key, (order, int(values.notna().sum())), MAX_CACHED_INDEXES)
+    return index
+
+
+def value_index(df, version, column):
+    """
+    Коди значень колонки (factorize): кожне унікальне значення отримує номер.
+
+    Returns:
+        tuple: (codes - код для кожного рядка, uniques - унікальні значення)
+    """
+    key = (version, column)
+    index = _cached(_value_indexes, key)
+    if index is None:
+        codes, uniques = pd.factorize(df[column], use_na_sentinel=False)
+        index = _remember(_value_indexes, key, (codes, uniques), MAX_CACHED_INDEXES)
+    return index
+
+
+def filter_options(df, version, column):
+    """
+    Визначає, як фільтрувати колонку.
+
+    Returns:
+        tuple: ('range', (мін, макс)) для числових колонок з багатьма значеннями,
+               ('values', унікальні значення) для колонок з небагатьма значеннями,
+               ('text', None) для текстових колонок (пошук підрядка)
+    """
+    codes, uniques = value_index(df, version, column)
+    if len(uniques) <= MAX_FILTER_VALUES:
+        return 'values', list(uniques)
+    if pd.api.types.is_numeric_dtype(df[column]):
+        order, n_valid = sort_index(df, version, column)
+        values = df[column].to_numpy()
+        return 'range', (values[order[0]], values[order[n_valid - 1]]) if n_valid else (0, 0)
+    return 'text', None
+
+
+def query(df, version, sort_by=None, descending=False, filter_column=None, filter_value=None):
+    """
+    Повертає позиції рядків після фільтрації та сортування.
+
+    Args:
+        df: DataFrame
+        version: Версія датасету (будь-який хешований ключ, що змінюється разом з даними)
+        sort_by: Колонка для сортування (None - початковий порядок)
+        descending: Сортувати за спаданням
+        filter_column: Колонка для фільтрації (None - без фільтра)
+        filter_value: (мін, макс) для 'range', кортеж номерів значень для 'values',
+                      підрядок для 'text' (див. filter_options)
+
+    Returns:
+        numpy.ndarray або None: Позиції рядків (None - всі рядки в початковому порядку)
+    """
+    key = (version, sort_by, descending, filter_column, filter_value)
+    positions = _cached(_queries, key)
+    if positions is not None or key in _queries:
+        return positions
+
+    positions = None
+    if filter_column is not None and filter_value is not None:
+        kind, _ = filter_options(df, version, filter_column)
+        if kind == 'range':
+            # Діапазон - це суцільний шматок відсортованого індексу
+            order, n_valid = sort_index(df, version, filter_column)
+            sorted_values = df[filter_column].to_numpy()[order[:n_valid]]
+            low, high = filter_value
+            start = np.searchsorted(sorted_values, low, side='left')
+            end = np.searchsorted(sorted_values, high, side='right')
+            positions = np.sort(order[start:end])
+        else:
+            codes, uniques = value_index(df, version, filter_column)
+            if kind == 'values':
+                selected = np.asarray(filter_value, dtype=np.int64)
+            else:
+                # Підрядок шукаємо тільки серед унікальних значень, а не в кожному рядку
+                matches = pd.Series(uniques).astype(str).str.contains(filter_value, case=False, regex=False)
+                selected = np.flatnonzero(matches.to_numpy())
+            positions = np.flatnonzero(np.isin(codes, selected))
+
+    if sort_by is not None:
+        order, n_valid = sort_index(df, version, sort_by)
+        if descending:
+            order = np.concatenate([order[:n_valid][::-1], order[n_valid:]])
+        if positions is None:
+            positions = order
+        else:
+            # Відфільтровані рядки в порядку сортування: позиція рядка в order - його ранг
+            rank = np.empty(len(order), dtype=np.int64)
+            rank[order] = np.arange(len(order))
+            positions = positions[np.argsort(rank[positions], kind='stable')]
+
+    return _remember(_queries, key, positions, MAX_CACHED_QUERIES)
+
+
+def count_rows(df, version, **query_args):
+    """Кількість рядків після фільтрації."""
+    positions = query(df, version, **query_args)
+    return len(df) if positions is None else len(positions)
+
+
+def get_page(df, version, columns, page, page_size, **query_args):
+    """
+    Повертає одну сторінку датасету як таблицю Arrow.
+    Береться тільки видимий шматок рядків, а готові сторінки кешуються,
+    тому повторний показ тієї ж сторінки не серіалізує дані заново.
+
+    Args:
+        df: DataFrame
+        version: Версія датасету
+        columns: Колонки для показу
+        page: Номер сторінки (з 1)
+        page_size: Кількість рядків на сторінці
+        **query_args: Параметри сортування та фільтрації (див. query)
+
+    Returns:
+        tuple: (pyarrow.Table сторінки, кількість рядків після фільтрації, кількість сторінок)
+    """
+    total = count_rows(df, version, **query_args)
+    n_pages = max(1, math.ceil(total / page_size))
+    page = min(max(int(page), 1), n_pages)
+
+    key = (version, tuple(columns), page, page_size, tuple(sorted(query_args.items())))
+    table = _cached(_pages, key)
+    if table is None:
+        start, end = (page - 1) * page_size, min(page * page_size, total)
+        positions = query(df, version, **query_args)
+        rows = np.arange(start, end) if positions is None else positions[start:end]
+
+        page_df = df.iloc[rows][list(columns)]
+        page_df.insert(0, '№', page_df.index)
+        table = _remember(_pages, key, pa.Table.from_pandas(page_df, preserve_index=False), MAX_CACHED_PAGES)
+
+    return table, total, n_pages
@@ -0,0 +1,319 @@
+"""
+Модуль зі схемою ознак моделі та скомпільованим векторизатором.
+
+Схема (JSON-сумісний словник) зберігається разом з кожною моделлю: порядок
+ознак, тип колонки під час навчання, кодування категоріальних колонок
+(як на кроці 3 гри) та значення для заповнення пропусків. З неї один раз
+компілюється Vectorizer: для кожної ознаки заздалегідь обирається
+векторизована функція, тому transform перетворює словник, список словників,
+DataFrame або Arrow RecordBatch / Table у суцільний масив numpy за один прохід
+по ознаках, без розгалужень для кожного рядка чи виклику.
+
+Так модель, навчену в гравця на кроці 6 (з Embarked, титулами, каютами або
+квитками), можна експортувати разом зі схемою та оцінювати на нових пасажирах.
+"""
+
+import io
+import json
+import pickle
+import hashlib
+from functools import partial
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from preprocessing import (SEX_MAPPINGS, EMBARKED_MAPPINGS, TITLE_MAPPING, DECK_MAPPING, AGE_MEAN, AGE_MEDIAN,
+                           CATEGORICAL_COLUMNS, NAME_ENCODINGS, TICKET_ENCODINGS, CABIN_ENCODINGS)
+
+SCHEMA_VERSION = 1
+
+# Рівень палуби (як preprocessing.classify_deck_level)
+DECK_LEVELS = {'A': 3, 'B': 3, 'C': 3, 'D': 2, 'E': 2, 'F': 1, 'G': 1}
+
+# Основна модель (train_model.py): ознаки та заповнення пропусків, яких немає в feature_stats
+MAIN_FEATURES = ['Pclass', 'Sex', 'Age', 'SibSp', 'Parch', 'Fare']
+MAIN_DEFAULTS = {'Pclass': 3, 'SibSp': 0, 'Parch': 0}
+
+# Кеш скомпільованих векторизаторів: відбиток схеми -> Vectorizer
+_vectorizers = {}
+
+
+def encoding_spec(column, encoding):
+    """
+    Опис кодування колонки кроку 3 (preprocessing.encode_column) для схеми.
+
+    Args:
+        column: Назва колонки
+        encoding: Обране кодування (див. preprocessing.ENCODINGS) або None
+
+    Returns:
+        dict: {'kind': ..., параметри} ({'kind': 'number'} для числових колонок)
+    """
+    if column == 'Sex' and encoding in SEX_MAPPINGS:
+        return {'kind': 'map', 'mapping': SEX_MAPPINGS[encoding]}
+    if column == 'Embarked' and encoding in EMBARKED_MAPPINGS:
+        return {'kind': 'map', 'mapping': EMBARKED_MAPPINGS[encoding]}
+    if column == 'Name' and encoding == NAME_ENCODINGS[0]:
+        return {'kind': 'title', 'mapping': TITLE_MAPPING, 'default': 5}
+    if column == 'Ticket' and encoding == TICKET_ENCODINGS[1]:
+        return {'kind': 'ticket_class'}
+    if (column, encoding) in [('Name', NAME_ENCODINGS[1]), ('Ticket', TICKET_ENCODINGS[0])]:
+        return {'kind': 'length'}
+    if column == 'Cabin' and encoding == CABIN_ENCODINGS[0]:
+        return {'kind': 'not_missing'}
+    if column == 'Cabin' and encoding == CABIN_ENCODINGS[1]:
+        return {'kind': 'first_letter', 'mapping': DECK_LEVELS, 'default': 0}
+    if column == 'Cabin' and encoding == CABIN_ENCODINGS[2]:
+        return {'kind': 'first_letter', 'mapping': DECK_MAPPING, 'default': 0}
+    return {'kind': 'number'}
+
+
+def main_model_schema(label_encoder, feature_stats):
+    """
+    Схема основної моделі (ознаки model.FEATURE_NAMES, стать через LabelEncoder).
+
+    Args:
+        label_encoder: LabelEncoder статі (female / male)
+        feature_stats: Медіани віку та вартості квитка
+
+    Returns:
+        dict: Схема
+    """
+    sex_codes = {str(label): int(code) for code, label in enumerate(label_encoder.classes_)}
+    # Українські назви та невідома стать - як у model.encode_sex (невідома - male)
+    sex_codes.update({'чоловік': sex_codes['male'], 'жінка': sex_codes['female']})
+    fills = dict(MAIN_DEFAULTS, Sex=sex_codes['male'], Age=feature_stats.get('age_median', 28.0),
+                 Fare=feature_stats.get('fare_median', 14.45))
+
+    features = []
+    for name in MAIN_FEATURES:
+        encoding = {'kind': 'map', 'mapping': sex_codes} if name == 'Sex' else {'kind': 'number'}
+        features.append({'name': name, 'source': name, 'dtype': 'float64', 'encoding': encoding,
+                         'fill': float(fills[name])})
+    return {'version': SCHEMA_VERSION, 'target': 'Survived', 'features': features}
+
+
+def game_model_schema(df_processed, choices, age_stats=None):
+    """
+    Схема моделі, навченої в гравця (крок 6).
+
+    Значення для пропусків - у просторі закодованих ознак: медіана колонки
+    навчальних даних, а для віку, заповненого на кроці 2, - те саме значення,
+    яким його заповнено (середнє або медіана з age_stats).
+
+    Args:
+        df_processed: Числовий DataFrame з колонкою 'Survived' (дані навчання)
+        choices: st.session_state.game_choices (encoding_choices, age_strategy)
+        age_stats: Статистика колонки Age оригінального датасету (mean, median), як у prepare_step_2
+
+    Returns:
+        dict: Схема
+    """
+    encodings = choices.get('encoding_choices') or {}
+    age_fill = {AGE_MEAN: 'mean', AGE_MEDIAN: 'median'}.get(choices.get('age_strategy'))
+    features = []
+    for name in df_processed.columns.drop('Survived'):
+        values = df_processed[name]
+        encoding = encoding_spec(name, encodings.get(name)) if name in CATEGORICAL_COLUMNS else {'kind': 'number'}
+        if name == 'Age' and age_fill is not None:
+            fill = age_stats[age_fill] if age_stats else getattr(values, age_fill)()
+        else:
+            fill = values.median()
+        features.append({'name': name, 'source': name, 'dtype': str(values.dtype), 'encoding': encoding,
+                         'fill': None if pd.isna(fill) else float(fill)})
+    return {'version': SCHEMA_VERSION, 'target': 'Survived', 'features': features}
+
+
+def schema_fingerprint(schema):
+    """Повертає короткий відбиток (sha1) схеми."""
+    payload = json.dumps(schema, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def _encode_number(values):
+    return pd.to_numeric(np.asarray(values), errors='coerce')
+
+
+def _by_unique(values, encode, **params):
+    """
+    Кодує кожне різне значення колонки один раз (pd.factorize) і розставляє результат
+    по рядках одним індексуванням. Пропуск кодується як окреме значення (None).
+    """
+    codes, uniques = pd.factorize(values)
+    uniques = np.append(np.asarray(uniques, dtype=object), None)
+    return np.asarray(encode(uniques, **params), dtype=np.float64)[codes]
+
+
+def _map(uniques, mapping):
+    # Ключі без урахування регістру та пробілів; невідомі значення - NaN (далі заповнення)
+    return [mapping.get(str(value).strip().casefold(), np.nan) for value in uniques]
+
+
+def _title(uniques, mapping, default):
+    titles = pd.Series(uniques, dtype=object).str.extract(r' ([A-Za-z]+)\.', expand=False)
+    return titles.map(mapping).fillna(default)
+
+
+def _length(uniques):
+    return pd.Series(uniques, dtype=object).str.len()
+
+
+def _ticket_class(uniques):
+    strings = pd.Series(uniques, dtype=object)
+    upper = strings.astype(str).str.upper()
+    ticket_class = np.select(
+        [upper.str.contains('PC', regex=False) | upper.str.contains('STON', regex=False),
+         upper.str.startswith('A/') | upper.str.startswith('A.')],
+        [1.0, 2.0], 3.0
+    )
+    return np.where(strings.isna(), 3.0, ticket_class)
+
+
+def _not_missing(uniques):
+    return pd.notna(uniques)
+
+
+def _first_letter(uniques, mapping, default):
+    strings = pd.Series(uniques, dtype=object)
+    letters = strings.astype(str).str[:1].str.upper().map(mapping).fillna(default)
+    return np.where(strings.isna(), default, letters)
+
+
+def _compile_encoding(encoding):
+    """Обирає функцію кодування один раз (під час компіляції схеми)."""
+    kind = encoding['kind']
+    if kind == 'number':
+        return _encode_number
+    if kind == 'map':
+        mapping = {str(key).strip().casefold(): float(value) for key, value in encoding['mapping'].items()}
+        return partial(_by_unique, encode=_map, mapping=mapping)
+    if kind in ('title', 'first_letter'):
+        return partial(_by_unique, encode=_title if kind == 'title' else _first_letter,
+                       mapping=encoding['mapping'], default=float(encoding['default']))
+    encoders = {'length': _length, 'ticket_class': _ticket_class, 'not_missing': _not_missing}
+    if kind in encoders:
+        return partial(_by_unique, encode=encoders[kind])
+    raise ValueError(f"Невідоме кодування в схемі: {kind}")
+
+
+def _columns(data, names):
+    """
+    Колонки вхідних даних: словник (один пасажир або колонки), список словників, DataFrame, Arrow.
+    З Arrow перетворюються лише потрібні колонки (names).
+    """
+    if isinstance(data, pd.DataFrame):
+        return data, len(data)
+    if isinstance(data, (pa.RecordBatch, pa.Table)):
+        return ({name: data.column(name).to_pandas() for name in names if name in data.column_names},
+                data.num_rows)
+    if isinstance(data, dict):
+        columns = {name: np.atleast_1d(values) for name, values in data.items()}
+        return columns, len(next(iter(columns.values()))) if columns else 0
+    frame = pd.DataFrame.from_records(list(data))
+    return frame, len(frame)
+
+
+class Vectorizer:
+    """
+    Скомпільована схема: перетворює дані пасажирів у масив ознак моделі.
+
+    Attributes:
+        schema: Схема
+        feature_names: Ознаки в порядку моделі
+        sources: Вхідні колонки, потрібні для кожної ознаки
+    """
+
+    def __init__(self, schema, dtype=np.float64):
+        if schema.get('version') != SCHEMA_VERSION:
+            raise ValueError(f"Непідтримувана версія схеми: {schema.get('version')}")
+        self.schema = schema
+        self.dtype = dtype
+        self.feature_names = [feature['name'] for feature in schema['features']]
+        self.sources = [feature['source'] for feature in schema['features']]
+        self._encoders = [_compile_encoding(feature['encoding']) for feature in schema['features']]
+        self._fills = [np.nan if feature['fill'] is None else feature['fill'] for feature in schema['features']]
+
+    def transform(self, data):
+        """
+        Args:
+            data: Словник (один пасажир або колонки), список словників, DataFrame,
+                  pyarrow.RecordBatch або pyarrow.Table з вихідними колонками
+
+        Returns:
+            ndarray: Суцільний (C-order) масив (рядки × ознаки)
+        """
+        columns, n_rows = _columns(data, self.sources)
+        missing = [source for source in self.sources if source not in columns]
+        if missing:
+            raise ValueError(f"У даних немає колонок: {', '.join(missing)}")
+
+        X = np.empty((n_rows, len(self._encoders)), dtype=self.dtype)
+        for j, (source, encode, fill) in enumerate(zip(self.sources, self._encoders, self._fills)):
+            values = np.asarray(encode(columns[source]), dtype=np.float64)
+            X[:, j] = np.where(np.isnan(values), fill, values)
+        return X
+
+
+def get_vectorizer(schema):
+    """Повертає скомпільований векторизатор схеми (з кешу процесу)."""
+    key = schema_fingerprint(schema)
+    if key not in _vectorizers:
+        _vectorizers[key] = Vectorizer(schema)
+    return _vectorizers[key]
+
+
+def save_schema(schema, path):
+    """Зберігає схему в JSON."""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(schema, f, ensure_ascii=False, indent=2)
+
+
+def load_schema(path):
+    """Завантажує схему з JSON."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def bundle_bytes(model, schema):
+    """
+    Модель разом зі схемою в одному файлі (pickle) для експорту.
+
+    Returns:
+        bytes: Вміст файлу
+    """
+    buffer = io.BytesIO()
+    pickle.dump({'version': SCHEMA_VERSION, 'model': model, 'schema': schema}, buffer)
+    return buffer.getvalue()
+
+
+def load_bundle(source):
+    """
+    Завантажує експортовану модель (bundle_bytes).
+
+    Args:
+        source: Шлях до файлу або його вміст (bytes)
+
+    Returns:
+        dict: model, schema та vectorizer (скомпільована схема)
+    """
+    if isinstance(source, bytes):
+        bundle = pickle.loads(source)
+    else:
+        with open(source, 'rb') as f:
+            bundle = pickle.load(f)
+    return {'model': bundle['model'], 'schema': bundle['schema'], 'vectorizer': get_vectorizer(bundle['schema'])}
+
+
+def predict_bundle(bundle, data):
+    """
+    Ймовірності виживання для нових пасажирів за експортованою моделлю.
+
+    Args:
+        bundle: Результат load_bundle
+        data: Дані пасажирів (див. Vectorizer.transform)
+
+    Returns:
+        ndarray: Ймовірності класу 1
+    """
+    return bundle['model'].predict_proba(bundle['vectorizer'].transform(data))[:, 1]
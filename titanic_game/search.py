@@ -0,0 +1,204 @@
+"""
+Модуль з пошуком гіперпараметрів оптимальної моделі (Good Fit) методом
+successive halving.
+
+Усі кандидати спочатку оцінюються крос-валідацією на невеликій частці
+тренувальних даних; у наступний раунд переходить 1/eta найкращих, а частка
+даних зростає в eta разів, доки останні кандидати не оцінюються на всіх даних.
+Кандидати оцінюються паралельно в окремих процесах, а одна підготовлена
+матриця ознак передається їм через спільну пам'ять (cross_validation.run_shared).
+
+Найкращі параметри та повна таблиця результатів зберігаються поруч з моделлю
+(best_params.json, search_results.csv), і train_model.py навчає модель з ними.
+"""
+
+import os
+import json
+import math
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import ParameterGrid
+from sklearn.tree import DecisionTreeClassifier
+
+from cross_validation import run_shared, make_fold_assignments, _binary_metrics
+
+MODELS_DIR = os.path.join(os.path.dirname(__file__), 'models')
+BEST_PARAMS_PATH = os.path.join(MODELS_DIR, 'best_params.json')
+SEARCH_RESULTS_PATH = os.path.join(MODELS_DIR, 'search_results.csv')
+
+# Параметри моделі Good Fit до пошуку (з ноутбука Chapter_3_Ov_Un.ipynb)
+GOOD_FIT_PARAMS = {'max_depth': 5, 'min_samples_split': 20, 'min_samples_leaf': 1, 'criterion': 'gini'}
+
+PARAM_GRID = {
+    'max_depth': [2, 3, 4, 5, 6, 7, 8, 10, 12, None],
+    'min_samples_split': [2, 5, 10, 20, 40, 80],
+    'min_samples_leaf': [1, 2, 5, 10, 20],
+    'criterion': ['gini', 'entropy'],
+}
+
+# У скільки разів скорочується кількість кандидатів (і зростає частка даних) за раунд
+ETA = 3
+
+# Мінімум тренувальних рядків у фолді першого раунду
+MIN_ROWS = 100
+
+# Скільки задач на один процес (кілька кандидатів в одній задачі зменшують накладні витрати)
+TASKS_PER_WORKER = 4
+
+
+def _evaluate_candidates(X, y, folds, ranks, candidates, fraction, random_state):
+    """
+    Оцінює кандидатів крос-валідацією на частці тренувальних даних кожного фолду.
+
+    Рядки з ranks < fraction утворюють вкладені підвибірки: дані раунду
+    містять дані всіх попередніх раундів. Тестова частина фолду - завжди повна.
+
+    Returns:
+        list: Для кожного кандидата словник accuracy, accuracy_std, f1, train_accuracy, fit_time
+    """
+    n_splits = int(folds.max()) + 1
+    in_fraction = ranks < fraction
+    splits = [(np.flatnonzero((folds != fold) & in_fraction), np.flatnonzero(folds == fold))
+              for fold in range(n_splits)]
+
+    results = []
+    for params in candidates:
+        accuracies, f1_scores, train_accuracies = [], [], []
+        started = time.perf_counter()
+        for train_idx, test_idx in splits:
+            model = DecisionTreeClassifier(random_state=random_state, **params)
+            model.fit(X[train_idx], y[train_idx])
+            metrics = _binary_metrics(y[test_idx], model.predict(X[test_idx]))
+            accuracies.append(metrics['accuracy'])
+            f1_scores.append(metrics['f1'])
+            train_accuracies.append(float(np.mean(model.predict(X[train_idx]) == y[train_idx])))
+        results.append({
+            'accuracy': float(np.mean(accuracies)),
+            'accuracy_std': float(np.std(accuracies, ddof=1)) if n_splits > 1 else 0.0,
+            'f1': float(np.mean(f1_scores)),
+            'train_accuracy': float(np.mean(train_accuracies)),
+            'fit_time': time.perf_counter() - started,
+        })
+    return results
+
+
+def halving_fractions(n_candidates, n_rows, eta=ETA, min_rows=MIN_ROWS):
+    """
+    Частки даних для кожного раунду (остання - 1.0).
+
+    Раундів стільки, щоб залишився один кандидат, але не більше, ніж дозволяє
+    min_rows для першого раунду.
+    """
+    needed = 1 + math.ceil(math.log(max(n_candidates, 1), eta))
+    allowed = 1 + int(math.floor(math.log(max(n_rows / min_rows, 1), eta)))
+    n_rounds = max(1, min(needed, allowed))
+    return [float(eta ** (i - n_rounds + 1)) for i in range(n_rounds)]
+
+
+def successive_halving(X, y, param_grid=PARAM_GRID, eta=ETA, n_splits=5, min_rows=MIN_ROWS,
+                       n_jobs=None, random_state=42, verbose=True):
+    """
+    Шукає найкращі гіперпараметри DecisionTreeClassifier.
+
+    Args:
+        X: Матриця ознак (тренувальні дані)
+        y: Цільова змінна (0/1)
+        param_grid: Сітка параметрів (словник списків, як у sklearn)
+        eta: У скільки разів скорочується кількість кандидатів за раунд
+        n_splits: Кількість фолдів крос-валідації
+        min_rows: Мінімум тренувальних рядків у фолді першого раунду
+        n_jobs: Кількість процесів (None - всі ядра, 1 - без паралелізму)
+        random_state: Початкове значення генератора
+        verbose: Виводити хід пошуку
+
+    Returns:
+        dict: Словник з результатами:
+            - best_params: dict - параметри найкращого кандидата
+            - best_score: float - його точність на крос-валідації (на всіх даних)
+            - results: DataFrame - оцінки всіх кандидатів у всіх раундах
+            - fractions: list - частки даних раундів
+    """
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    y = np.ascontiguousarray(y, dtype=np.int64)
+    folds = make_fold_assignments(y, n_splits, 1, random_state)[0]
+    ranks = np.random.default_rng(random_state).random(len(y))
+
+    candidates = list(ParameterGrid(param_grid))
+    n_train_rows = len(y) * (n_splits - 1) / n_splits
+    fractions = halving_fractions(len(candidates), n_train_rows, eta, min_rows)
+    n_workers = n_jobs or os.cpu_count() or 1
+
+    rows = []
+    for round_number, fraction in enumerate(fractions):
+        # Кандидати розкладаються по задачах через один, щоб складні дерева не потрапили в одну задачу
+        n_tasks = min(len(candidates), n_workers * TASKS_PER_WORKER)
+        chunks = [candidates[i::n_tasks] for i in range(n_tasks)]
+        started = time.perf_counter()
+        chunk_results = run_shared(_evaluate_candidates, (X, y, folds, ranks),
+                                   [(chunk, fraction, random_state) for chunk in chunks], n_jobs)
+
+        scored = []
+        for chunk, results in zip(chunks, chunk_results):
+            for params, result in zip(chunk, results):
+                scored.append((params, result))
+                rows.append({'round': round_number, 'fraction': fraction,
+                             'n_rows': int(round(n_train_rows * fraction)), **params, **result})
+
+        # Найкращі - за точністю, при рівності - за F1 та меншим розкидом
+        scored.sort(key=lambda item: (-item[1]['accuracy'], -item[1]['f1'], item[1]['accuracy_std']))
+        if verbose:
+            best_params, best = scored[0]
+            print(f"   Раунд {round_number + 1}/{len(fractions)}: {len(scored)} кандидатів на "
+                  f"{fraction:.0%} даних за {time.perf_counter() - started:.1f} с, "
+                  f"найкраща точність {best['accuracy']*100:.1f}% ({best_params})")
+        n_keep = max(1, math.ceil(len(scored) / eta))
+        candidates = [params for params, _ in scored[:n_keep]]
+
+    results = pd.DataFrame(rows)
+    # Параметри зберігаються як є (без перетворення max_depth=None та цілих чисел на float)
+    for column in param_grid:
+        results[column] = pd.Series([row[column] for row in rows], dtype=object)
+    return {
+        'best_params': dict(scored[0][0]),
+        'best_score': scored[0][1]['accuracy'],
+        'results': results,
+        'fractions': fractions,
+    }
+
+
+def save_search_results(search, test_accuracy=None, best_params_path=BEST_PARAMS_PATH,
+                        results_path=SEARCH_RESULTS_PATH):
+    """
+    Зберігає найкращі параметри (JSON) та повну таблицю результатів (CSV) поруч з моделлю.
+
+    Args:
+        search: Результат successive_halving
+        test_accuracy: Точність моделі з найкращими параметрами на тестових даних
+    """
+    os.makedirs(os.path.dirname(best_params_path) or '.', exist_ok=True)
+    summary = {
+        'params': search['best_params'],
+        'cv_accuracy': search['best_score'],
+        'test_accuracy': test_accuracy,
+        'fractions': search['fractions'],
+        'n_candidates': int((search['results']['round'] == 0).sum()),
+        'searched_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+    with open(best_params_path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    search['results'].to_csv(results_path, index=False)
+
+
+def load_best_params(path=BEST_PARAMS_PATH):
+    """
+    Повертає параметри моделі Good Fit: знайдені пошуком або GOOD_FIT_PARAMS.
+
+    Returns:
+        dict: Параметри DecisionTreeClassifier
+    """
+    if not os.path.exists(path):
+        return dict(GOOD_FIT_PARAMS)
+    with open(path, encoding='utf-8') as f:
+        return {**GOOD_FIT_PARAMS, **json.load(f)['params']}
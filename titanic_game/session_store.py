@@ -0,0 +1,485 @@
+"""
+Модуль для зберігання стану сесій гравців поза процесом Streamlit.
+Зберігається тільки компактний знімок (крок гри, вибори гравця, відбиток
+та метрики останньої моделі), а великі DataFrame відтворюються з виборів
+(див. preprocessing.py). Тому сесія переживає перезапуск сервера і може
+продовжитись на будь-якій репліці за балансувальником.
+
+Ідентифікатор сесії в адресі сторінки підписаний (HMAC з секретом, спільним
+для реплік), тому підібрати чужий ідентифікатор не можна. Записувати сесію
+може лише вкладка, яка її орендувала (claim_session): якщо адресу відкрито
+в другій вкладці, поки перша активна, друга отримує копію стану під новим
+ідентифікатором і не перезаписує чужий прогрес.
+
+Сховище обирається змінною середовища TITANIC_SESSION_STORE:
+    sqlite:///шлях/до/sessions.db   - локальна база SQLite (за замовчуванням)
+    redis://host:6379/0             - Redis або сумісний сервер (потрібен пакет redis)
+    memory://                       - пам'ять процесу (одна репліка, для тестів)
+"""
+
+import os
+import hmac
+import json
+import time
+import uuid
+import zlib
+import hashlib
+import secrets
+import sqlite3
+import threading
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+SESSION_STORE_URL = os.environ.get('TITANIC_SESSION_STORE',
+                                   'sqlite:///' + os.path.join(RESULTS_DIR, 'sessions.db'))
+
+# Скільки зберігати неактивну сесію (в секундах)
+SESSION_TTL = 7 * 24 * 3600
+
+# Скільки секунд після останнього звернення сесія належить вкладці, яка її орендувала
+LEASE_TTL = int(os.environ.get('TITANIC_SESSION_LEASE_TTL', '120'))
+
+# Секрет для підпису ідентифікаторів сесій: TITANIC_SESSION_SECRET, секрет cookie Streamlit
+# (однаковий для всіх реплік run_replicas.py) або файл, спільний для реплік на одному сервері
+SESSION_SECRET_PATH = os.path.join(RESULTS_DIR, 'session_secret')
+
+# Ідентифікатор цього процесу (репліки) у власниках оренди
+REPLICA_ID = uuid.uuid4().hex[:12]
+
+# Вибори гравця, які не зберігаються: великі дані та похідна статистика
+# (відтворюються з решти виборів)
+HEAVY_CHOICES = {'df_step_2', 'df_processed', 'stats_step_2', 'stats_processed'}
+
+# Метрики результату навчання, які зберігаються (сама модель - ні)
+RESULT_KEYS = ['train_accuracy', 'test_accuracy', 'precision', 'recall', 'f1', 'fit_time', 'total_time']
+
+# Ключі session_state, які входять у знімок
+STATE_KEYS = ['mode', 'game_step']
+
+
+class SessionConflictError(RuntimeError):
+    """Сесію орендувала інша вкладка - знімок не записано."""
+
+
+# Секрет підпису (читається один раз на процес)
+_session_secret = None
+
+
+def session_secret():
+    """Повертає секрет підпису ідентифікаторів сесій (див. SESSION_SECRET_PATH)."""
+    global _session_secret
+
+    if _session_secret is None:
+        secret = os.environ.get('TITANIC_SESSION_SECRET') or os.environ.get('STREAMLIT_SERVER_COOKIE_SECRET')
+        if not secret:
+            secret = _file_secret(SESSION_SECRET_PATH)
+        _session_secret = secret.encode('utf-8')
+    return _session_secret
+
+
+def _file_secret(path):
+    """Читає секрет з файлу або атомарно створює його (перша репліка, що встигла, перемагає)."""
+    try:
+        with open(path, encoding='utf-8') as file:
+            secret = file.read().strip()
+        if secret:
+            return secret
+    except FileNotFoundError:
+        pass
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        file.write(secrets.token_hex(32))
+    os.chmod(temp_path, 0o600)
+    try:
+        os.link(temp_path, path)
+    except FileExistsError:
+        pass
+    finally:
+        os.remove(temp_path)
+    with open(path, encoding='utf-8') as file:
+        return file.read().strip()
+
+
+def sign_session_id(session_id, secret=None):
+    """Токен сесії для адреси сторінки: '<ідентифікатор>.<підпис>'."""
+    signature = hmac.new(secret or session_secret(), session_id.encode('utf-8'), hashlib.sha256)
+    return f"{session_id}.{signature.hexdigest()[:32]}"
+
+
+def verify_session_token(token, secret=None):
+    """
+    Перевіряє підпис токена сесії.
+
+    Returns:
+        str або None: Ідентифікатор сесії, якщо підпис правильний
+    """
+    if not token or '.' not in token:
+        return None
+    session_id = token.rsplit('.', 1)[0]
+    return session_id if hmac.compare_digest(sign_session_id(session_id, secret), token) else None
+
+
+def _json_default(value):
+    # Числа numpy (наприклад, з віджетів) -> звичайні числа Python
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError(f"Значення не серіалізується: {type(value).__name__}")
+
+
+def snapshot_session(state, fingerprint=None):
+    """
+    Будує компактний знімок стану сесії.
+
+    Args:
+        state: st.session_state (або будь-який словник)
+        fingerprint: Відбиток канонічних виборів (training.choices_fingerprint) для результату навчання
+
+    Returns:
+        dict: Знімок з JSON-сумісними значеннями
+    """
+    snapshot = {key: state[key] for key in STATE_KEYS if key in state}
+    snapshot['game_choices'] = {
+        key: value for key, value in state.get('game_choices', {}).items()
+        if key not in HEAVY_CHOICES
+    }
+
+    training_result = state.get('training_result')
+    if training_result is not None:
+        snapshot['training_summary'] = {key: training_result.get(key) for key in RESULT_KEYS}
+        snapshot['training_summary']['fingerprint'] = fingerprint
+        snapshot['training_summary']['model_fingerprint'] = training_result.get('model_fingerprint')
+    elif 'training_summary' in state:
+        snapshot['training_summary'] = state['training_summary']
+
+    return snapshot
+
+
+def encode_snapshot(snapshot):
+    """Серіалізує знімок у стиснутий JSON (байти)."""
+    payload = json.dumps(snapshot, ensure_ascii=False, separators=(',', ':'), default=_json_default)
+    return zlib.compress(payload.encode('utf-8'), 6)
+
+
+def decode_snapshot(data):
+    """Відновлює знімок зі стиснутого JSON."""
+    return json.loads(zlib.decompress(data).decode('utf-8'))
+
+
+def restore_session(state, snapshot):
+    """
+    Записує знімок назад у стан сесії. Великі дані не відновлюються -
+    їх потрібно відтворити з виборів гравця.
+
+    Args:
+        state: st.session_state
+        snapshot: Знімок (snapshot_session)
+    """
+    for key in STATE_KEYS:
+        if key in snapshot:
+            state[key] = snapshot[key]
+    state['game_choices'] = dict(snapshot.get('game_choices', {}))
+    if 'training_summary' in snapshot:
+        state['training_summary'] = snapshot['training_summary']
+
+
+class MemorySessionStore:
+    """Сховище в пам'яті процесу (тільки для однієї репліки та тестів)."""
+
+    def __init__(self, ttl=SESSION_TTL):
+        self.ttl = ttl
+        self._data = {}
+        self._leases = {}
+        self._lock = threading.Lock()
+
+    def load(self, session_id):
+        with self._lock:
+            item = self._data.get(session_id)
+        if item is None or item[0] < time.time() - self.ttl:
+            return None
+        return decode_snapshot(item[1])
+
+    def _claim(self, session_id, owner, ttl, takeover=None):
+        now = time.time()
+        current = self._leases.get(session_id)
+        if current is not None and current[1] >= now and current[0] not in (owner, takeover):
+            return False
+        self._leases[session_id] = (owner, now + ttl)
+        return True
+
+    def claim(self, session_id, owner, ttl=LEASE_TTL, takeover=None):
+        with self._lock:
+            return self._claim(session_id, owner, ttl, takeover)
+
+    def lease_owner(self, session_id):
+        with self._lock:
+            current = self._leases.get(session_id)
+        return current[0] if current is not None and current[1] >= time.time() else None
+
+    def save(self, session_id, data, owner=None, ttl=LEASE_TTL):
+        with self._lock:
+            if owner is not None and not self._claim(session_id, owner, ttl):
+                return False
+            self._data[session_id] = (time.time(), data)
+            return True
+
+    def delete(self, session_id):
+        with self._lock:
+            self._data.pop(session_id, None)
+            self._leases.pop(session_id, None)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    updated_at REAL NOT NULL,
+    data BLOB NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_sessions_updated_at ON sessions (updated_at);
+CREATE TABLE IF NOT EXISTS session_leases (
+    session_id TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+# Оренда: нова, продовження своєї, прострочена чужа або явно передана (takeover)
+_CLAIM = """
+INSERT INTO session_leases (session_id, owner, expires_at) VALUES (?, ?, ?)
+ON CONFLICT (session_id) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+WHERE session_leases.owner = excluded.owner OR session_leases.expires_at < ? OR session_leases.owner = ?
+"""
+
+
+class SQLiteSessionStore:
+    """
+    Сховище сесій у локальній базі SQLite (спільне для всіх реплік на одному сервері).
+    WAL дозволяє репліками читати сесії під час запису інших реплік.
+
+    Args:
+        path: Шлях до файлу бази
+        ttl: Скільки зберігати неактивну сесію (в секундах)
+    """
+
+    def __init__(self, path, ttl=SESSION_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+
+    def _connection(self):
+        """З'єднання з базою (окреме для кожного потоку)."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(_SCHEMA)
+            self._local.connection = connection
+        return connection
+
+    def load(self, session_id):
+        row = self._connection().execute(
+            "SELECT data FROM sessions WHERE session_id = ? AND updated_at >= ?",
+            (session_id, time.time() - self.ttl)
+        ).fetchone()
+        return decode_snapshot(row[0]) if row else None
+
+    @staticmethod
+    def _claim(connection, session_id, owner, ttl, takeover=None):
+        now = time.time()
+        return connection.execute(_CLAIM, (session_id, owner, now + ttl, now, takeover)).rowcount > 0
+
+    def claim(self, session_id, owner, ttl=LEASE_TTL, takeover=None):
+        with self._connection() as connection:
+            return self._claim(connection, session_id, owner, ttl, takeover)
+
+    def lease_owner(self, session_id):
+        row = self._connection().execute(
+            "SELECT owner FROM session_leases WHERE session_id = ? AND expires_at >= ?",
+            (session_id, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def save(self, session_id, data, owner=None, ttl=LEASE_TTL):
+        # Оренда та запис в одній транзакції: перший запис блокує базу для інших реплік
+        with self._connection() as connection:
+            if owner is not None and not self._claim(connection, session_id, owner, ttl):
+                return False
+            connection.execute(
+                "INSERT INTO sessions (session_id, updated_at, data) VALUES (?, ?, ?) "
+                "ON CONFLICT (session_id) DO UPDATE SET updated_at = excluded.updated_at, data = excluded.data",
+                (session_id, time.time(), data)
+            )
+            return True
+
+    def delete(self, session_id):
+        with self._connection() as connection:
+            connection.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            connection.execute("DELETE FROM session_leases WHERE session_id = ?", (session_id,))
+
+    def purge_expired(self):
+        """Видаляє сесії, неактивні довше за ttl, та прострочені оренди. Повертає кількість видалених сесій."""
+        now = time.time()
+        with self._connection() as connection:
+            connection.execute("DELETE FROM session_leases WHERE expires_at < ?", (now,))
+            return connection.execute("DELETE FROM sessions WHERE updated_at < ?", (now - self.ttl,)).rowcount
+
+
+class RedisSessionStore:
+    """
+    Сховище сесій у Redis (або сумісному сервері) - для реплік на кількох серверах.
+    Неактивні сесії видаляє сам сервер (EXPIRE).
+
+    Args:
+        url: Адреса сервера, наприклад redis://localhost:6379/0
+        ttl: Скільки зберігати неактивну сесію (в секундах)
+    """
+
+    KEY_PREFIX = 'titanic:session:'
+    LEASE_PREFIX = 'titanic:lease:'
+
+    # Оренда (KEYS[1]) вільна, своя або takeover (ARGV[3]) - продовжуємо її і, якщо передано дані,
+    # записуємо їх у KEYS[2]; інакше повертаємо 0
+    CLAIM_SCRIPT = """
+    local current = redis.call('GET', KEYS[1])
+    if current and current ~= ARGV[1] and current ~= ARGV[3] then
+        return 0
+    end
+    redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+    if KEYS[2] then
+        redis.call('SET', KEYS[2], ARGV[4], 'EX', ARGV[5])
+    end
+    return 1
+    """
+
+    def __init__(self, url, ttl=SESSION_TTL):
+        try:
+            import redis
+        except ImportError as error:
+            raise ImportError("Для сховища Redis встановіть пакет redis: pip install redis") from error
+
+        self.ttl = ttl
+        self._client = redis.Redis.from_url(url)
+        self._claim = self._client.register_script(self.CLAIM_SCRIPT)
+
+    def load(self, session_id):
+        data = self._client.get(self.KEY_PREFIX + session_id)
+        return decode_snapshot(data) if data else None
+
+    def claim(self, session_id, owner, ttl=LEASE_TTL, takeover=None):
+        return bool(self._claim(keys=[self.LEASE_PREFIX + session_id], args=[owner, ttl, takeover or '']))
+
+    def lease_owner(self, session_id):
+        owner = self._client.get(self.LEASE_PREFIX + session_id)
+        return owner.decode('utf-8') if owner else None
+
+    def save(self, session_id, data, owner=None, ttl=LEASE_TTL):
+        if owner is None:
+            self._client.set(self.KEY_PREFIX + session_id, data, ex=self.ttl)
+            return True
+        return bool(self._claim(keys=[self.LEASE_PREFIX + session_id, self.KEY_PREFIX + session_id],
+                                args=[owner, ttl, '', data, self.ttl]))
+
+    def delete(self, session_id):
+        self._client.delete(self.KEY_PREFIX + session_id, self.LEASE_PREFIX + session_id)
+
+
+def create_session_store(url=SESSION_STORE_URL):
+    """
+    Створює сховище за адресою (див. опис модуля).
+
+    Returns:
+        SQLiteSessionStore, RedisSessionStore або MemorySessionStore
+    """
+    if url.startswith('sqlite:///'):
+        return SQLiteSessionStore(url[len('sqlite:///'):])
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisSessionStore(url)
+    if url.startswith('memory://'):
+        return MemorySessionStore()
+    raise ValueError(f"Невідоме сховище сесій: {url}")
+
+
+# Глобальне сховище (одне на процес)
+_session_store = None
+
+
+def get_session_store():
+    """Створює (або повертає закешоване) сховище сесій."""
+    global _session_store
+
+    if _session_store is None:
+        _session_store = create_session_store()
+    return _session_store
+
+
+def claim_session(session_id, owner, store=None, is_stale=None):
+    """
+    Орендує сесію для вкладки owner (або продовжує її оренду).
+
+    Args:
+        session_id: Ідентифікатор сесії
+        owner: Власник оренди (вкладка гравця)
+        store: Сховище (за замовчуванням - get_session_store())
+        is_stale: Функція owner -> bool: чи можна забрати оренду чужого власника
+                  (наприклад, вкладку вже закрито)
+
+    Returns:
+        bool: True, якщо сесія належить owner
+    """
+    store = store or get_session_store()
+    if store.claim(session_id, owner):
+        return True
+    current = store.lease_owner(session_id)
+    if current is None:
+        return store.claim(session_id, owner)
+    return is_stale is not None and is_stale(current) and store.claim(session_id, owner, takeover=current)
+
+
+def save_session(session_id, state, fingerprint=None, store=None, owner=None):
+    """
+    Зберігає знімок сесії, якщо він змінився з минулого збереження.
+
+    Args:
+        session_id: Ідентифікатор сесії
+        state: st.session_state
+        fingerprint: Відбиток канонічних виборів для результату навчання
+        store: Сховище (за замовчуванням - get_session_store())
+        owner: Власник оренди сесії (вкладка гравця); None - записати без перевірки оренди
+
+    Returns:
+        bool: True, якщо знімок записано
+
+    Raises:
+        SessionConflictError: Сесію орендувала інша вкладка
+    """
+    store = store or get_session_store()
+    data = encode_snapshot(snapshot_session(state, fingerprint))
+    if state.get('_saved_snapshot') == data:
+        # Знімок не змінився - лише продовжуємо оренду, поки вона не спливла
+        if owner is not None and time.time() - state.get('_lease_renewed_at', 0) > LEASE_TTL / 3:
+            if not store.claim(session_id, owner):
+                raise SessionConflictError(session_id)
+            state['_lease_renewed_at'] = time.time()
+        return False
+    if not store.save(session_id, data, owner):
+        raise SessionConflictError(session_id)
+    state['_saved_snapshot'] = data
+    if owner is not None:
+        state['_lease_renewed_at'] = time.time()
+    return True
+
+
+def load_session(session_id, state, store=None):
+    """
+    Відновлює сесію зі сховища.
+
+    Returns:
+        bool: True, якщо сесію знайдено та відновлено
+    """
+    snapshot = (store or get_session_store()).load(session_id)
+    if snapshot is None:
+        return False
+    restore_session(state, snapshot)
+    return True
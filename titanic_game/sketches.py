@@ -0,0 +1,194 @@
+"""
+Модуль з потоковими скетчами фіксованого розміру.
+Дозволяє оцінювати квантилі (наприклад, медіану віку) та частоти категорій
+на даних, які не вміщуються в пам'ять, та об'єднувати скетчі з різних
+частин даних або процесів.
+"""
+
+import numpy as np
+
+# Кількість центроїдів у скетчі за замовчуванням (похибка рангу ~ 1/size)
+DEFAULT_SKETCH_SIZE = 512
+
+# Максимальна кількість різних категорій у лічильнику (решта потрапляє в OTHER)
+DEFAULT_MAX_CATEGORIES = 64
+OTHER = '__other__'
+
+
+class QuantileSketch:
+    """
+    Потоковий скетч для оцінки квантилів з обмеженою пам'яттю.
+
+    Зберігає не більше size центроїдів (середнє значення + вага). Коли
+    центроїдів стає забагато, сусідні (за значенням) центроїди з однаковою
+    сумарною вагою об'єднуються. Скетчі можна об'єднувати через merge(),
+    тому кожен процес або частина даних може мати свій скетч.
+
+    Args:
+        size: Максимальна кількість центроїдів
+    """
+
+    def __init__(self, size=DEFAULT_SKETCH_SIZE):
+        self.size = size
+        self.means = np.empty(0, dtype=np.float64)
+        self.weights = np.empty(0, dtype=np.float64)
+        self.count = 0
+        self.missing = 0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        """
+        Додає пакет значень у скетч (пропущені значення NaN лише рахуються).
+        """
+        values = np.asarray(values, dtype=np.float64).ravel()
+        missing = np.isnan(values)
+        n_missing = int(missing.sum())
+        if n_missing:
+            self.missing += n_missing
+            values = values[~missing]
+        if len(values) == 0:
+            return self
+
+        self.count += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+        # Пакет спочатку стискаємо до size центроїдів, щоб не тримати його цілим
+        means, weights = self._compress(np.sort(values), np.ones(len(values)))
+        self._absorb(means, weights)
+        return self
+
+    def merge(self, other):
+        """Об'єднує інший скетч з цим (результат - у цьому скетчі)."""
+        self.count += other.count
+        self.missing += other.missing
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._absorb(other.means, other.weights)
+        return self
+
+    def _absorb(self, means, weights):
+        means = np.concatenate([self.means, means])
+        weights = np.concatenate([self.weights, weights])
+        order = np.argsort(means, kind='stable')
+        self.means, self.weights = self._compress(means[order], weights[order])
+
+    def _compress(self, means, weights):
+        """Об'єднує відсортовані центроїди в не більше ніж size груп однакової ваги."""
+        if len(means) <= self.size:
+            return means, weights
+
+        cumulative = np.cumsum(weights)
+        groups = np.minimum((cumulative - weights / 2) / cumulative[-1] * self.size, self.size - 1)
+        groups = groups.astype(np.int64)
+
+        group_weights = np.bincount(groups, weights=weights, minlength=self.size)
+        group_sums = np.bincount(groups, weights=means * weights, minlength=self.size)
+        non_empty = group_weights > 0
+        return group_sums[non_empty] / group_weights[non_empty], group_weights[non_empty]
+
+    def quantile(self, q):
+        """
+        Оцінює квантиль (або масив квантилів) q в діапазоні 0-1.
+
+        Returns:
+            float або numpy.ndarray: Оцінка квантиля (NaN, якщо скетч порожній)
+        """
+        q_array = np.atleast_1d(np.asarray(q, dtype=np.float64))
+        if self.count == 0:
+            result = np.full(q_array.shape, np.nan)
+        else:
+            # Кожен центроїд представляє середину своєї ваги
+            cumulative = np.cumsum(self.weights)
+            centers = (cumulative - self.weights / 2) / cumulative[-1]
+            positions = np.concatenate([[0.0], centers, [1.0]])
+            values = np.concatenate([[self.min], self.means, [self.max]])
+            result = np.interp(q_array, positions, values)
+
+        return float(result[0]) if np.ndim(q) == 0 else result
+
+    def median(self):
+        """Оцінка медіани."""
+        return self.quantile(0.5)
+
+    def cdf(self, x):
+        """
+        Оцінює частку значень, не більших за x (обернена функція до quantile).
+
+        Returns:
+            float або numpy.ndarray: Значення 0-1 (NaN, якщо скетч порожній)
+        """
+        x_array = np.atleast_1d(np.asarray(x, dtype=np.float64))
+        if self.count == 0:
+            result = np.full(x_array.shape, np.nan)
+        else:
+            cumulative = np.cumsum(self.weights)
+            centers = (cumulative - self.weights / 2) / cumulative[-1]
+            positions = np.concatenate([[0.0], centers, [1.0]])
+            values = np.concatenate([[self.min], self.means, [self.max]])
+            result = np.interp(x_array, values, positions, left=0.0, right=1.0)
+
+        return float(result[0]) if np.ndim(x) == 0 else result
+
+
+class CategoryCounter:
+    """
+    Потоковий лічильник категорій з обмеженою пам'яттю.
+
+    Рахує не більше max_categories різних значень; нові значення понад
+    цю межу рахуються разом як OTHER. Лічильники можна об'єднувати через merge().
+
+    Args:
+        max_categories: Максимальна кількість різних категорій
+    """
+
+    def __init__(self, max_categories=DEFAULT_MAX_CATEGORIES):
+        self.max_categories = max_categories
+        self.counts = {}
+        self.count = 0
+        self.missing = 0
+
+    def update(self, values):
+        """Додає пакет значень (пропущені значення лише рахуються)."""
+        values = np.asarray(values).ravel()
+        if values.dtype.kind == 'f':
+            missing = np.isnan(values)
+        else:
+            values = values.astype(object)
+            missing = np.array([value is None or value != value for value in values], dtype=bool)
+        self.missing += int(missing.sum())
+        values = values[~missing]
+        if len(values) == 0:
+            return self
+
+        uniques, counts = np.unique(values.astype(str), return_counts=True)
+        self._add(dict(zip(uniques.tolist(), counts.tolist())))
+        return self
+
+    def merge(self, other):
+        """Об'єднує інший лічильник з цим (результат - у цьому лічильнику)."""
+        self.missing += other.missing
+        self._add(other.counts)
+        return self
+
+    def _add(self, counts):
+        for value, count in counts.items():
+            if value not in self.counts and len(self.counts) >= self.max_categories:
+                value = OTHER
+            self.counts[value] = self.counts.get(value, 0) + count
+            self.count += count
+
+    def frequencies(self, categories=None):
+        """
+        Частки категорій.
+
+        Args:
+            categories: Порядок категорій (за замовчуванням - всі відомі)
+
+        Returns:
+            dict: {категорія: частка 0-1}
+        """
+        categories = list(self.counts) if categories is None else categories
+        total = self.count or 1
+        return {value: self.counts.get(value, 0) / total for value in categories}
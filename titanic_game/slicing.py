@@ -0,0 +1,214 @@
+"""
+Модуль з метриками моделі за групами пасажирів (зрізами).
+
+Сегменти (Pclass, Sex, Embarked, вікова група) кодуються цілими числами, і
+за один прохід по рядках (bincount за спільним кодом сегментів та кошиком
+ймовірності) будується куб кількостей: рядки, вижили, передбачено «Вижив»,
+правильно передбачено «Вижив», сума ймовірностей та сума квадратів помилок.
+Усі величини адитивні, тому кожен зріз (одна колонка) та пара зрізів - це
+сума куба по решті осей, без повторних проходів по даних. Куби частин
+великого датасету можна просто додавати.
+"""
+
+from itertools import combinations, product
+
+import numpy as np
+import pandas as pd
+
+from evaluation import THRESHOLD
+
+# Колонки сегментів та їх значення (все інше - "невідомо")
+SEGMENT_CATEGORIES = {
+    'Pclass': [1, 2, 3],
+    'Sex': ['male', 'female'],
+    'Embarked': ['C', 'Q', 'S'],
+}
+
+# Вікові групи: нижні межі (остання група - без верхньої межі)
+AGE_BAND_EDGES = [0, 12, 18, 30, 45, 60]
+AGE_BAND = 'AgeBand'
+
+SEGMENTS = ['Pclass', 'Sex', 'Embarked', AGE_BAND]
+UNKNOWN = 'невідомо'
+
+# Кошики ймовірності для калібрування (ECE)
+CALIBRATION_BINS = 10
+
+# Зрізи з меншою кількістю пасажирів не показуються серед найгірших
+MIN_SLICE_ROWS = 20
+
+# Порядок величин у кубі
+_ROWS, _POSITIVES, _PREDICTED, _TRUE_POSITIVES, _SCORES, _SQUARED_ERRORS = range(6)
+
+REPORT_COLUMNS = ['slice', 'segment', 'n', 'survival_rate', 'mean_score', 'calibration_gap',
+                  'accuracy', 'precision', 'recall', 'f1', 'brier', 'ece', 'accuracy_gap']
+
+
+def _age_band_labels():
+    labels = [f"{low}-{high - 1}" for low, high in zip(AGE_BAND_EDGES[:-1], AGE_BAND_EDGES[1:])]
+    return labels + [f"{AGE_BAND_EDGES[-1]}+"]
+
+
+def segment_codes(passengers, segments=SEGMENTS):
+    """
+    Кодує сегменти пасажирів цілими числами.
+
+    Args:
+        passengers: DataFrame з вихідними колонками (Pclass, Sex, Embarked, Age)
+        segments: Назви сегментів (колонки SEGMENT_CATEGORIES та AGE_BAND)
+
+    Returns:
+        tuple: (коди - масив int64 (рядки × сегменти), назви значень кожного сегмента;
+                останнє значення кожного сегмента - UNKNOWN)
+    """
+    codes = np.empty((len(passengers), len(segments)), dtype=np.int64)
+    labels = []
+    for i, segment in enumerate(segments):
+        if segment == AGE_BAND:
+            age = pd.to_numeric(passengers['Age'], errors='coerce').to_numpy(dtype=np.float64)
+            segment_labels = _age_band_labels()
+            with np.errstate(invalid='ignore'):
+                band = np.searchsorted(AGE_BAND_EDGES, age, side='right') - 1
+            band[np.isnan(age) | (band < 0)] = len(segment_labels)
+        else:
+            segment_labels = [str(value) for value in SEGMENT_CATEGORIES[segment]]
+            band = pd.Categorical(passengers[segment], categories=SEGMENT_CATEGORIES[segment]).codes
+            band = np.where(band < 0, len(segment_labels), band)
+        codes[:, i] = band
+        labels.append(segment_labels + [UNKNOWN])
+    return codes, labels
+
+
+def slice_counts(codes, cardinalities, y_true, scores, threshold=THRESHOLD, n_bins=CALIBRATION_BINS):
+    """
+    Куб кількостей за один прохід по рядках.
+
+    Args:
+        codes: Коди сегментів (рядки × сегменти), див. segment_codes
+        cardinalities: Кількість значень кожного сегмента
+        y_true: Справжні класи (0/1)
+        scores: Ймовірності класу 1
+        threshold: Поріг класу 1
+
+    Returns:
+        ndarray: Масив (*cardinalities, n_bins, 6) - величини для кожної комбінації сегментів
+                 та кошика ймовірності
+    """
+    y_true = np.asarray(y_true, dtype=np.float64)
+    scores = np.asarray(scores, dtype=np.float64)
+    predicted = (scores > threshold).astype(np.float64)
+    score_bin = np.minimum((scores * n_bins).astype(np.int64), n_bins - 1)
+
+    cells = np.ravel_multi_index(tuple(np.asarray(codes).T), cardinalities) * n_bins + score_bin
+    size = int(np.prod(cardinalities)) * n_bins
+    cube = np.stack([
+        np.bincount(cells, minlength=size).astype(np.float64),
+        np.bincount(cells, weights=y_true, minlength=size),
+        np.bincount(cells, weights=predicted, minlength=size),
+        np.bincount(cells, weights=y_true * predicted, minlength=size),
+        np.bincount(cells, weights=scores, minlength=size),
+        np.bincount(cells, weights=(scores - y_true) ** 2, minlength=size),
+    ], axis=-1)
+    return cube.reshape(*cardinalities, n_bins, 6)
+
+
+def _slice_metrics(counts):
+    """Метрики для масиву кількостей (сегменти × кошики × 6)."""
+    totals = counts.sum(axis=1)
+    n = totals[:, _ROWS]
+    positives, predicted, tp = totals[:, _POSITIVES], totals[:, _PREDICTED], totals[:, _TRUE_POSITIVES]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        accuracy = (n - positives - predicted + 2 * tp) / n
+        precision = np.where(predicted > 0, tp / predicted, 0.0)
+        recall = np.where(positives > 0, tp / positives, 0.0)
+        f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+        survival_rate = positives / n
+        mean_score = totals[:, _SCORES] / n
+        # ECE: зважена різниця між середньою ймовірністю та часткою тих, хто вижив, по кошиках
+        ece = np.abs(counts[..., _SCORES] - counts[..., _POSITIVES]).sum(axis=1) / n
+        brier = totals[:, _SQUARED_ERRORS] / n
+
+    return {
+        'n': n.astype(np.int64),
+        'survival_rate': survival_rate,
+        'mean_score': mean_score,
+        'calibration_gap': mean_score - survival_rate,
+        'accuracy': accuracy,
+        'precision': precision,
+        'recall': recall,
+        'f1': f1,
+        'brier': brier,
+        'ece': ece,
+    }
+
+
+def slice_table(cube, segments, labels, max_order=2):
+    """
+    Метрики для всіх зрізів з куба: усі пасажири, кожен сегмент та (max_order=2) кожна пара.
+
+    Args:
+        cube: Результат slice_counts (можна суму кубів кількох частин)
+        segments: Назви сегментів (осі куба)
+        labels: Назви значень кожного сегмента
+        max_order: Найбільша кількість сегментів в одному зрізі
+
+    Returns:
+        DataFrame: Колонки REPORT_COLUMNS, по рядку на кожен непорожній сегмент зрізу
+    """
+    n_bins = cube.shape[-2]
+    tables = []
+    overall_accuracy = None
+    for order in range(max_order + 1):
+        for axes in combinations(range(len(segments)), order):
+            other = tuple(axis for axis in range(len(segments)) if axis not in axes)
+            counts = cube.sum(axis=other).reshape(-1, n_bins, cube.shape[-1])
+            metrics = _slice_metrics(counts)
+            if overall_accuracy is None:
+                overall_accuracy = metrics['accuracy'][0]
+
+            table = pd.DataFrame(metrics)
+            table.insert(0, 'slice', ' × '.join(segments[axis] for axis in axes) or 'Усі')
+            table.insert(1, 'segment', [' × '.join(values) or 'Усі пасажири'
+                                        for values in product(*(labels[axis] for axis in axes))])
+            tables.append(table[table['n'] > 0])
+
+    report = pd.concat(tables, ignore_index=True)
+    report['accuracy_gap'] = report['accuracy'] - overall_accuracy
+    return report[REPORT_COLUMNS]
+
+
+def sliced_metrics(passengers, y_true, scores, segments=SEGMENTS, threshold=THRESHOLD, max_order=2):
+    """
+    Метрики моделі за групами пасажирів (усі зрізи та пари зрізів).
+
+    Args:
+        passengers: Вихідні дані тих самих пасажирів (Pclass, Sex, Embarked, Age)
+        y_true: Справжні класи (0/1)
+        scores: Ймовірності класу 1 (evaluation.positive_scores)
+        segments: Сегменти для зрізів
+        threshold: Поріг класу 1
+        max_order: Найбільша кількість сегментів в одному зрізі
+
+    Returns:
+        DataFrame: Див. slice_table
+    """
+    codes, labels = segment_codes(passengers, segments)
+    cube = slice_counts(codes, [len(values) for values in labels], y_true, scores, threshold)
+    return slice_table(cube, list(segments), labels, max_order)
+
+
+def worst_slices(report, metric='accuracy_gap', min_rows=MIN_SLICE_ROWS, limit=10):
+    """
+    Зрізи, де модель працює найгірше (за різницею точності з усіма пасажирами
+    або за модулем помилки калібрування).
+
+    Returns:
+        DataFrame: Не більше limit рядків з щонайменше min_rows пасажирами
+    """
+    candidates = report[(report['n'] >= min_rows) & (report['slice'] != 'Усі')]
+    if metric == 'calibration_gap':
+        order = candidates['calibration_gap'].abs().sort_values(ascending=False).index
+    else:
+        order = candidates[metric].sort_values().index
+    return candidates.loc[order].head(limit).reset_index(drop=True)
@@ -0,0 +1,350 @@
+"""
+Модуль для керування важкими об'єктами сесій гравців (DataFrame кроків гри,
+навчені моделі) у межах спільного бюджету пам'яті процесу.
+
+Між перезапусками сторінки важкі об'єкти тримає не st.session_state, а
+менеджер процесу: наприкінці перезапуску release() забирає їх зі стану сесії,
+а на початку наступного restore() повертає. Якщо сума розмірів об'єктів усіх
+сесій перевищує бюджет, найдавніше використані об'єкти (LRU) інших сесій
+витісняються:
+    'spill'   - зберігаються на локальний диск (DataFrame - Arrow IPC зі стисненням
+                zstd, інші об'єкти - joblib) і завантажуються при поверненні гравця;
+    'rebuild' - відкидаються; застосунок відтворює їх з виборів гравця
+                (rebuild_game_data, compute_stats) або з інших об'єктів.
+Об'єкти сесій, неактивних довше за IDLE_TTL, витісняються повністю, а файли
+на диску видаляються разом із сесією в сховищі (session_store.SESSION_TTL).
+
+Бюджет задається змінною TITANIC_SESSION_MEMORY_MB, час неактивності -
+TITANIC_SESSION_IDLE_TTL (в секундах).
+"""
+
+import os
+import time
+import uuid
+import shutil
+import threading
+from collections import OrderedDict
+
+import joblib
+import pandas as pd
+import pyarrow as pa
+
+from memory_debug import deep_sizeof
+from session_store import SESSION_TTL
+
+SPILL_DIR = os.environ.get('TITANIC_SPILL_DIR',
+                           os.path.join(os.path.dirname(__file__), 'results', 'spill'))
+
+# Спільний бюджет пам'яті важких об'єктів усіх сесій процесу
+MEMORY_BUDGET = int(float(os.environ.get('TITANIC_SESSION_MEMORY_MB', '512')) * 1024 * 1024)
+
+# Через скільки секунд неактивності об'єкти сесії витісняються з пам'яті
+IDLE_TTL = int(os.environ.get('TITANIC_SESSION_IDLE_TTL', '900'))
+
+# Як часто (в секундах) шукати неактивні сесії та старі файли на диску
+EXPIRE_INTERVAL = 30
+
+# Скільки секунд сесія після restore() вважається такою, що виконується (якщо перезапуск
+# перервано, наприклад st.rerun(), release() не викликається)
+RERUN_TIMEOUT = 120
+
+SPILL = 'spill'
+REBUILD = 'rebuild'
+
+# Важкі ключі стану сесії та що з ними робити при витісненні.
+# 'game_choices.<ключ>' - ключ у st.session_state.game_choices
+HEAVY_KEYS = {
+    'game_choices.df_step_2': REBUILD,
+    'game_choices.df_processed': REBUILD,
+    'game_choices.stats_step_2': REBUILD,
+    'game_choices.stats_processed': REBUILD,
+    'training_data': SPILL,
+    'training_result': SPILL,
+    'trained_model': REBUILD,
+    'X_train': REBUILD,
+    'X_test': REBUILD,
+    'y_train': REBUILD,
+    'y_test': REBUILD,
+}
+
+# Глобальний менеджер (один на процес)
+_state_manager = None
+
+
+def _container(state, key):
+    """Словник, у якому лежить ключ (state або state['game_choices']), та ім'я ключа в ньому."""
+    if key.startswith('game_choices.'):
+        return state.get('game_choices'), key[len('game_choices.'):]
+    return state, key
+
+
+def write_spill(value, path):
+    """
+    Зберігає об'єкт у файл (атомарно).
+    DataFrame - Arrow IPC зі стисненням zstd (разом з індексом), інші об'єкти - joblib.
+
+    Returns:
+        str: Шлях до файлу (з розширенням за форматом)
+    """
+    is_frame = isinstance(value, pd.DataFrame)
+    path = f"{path}.arrow" if is_frame else f"{path}.joblib"
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    if is_frame:
+        table = pa.Table.from_pandas(value, preserve_index=True)
+        with pa.OSFile(tmp_path, 'wb') as f:
+            with pa.ipc.new_file(f, table.schema, options=pa.ipc.IpcWriteOptions(compression='zstd')) as writer:
+                writer.write_table(table)
+    else:
+        joblib.dump(value, tmp_path, compress=3)
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_spill(path):
+    """Завантажує об'єкт, збережений write_spill."""
+    if path.endswith('.arrow'):
+        with pa.memory_map(path, 'r') as source:
+            return pa.ipc.open_file(source).read_all().to_pandas()
+    return joblib.load(path)
+
+
+class _Entry:
+    """Важкий об'єкт сесії: значення (None - витіснено), розмір та файл на диску."""
+
+    __slots__ = ('value', 'size', 'policy', 'path')
+
+    def __init__(self, value, size, policy):
+        self.value = value
+        self.size = size
+        self.policy = policy
+        self.path = None
+
+
+class SessionStateManager:
+    """
+    Важкі об'єкти всіх сесій процесу зі спільним бюджетом пам'яті (LRU).
+
+    Сесія, у якої зараз виконується перезапуск сторінки (між restore та release),
+    не витісняється.
+
+    Args:
+        budget: Бюджет пам'яті в байтах
+        idle_ttl: Через скільки секунд неактивності витісняти об'єкти сесії
+        spill_dir: Папка для збережених об'єктів
+        spill_ttl: Через скільки секунд видаляти файли неактивної сесії
+    """
+
+    def __init__(self, budget=MEMORY_BUDGET, idle_ttl=IDLE_TTL, spill_dir=SPILL_DIR, spill_ttl=SESSION_TTL):
+        self.budget = budget
+        self.idle_ttl = idle_ttl
+        self.spill_dir = spill_dir
+        self.spill_ttl = spill_ttl
+        self._entries = OrderedDict()  # (session_id, key) -> _Entry, від найдавнішого використання
+        self._last_seen = {}
+        self._active = {}
+        self._lock = threading.RLock()
+        self._expired_at = 0.0
+        self.memory = 0
+        self.evicted = 0
+        self.spilled = 0
+        self.loaded = 0
+        self.dropped = 0
+
+    def _spill_path(self, session_id, key):
+        return os.path.join(self.spill_dir, session_id, key)
+
+    def restore(self, session_id, state):
+        """
+        Повертає важкі об'єкти сесії у її стан (на початку перезапуску сторінки).
+        Збережені на диск об'єкти завантажуються; відкинуті ('rebuild') - ні,
+        їх відтворює застосунок.
+        """
+        with self._lock:
+            self._last_seen[session_id] = self._active[session_id] = time.time()
+            keys = [key for sid, key in self._entries if sid == session_id]
+            for key in keys:
+                container, name = _container(state, key)
+                if container is None or name in container:
+                    continue
+                value = self._get(session_id, key)
+                if value is not None:
+                    container[name] = value
+
+    def _get(self, session_id, key):
+        entry = self._entries[(session_id, key)]
+        self._entries.move_to_end((session_id, key))
+        if entry.value is None and entry.path is not None:
+            try:
+                entry.value = read_spill(entry.path)
+            except (OSError, ValueError, EOFError, pa.ArrowException):
+                # Файл видалено або пошкоджено - об'єкт потрібно відтворити
+                del self._entries[(session_id, key)]
+                return None
+            if entry.size is None:
+                entry.size = deep_sizeof(entry.value)
+            self.memory += entry.size
+            self.loaded += 1
+        return entry.value
+
+    def release(self, session_id, state):
+        """
+        Забирає важкі об'єкти зі стану сесії в менеджер (наприкінці перезапуску сторінки)
+        та застосовує бюджет пам'яті. Ключі, яких у стані вже немає (наприклад,
+        гравець почав гру заново), видаляються.
+        """
+        with self._lock:
+            for key, policy in HEAVY_KEYS.items():
+                container, name = _container(state, key)
+                if container is not None and name in container:
+                    self._put(session_id, key, container.pop(name), policy)
+                else:
+                    self._discard(session_id, key)
+
+            self._last_seen[session_id] = time.time()
+            self._active.pop(session_id, None)
+            self._enforce_budget()
+            self._expire_idle()
+
+    def _put(self, session_id, key, value, policy):
+        entry = self._entries.get((session_id, key))
+        if entry is not None and entry.value is value:
+            self._entries.move_to_end((session_id, key))
+            return
+
+        self._discard(session_id, key)
+        entry = _Entry(value, deep_sizeof(value), policy)
+        self._entries[(session_id, key)] = entry
+        self.memory += entry.size
+
+    def _discard(self, session_id, key):
+        entry = self._entries.pop((session_id, key), None)
+        if entry is None:
+            return
+        if entry.value is not None:
+            self.memory -= entry.size
+            entry.value = None
+        if entry.path is not None:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    def _evict(self, session_id, key):
+        """Витісняє об'єкт з пам'яті: на диск ('spill') або повністю ('rebuild')."""
+        entry = self._entries[(session_id, key)]
+        if entry.value is None:
+            return
+        if entry.policy == SPILL:
+            try:
+                if entry.path is None:
+                    entry.path = write_spill(entry.value, self._spill_path(session_id, key))
+                    self.spilled += 1
+            except (OSError, TypeError, ValueError, pa.ArrowException):
+                entry.path = None
+        self.memory -= entry.size
+        self.evicted += 1
+        if entry.path is None:
+            del self._entries[(session_id, key)]
+            self.dropped += 1
+        else:
+            entry.value = None
+
+    def _is_active(self, session_id, now):
+        started = self._active.get(session_id)
+        return started is not None and now - started < RERUN_TIMEOUT
+
+    def _enforce_budget(self):
+        if self.memory <= self.budget:
+            return
+        now = time.time()
+        for session_id, key in list(self._entries):
+            if self.memory <= self.budget:
+                break
+            if not self._is_active(session_id, now):
+                self._evict(session_id, key)
+
+    def _expire_idle(self):
+        now = time.time()
+        if now - self._expired_at < EXPIRE_INTERVAL:
+            return
+        self._expired_at = now
+
+        for session_id, last_seen in list(self._last_seen.items()):
+            if self._is_active(session_id, now) or now - last_seen < self.idle_ttl:
+                continue
+            keys = [key for sid, key in self._entries if sid == session_id]
+            for key in keys:
+                self._evict(session_id, key)
+            if now - last_seen >= self.spill_ttl:
+                for key in keys:
+                    self._discard(session_id, key)
+                del self._last_seen[session_id]
+
+        # Файли сесій, які залишились від попередніх запусків (або інших реплік)
+        if os.path.isdir(self.spill_dir):
+            for name in os.listdir(self.spill_dir):
+                path = os.path.join(self.spill_dir, name)
+                try:
+                    if name not in self._last_seen and now - os.path.getmtime(path) >= self.spill_ttl:
+                        shutil.rmtree(path, ignore_errors=True)
+                except OSError:
+                    pass
+
+    def adopt_spilled(self, session_id):
+        """
+        Підхоплює файли сесії, збережені іншим процесом (наприклад, до перезапуску
+        сервера або іншою реплікою на цьому сервері), щоб restore() їх завантажив.
+        """
+        directory = os.path.join(self.spill_dir, session_id)
+        if not os.path.isdir(directory):
+            return
+        with self._lock:
+            for file_name in os.listdir(directory):
+                key, extension = os.path.splitext(file_name)
+                if extension not in ('.arrow', '.joblib') or key not in HEAVY_KEYS or (session_id, key) in self._entries:
+                    continue
+                path = os.path.join(directory, file_name)
+                # Розмір у пам'яті стане відомим після завантаження
+                entry = _Entry(None, None, HEAVY_KEYS[key])
+                entry.path = path
+                self._entries[(session_id, key)] = entry
+                self._entries.move_to_end((session_id, key), last=False)
+
+    def forget(self, session_id):
+        """Видаляє всі об'єкти сесії (з пам'яті та з диска)."""
+        with self._lock:
+            for key in [key for sid, key in self._entries if sid == session_id]:
+                self._discard(session_id, key)
+            self._last_seen.pop(session_id, None)
+        shutil.rmtree(os.path.join(self.spill_dir, session_id), ignore_errors=True)
+
+    def metrics(self):
+        """
+        Стан менеджера.
+
+        Returns:
+            dict: memory, budget, sessions, in_memory, on_disk, evicted, spilled, loaded, dropped
+        """
+        with self._lock:
+            in_memory = sum(entry.value is not None for entry in self._entries.values())
+            return {
+                'memory': self.memory,
+                'budget': self.budget,
+                'sessions': len(self._last_seen),
+                'in_memory': in_memory,
+                'on_disk': len(self._entries) - in_memory,
+                'evicted': self.evicted,
+                'spilled': self.spilled,
+                'loaded': self.loaded,
+                'dropped': self.dropped,
+            }
+
+
+def get_state_manager():
+    """Створює (або повертає закешований) менеджер важких об'єктів процесу."""
+    global _state_manager
+
+    if _state_manager is None:
+        _state_manager = SessionStateManager()
+    return _state_manager
@@ -0,0 +1,165 @@
+"""
+Модуль для навчання моделі ігрового режиму (крок 6).
+Функція train_game_model не залежить від Streamlit, тому її можна запускати
+у фоновому процесі (див. jobs.py).
+"""
+
+import json
+import time
+import hashlib
+
+import numpy as np
+from sklearn.model_selection import train_test_split
+
+from algorithms import RANDOM_FOREST, TREE_ALGORITHMS, DECISION_TREE, build_model, grow_forest
+from evaluation import evaluate_model
+
+# Вибори гравця, які впливають на навчену модель
+CHOICE_KEYS = ['features', 'age_strategy', 'encoding_choices', 'dropna_strategy',
+               'algorithm', 'max_depth', 'forest_stop_on_plateau', 'eval_mode',
+               'cv_splits', 'cv_repeats']
+
+
+def canonical_choices(choices):
+    """
+    Приводить вибори гравця до канонічного вигляду: порядок ознак не важливий,
+    а параметри, які не використовуються обраним алгоритмом, відкидаються.
+
+    Returns:
+        dict: Словник тільки з JSON-сумісними значеннями
+    """
+    canonical = {key: choices.get(key) for key in CHOICE_KEYS}
+    canonical['features'] = sorted(canonical['features'] or [])
+    canonical['encoding_choices'] = dict(sorted((canonical['encoding_choices'] or {}).items()))
+    canonical['algorithm'] = canonical['algorithm'] or DECISION_TREE
+
+    if canonical['algorithm'] not in TREE_ALGORITHMS:
+        canonical['max_depth'] = None
+    if canonical['algorithm'] != RANDOM_FOREST:
+        canonical['forest_stop_on_plateau'] = None
+    if not canonical['cv_splits']:
+        canonical['cv_splits'] = canonical['cv_repeats'] = None
+
+    return canonical
+
+
+def choices_fingerprint(choices):
+    """Повертає короткий відбиток (sha1) канонічних виборів гравця."""
+    payload = json.dumps(canonical_choices(choices), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def training_job_key(choices, columns):
+    """
+    Ключ фонової задачі навчання (jobs.TrainingJobExecutor, coalesce_key).
+
+    На відміну від choices_fingerprint (таблиця лідерів), враховує порядок колонок
+    df_processed: від нього залежать важливості ознак, схема і вхід моделі, тому
+    гравці з однаковими виборами, але іншим порядком ознак, навчають власну модель.
+
+    Args:
+        choices: Вибори гравця
+        columns: Колонки df_processed у порядку, в якому їх отримає модель
+
+    Returns:
+        str: Короткий відбиток (sha1)
+    """
+    payload = json.dumps([canonical_choices(choices), list(columns)], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def train_game_model(df_processed, algorithm, max_depth=5, stop_on_plateau=True,
+                     cv_splits=None, cv_repeats=1, schema=None, progress=None):
+    """
+    Навчає модель на підготовлених даних гравця та обчислює метрики.
+
+    Args:
+        df_processed: Числовий DataFrame без пропусків з колонкою 'Survived'
+        algorithm: Один з algorithms.ALGORITHMS
+        max_depth: Максимальна глибина дерев
+        stop_on_plateau: Чи зупиняти ріст Random Forest на плато точності
+        cv_splits: Кількість фолдів для крос-валідації (None - без неї)
+        cv_repeats: Кількість повторень крос-валідації
+        schema: Схема ознак (schema.game_model_schema), зберігається разом з моделлю для експорту
+        progress: Функція progress(value, text) для відображення прогресу (0-1)
+
+    Returns:
+        dict: Словник з результатами навчання:
+            - model: навчена модель
+            - schema: схема ознак моделі (або None)
+            - train_positions, test_positions: позиції рядків train/test у df_processed
+            - train_accuracy, test_accuracy, precision, recall, f1: метрики
+            - evaluation: повна оцінка train / test (evaluation.evaluate_model: матриця помилок,
+              ROC-крива, AUC та бутстреп-інтервали)
+            - forest_info: історія росту лісу (тільки для Random Forest)
+            - cv_results: результати крос-валідації (або None)
+            - fit_time, total_time: тривалість навчання та всієї оцінки (в секундах)
+    """
+    def report(value, text):
+        if progress is not None:
+            progress(value, text)
+
+    started = time.perf_counter()
+
+    # Розділяємо на X та y
+    X = df_processed.drop('Survived', axis=1)
+    y = df_processed['Survived']
+
+    # Розділяємо на train/test (позиції, щоб не пересилати копії даних)
+    positions = np.arange(len(df_processed))
+    train_positions, test_positions = train_test_split(
+        positions, test_size=0.2, random_state=42, stratify=y
+    )
+    X_train, X_test = X.iloc[train_positions], X.iloc[test_positions]
+    y_train, y_test = y.iloc[train_positions], y.iloc[test_positions]
+
+    # Навчаємо модель
+    model = build_model(algorithm, max_depth=max_depth, n_rows=len(train_positions))
+    forest_info = None
+
+    if algorithm == RANDOM_FOREST:
+        def show_forest_progress(n_trees, max_trees, accuracy):
+            report(n_trees / max_trees,
+                   f"🌲 Дерев: {n_trees} з {max_trees} | Точність: {accuracy * 100:.1f}%")
+
+        forest_info = grow_forest(
+            model, X_train, y_train, X_test, y_test,
+            stop_on_plateau=stop_on_plateau,
+            on_progress=show_forest_progress
+        )
+    else:
+        report(0.0, "🔧 Навчаємо модель...")
+        model.fit(X_train, y_train)
+
+    fit_time = time.perf_counter() - started
+
+    # Оцінка: один predict_proba на вибірку, всі метрики та бутстреп-інтервали з нього
+    report(1.0, "📏 Оцінюємо модель...")
+    evaluation = evaluate_model(model, X_train, y_train, X_test, y_test)
+
+    # K-fold крос-валідація (якщо обрано)
+    cv_results = None
+    if cv_splits:
+        from cross_validation import cross_validate_model
+
+        report(1.0, f"🔁 Крос-валідація: {cv_splits} фолдів × {cv_repeats} повторень...")
+        cv_results = cross_validate_model(model, X, y, n_splits=cv_splits, n_repeats=cv_repeats)
+
+    report(1.0, "✅ Навчання завершено")
+
+    return {
+        'model': model,
+        'schema': schema,
+        'train_positions': train_positions,
+        'test_positions': test_positions,
+        'train_accuracy': evaluation['train']['accuracy'],
+        'test_accuracy': evaluation['test']['accuracy'],
+        'precision': evaluation['test']['precision'],
+        'recall': evaluation['test']['recall'],
+        'f1': evaluation['test']['f1'],
+        'evaluation': evaluation,
+        'forest_info': forest_info,
+        'cv_results': cv_results,
+        'fit_time': fit_time,
+        'total_time': time.perf_counter() - started,
+    }
@@ -7,12 +7,37 @@ import pandas as pd
 import numpy as np
 import pickle
 import os
+import json
+import hashlib
+import plotly.graph_objects as go
 from sklearn.model_selection import train_test_split
 from sklearn.tree import DecisionTreeClassifier
 from sklearn.metrics import accuracy_score
 from sklearn.preprocessing import LabelEncoder
 
+from search import load_best_params
+from learning_curve import compute_learning_curve, save_learning_curve, load_learning_curve
+from schema import main_model_schema, save_schema
+
 MODELS_DIR = os.path.join(os.path.dirname(__file__), 'models')
+FIGURES_PATH = os.path.join(MODELS_DIR, 'comparison_figures.json')
+
+# Кеш готових графіків та таблиць (ключ - відбиток результатів)
+_figures_cache = {}
+
+def prepare_clean_data(df):
+    """
+    Готує дані для моделі good fit: ознаки без пропусків, стать закодована.
+
+    Returns:
+        tuple: (df_clean, LabelEncoder для колонки Sex)
+    """
+    df_clean = df[['Survived', 'Pclass', 'Sex', 'Age', 'SibSp', 'Parch', 'Fare']].copy()
+    df_clean = df_clean.fillna({'Age': df_clean['Age'].median()})
+    le = LabelEncoder()
+    df_clean['Sex'] = le.fit_transform(df_clean['Sex'])
+    df_clean = df_clean.dropna()
+    return df_clean, le
 
 def train_all_models():
     """
@@ -26,11 +51,7 @@ def train_all_models():
     df = pd.read_csv(url)
     
     # Підготовка даних для good fit
-    df_clean = df[['Survived', 'Pclass', 'Sex', 'Age', 'SibSp', 'Parch', 'Fare']].copy()
-    df_clean = df_clean.fillna({'Age': df_clean['Age'].median()})
-    le = LabelEncoder()
-    df_clean['Sex'] = le.fit_transform(df_clean['Sex'])
-    df_clean = df_clean.dropna()
+    df_clean, le = prepare_clean_data(df)
     
     # ========== OVERFITTING ==========
     print("🔴 Навчаємо модель OVERFITTING...")
@@ -71,12 +92,17 @@ def train_all_models():
         X_full, y_full, test_size=0.3, random_state=42
     )
     
-    model_goodfit = DecisionTreeClassifier(max_depth=5, min_samples_split=20, random_state=42)
+    # Параметри знайдені пошуком (train_model.py --search) або з ноутбука
+    goodfit_params = load_best_params()
+    model_goodfit = DecisionTreeClassifier(random_state=42, **goodfit_params)
     model_goodfit.fit(X_train_full, y_train_full)
     
     train_acc_goodfit = accuracy_score(y_train_full, model_goodfit.predict(X_train_full))
     test_acc_goodfit = accuracy_score(y_test_full, model_goodfit.predict(X_test_full))
     
+    print("📈 Обчислюємо криву навчання GOOD FIT...")
+    save_learning_curve(compute_learning_curve(X_full.to_numpy(), y_full.to_numpy(), goodfit_params))
+    
     # Зберігаємо моделі
     os.makedirs(MODELS_DIR, exist_ok=True)
     
@@ -98,6 +124,7 @@ def train_all_models():
     }
     with open(os.path.join(MODELS_DIR, 'feature_stats.pkl'), 'wb') as f:
         pickle.dump(feature_stats, f)
+    save_schema(main_model_schema(le, feature_stats), os.path.join(MODELS_DIR, 'feature_schema.json'))
     
     # Результати для візуалізації
     results = {
@@ -119,7 +146,7 @@ def train_all_models():
             'train_accuracy': train_acc_goodfit,
             'test_accuracy': test_acc_goodfit,
             'difference': abs(train_acc_goodfit - test_acc_goodfit),
-            'params': 'Багато даних\nХороші ознаки + depth=5',
+            'params': f"Багато даних\nХороші ознаки + depth={goodfit_params['max_depth']}",
             'color': '#2ecc71'
         }
     }
@@ -131,6 +158,18 @@ def train_all_models():
     
     return results
 
+def get_learning_curve():
+    """
+    Повертає збережену криву навчання моделі good fit.
+    Крива обчислюється разом з іншими артефактами (train_model.py, train_all_models),
+    а не під час показу сторінки.
+
+    Returns:
+        dict або None: Крива (learning_curve.compute_learning_curve); None, якщо її ще
+        не обчислено або її обчислено для інших параметрів моделі
+    """
+    return load_learning_curve(load_best_params())
+
 def get_cached_results():
     """
     Спробує завантажити збережені результати з файлу.
@@ -148,12 +187,177 @@ def get_cached_results():
 def save_results(results):
     """
     Зберігає результати порівняння у файл.
+    Разом з ними зберігає готові специфікації графіків та таблиць.
     """
     os.makedirs(MODELS_DIR, exist_ok=True)
     results_path = os.path.join(MODELS_DIR, 'comparison_results.pkl')
     with open(results_path, 'wb') as f:
         pickle.dump(results, f)
 
+    save_comparison_figures(results)
+
+def results_fingerprint(results):
+    """
+    Повертає відбиток результатів порівняння.
+    Змінюється тільки тоді, коли моделі перенавчено.
+    """
+    payload = json.dumps(results, sort_keys=True, default=float)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+def _train_test_bar(data, colors, title, name):
+    """Будує стовпчикову діаграму Train/Test для однієї моделі."""
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=['Train', 'Test'],
+        y=[data['train_accuracy']*100, data['test_accuracy']*100],
+        marker_color=colors,
+        text=[f"{data['train_accuracy']*100:.1f}%", f"{data['test_accuracy']*100:.1f}%"],
+        textposition='outside',
+        name=name
+    ))
+    fig.update_layout(
+        title=title,
+        yaxis_title='Точність (%)',
+        height=400,
+        showlegend=False
+    )
+    return fig
+
+def build_comparison_figures(results):
+    """
+    Будує графіки та таблиці навчального режиму з результатів порівняння.
+
+    Returns:
+        dict: Словник з JSON-сумісними специфікаціями:
+            - fingerprint: відбиток результатів
+            - figures: специфікації графіків plotly (overfit, underfit, goodfit, comparison)
+            - tables: таблиці comparison та display ({'columns': [...], 'data': [...]})
+    """
+    fig_overfit = _train_test_bar(
+        results['overfitting'], ['#e74c3c', '#c0392b'],
+        'Overfitting: Велика різниця між Train та Test', 'Overfitting'
+    )
+    fig_underfit = _train_test_bar(
+        results['underfitting'], ['#3498db', '#2980b9'],
+        'Underfitting: Низька точність на обох наборах', 'Underfitting'
+    )
+    fig_goodfit = _train_test_bar(
+        results['goodfit'], ['#2ecc71', '#27ae60'],
+        'Good Fit: Висока точність на обох наборах', 'Good Fit'
+    )
+
+    # Формуємо дані для таблиці з округленням
+    comparison_data = {
+        'Модель': ['Overfitting', 'Underfitting', 'Good Fit'],
+        'Train Accuracy (%)': [
+            round(results['overfitting']['train_accuracy']*100, 1),
+            round(results['underfitting']['train_accuracy']*100, 1),
+            round(results['goodfit']['train_accuracy']*100, 1)
+        ],
+        'Test Accuracy (%)': [
+            round(results['overfitting']['test_accuracy']*100, 1),
+            round(results['underfitting']['test_accuracy']*100, 1),
+            round(results['goodfit']['test_accuracy']*100, 1)
+        ],
+        'Різниця (%)': [
+            round(results['overfitting']['difference']*100, 1),
+            round(results['underfitting']['difference']*100, 1),
+            round(results['goodfit']['difference']*100, 1)
+        ]
+    }
+    comparison_df = pd.DataFrame(comparison_data)
+
+    # Візуалізація порівняння
+    fig_comparison = go.Figure()
+    fig_comparison.add_trace(go.Bar(
+        name='Train Accuracy',
+        x=comparison_df['Модель'],
+        y=comparison_df['Train Accuracy (%)'],
+        marker_color='#3498db',
+        text=comparison_df['Train Accuracy (%)'].apply(lambda x: f'{x:.1f}%'),
+        textposition='outside'
+    ))
+    fig_comparison.add_trace(go.Bar(
+        name='Test Accuracy',
+        x=comparison_df['Модель'],
+        y=comparison_df['Test Accuracy (%)'],
+        marker_color='#e74c3c',
+        text=comparison_df['Test Accuracy (%)'].apply(lambda x: f'{x:.1f}%'),
+        textposition='outside'
+    ))
+    fig_comparison.update_layout(
+        title='Порівняння: Overfitting vs Underfitting vs Good Fit',
+        xaxis_title='Модель',
+        yaxis_title='Точність (%)',
+        barmode='group',
+        height=500
+    )
+
+    # Форматуємо таблицю для кращого відображення
+    display_df = comparison_df.copy()
+    for column in ['Train Accuracy (%)', 'Test Accuracy (%)', 'Різниця (%)']:
+        display_df[column] = display_df[column].apply(lambda x: f"{x:.1f}%")
+
+    return {
+        'fingerprint': results_fingerprint(results),
+        'figures': {
+            'overfit': json.loads(fig_overfit.to_json()),
+            'underfit': json.loads(fig_underfit.to_json()),
+            'goodfit': json.loads(fig_goodfit.to_json()),
+            'comparison': json.loads(fig_comparison.to_json()),
+        },
+        'tables': {
+            'comparison': comparison_df.to_dict(orient='split', index=False),
+            'display': display_df.to_dict(orient='split', index=False),
+        }
+    }
+
+def save_comparison_figures(results):
+    """
+    Зберігає специфікації графіків та таблиць у JSON поруч з результатами.
+    """
+    spec = build_comparison_figures(results)
+    os.makedirs(MODELS_DIR, exist_ok=True)
+    with open(FIGURES_PATH, 'w', encoding='utf-8') as f:
+        json.dump(spec, f, ensure_ascii=False)
+    return spec
+
+def load_comparison_figures(results):
+    """
+    Повертає готові графіки та таблиці для навчального режиму.
+
+    Специфікації читаються з comparison_figures.json (якщо його відбиток
+    збігається з результатами), а готові об'єкти кешуються в пам'яті,
+    тому повторні перезапуски сторінки не будують графіки заново.
+
+    Returns:
+        dict: Словник з графіками ('overfit', 'underfit', 'goodfit', 'comparison')
+            та таблицями ('comparison_df', 'display_df')
+    """
+    fingerprint = results_fingerprint(results)
+    if fingerprint in _figures_cache:
+        return _figures_cache[fingerprint]
+
+    spec = None
+    if os.path.exists(FIGURES_PATH):
+        try:
+            with open(FIGURES_PATH, 'r', encoding='utf-8') as f:
+                spec = json.load(f)
+        except (OSError, ValueError):
+            spec = None
+
+    if spec is None or spec.get('fingerprint') != fingerprint:
+        # Результати збережені старішою версією - будуємо специфікації один раз
+        spec = save_comparison_figures(results)
+
+    figures = {name: go.Figure(fig_spec) for name, fig_spec in spec['figures'].items()}
+    for name, table in spec['tables'].items():
+        figures[f'{name}_df'] = pd.DataFrame(table['data'], columns=table['columns'])
+
+    _figures_cache.clear()
+    _figures_cache[fingerprint] = figures
+    return figures
+
 def load_comparison_results(use_cache=True):
     """
     Завантажує результати порівняння моделей.
@@ -8,22 +8,48 @@ import numpy as np
 import warnings
 import pickle
 import os
+import sys
+import time
+import argparse
 from sklearn.model_selection import train_test_split
 from sklearn.tree import DecisionTreeClassifier
 from sklearn.metrics import accuracy_score
 from sklearn.preprocessing import LabelEncoder
 
+# Модулі додатку імпортуються так само, як в app.py (з папки titanic_game),
+# щоб збережені моделі однаково завантажувались і тут, і в додатку
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'titanic_game'))
+
+from sketches import QuantileSketch
+from drift import create_sketches, update_sketches, build_baseline
+from search import successive_halving, save_search_results, load_best_params
+from hist_tree import HistogramTreeClassifier, compute_bin_edges, MAX_BINS
+from slicing import sliced_metrics, worst_slices
+from schema import main_model_schema, save_schema
+from learning_curve import compute_learning_curve, save_learning_curve, LEARNING_CURVE_PATH
+
 warnings.filterwarnings('ignore')
 
-def prepare_data():
-    """Завантажує та підготовлює дані для навчання"""
+# Ознаки моделі (в порядку, який очікує model.prepare_input)
+FEATURES = ['Pclass', 'Sex', 'Age', 'SibSp', 'Parch', 'Fare']
+COLUMNS = ['Survived'] + FEATURES
+
+SLICE_REPORT_PATH = 'titanic_game/models/slice_report.csv'
+
+def load_data(csv_path=None):
+    """Завантажує датасет Titanic (з csv_path, якщо його передано)"""
     print("🚢 Завантажуємо датасет Titanic...")
     
-    # Завантажуємо датасет
     url = "https://raw.githubusercontent.com/datasciencedojo/datasets/master/titanic.csv"
-    df = pd.read_csv(url)
+    df = pd.read_csv(csv_path or url)
     
     print(f"✅ Датасет завантажено! Кількість записів: {len(df)}")
+    return df
+
+def prepare_data(df=None, csv_path=None):
+    """Завантажує (якщо df не передано) та підготовлює дані для навчання"""
+    if df is None:
+        df = load_data(csv_path)
     
     # Вибираємо важливі колонки
     df_clean = df[['Survived', 'Pclass', 'Sex', 'Age', 'SibSp', 'Parch', 'Fare']].copy()
@@ -44,14 +70,55 @@ def prepare_data():
     
     return df_clean, le
 
-def train_model():
-    """Навчає оптимальну модель та зберігає її"""
+def save_artifacts(model, label_encoder, feature_stats, drift_baseline=None):
+    """Зберігає модель, LabelEncoder, статистику та схему ознак для model.load_model і базові скетчі для drift.py"""
+    # Створюємо папку для моделей, якщо її немає
+    os.makedirs('titanic_game/models', exist_ok=True)
+    
+    # Зберігаємо модель
+    model_path = 'titanic_game/models/titanic_model.pkl'
+    with open(model_path, 'wb') as f:
+        pickle.dump(model, f)
+    print(f"✅ Модель збережено: {model_path}")
+    
+    # Зберігаємо LabelEncoder
+    encoder_path = 'titanic_game/models/label_encoder.pkl'
+    with open(encoder_path, 'wb') as f:
+        pickle.dump(label_encoder, f)
+    print(f"✅ LabelEncoder збережено: {encoder_path}")
+    
+    stats_path = 'titanic_game/models/feature_stats.pkl'
+    with open(stats_path, 'wb') as f:
+        pickle.dump(feature_stats, f)
+    print(f"✅ Статистика ознак збережена: {stats_path}")
+    
+    schema_path = 'titanic_game/models/feature_schema.json'
+    save_schema(main_model_schema(label_encoder, feature_stats), schema_path)
+    print(f"✅ Схема ознак збережена: {schema_path}")
+    
+    if drift_baseline is not None:
+        baseline_path = 'titanic_game/models/drift_baseline.pkl'
+        with open(baseline_path, 'wb') as f:
+            pickle.dump(drift_baseline, f)
+        print(f"✅ Базові скетчі для моніторингу зсуву збережено: {baseline_path}")
+
+def train_model(params=None, csv_path=None):
+    """
+    Навчає оптимальну модель та зберігає її.
+    
+    Args:
+        params: Параметри DecisionTreeClassifier (за замовчуванням - знайдені
+                search_model або параметри з ноутбука)
+        csv_path: Шлях до CSV з даними (за замовчуванням - датасет з інтернету)
+    """
+    params = params or load_best_params()
     print("="*80)
     print("🟢 НАВЧАННЯ ОПТИМАЛЬНОЇ МОДЕЛІ (GOOD FIT)")
     print("="*80)
     
-    # Підготовка даних
-    df_clean, label_encoder = prepare_data()
+    # Підготовка даних (вихідні дані потрібні ще для звіту за групами пасажирів)
+    df = load_data(csv_path)
+    df_clean, label_encoder = prepare_data(df)
     
     # Розділяємо на ознаки (X) та цільову змінну (y)
     X_full = df_clean.drop('Survived', axis=1)
@@ -66,8 +133,8 @@ def train_model():
     print(f"📊 Розмір тестового набору: {len(X_test_full)} записів\n")
     
     # Навчаємо модель оптимальної складності
-    print("🔧 Навчаємо модель...")
-    model_goodfit = DecisionTreeClassifier(max_depth=5, min_samples_split=20, random_state=42)
+    print(f"🔧 Навчаємо модель з параметрами {params}...")
+    model_goodfit = DecisionTreeClassifier(random_state=42, **params)
     model_goodfit.fit(X_train_full, y_train_full)
     
     # Передбачаємо результати
@@ -84,31 +151,21 @@ def train_model():
     print(f"   Різниця: {abs(train_accuracy - test_accuracy)*100:.1f}%")
     print("\n💡 Модель ОПТИМАЛЬНА! Вона добре працює на обох наборах даних.\n")
     
-    # Створюємо папку для моделей, якщо її немає
-    os.makedirs('titanic_game/models', exist_ok=True)
-    
-    # Зберігаємо модель
-    model_path = 'titanic_game/models/titanic_model.pkl'
-    with open(model_path, 'wb') as f:
-        pickle.dump(model_goodfit, f)
-    print(f"✅ Модель збережено: {model_path}")
-    
-    # Зберігаємо LabelEncoder
-    encoder_path = 'titanic_game/models/label_encoder.pkl'
-    with open(encoder_path, 'wb') as f:
-        pickle.dump(label_encoder, f)
-    print(f"✅ LabelEncoder збережено: {encoder_path}")
-    
     # Зберігаємо інформацію про середні значення для заповнення пропусків
     # (може знадобитися для передбачень)
     feature_stats = {
         'age_median': df_clean['Age'].median(),
         'fare_median': df_clean['Fare'].median(),
     }
-    stats_path = 'titanic_game/models/feature_stats.pkl'
-    with open(stats_path, 'wb') as f:
-        pickle.dump(feature_stats, f)
-    print(f"✅ Статистика ознак збережена: {stats_path}")
+    # Базовий розподіл ознак та передбачень для моніторингу зсуву
+    drift_baseline = build_baseline(X_train_full[FEATURES], model_goodfit.predict_proba(X_train_full)[:, 1])
+    save_artifacts(model_goodfit, label_encoder, feature_stats, drift_baseline)
+    save_slice_report(model_goodfit, df.loc[X_test_full.index], X_test_full, y_test_full)
+    
+    # Крива навчання для навчального режиму (сторінка її лише завантажує)
+    print("\n📈 Обчислюємо криву навчання GOOD FIT...")
+    save_learning_curve(compute_learning_curve(X_full.to_numpy(), y_full.to_numpy(), params))
+    print(f"✅ Крива навчання збережена: {LEARNING_CURVE_PATH}")
     
     print("\n" + "="*80)
     print("✅ НАВЧАННЯ ЗАВЕРШЕНО УСПІШНО!")
@@ -119,6 +176,193 @@ def train_model():
     
     return model_goodfit, label_encoder, feature_stats
 
+def save_slice_report(model, passengers, X_test, y_test, path=SLICE_REPORT_PATH):
+    """
+    Звіт за групами пасажирів (slicing.py): метрики на тестових даних для кожного
+    сегмента (Pclass, Sex, Embarked, вікова група) та кожної пари сегментів.
+    """
+    report = sliced_metrics(passengers, y_test, model.predict_proba(X_test)[:, 1])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    report.to_csv(path, index=False)
+    print(f"✅ Звіт за групами пасажирів збережено: {path} ({len(report)} груп)")
+    
+    print("\n🧩 Групи, де модель працює найгірше:")
+    for row in worst_slices(report, limit=5).itertuples():
+        print(f"   {row.slice:20s} {row.segment:20s} пасажирів: {row.n:6d} | точність: {row.accuracy*100:5.1f}% "
+              f"({row.accuracy_gap*100:+.1f}%) | калібрування: {row.calibration_gap*100:+.1f}%")
+    return report
+
+def search_model(n_jobs=None, csv_path=None):
+    """
+    Шукає найкращі гіперпараметри методом successive halving (search.py),
+    зберігає їх разом з таблицею результатів і навчає з ними модель.
+    """
+    print("="*80)
+    print("🔎 ПОШУК ГІПЕРПАРАМЕТРІВ (SUCCESSIVE HALVING)")
+    print("="*80)
+    
+    # Одна підготовлена матриця для всіх кандидатів
+    df_clean, _ = prepare_data(csv_path=csv_path)
+    X_full = df_clean[FEATURES].to_numpy(dtype=np.float64)
+    y_full = df_clean['Survived'].to_numpy()
+    
+    # Той самий поділ, що й у train_model: тестові дані в пошуку не беруть участі
+    X_train_full, X_test_full, y_train_full, y_test_full = train_test_split(
+        X_full, y_full, test_size=0.3, random_state=42
+    )
+    
+    started = time.perf_counter()
+    search = successive_halving(X_train_full, y_train_full, n_jobs=n_jobs)
+    print(f"\n✅ Пошук завершено за {time.perf_counter() - started:.1f} с, "
+          f"оцінок кандидатів: {len(search['results'])}")
+    
+    best_model = DecisionTreeClassifier(random_state=42, **search['best_params'])
+    best_model.fit(X_train_full, y_train_full)
+    test_accuracy = accuracy_score(y_test_full, best_model.predict(X_test_full))
+    print(f"🏆 Найкращі параметри: {search['best_params']}")
+    print(f"   Точність на крос-валідації: {search['best_score']*100:.1f}%, на тестових даних: {test_accuracy*100:.1f}%\n")
+    
+    save_search_results(search, test_accuracy)
+    print("✅ Параметри та таблицю результатів збережено поруч з моделлю\n")
+    
+    return train_model(search['best_params'], csv_path=csv_path)
+
+def scan_statistics(csv_path, chunksize):
+    """
+    Перший прохід по CSV частинами: потокові квантилі кожної ознаки.
+    Пам'ять обмежена розміром частини та розміром скетчів.
+    """
+    sketches = {column: QuantileSketch() for column in FEATURES if column != 'Sex'}
+    n_rows = 0
+    
+    for chunk in pd.read_csv(csv_path, usecols=COLUMNS, chunksize=chunksize):
+        n_rows += len(chunk)
+        for column, sketch in sketches.items():
+            sketch.update(pd.to_numeric(chunk[column], errors='coerce').to_numpy())
+    
+    return sketches, n_rows
+
+def iter_prepared_chunks(csv_path, chunksize, label_encoder, feature_stats, subset):
+    """
+    Читає CSV частинами та підготовлює кожну частину так само, як prepare_data.
+    
+    Args:
+        subset: 'train' або 'test' - детермінований поділ 70/30 (однаковий на кожному проході)
+    
+    Yields:
+        tuple: (X_chunk, y_chunk) - numpy масиви ознак та цільової змінної
+    """
+    for chunk_number, chunk in enumerate(pd.read_csv(csv_path, usecols=COLUMNS, chunksize=chunksize)):
+        # Заповнюємо пропущені значення віку медіаною
+        chunk = chunk.fillna({'Age': feature_stats['age_median']})
+        
+        # Перетворюємо стать на числа (невідомі значення відкидаємо)
+        chunk = chunk[chunk['Sex'].isin(label_encoder.classes_)]
+        chunk = chunk.assign(Sex=label_encoder.transform(chunk['Sex']))
+        chunk = chunk.dropna()
+        
+        is_test = np.random.default_rng(42 + chunk_number).random(len(chunk)) < 0.3
+        mask = is_test if subset == 'test' else ~is_test
+        
+        yield chunk[FEATURES].to_numpy(dtype=np.float64)[mask], chunk['Survived'].to_numpy()[mask]
+
+def chunked_accuracy(model, chunks):
+    """Точність моделі, обчислена частинами"""
+    correct = total = 0
+    for X_chunk, y_chunk in chunks:
+        correct += int((model.predict(X_chunk) == y_chunk).sum())
+        total += len(y_chunk)
+    return correct / total if total else 0.0
+
+def train_model_chunked(csv_path, chunksize=100_000, max_depth=5, min_samples_split=20):
+    """
+    Навчає оптимальну модель на CSV, який не вміщується в пам'ять.
+    
+    Дані читаються частинами по chunksize рядків. Медіани для заповнення
+    пропусків обчислюються потоковими скетчами квантилів, а дерево рішень
+    росте з гістограм, накопичених по частинах (один прохід на рівень дерева).
+    Збережені файли сумісні з model.load_model.
+    """
+    print("="*80)
+    print("🟢 НАВЧАННЯ ОПТИМАЛЬНОЇ МОДЕЛІ ЧАСТИНАМИ (OUT-OF-CORE)")
+    print("="*80)
+    print(f"📂 Файл: {csv_path}")
+    print(f"📦 Розмір частини: {chunksize} записів\n")
+    
+    # Перший прохід: статистика ознак
+    print("🔍 Прохід 1: обчислюємо статистику ознак...")
+    sketches, n_rows = scan_statistics(csv_path, chunksize)
+    feature_stats = {
+        'age_median': sketches['Age'].median(),
+        'fare_median': sketches['Fare'].median(),
+    }
+    print(f"✅ Прочитано {n_rows} записів")
+    print(f"   Медіана віку: {feature_stats['age_median']:.2f}, медіана вартості: {feature_stats['fare_median']:.2f}\n")
+    
+    # Стать кодуємо так само, як prepare_data (female=0, male=1)
+    label_encoder = LabelEncoder().fit(['female', 'male'])
+    
+    # Межі кошиків з квантилів (після заповнення пропусків вік має ще одне значення - медіану)
+    levels = np.linspace(0, 1, MAX_BINS)[1:-1]
+    candidates = []
+    for column in FEATURES:
+        if column == 'Sex':
+            candidates.append(np.arange(len(label_encoder.classes_)))
+        else:
+            values = sketches[column].quantile(levels)
+            if column == 'Age':
+                values = np.append(values, feature_stats['age_median'])
+            candidates.append(values)
+    bin_edges = compute_bin_edges(candidates)
+    
+    def train_chunks():
+        return iter_prepared_chunks(csv_path, chunksize, label_encoder, feature_stats, 'train')
+    
+    def test_chunks():
+        return iter_prepared_chunks(csv_path, chunksize, label_encoder, feature_stats, 'test')
+    
+    print(f"🔧 Проходи 2-{max_depth + 2}: вирощуємо дерево рівень за рівнем...")
+    model_goodfit = HistogramTreeClassifier(max_depth=max_depth, min_samples_split=min_samples_split)
+    model_goodfit.fit_chunks(train_chunks, bin_edges)
+    
+    print("📈 Останній прохід: обчислюємо точність...")
+    train_accuracy = chunked_accuracy(model_goodfit, train_chunks())
+    test_accuracy = chunked_accuracy(model_goodfit, test_chunks())
+    
+    print("📈 РЕЗУЛЬТАТИ НАВЧАННЯ:")
+    print(f"   Точність на тренувальних даних: {train_accuracy*100:.1f}%")
+    print(f"   Точність на тестових даних: {test_accuracy*100:.1f}%")
+    print(f"   Різниця: {abs(train_accuracy - test_accuracy)*100:.1f}%\n")
+    
+    # Базові скетчі для моніторингу зсуву (ще один прохід, пам'ять не залежить від розміру файлу)
+    drift_baseline = create_sketches()
+    for X_chunk, _ in train_chunks():
+        update_sketches(drift_baseline, X_chunk, model_goodfit.predict_proba(X_chunk)[:, 1])
+    save_artifacts(model_goodfit, label_encoder, feature_stats, drift_baseline)
+    
+    print("\n" + "="*80)
+    print("✅ НАВЧАННЯ ЗАВЕРШЕНО УСПІШНО!")
+    print("="*80)
+    
+    return model_goodfit, label_encoder, feature_stats
+
 if __name__ == "__main__":
-    train_model()
+    parser = argparse.ArgumentParser(description="Навчання моделі передбачення виживання на Титаніку")
+    parser.add_argument('--csv', help="Шлях до CSV з даними пасажирів (схема Titanic, за замовчуванням - з інтернету)")
+    parser.add_argument('--chunked', action='store_true',
+                        help="Навчати частинами, не завантажуючи весь файл у пам'ять (потрібен --csv)")
+    parser.add_argument('--chunksize', type=int, default=100_000, help="Кількість рядків в одній частині")
+    parser.add_argument('--search', action='store_true',
+                        help="Спочатку знайти найкращі гіперпараметри (successive halving)")
+    parser.add_argument('--n-jobs', type=int, default=None, help="Кількість процесів для пошуку")
+    args = parser.parse_args()
+    
+    if args.chunked:
+        if not args.csv:
+            parser.error("--chunked потребує --csv")
+        train_model_chunked(args.csv, chunksize=args.chunksize)
+    elif args.search:
+        search_model(n_jobs=args.n_jobs, csv_path=args.csv)
+    else:
+        train_model(csv_path=args.csv)
 